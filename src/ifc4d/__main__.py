@@ -20,6 +20,12 @@ parser.add_argument(
 parser.add_argument(
     "-o", "--output", action="store", required=True, type=str, help='ifc file name as string e.g. "file.ifc"'
 )
+parser.add_argument(
+    "-b",
+    "--bulk",
+    action="store_true",
+    help="stream the schedule and create it in bulk, reporting the throughput of each stage (xer, p6xml, mspxml)",
+)
 args = parser.parse_args()
 
 
@@ -52,17 +58,23 @@ elif args.schedule == "xer":
     ifcfile = get_file()
     if ifcfile:
         p6xer.file = ifcfile
-        p6xer.execute()
+        if args.bulk:
+            p6xer.execute_bulk()
+        else:
+            p6xer.execute()
     else:
         raise Exception("No files provided for output")
 elif args.schedule == "mspxml":
     msp = MSP2Ifc()
-    msp.xml = args.file()
+    msp.xml = args.file
     msp.output = args.output
     ifcfile = get_file()
     if ifcfile:
         msp.file = ifcfile
-        msp.execute()
+        if args.bulk:
+            msp.execute_bulk()
+        else:
+            msp.execute()
 elif args.schedule == "p6xml":
     p6xml = P62Ifc()
     p6xml.output = args.output
@@ -70,7 +82,10 @@ elif args.schedule == "p6xml":
     ifcfile = get_file()
     if ifcfile:
         p6xml.file = ifcopenshell.open(args.ifcfile)
-        p6xml.execute()
+        if args.bulk:
+            p6xml.execute_bulk()
+        else:
+            p6xml.execute()
 elif args.schedule == "pp":
     pp = PP2Ifc()
     pp.output = args.output
@@ -1,8 +1,14 @@
-from xerparser.reader import Reader
 import ifcopenshell
 import ifcopenshell.api
+import ifcopenshell.api.owner
+import ifcopenshell.api.sequence
+import ifcopenshell.guid
 import ifcopenshell.util.date
-from datetime import datetime, timedelta, date
+import ifcopenshell.util.sequence
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date, time
+from time import perf_counter
 
 
 class ScheduleIfcGenerator:
@@ -284,6 +290,8 @@ class ScheduleIfcGenerator:
                     lag_value=timedelta(days=lag / float(calendar["HoursPerDay"] or 8)),
                     duration_type="WORKTIME",
                 )
+                # Unlike editing a lag time, assigning one doesn't cascade the schedule.
+                ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=rel_sequence.RelatedProcess)
 
     def create_resources(self):
         # print("Resources", self.resources)
@@ -317,3 +325,394 @@ class ScheduleIfcGenerator:
     def create_boilerplate_ifc(self):
         self.file = ifcopenshell.file(schema="IFC4")
         self.work_plan = self.file.create_entity("IfcWorkPlan")
+
+
+def iter_xml(source, paths):
+    """Streams elements of an XML document, clearing each once it is read
+
+    Elements that are neither read nor inside an element that is read are
+    also cleared as soon as they end, so memory use doesn't grow with the
+    size of the document.
+
+    :param source: The path or file object of the XML document.
+    :param paths: The paths of the elements to read, each a tuple of tags
+        without namespaces starting from the children of the root element,
+        such as ``("Project", "Activity")``.
+    :return: A generator of ``(path, element)`` pairs. Each element is only
+        complete until the next pair is read.
+    """
+    paths = set(paths)
+    records = paths - {path[:i] for path in paths for i in range(len(path))}
+    depth = max(len(path) for path in paths)
+    path = []
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            path.append(element.tag.rpartition("}")[2])
+            continue
+        if len(path) <= depth + 1:
+            current = tuple(path[1:])
+            if current in paths:
+                yield current, element
+            if not any(current[:i] in records for i in range(1, len(current))):
+                element.clear()
+        path.pop()
+
+
+class ImportStatistics:
+    """Counts the records processed by each stage of an import and how long each stage takes"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, count=0, seconds=0.0):
+        totals = self.stages.setdefault(stage, [0, 0.0])
+        totals[0] += count
+        totals[1] += seconds
+
+    @contextmanager
+    def measure(self, stage, count=0):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, count, perf_counter() - start)
+
+    def iterate(self, stage, records):
+        """Yields each record of a stream, timing how long it takes to read"""
+        records = iter(records)
+        while True:
+            start = perf_counter()
+            try:
+                record = next(records)
+            except StopIteration:
+                self.add(stage, 0, perf_counter() - start)
+                return
+            self.add(stage, 1, perf_counter() - start)
+            yield record
+
+    def report(self):
+        lines = []
+        for stage, (count, seconds) in self.stages.items():
+            if count and seconds:
+                lines.append(f"{stage}: {count} in {seconds:.3f}s ({count / seconds:.0f}/s)")
+            else:
+                lines.append(f"{stage}: {seconds:.3f}s")
+        return "\n".join(lines)
+
+
+class BulkScheduleBuilder:
+    """Creates the tasks and sequences of a work schedule in bulk
+
+    Creating a task through the API assigns it to its parent task, work
+    schedule or calendar one relationship at a time, and editing its time or
+    sequences cascades the schedule after each change. Instead, tasks are
+    created directly, and the relationships that nest them and assign them to
+    the work schedule or their calendar are created once per parent, work
+    schedule and calendar when :meth:`finish` is called.
+
+    Task times are normalised to working days like
+    ``sequence.edit_task_time``, and conversions are cached for tasks with
+    the same dates and calendar. Rather than cascading dates through
+    sequences after each change, call :meth:`cascade` once all tasks and
+    sequences are added.
+    """
+
+    def __init__(self, file, work_schedule, statistics=None):
+        self.file = file
+        self.work_schedule = work_schedule
+        self.statistics = statistics or ImportStatistics()
+        self.owner_history = ifcopenshell.api.owner.create_owner_history(self.file)
+        self.tasks = {}
+        self.task_calendars = {}
+        self.nested_tasks = {}
+        self.controlled_tasks = {}
+        self.nests = {}
+        self.controls = {}
+        self.sequences = {}
+        self.task_times = {}
+        self.lag_values = {}
+
+    def add_task(self, key, attributes, parent=None, calendar=None, task_time=None):
+        """Creates a task
+
+        :param key: The source ID of the task, used to refer to it later.
+        :param attributes: Attributes of the IfcTask, such as its Name.
+        :param parent: The key of a previously added parent task. If None,
+            the task is a root task of the work schedule.
+        :param calendar: The IfcWorkCalendar of the task. If None, the task
+            inherits the calendar of its parent.
+        :param task_time: Attributes of the IfcTaskTime, as given to
+            ``sequence.edit_task_time``. If None, no time is added.
+        :return: The newly created IfcTask
+        """
+        start = perf_counter()
+        if parent is not None and parent not in self.tasks:
+            raise KeyError(f"Parent task {parent} must be added before its subtasks")
+        task = self.tasks[key] = self.file.create_entity(
+            "IfcTask",
+            **{
+                "GlobalId": ifcopenshell.guid.new(),
+                "OwnerHistory": self.owner_history,
+                "IsMilestone": False,
+                "PredefinedType": "NOTDEFINED",
+                **attributes,
+            },
+        )
+        self.nested_tasks.setdefault(parent, []).append(task)
+        if calendar:
+            self.controlled_tasks.setdefault(calendar, []).append(task)
+        else:
+            calendar = self.task_calendars.get(parent)
+        self.task_calendars[key] = calendar
+        if task_time is not None:
+            task.TaskTime = self.file.create_entity("IfcTaskTime", **self.get_task_time(task_time, calendar))
+        self.statistics.add("Create tasks", 1, perf_counter() - start)
+        return task
+
+    def get_task_time(self, task_time, calendar):
+        key = (
+            calendar,
+            task_time.get("ScheduleStart"),
+            task_time.get("ScheduleFinish"),
+            task_time.get("ScheduleDuration"),
+            task_time.get("DurationType"),
+        )
+        attributes = self.task_times.get(key)
+        if attributes is None:
+            attributes = self.task_times[key] = self.convert_task_time(*key)
+        return attributes
+
+    def convert_task_time(self, calendar, start, finish, duration, duration_type):
+        if duration:
+            finish = None
+        if finish:
+            finish = datetime.combine(
+                ifcopenshell.util.sequence.get_soonest_working_day(finish, duration_type, calendar), time(17)
+            )
+        if start:
+            start = datetime.combine(
+                ifcopenshell.util.sequence.get_soonest_working_day(start, duration_type, calendar), time(9)
+            )
+        attributes = {
+            "ScheduleStart": None if start is None else ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime"),
+            "ScheduleFinish": None if finish is None else ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime"),
+            "ScheduleDuration": (
+                None if duration is None else ifcopenshell.util.date.datetime2ifc(duration, "IfcDuration")
+            ),
+            "DurationType": duration_type,
+        }
+        if attributes["ScheduleDuration"] and attributes["ScheduleStart"]:
+            finish = ifcopenshell.util.sequence.get_start_or_finish_date(
+                ifcopenshell.util.date.ifc2datetime(attributes["ScheduleStart"]),
+                ifcopenshell.util.date.ifc2datetime(attributes["ScheduleDuration"]),
+                duration_type,
+                calendar,
+                date_type="FINISH",
+            )
+            attributes["ScheduleFinish"] = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
+        elif finish and attributes["ScheduleStart"]:
+            duration = ifcopenshell.util.sequence.get_schedule_duration(
+                ifcopenshell.util.date.ifc2datetime(attributes["ScheduleStart"]),
+                ifcopenshell.util.date.ifc2datetime(attributes["ScheduleFinish"]),
+                duration_type,
+                calendar,
+            )
+            attributes["ScheduleDuration"] = ifcopenshell.util.date.datetime2ifc(duration, "IfcDuration")
+        return attributes
+
+    def add_sequence(self, predecessor, successor, sequence_type=None, lag=None, lag_duration_type="WORKTIME"):
+        """Creates a sequence between two added tasks
+
+        Adding a sequence between the same tasks again edits the existing one.
+
+        :param predecessor: The key of the predecessor task.
+        :param successor: The key of the successor task.
+        :param sequence_type: The SequenceType, defaulting to FINISH_START.
+        :param lag: The lag time as a timedelta, if any.
+        :param lag_duration_type: The duration type of the lag time.
+        :return: The IfcRelSequence
+        """
+        start = perf_counter()
+        rel = self.sequences.get((predecessor, successor))
+        if rel is None:
+            rel = self.sequences[(predecessor, successor)] = self.file.create_entity(
+                "IfcRelSequence",
+                GlobalId=ifcopenshell.guid.new(),
+                OwnerHistory=self.owner_history,
+                RelatingProcess=self.tasks[predecessor],
+                RelatedProcess=self.tasks[successor],
+                SequenceType=sequence_type or "FINISH_START",
+            )
+        elif sequence_type:
+            rel.SequenceType = sequence_type
+        if lag:
+            lag_value = self.lag_values.get(lag)
+            if lag_value is None:
+                lag_value = self.lag_values[lag] = ifcopenshell.util.date.datetime2ifc(lag, "IfcDuration")
+            if rel.TimeLag:
+                rel.TimeLag.DurationType = lag_duration_type
+                rel.TimeLag.LagValue = self.file.createIfcDuration(lag_value)
+            else:
+                rel.TimeLag = self.file.create_entity(
+                    "IfcLagTime", DurationType=lag_duration_type, LagValue=self.file.createIfcDuration(lag_value)
+                )
+        self.statistics.add("Create sequences", 1, perf_counter() - start)
+        return rel
+
+    def finish(self):
+        """Creates the relationships of all tasks added since the last call"""
+        start = perf_counter()
+        count = 0
+        for parent, tasks in self.nested_tasks.items():
+            if parent is None:
+                self.controls[self.work_schedule] = self.assign(
+                    self.controls.get(self.work_schedule),
+                    tasks,
+                    "IfcRelAssignsToControl",
+                    RelatingControl=self.work_schedule,
+                )
+            else:
+                self.nests[parent] = self.assign(
+                    self.nests.get(parent), tasks, "IfcRelNests", RelatingObject=self.tasks[parent]
+                )
+            count += len(tasks)
+        for calendar, tasks in self.controlled_tasks.items():
+            self.controls[calendar] = self.assign(
+                self.controls.get(calendar), tasks, "IfcRelAssignsToControl", RelatingControl=calendar
+            )
+            count += len(tasks)
+        self.nested_tasks = {}
+        self.controlled_tasks = {}
+        self.statistics.add("Create task relationships", count, perf_counter() - start)
+
+    def cascade(self):
+        """Cascades the dates of all tasks through their sequences
+
+        The result is the same as if each task time and sequence had been
+        edited through the API, but each task is only cascaded once.
+        """
+        with self.statistics.measure("Cascade schedule", len(self.tasks)):
+            ifcopenshell.api.sequence.cascade_schedule(self.file, work_schedule=self.work_schedule)
+
+    def assign(self, rel, related_objects, ifc_class, **attributes):
+        if rel:
+            rel.RelatedObjects = rel.RelatedObjects + tuple(related_objects)
+            return rel
+        return self.file.create_entity(
+            ifc_class,
+            GlobalId=ifcopenshell.guid.new(),
+            OwnerHistory=self.owner_history,
+            RelatedObjects=related_objects,
+            **attributes,
+        )
+
+
+class BulkScheduleIfcGenerator(ScheduleIfcGenerator):
+    """Creates a schedule while streaming its activities and relationships
+
+    The settings are the same as for :class:`ScheduleIfcGenerator`, except
+    that activities and relationships may be any iterable of ``(id, data)``
+    pairs, which is only read once. The data of each activity also has its
+    ``WBSObjectId``. All WBS must be given before activities are read.
+
+    Tasks and sequences are created through a :class:`BulkScheduleBuilder`.
+    The number of records and time spent in each stage is reported once the
+    schedule is created.
+    """
+
+    def __init__(self, file, output, settings):
+        super().__init__(file, output, {"root_activities": [], **settings})
+        self.statistics = settings.get("statistics") or ImportStatistics()
+        self.builder = None
+        self.hours_per_day = {}
+        self.activity_hours_per_day = {}
+
+    def create_ifc(self):
+        if not self.file:
+            self.create_boilerplate_ifc()
+        if not self.work_plan:
+            self.work_plan = ifcopenshell.api.run("sequence.add_work_plan", self.file)
+        work_schedule = self.create_work_schedule()
+        with self.statistics.measure("Create calendars", len(self.calendars)):
+            self.create_calendars()
+        self.builder = BulkScheduleBuilder(self.file, work_schedule, self.statistics)
+        self.create_tasks(work_schedule)
+        self.create_rel_sequences()
+        self.builder.finish()
+        self.builder.cascade()
+        with self.statistics.measure("Create resources", len(self.resources or {})):
+            self.create_resources()
+        if self.output:
+            with self.statistics.measure("Write IFC"):
+                self.file.write(self.output)
+        print(self.statistics.report())
+
+    def create_tasks(self, work_schedule):
+        for wbs_id in self.wbs:
+            self.create_task_from_wbs(wbs_id)
+        for activity_id, activity in self.statistics.iterate("Read activities", self.activities):
+            self.create_task_from_activity(activity_id, activity)
+
+    def create_task_from_wbs(self, wbs_id):
+        wbs = self.wbs[wbs_id]
+        if wbs["ifc"]:
+            return
+        parent_id = wbs["ParentObjectId"] if self.wbs.get(wbs["ParentObjectId"]) else None
+        identification = wbs["Code"]
+        if parent_id:
+            self.create_task_from_wbs(parent_id)
+            identification = str(self.wbs[parent_id]["ifc"].Identification) + "." + str(wbs["Code"])
+        wbs["ifc"] = self.builder.add_task(
+            ("WBS", wbs_id),
+            {"Name": wbs["Name"], "Identification": str(identification)},
+            parent=("WBS", parent_id) if parent_id else None,
+        )
+
+    def create_task_from_activity(self, activity_id, activity):
+        calendar = self.calendars[activity["CalendarObjectId"]]
+        hours_per_day = self.activity_hours_per_day[activity_id] = self.get_hours_per_day(activity["CalendarObjectId"])
+        self.builder.add_task(
+            activity_id,
+            {
+                "Name": activity["Name"],
+                "Identification": str(activity["Identification"]),
+                "Status": activity["Status"],
+                "IsMilestone": activity["StartDate"] == activity["FinishDate"],
+                "PredefinedType": "CONSTRUCTION",
+            },
+            parent=("WBS", activity["WBSObjectId"]) if activity["WBSObjectId"] else None,
+            calendar=calendar["ifc"],
+            task_time={
+                "ScheduleStart": activity["StartDate"],
+                "ScheduleFinish": activity["FinishDate"],
+                "DurationType": "WORKTIME" if activity["PlannedDuration"] else None,
+                "ScheduleDuration": (
+                    timedelta(days=float(activity["PlannedDuration"]) / hours_per_day) or None
+                    if activity["PlannedDuration"]
+                    else None
+                ),
+            },
+        )
+
+    def get_hours_per_day(self, calendar_id):
+        hours_per_day = self.hours_per_day.get(calendar_id)
+        if hours_per_day is None:
+            hours_per_day = self.hours_per_day[calendar_id] = float(self.calendars[calendar_id]["HoursPerDay"] or 8)
+        return hours_per_day
+
+    def create_rel_sequences(self):
+        self.sequence_type_map = {
+            "Start to Start": "START_START",
+            "Start to Finish": "START_FINISH",
+            "Finish to Start": "FINISH_START",
+            "Finish to Finish": "FINISH_FINISH",
+        }
+        for _, relationship in self.statistics.iterate("Read relationships", self.relationships):
+            predecessor = relationship["PredecessorActivity"]
+            successor = relationship["SuccessorActivity"]
+            if predecessor not in self.builder.tasks or successor not in self.builder.tasks:
+                continue
+            lag = float(relationship["Lag"])
+            if lag:
+                lag = timedelta(days=lag / self.activity_hours_per_day[predecessor])
+            self.builder.add_sequence(predecessor, successor, relationship["Type"], lag=lag or None)
@@ -23,6 +23,7 @@ import ifcopenshell
 import ifcopenshell.api
 import ifcopenshell.util.date
 import xml.etree.ElementTree as ET
+from .common import BulkScheduleBuilder, ImportStatistics, iter_xml
 
 
 class MSP2Ifc:
@@ -36,12 +37,90 @@ class MSP2Ifc:
         self.tasks = {}
         self.optionalColumns = optionalColumns
         self.resources = {}
+        self.output = None
         self.RESOURCE_TYPES_MAPPING = {"1": "LABOR", "0": "MATERIAL", "2": None}
 
     def execute(self):
         self.parse_xml()
         self.create_ifc()
 
+    def execute_bulk(self):
+        """Creates the schedule while streaming the XML, reporting the throughput of each stage
+
+        Unlike :meth:`execute`, the XML is never fully loaded into memory. The
+        project and its calendars are read in a first pass, and tasks are
+        created as they are read in a second pass. Tasks and sequences are
+        created through a :class:`BulkScheduleBuilder`.
+        """
+        statistics = ImportStatistics()
+        paths = (("Name",), ("CalendarUID",), ("MinutesPerDay",), ("Calendars", "Calendar"))
+        for path, element in statistics.iterate("Read project and calendars", iter_xml(self.xml, paths)):
+            self.ns = {"pr": element.tag[1:].partition("}")[0]}
+            if path[0] == "Calendars":
+                self.parse_calendar(element)
+            else:
+                self.project[path[0]] = element.text or None
+        self.project["Name"] = self.project.get("Name") or "Unnamed"
+        self.project.setdefault("CalendarUID", None)
+        self.project.setdefault("MinutesPerDay", None)
+
+        if not self.file:
+            self.create_boilerplate_ifc()
+        if not self.work_plan:
+            self.work_plan = ifcopenshell.api.run("sequence.add_work_plan", self.file)
+        work_schedule = self.create_work_schedule()
+        with statistics.measure("Create calendars", len(self.calendars)):
+            self.create_calendars()
+        builder = BulkScheduleBuilder(self.file, work_schedule, statistics)
+        self.create_tasks_bulk(builder)
+        builder.finish()
+        builder.cascade()
+        if self.output:
+            with statistics.measure("Write IFC"):
+                self.file.write(self.output)
+        print(statistics.report())
+
+    def create_tasks_bulk(self, builder):
+        hours_per_day = self.get_hours_per_day()
+        outline_parents = {}
+        predecessors = []
+        for _, element in builder.statistics.iterate("Read tasks", iter_xml(self.xml, (("Tasks", "Task"),))):
+            task_id = element.find("pr:UID", self.ns).text
+            task = self.get_task(element, hours_per_day)
+            parent_id = outline_parents[task["OutlineLevel"] - 1] if task["OutlineLevel"] != 0 else None
+            outline_parents[task["OutlineLevel"]] = task_id
+
+            calendar = None
+            if task["CalendarUID"] != "-1":
+                calendar = self.calendars[task["CalendarUID"]]["ifc"]
+            elif not parent_id and self.project["CalendarUID"]:
+                calendar = self.calendars[self.project["CalendarUID"]]["ifc"]
+
+            task["ifc"] = builder.add_task(
+                task_id,
+                {
+                    "Name": task["Name"],
+                    "Identification": task["OutlineNumber"],
+                    "IsMilestone": task["Start"] == task["Finish"],
+                },
+                parent=parent_id,
+                calendar=calendar,
+                task_time={
+                    "ScheduleStart": task["Start"],
+                    "ScheduleFinish": task["Finish"],
+                    "DurationType": "WORKTIME" if task["Duration"] else None,
+                    "ScheduleDuration": task["Duration"] if task["Duration"] else None,
+                },
+            )
+            for predecessor in (task["PredecessorTasks"] or {}).values():
+                predecessors.append((predecessor["PredecessorTask"], task_id, predecessor["Type"]))
+            if len(self.optionalColumns):
+                self.create_optional_columns_pset(task)
+
+        sequence_type_map = {"0": "FINISH_FINISH", "1": "FINISH_START", "2": "START_FINISH", "3": "START_START"}
+        for predecessor_id, task_id, sequence_type in predecessors:
+            builder.add_sequence(predecessor_id, task_id, sequence_type_map[sequence_type] if sequence_type else None)
+
     def parse_xml(self):
         tree = ET.parse(self.xml)
         project = tree.getroot()
@@ -68,17 +147,15 @@ class MSP2Ifc:
                 id += 1
         return relationships
 
-    def parse_task_xml(self, project):
+    def get_hours_per_day(self):
         if self.project["MinutesPerDay"]:
-            hours_per_day = int(self.project["MinutesPerDay"]) / 60
-        else:
-            hours_per_day = 8
+            return int(self.project["MinutesPerDay"]) / 60
+        return 8
 
+    def parse_task_xml(self, project):
+        hours_per_day = self.get_hours_per_day()
         for task in project.find("pr:Tasks", self.ns):
             task_id = task.find("pr:UID", self.ns).text
-            task_index_level = task.find("pr:OutlineLevel", self.ns).text
-            wbs_id = task.find("pr:WBS", self.ns).text
-            relationships = self.parse_relationship_xml(task)
             outline_level = int(task.find("pr:OutlineLevel", self.ns).text)
 
             if outline_level != 0:
@@ -86,124 +163,128 @@ class MSP2Ifc:
                 parent_task["subtasks"].append(task_id)
             self.outline_level = outline_level
             self.outline_parents[outline_level] = task_id
+            self.tasks[task_id] = self.get_task(task, hours_per_day)
+
+    def get_task(self, task, hours_per_day):
+        relationships = self.parse_relationship_xml(task)
+
+        # Microsoft Project stores durations in terms of hours.
+        duration = ifcopenshell.util.date.ifc2datetime(task.find("pr:Duration", self.ns).text)
+        hours = duration.days * 24
+        hours += duration.seconds / 60 / 60
+        # Let's convert it into days, where days is the appropriate hours per day
+        duration = timedelta(days=hours / float(hours_per_day))
+
+        data = {
+            "Name": task.find("pr:Name", self.ns).text,
+            "OutlineNumber": task.find("pr:OutlineNumber", self.ns).text,
+            "OutlineLevel": int(task.find("pr:OutlineLevel", self.ns).text),
+            "Start": datetime.datetime.fromisoformat(task.find("pr:Start", self.ns).text),
+            "Finish": datetime.datetime.fromisoformat(task.find("pr:Finish", self.ns).text),
+            "Duration": duration,
+            "Priority": task.find("pr:Priority", self.ns).text,
+            "CalendarUID": task.find("pr:CalendarUID", self.ns).text,
+            "PredecessorTasks": relationships if relationships else None,
+            "subtasks": [],
+            "ifc": None,
+        }
 
-            # Microsoft Project stores durations in terms of hours.
-            duration = ifcopenshell.util.date.ifc2datetime(task.find("pr:Duration", self.ns).text)
-            hours = duration.days * 24
-            hours += duration.seconds / 60 / 60
-            # Let's convert it into days, where days is the appropriate hours per day
-            duration = timedelta(days=hours / float(hours_per_day))
-
-            self.tasks[task_id] = {
-                "Name": task.find("pr:Name", self.ns).text,
-                "OutlineNumber": task.find("pr:OutlineNumber", self.ns).text,
-                "OutlineLevel": outline_level,
-                "Start": datetime.datetime.fromisoformat(task.find("pr:Start", self.ns).text),
-                "Finish": datetime.datetime.fromisoformat(task.find("pr:Finish", self.ns).text),
-                "Duration": duration,
-                "Priority": task.find("pr:Priority", self.ns).text,
-                "CalendarUID": task.find("pr:CalendarUID", self.ns).text,
-                "PredecessorTasks": relationships if relationships else None,
-                "subtasks": [],
-                "ifc": None,
-            }
-
-            # retrieve optional columns
-            # If first column = "all" then retrieve all columns
-            if len(self.optionalColumns) and self.optionalColumns[0] == "all":
-                self.optionalColumns = [child.tag.split("}")[1] for child in task]
+        # retrieve optional columns
+        # If first column = "all" then retrieve all columns
+        if len(self.optionalColumns) and self.optionalColumns[0] == "all":
+            self.optionalColumns = [child.tag.split("}")[1] for child in task]
 
-            for column in self.optionalColumns:
-                if not self.tasks[task_id].get(column):
-                    self.tasks[task_id][column] = (
-                        task.find(f"pr:{column}", self.ns).text if task.find(f"pr:{column}", self.ns) else None
-                    )
+        for column in self.optionalColumns:
+            if not data.get(column):
+                data[column] = task.find(f"pr:{column}", self.ns).text if task.find(f"pr:{column}", self.ns) else None
+        return data
 
     def parse_calendar_xml(self, project):
-        def parse_working_times(day):
-            working_times = []
-            if day.find("pr:WorkingTimes", self.ns):
-                for working_time in day.find("pr:WorkingTimes", self.ns).findall("pr:WorkingTime", self.ns):
-                    if working_time.find("pr:FromTime", self.ns) is None:
-                        continue
-                    working_times.append(
+        for calendar in project.find("pr:Calendars", self.ns).findall("pr:Calendar", self.ns):
+            self.parse_calendar(calendar)
+
+    def parse_calendar(self, calendar):
+        calendar_id = calendar.find("pr:UID", self.ns).text
+        week_days = []
+        exceptions = []
+        week_days_element = calendar.find("pr:WeekDays", self.ns)
+        week_day_elements = week_days_element.findall("pr:WeekDay", self.ns) if week_days_element else []
+        for week_day in week_day_elements:
+            if week_day.find("pr:WorkingTimes", self.ns):
+                if week_day.find("pr:DayType", self.ns).text == "0":
+                    data = self.parse_exception(week_day)
+                    data["Type"] = "2"
+                    exceptions.append(data)
+                else:
+                    week_days.append(
                         {
-                            "Start": datetime.time.fromisoformat(working_time.find("pr:FromTime", self.ns).text),
-                            "Finish": datetime.time.fromisoformat(working_time.find("pr:ToTime", self.ns).text),
+                            "DayType": week_day.find("pr:DayType", self.ns).text,
+                            "WorkingTimes": self.parse_working_times(week_day),
+                            "ifc": None,
                         }
                     )
-            return working_times
-
-        def parse_exception(exception):
-            work_times = parse_working_times(exception)
-            time_period = exception.find("pr:TimePeriod", self.ns)
-            data = {
-                "Name": (
-                    exception.find("pr:Name", self.ns).text if exception.find("pr:Name", self.ns) is not None else None
-                ),
-                "FromDate": (
-                    datetime.datetime.fromisoformat(time_period.find("pr:FromDate", self.ns).text)
-                    if time_period is not None
-                    else None
-                ),
-                "ToDate": (
-                    datetime.datetime.fromisoformat(time_period.find("pr:ToDate", self.ns).text)
-                    if time_period is not None
-                    else None
-                ),
-                "Occurrences": (
-                    int(exception.find("pr:Occurrences", self.ns).text)
-                    if exception.find("pr:Occurrences", self.ns) is not None
-                    else None
-                ),
-                "Month": (
-                    exception.find("pr:Month", self.ns).text
-                    if exception.find("pr:Month", self.ns) is not None
-                    else None
-                ),
-                "MonthDay": (
-                    exception.find("pr:MonthDay", self.ns).text
-                    if exception.find("pr:MonthDay", self.ns) is not None
-                    else None
-                ),
-                "Type": (
-                    exception.find("pr:Type", self.ns).text if exception.find("pr:Type", self.ns) is not None else None
-                ),
-                "WorkingTimes": work_times,
-                "ifc": None,
-            }
-            return data
+        exceptions_element = calendar.find("pr:Exceptions", self.ns)
+        for exception in exceptions_element.findall("pr:Exception", self.ns) if exceptions_element else []:
+            data = self.parse_exception(exception)
+            exceptions.append(data)
+
+        self.calendars[calendar_id] = {
+            "Name": calendar.find("pr:Name", self.ns).text,
+            "StandardWorkWeek": week_days,
+            "HolidayOrExceptions": exceptions,
+        }
 
-        for calendar in project.find("pr:Calendars", self.ns).findall("pr:Calendar", self.ns):
-            calendar_id = calendar.find("pr:UID", self.ns).text
-            week_days = []
-            exceptions = []
-            week_days_element = calendar.find("pr:WeekDays", self.ns)
-            week_day_elements = week_days_element.findall("pr:WeekDay", self.ns) if week_days_element else []
-            for week_day in week_day_elements:
-                if week_day.find("pr:WorkingTimes", self.ns):
-                    if week_day.find("pr:DayType", self.ns).text == "0":
-                        data = parse_exception(week_day)
-                        data["Type"] = "2"
-                        exceptions.append(data)
-                    else:
-                        week_days.append(
-                            {
-                                "DayType": week_day.find("pr:DayType", self.ns).text,
-                                "WorkingTimes": parse_working_times(week_day),
-                                "ifc": None,
-                            }
-                        )
-            exceptions_element = calendar.find("pr:Exceptions", self.ns)
-            for exception in exceptions_element.findall("pr:Exception", self.ns) if exceptions_element else []:
-                data = parse_exception(exception)
-                exceptions.append(data)
-
-            self.calendars[calendar_id] = {
-                "Name": calendar.find("pr:Name", self.ns).text,
-                "StandardWorkWeek": week_days,
-                "HolidayOrExceptions": exceptions,
-            }
+    def parse_working_times(self, day):
+        working_times = []
+        if day.find("pr:WorkingTimes", self.ns):
+            for working_time in day.find("pr:WorkingTimes", self.ns).findall("pr:WorkingTime", self.ns):
+                if working_time.find("pr:FromTime", self.ns) is None:
+                    continue
+                working_times.append(
+                    {
+                        "Start": datetime.time.fromisoformat(working_time.find("pr:FromTime", self.ns).text),
+                        "Finish": datetime.time.fromisoformat(working_time.find("pr:ToTime", self.ns).text),
+                    }
+                )
+        return working_times
+
+    def parse_exception(self, exception):
+        work_times = self.parse_working_times(exception)
+        time_period = exception.find("pr:TimePeriod", self.ns)
+        data = {
+            "Name": (
+                exception.find("pr:Name", self.ns).text if exception.find("pr:Name", self.ns) is not None else None
+            ),
+            "FromDate": (
+                datetime.datetime.fromisoformat(time_period.find("pr:FromDate", self.ns).text)
+                if time_period is not None
+                else None
+            ),
+            "ToDate": (
+                datetime.datetime.fromisoformat(time_period.find("pr:ToDate", self.ns).text)
+                if time_period is not None
+                else None
+            ),
+            "Occurrences": (
+                int(exception.find("pr:Occurrences", self.ns).text)
+                if exception.find("pr:Occurrences", self.ns) is not None
+                else None
+            ),
+            "Month": (
+                exception.find("pr:Month", self.ns).text if exception.find("pr:Month", self.ns) is not None else None
+            ),
+            "MonthDay": (
+                exception.find("pr:MonthDay", self.ns).text
+                if exception.find("pr:MonthDay", self.ns) is not None
+                else None
+            ),
+            "Type": (
+                exception.find("pr:Type", self.ns).text if exception.find("pr:Type", self.ns) is not None else None
+            ),
+            "WorkingTimes": work_times,
+            "ifc": None,
+        }
+        return data
 
     def create_ifc(self):
         if not self.file:
@@ -214,6 +295,8 @@ class MSP2Ifc:
         self.create_calendars()
         self.create_tasks(work_schedule)
         self.create_rel_sequences()
+        if self.output:
+            self.file.write(self.output)
 
     def create_boilerplate_ifc(self):
         self.file = ifcopenshell.file(schema="IFC4")
@@ -294,14 +377,17 @@ class MSP2Ifc:
 
         # create pset for optional columns
         if len(self.optionalColumns):
-            pset = ifcopenshell.api.run("pset.add_pset", self.file, product=task["ifc"], name="Pset_MSP_Task")
+            self.create_optional_columns_pset(task)
 
-            ifcopenshell.api.run(
-                "pset.edit_pset",
-                self.file,
-                pset=pset,
-                properties={name: str(task[name]) for name in self.optionalColumns if task[name]},
-            )
+    def create_optional_columns_pset(self, task):
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=task["ifc"], name="Pset_MSP_Task")
+
+        ifcopenshell.api.run(
+            "pset.edit_pset",
+            self.file,
+            pset=pset,
+            properties={name: str(task[name]) for name in self.optionalColumns if task[name]},
+        )
 
     def process_working_week(self, week, calendar):
         day_map = {
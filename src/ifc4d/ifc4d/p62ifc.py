@@ -22,7 +22,7 @@ import ifcopenshell
 import ifcopenshell.api
 import ifcopenshell.util.date
 import xml.etree.ElementTree as ET
-from .common import ScheduleIfcGenerator
+from .common import ScheduleIfcGenerator, BulkScheduleIfcGenerator, ImportStatistics, iter_xml
 
 
 class P62Ifc:
@@ -91,7 +91,7 @@ class P62Ifc:
         root = tree.getroot()
         self.ns = {"pr": root.tag[1:].partition("}")[0]}
         project = root.find("pr:Project", self.ns)
-        self.project["Name"] = project.findtext("pr:Name") or "Unnamed"
+        self.project["Name"] = project.findtext("pr:Name", namespaces=self.ns) or "Unnamed"
         self.parse_calendar_xml(root)
         self.parse_calendar_xml(project)
         self.parse_wbs_xml(project)
@@ -99,72 +99,136 @@ class P62Ifc:
         self.parse_relationship_xml(project)
         self.parse_resources_xml(root)
 
+    def execute_bulk(self):
+        """Creates the schedule while streaming the XML, reporting the throughput of each stage
+
+        Unlike :meth:`execute`, the XML is never fully loaded into memory.
+        Calendars, WBS, relationships and resources are read in a first pass,
+        and activities are created as they are read in a second pass. See
+        :class:`BulkScheduleIfcGenerator`.
+        """
+        statistics = ImportStatistics()
+        paths = (
+            ("Calendar",),
+            ("Resource",),
+            ("Project",),
+            ("Project", "Name"),
+            ("Project", "Calendar"),
+            ("Project", "WBS"),
+            ("Project", "Relationship"),
+        )
+        is_project_read = False
+        elements = iter_xml(self.xml, paths)
+        for path, element in statistics.iterate("Read calendars, WBS, relationships and resources", elements):
+            self.ns = {"pr": element.tag[1:].partition("}")[0]}
+            tag = path[-1]
+            if path == ("Project",):
+                is_project_read = True
+            elif path[0] == "Project" and is_project_read:
+                continue
+            elif tag == "Name":
+                self.project["Name"] = element.text
+            elif tag == "Calendar":
+                self.parse_calendar(element)
+            elif tag == "WBS":
+                self.parse_wbs(element)
+            elif tag == "Relationship":
+                self.relationships[element.find("pr:ObjectId", self.ns).text] = self.get_relationship(element)
+            elif tag == "Resource":
+                self.parse_resource(element)
+        self.project["Name"] = self.project.get("Name") or "Unnamed"
+        settings = {
+            "work_plan": self.work_plan,
+            "project": self.project,
+            "calendars": self.calendars,
+            "wbs": self.wbs,
+            "activities": self.iter_activities(),
+            "relationships": self.relationships.items(),
+            "resources": self.resources,
+            "statistics": statistics,
+        }
+        BulkScheduleIfcGenerator(self.file, self.output, settings).create_ifc()
+
+    def iter_activities(self):
+        for path, activity in iter_xml(self.xml, (("Project",), ("Project", "Activity"))):
+            if path == ("Project",):
+                return
+            if activity.find("pr:Type", self.ns).text == "Level of Effort":
+                continue
+            yield activity.find("pr:ObjectId", self.ns).text, self.get_activity(activity)
+
     def parse_calendar_xml(self, project):
         for calendar in project.findall("pr:Calendar", self.ns):
-            calendar_id = calendar.find("pr:ObjectId", self.ns).text
-            standard_work_week = []
-            for standard_work_hour in calendar.find("pr:StandardWorkWeek", self.ns).findall(
-                "pr:StandardWorkHours", self.ns
-            ):
-                work_times = []
-                for work_time in standard_work_hour.findall("pr:WorkTime", self.ns):
-                    if work_time.find("pr:Start", self.ns) is None:
-                        continue
-                    work_times.append(
-                        {
-                            "Start": datetime.time.fromisoformat(work_time.find("pr:Start", self.ns).text),
-                            "Finish": datetime.time.fromisoformat(work_time.find("pr:Finish", self.ns).text),
-                        }
-                    )
-                standard_work_week.append(
+            self.parse_calendar(calendar)
+
+    def parse_calendar(self, calendar):
+        calendar_id = calendar.find("pr:ObjectId", self.ns).text
+        standard_work_week = []
+        for standard_work_hour in calendar.find("pr:StandardWorkWeek", self.ns).findall(
+            "pr:StandardWorkHours", self.ns
+        ):
+            work_times = []
+            for work_time in standard_work_hour.findall("pr:WorkTime", self.ns):
+                if work_time.find("pr:Start", self.ns) is None:
+                    continue
+                work_times.append(
                     {
-                        "DayOfWeek": standard_work_hour.find("pr:DayOfWeek", self.ns).text,
-                        "WorkTimes": work_times,
-                        "ifc": None,
+                        "Start": datetime.time.fromisoformat(work_time.find("pr:Start", self.ns).text),
+                        "Finish": datetime.time.fromisoformat(work_time.find("pr:Finish", self.ns).text),
                     }
                 )
-            exceptions = {}
-            holiday_or_exceptions = calendar.find("pr:HolidayOrExceptions", self.ns)
-            holiday_or_exception = []
-            if holiday_or_exceptions is not None:
-                holiday_or_exception = holiday_or_exceptions.findall("pr:HolidayOrException", self.ns)
-            for exception in holiday_or_exception:
-                d = datetime.datetime.fromisoformat(exception.find("pr:Date", self.ns).text).date()
-                month = exceptions.setdefault(d.year, {}).setdefault(d.month, {})
-                month.setdefault("FullDay", [])
-                month.setdefault("WorkTime", [])
-                work_times = []
-                for work_time in exception.findall("pr:WorkTime", self.ns):
-                    if work_time.find("pr:Start", self.ns) is None:
-                        continue
-                    work_times.append(
-                        {
-                            "Start": datetime.time.fromisoformat(work_time.find("pr:Start", self.ns).text),
-                            "Finish": datetime.time.fromisoformat(work_time.find("pr:Finish", self.ns).text),
-                        }
-                    )
-                if work_times:
-                    exceptions[d.year][d.month]["WorkTime"].append({"Day": d.day, "WorkTimes": work_times, "ifc": None})
-                else:
-                    exceptions[d.year][d.month]["FullDay"].append(d.day)
-            self.calendars[calendar_id] = {
-                "Name": calendar.find("pr:Name", self.ns).text,
-                "Type": calendar.find("pr:Type", self.ns).text,
-                "HoursPerDay": calendar.find("pr:HoursPerDay", self.ns).text,
-                "StandardWorkWeek": standard_work_week,
-                "HolidayOrExceptions": exceptions,
-            }
+            standard_work_week.append(
+                {
+                    "DayOfWeek": standard_work_hour.find("pr:DayOfWeek", self.ns).text,
+                    "WorkTimes": work_times,
+                    "ifc": None,
+                }
+            )
+        exceptions = {}
+        holiday_or_exceptions = calendar.find("pr:HolidayOrExceptions", self.ns)
+        holiday_or_exception = []
+        if holiday_or_exceptions is not None:
+            holiday_or_exception = holiday_or_exceptions.findall("pr:HolidayOrException", self.ns)
+        for exception in holiday_or_exception:
+            d = datetime.datetime.fromisoformat(exception.find("pr:Date", self.ns).text).date()
+            month = exceptions.setdefault(d.year, {}).setdefault(d.month, {})
+            month.setdefault("FullDay", [])
+            month.setdefault("WorkTime", [])
+            work_times = []
+            for work_time in exception.findall("pr:WorkTime", self.ns):
+                if work_time.find("pr:Start", self.ns) is None:
+                    continue
+                work_times.append(
+                    {
+                        "Start": datetime.time.fromisoformat(work_time.find("pr:Start", self.ns).text),
+                        "Finish": datetime.time.fromisoformat(work_time.find("pr:Finish", self.ns).text),
+                    }
+                )
+            if work_times:
+                exceptions[d.year][d.month]["WorkTime"].append({"Day": d.day, "WorkTimes": work_times, "ifc": None})
+            else:
+                exceptions[d.year][d.month]["FullDay"].append(d.day)
+        self.calendars[calendar_id] = {
+            "Name": calendar.find("pr:Name", self.ns).text,
+            "Type": calendar.find("pr:Type", self.ns).text,
+            "HoursPerDay": calendar.find("pr:HoursPerDay", self.ns).text,
+            "StandardWorkWeek": standard_work_week,
+            "HolidayOrExceptions": exceptions,
+        }
 
     def parse_wbs_xml(self, project):
         for wbs in project.findall("pr:WBS", self.ns):
-            self.wbs[wbs.find("pr:ObjectId", self.ns).text] = {
-                "Name": wbs.find("pr:Name", self.ns).text,
-                "Code": wbs.find("pr:Code", self.ns).text,
-                "ParentObjectId": wbs.find("pr:ParentObjectId", self.ns).text,
-                "ifc": None,
-                "rel": None,
-                "activities": [],
-            }
+            self.parse_wbs(wbs)
+
+    def parse_wbs(self, wbs):
+        self.wbs[wbs.find("pr:ObjectId", self.ns).text] = {
+            "Name": wbs.find("pr:Name", self.ns).text,
+            "Code": wbs.find("pr:Code", self.ns).text,
+            "ParentObjectId": wbs.find("pr:ParentObjectId", self.ns).text,
+            "ifc": None,
+            "rel": None,
+            "activities": [],
+        }
 
     def parse_activity_xml(self, project):
         for activity in project.findall("pr:Activity", self.ns):
@@ -177,16 +241,20 @@ class P62Ifc:
                 self.wbs[wbs_id]["activities"].append(activity_id)
             else:
                 self.root_activites.append(activity_id)
-            self.activities[activity_id] = {
-                "Name": activity.find("pr:Name", self.ns).text,
-                "Identification": activity.find("pr:Id", self.ns).text,
-                "StartDate": datetime.datetime.fromisoformat(activity.find("pr:StartDate", self.ns).text),
-                "FinishDate": datetime.datetime.fromisoformat(activity.find("pr:FinishDate", self.ns).text),
-                "PlannedDuration": activity.find("pr:PlannedDuration", self.ns).text,
-                "Status": activity.find("pr:Status", self.ns).text,
-                "CalendarObjectId": activity.find("pr:CalendarObjectId", self.ns).text,
-                "ifc": None,
-            }
+            self.activities[activity_id] = self.get_activity(activity)
+
+    def get_activity(self, activity):
+        return {
+            "Name": activity.find("pr:Name", self.ns).text,
+            "Identification": activity.find("pr:Id", self.ns).text,
+            "StartDate": datetime.datetime.fromisoformat(activity.find("pr:StartDate", self.ns).text),
+            "FinishDate": datetime.datetime.fromisoformat(activity.find("pr:FinishDate", self.ns).text),
+            "PlannedDuration": activity.find("pr:PlannedDuration", self.ns).text,
+            "Status": activity.find("pr:Status", self.ns).text,
+            "CalendarObjectId": activity.find("pr:CalendarObjectId", self.ns).text,
+            "WBSObjectId": activity.find("pr:WBSObjectId", self.ns).text,
+            "ifc": None,
+        }
 
     def parse_relationship_xml(self, project):
         for relationship in project.findall("pr:Relationship", self.ns):
@@ -194,12 +262,15 @@ class P62Ifc:
             successor = relationship.find("pr:SuccessorActivityObjectId", self.ns).text
             if predecessor not in self.activities or successor not in self.activities:
                 continue
-            self.relationships[relationship.find("pr:ObjectId", self.ns).text] = {
-                "PredecessorActivity": predecessor,
-                "SuccessorActivity": successor,
-                "Type": self.sequence_type_map[relationship.find("pr:Type", self.ns).text],
-                "Lag": relationship.find("pr:Lag", self.ns).text,
-            }
+            self.relationships[relationship.find("pr:ObjectId", self.ns).text] = self.get_relationship(relationship)
+
+    def get_relationship(self, relationship):
+        return {
+            "PredecessorActivity": relationship.find("pr:PredecessorActivityObjectId", self.ns).text,
+            "SuccessorActivity": relationship.find("pr:SuccessorActivityObjectId", self.ns).text,
+            "Type": self.sequence_type_map[relationship.find("pr:Type", self.ns).text],
+            "Lag": relationship.find("pr:Lag", self.ns).text,
+        }
 
     def get_wbs(self, wbs):
         return {"Name": wbs.find("pr:Name", self.ns).text, "subtasks": []}
@@ -207,13 +278,15 @@ class P62Ifc:
     def parse_resources_xml(self, project):
         resources = project.findall("pr:Resource", self.ns)
         for resource in resources:
-            id = resource.find("pr:ObjectId", self.ns).text
-            self.resources[id] = {
-                "Name": resource.find("pr:Name", self.ns).text,
-                "Code": resource.find("pr:Id", self.ns).text,
-                "ParentObjectId": resource.find("pr:ParentObjectId", self.ns).text,
-                "Type": self.resource_type_map[resource.find("pr:ResourceType", self.ns).text],
-                "ifc": None,
-                "rel": None,
-            }
+            self.parse_resource(resource)
         print("Resource found", self.resources)
+
+    def parse_resource(self, resource):
+        self.resources[resource.find("pr:ObjectId", self.ns).text] = {
+            "Name": resource.find("pr:Name", self.ns).text,
+            "Code": resource.find("pr:Id", self.ns).text,
+            "ParentObjectId": resource.find("pr:ParentObjectId", self.ns).text,
+            "Type": self.resource_type_map[resource.find("pr:ResourceType", self.ns).text],
+            "ifc": None,
+            "rel": None,
+        }
@@ -21,7 +21,7 @@ import ifcopenshell
 import ifcopenshell.api
 import ifcopenshell.util.date
 from datetime import datetime, timedelta, date
-from .common import ScheduleIfcGenerator
+from .common import ScheduleIfcGenerator, BulkScheduleIfcGenerator, ImportStatistics
 
 
 class P6XER2Ifc:
@@ -90,6 +90,39 @@ class P6XER2Ifc:
         ifcCreator = ScheduleIfcGenerator(self.file, self.output, settings)
         ifcCreator.create_ifc()
 
+    def execute_bulk(self):
+        """Creates the schedule in bulk, reporting the throughput of each stage
+
+        Activities and relationships are created as they are read from the
+        XER rather than parsed into dictionaries first. See
+        :class:`BulkScheduleIfcGenerator`.
+        """
+        statistics = ImportStatistics()
+        with statistics.measure("Read XER"):
+            self.model = Reader(self.xer)
+        self.project["Name"] = self.model.projects._projects[0].proj_short_name
+        with statistics.measure("Read calendars, WBS and resources"):
+            self.parse_calendar_xer()
+            self.parse_wbs_xer()
+            self.parse_resource_xer()
+        settings = {
+            "work_plan": self.work_plan,
+            "project": self.project,
+            "calendars": self.calendars,
+            "wbs": self.wbs,
+            "activities": self.iter_activities(),
+            "relationships": ((rel.task_pred_id, self.get_relationship(rel)) for rel in self.model.relations),
+            "resources": self.resources,
+            "statistics": statistics,
+        }
+        BulkScheduleIfcGenerator(self.file, self.output, settings).create_ifc()
+
+    def iter_activities(self):
+        for activity in self.model.activities:
+            if activity.task_type == "TT_LOE":
+                continue
+            yield activity.task_id, self.get_activity(activity)
+
     def parse_xer(self):
         self.model = Reader(self.xer)
         # for project in self.model.projects:
@@ -145,16 +178,20 @@ class P6XER2Ifc:
                 self.wbs[wbs_id]["activities"].append(activity.task_id)
             else:
                 self.root_activites.append(activity.task_id)
-            self.activities[activity.task_id] = {
-                "Name": activity.task_name,
-                "Identification": activity.task_code,
-                "StartDate": activity.start_date,
-                "FinishDate": activity.end_date,
-                "PlannedDuration": activity.target_drtn_hr_cnt,
-                "Status": self.status_map[activity.status_code],
-                "CalendarObjectId": activity.clndr_id,
-                "ifc": None,
-            }
+            self.activities[activity.task_id] = self.get_activity(activity)
+
+    def get_activity(self, activity):
+        return {
+            "Name": activity.task_name,
+            "Identification": activity.task_code,
+            "StartDate": activity.start_date,
+            "FinishDate": activity.end_date,
+            "PlannedDuration": activity.target_drtn_hr_cnt,
+            "Status": self.status_map[activity.status_code],
+            "CalendarObjectId": activity.clndr_id,
+            "WBSObjectId": activity.wbs_id,
+            "ifc": None,
+        }
 
     def parse_relationship_xer(self):
         for rel in self.model.relations:
@@ -162,12 +199,15 @@ class P6XER2Ifc:
             successor = rel.task_id
             if predecessor not in self.activities or successor not in self.activities:
                 continue
-            self.relationships[rel.task_pred_id] = {
-                "PredecessorActivity": predecessor,
-                "SuccessorActivity": successor,
-                "Type": self.RELATIONSHIP_TYPE_MAPPING[rel.pred_type],
-                "Lag": rel.lag_hr_cnt,
-            }
+            self.relationships[rel.task_pred_id] = self.get_relationship(rel)
+
+    def get_relationship(self, rel):
+        return {
+            "PredecessorActivity": rel.pred_task_id,
+            "SuccessorActivity": rel.task_id,
+            "Type": self.RELATIONSHIP_TYPE_MAPPING[rel.pred_type],
+            "Lag": rel.lag_hr_cnt,
+        }
 
     def parse_resource_xer(self):
         for rsrc in self.model.resources:
@@ -29,10 +29,18 @@ parser.add_argument("input", type=str, help="A JSON dataset describing a series
 parser.add_argument(
     "-o", "--output", type=str, help="The JSON diff file to output. Defaults to output.json", default="output.json"
 )
+parser.add_argument(
+    "--tile-size",
+    type=float,
+    help="Clash in square tiles of this size in metres, using multiple processes, to limit memory use",
+)
+parser.add_argument("--processes", type=int, help="The number of processes used when clashing in tiles")
 args = parser.parse_args()
 
 settings = ClashSettings()
 settings.output = args.output
+settings.tile_size = args.tile_size
+settings.processes = args.processes
 settings.logger = logging.getLogger("Clash")
 settings.logger.setLevel(logging.DEBUG)
 handler = logging.StreamHandler(sys.stdout)
@@ -19,6 +19,7 @@
 # along with IfcClash.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import sys
 import json
 import time
 import numpy as np
@@ -26,6 +27,7 @@ import multiprocessing
 import ifcopenshell
 import ifcopenshell.geom
 import ifcopenshell.util.selector
+import ifcopenshell.util.shape
 
 
 class Clasher:
@@ -40,7 +42,10 @@ class Clasher:
 
     def clash(self):
         for clash_set in self.clash_sets:
-            self.process_clash_set(clash_set)
+            if self.settings.tile_size:
+                self.process_clash_set_tiled(clash_set)
+            else:
+                self.process_clash_set(clash_set)
 
     def process_clash_set(self, clash_set):
         self.tree = ifcopenshell.geom.tree()
@@ -58,34 +63,141 @@ class Clasher:
         else:
             b = "a"
 
+        results = self.clash_tree(
+            self.tree,
+            clash_set,
+            list(self.groups["a"]["elements"].values()),
+            list(self.groups[b]["elements"].values()),
+        )
+        processed_results = self.process_results(results)
+        clash_set["clashes"] = processed_results
+        self.logger.info(f"Found clashes: {len(processed_results.keys())}")
+
+    def process_clash_set_tiled(self, clash_set):
+        """Clashes a clash set tile by tile to bound memory use
+
+        The scene is divided into a grid of square tiles on the XY plane of
+        ``tile_size`` metres. Each element is added to every tile that its
+        bounding box, expanded by a margin, overlaps. Each tile then gets its
+        own small tree and tiles are clashed in a pool of processes. Clashes
+        found in more than one tile are only reported once.
+        """
+        margin = self.settings.tile_margin
+        if clash_set["mode"] == "clearance":
+            margin += clash_set["clearance"]
+
+        tiles = {}
+        for group in ("a", "b"):
+            for source in clash_set.get(group, None) or []:
+                source["ifc"] = self.load_ifc(source["file"])
+                elements = self.get_elements(source["ifc"], source.get("mode", None), source.get("selector", None))
+                for element_id, tile_keys in self.get_element_tiles(source["ifc"], elements, margin).items():
+                    for tile_key in tile_keys:
+                        tile = tiles.setdefault(tile_key, {"a": {}, "b": {}})
+                        tile[group].setdefault(source["file"], []).append(element_id)
+
+        is_self_clash = not clash_set.get("b", None)
+        options = {k: v for k, v in clash_set.items() if k not in ("a", "b", "clashes")}
+        tasks = []
+        for tile in tiles.values():
+            if not tile["a"] or (not is_self_clash and not tile["b"]):
+                continue
+            tasks.append((options, tile["a"], None if is_self_clash else tile["b"]))
+
+        start = time.time()
+        self.logger.info(f"Clashing {len(tasks)} tiles")
+        processed_results = {}
+        for results in self.clash_tiles(tasks):
+            for key, result in results.items():
+                processed_results.setdefault(key, result)
+        self.logger.info(f"Tiles finished {time.time() - start}")
+        clash_set["clashes"] = processed_results
+        self.logger.info(f"Found clashes: {len(processed_results.keys())}")
+
+    def get_element_tiles(self, ifc_file, elements, margin):
+        start = time.time()
+        tile_size = self.settings.tile_size
+        results = {}
+        if not elements:
+            return results
+        iterator = ifcopenshell.geom.iterator(
+            self.geom_settings, ifc_file, multiprocessing.cpu_count(), include=elements
+        )
+        assert iterator.initialize()
+        while True:
+            shape = iterator.get()
+            vertices = ifcopenshell.util.shape.get_shape_vertices(shape, shape.geometry)
+            if len(vertices):
+                x0, y0 = np.floor((vertices[:, :2].min(axis=0) - margin) / tile_size).astype(int)
+                x1, y1 = np.floor((vertices[:, :2].max(axis=0) + margin) / tile_size).astype(int)
+                results[shape.id] = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+            if not iterator.next():
+                break
+        self.logger.info(f"Tiling finished {time.time() - start}")
+        return results
+
+    def clash_tiles(self, tasks):
+        global worker_clasher
+        worker_clasher = self
+        processes = self.settings.processes or multiprocessing.cpu_count()
+        can_fork = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+        if processes <= 1 or not can_fork or len(tasks) < 2:
+            yield from map(clash_tile, tasks)
+            return
+        # Forked workers share the already loaded IFC files.
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            yield from pool.imap_unordered(clash_tile, tasks)
+
+    def clash_tile(self, clash_set, a, b=None):
+        tree = ifcopenshell.geom.tree()
+        groups = []
+        for group in (a, b or {}):
+            elements = []
+            for path, element_ids in group.items():
+                source_elements = [self.ifcs[path].by_id(i) for i in element_ids]
+                elements.extend(source_elements)
+                iterator = ifcopenshell.geom.iterator(self.geom_settings, self.ifcs[path], 1, include=source_elements)
+                assert iterator.initialize()
+                while True:
+                    tree.add_element(iterator.get())
+                    if not iterator.next():
+                        break
+            groups.append(elements)
+        results = self.clash_tree(tree, clash_set, groups[0], groups[1] if b else groups[0])
+        return self.process_results(results)
+
+    def clash_tree(self, tree, clash_set, a, b):
         mode = clash_set["mode"]
         if mode == "intersection":
-            results = self.tree.clash_intersection_many(
-                list(self.groups["a"]["elements"].values()),
-                list(self.groups[b]["elements"].values()),
+            return tree.clash_intersection_many(
+                a,
+                b,
                 tolerance=clash_set["tolerance"],
                 check_all=clash_set["check_all"],
             )
         elif mode == "collision":
-            results = self.tree.clash_collision_many(
-                list(self.groups["a"]["elements"].values()),
-                list(self.groups[b]["elements"].values()),
+            return tree.clash_collision_many(
+                a,
+                b,
                 allow_touching=clash_set["allow_touching"],
             )
         elif mode == "clearance":
-            results = self.tree.clash_clearance_many(
-                list(self.groups["a"]["elements"].values()),
-                list(self.groups[b]["elements"].values()),
+            return tree.clash_clearance_many(
+                a,
+                b,
                 clearance=clash_set["clearance"],
                 check_all=clash_set["check_all"],
             )
 
+    def process_results(self, results):
         processed_results = {}
         for result in results:
             element1 = result.a
             element2 = result.b
 
-            processed_results[f"{element1.get_argument(0)}-{element2.get_argument(0)}"] = {
+            # The same pair may be found in either order, e.g. in different tiles of a self clash.
+            key = "-".join(sorted((element1.get_argument(0), element2.get_argument(0))))
+            processed_results[key] = {
                 "a_global_id": element1.get_argument(0),
                 "b_global_id": element2.get_argument(0),
                 "a_ifc_class": element1.is_a(),
@@ -97,8 +209,7 @@ class Clasher:
                 "p2": list(result.p2),
                 "distance": result.distance,
             }
-        clash_set["clashes"] = processed_results
-        self.logger.info(f"Found clashes: {len(processed_results.keys())}")
+        return processed_results
 
     def create_group(self, name):
         self.logger.info(f"Creating group {name}")
@@ -114,9 +225,7 @@ class Clasher:
         self.settings.logger.info(f"Loading finished {time.time() - start}")
         return ifc
 
-    def add_collision_objects(self, name, ifc_file, mode=None, selector=None):
-        start = time.time()
-        self.settings.logger.info("Creating iterator")
+    def get_elements(self, ifc_file, mode=None, selector=None):
         if not mode or mode == "a" or not selector:
             elements = set(ifc_file.by_type("IfcElement"))
             elements -= set(ifc_file.by_type("IfcFeatureElement"))
@@ -126,6 +235,12 @@ class Clasher:
             elements -= set(ifcopenshell.util.selector.filter_elements(ifc_file, selector))
         elif mode == "i":
             elements = set(ifcopenshell.util.selector.filter_elements(ifc_file, selector))
+        return elements
+
+    def add_collision_objects(self, name, ifc_file, mode=None, selector=None):
+        start = time.time()
+        self.settings.logger.info("Creating iterator")
+        elements = self.get_elements(ifc_file, mode, selector)
         iterator = ifcopenshell.geom.iterator(
             self.geom_settings, ifc_file, multiprocessing.cpu_count(), include=elements
         )
@@ -280,3 +395,18 @@ class ClashSettings:
     def __init__(self):
         self.logger = None
         self.output = "clashes.json"
+        # If set, clash sets are processed in square tiles of this size in
+        # metres, see Clasher.process_clash_set_tiled.
+        self.tile_size = None
+        # Extra distance in metres added to element bounding boxes when
+        # assigning them to tiles.
+        self.tile_margin = 0.01
+        # Number of processes used for tiles. Defaults to the CPU count.
+        self.processes = None
+
+
+worker_clasher = None
+
+
+def clash_tile(task):
+    return worker_clasher.clash_tile(*task)
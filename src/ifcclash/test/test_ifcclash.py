@@ -0,0 +1,83 @@
+# IfcClash - IFC-based clash detection.
+# Copyright (C) 2020-2024 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcClash.
+#
+# IfcClash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcClash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcClash.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import logging
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api.context
+import ifcopenshell.api.geometry
+import ifcopenshell.api.root
+import ifcopenshell.api.unit
+from ifcclash.ifcclash import Clasher, ClashSettings
+
+
+def create_walls(filepath, total=80, seed=0):
+    rng = random.Random(seed)
+    ifc_file = ifcopenshell.file(schema="IFC4")
+    ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcProject")
+    unit = ifcopenshell.api.unit.add_si_unit(ifc_file, unit_type="LENGTHUNIT")
+    ifcopenshell.api.unit.assign_unit(ifc_file, units=[unit])
+    model = ifcopenshell.api.context.add_context(ifc_file, "Model")
+    body = ifcopenshell.api.context.add_context(ifc_file, "Model", "Body", "MODEL_VIEW", parent=model)
+    for i in range(total):
+        wall = ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcWall", name=f"Wall {i}")
+        matrix = np.eye(4)
+        matrix[:2, 3] = (rng.uniform(0, 8), rng.uniform(0, 8))
+        ifcopenshell.api.geometry.edit_object_placement(ifc_file, product=wall, matrix=matrix)
+        representation = ifcopenshell.api.geometry.add_wall_representation(
+            ifc_file, context=body, length=rng.uniform(1, 5), height=3, thickness=0.2
+        )
+        ifcopenshell.api.geometry.assign_representation(ifc_file, product=wall, representation=representation)
+    ifc_file.write(filepath)
+
+
+def clash(clash_set, tile_size=None, processes=1):
+    settings = ClashSettings()
+    settings.logger = logging.getLogger("IfcClash")
+    settings.tile_size = tile_size
+    settings.processes = processes
+    clasher = Clasher(settings)
+    clasher.clash_sets = [clash_set]
+    clasher.clash()
+    return clasher.clash_sets[0]["clashes"]
+
+
+class TestTiledClash:
+    def test_self_clash_matches_the_untiled_results(self, tmp_path):
+        filepath = str(tmp_path / "walls.ifc")
+        create_walls(filepath)
+
+        def get_clash_set():
+            return {
+                "name": "Walls",
+                "mode": "intersection",
+                "tolerance": 0.002,
+                "check_all": False,
+                "a": [{"file": filepath}],
+            }
+
+        untiled = clash(get_clash_set())
+        tiled = clash(get_clash_set(), tile_size=2.0, processes=2)
+        assert untiled
+        assert tiled.keys() == untiled.keys()
+        for key, result in tiled.items():
+            assert {result["a_global_id"], result["b_global_id"]} == {
+                untiled[key]["a_global_id"],
+                untiled[key]["b_global_id"],
+            }
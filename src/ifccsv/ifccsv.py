@@ -23,13 +23,15 @@
 import os
 import re
 import csv
+import sys
 import argparse
+import multiprocessing
 import ifcopenshell
 import ifcopenshell.util.selector
 import ifcopenshell.util.element
 import ifcopenshell.util.schema
 from statistics import mean
-from typing import Optional, Union, Literal
+from typing import Optional, Union, Literal, Iterable, Iterator
 
 try:
     from odf.namespaces import OFFICENS
@@ -53,6 +55,13 @@ except:
     pass  # No Pandas support
 
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except:
+    pass  # No Parquet support
+
+
 __version__ = version = "0.0.0"
 
 
@@ -61,9 +70,21 @@ FILE_FORMAT = Literal[
     "ods",
     "xlsx",
     "pd",
+    "parquet",
 ]
 
 
+class EntityId(int):
+    """An element ID standing in for an entity instance sent between processes"""
+
+
+worker_exporter: Optional["IfcCsv"] = None
+
+
+def export_chunk(ids: list[int]) -> list[list]:
+    return worker_exporter.export_chunk(ids)
+
+
 class IfcCsv:
     def __init__(self):
         self.headers = []
@@ -90,7 +111,25 @@ class IfcCsv:
         groups=None,
         summaries=None,
         formatting=None,
+        processes: int = 1,
+        should_stream: bool = False,
     ):
+        """Exports the attributes of elements to a table
+
+        Each attribute is a query using the syntax of
+        :func:`ifcopenshell.util.selector.get_element_value`, such as
+        ``Name`` or ``Pset_WallCommon.FireRating``. All attributes of an
+        element are gathered together, so lookups shared by several
+        attributes (such as a property set or type) only happen once.
+
+        :param processes: If more than 1, elements are split into chunks
+            which are exported by that many forked processes. This is only
+            available on platforms that support forking.
+        :param should_stream: If true, rows are written directly to the csv
+            or parquet output as they are exported, in the order of the
+            elements, instead of being kept in memory. Grouping, summarising,
+            and sorting need every row at once and so cannot be streamed.
+        """
         self.ifc_file = ifc_file
         self.results = []
         self.headers = []
@@ -103,23 +142,12 @@ class IfcCsv:
             attributes.insert(0, "GlobalId")
             headers.insert(0, "GlobalId")
 
-        for element in elements:
-            result = []
-
-            for attribute in attributes:
-                value = ifcopenshell.util.selector.get_element_value(element, attribute)
-                if value is None:
-                    value = null
-                elif value == "":
-                    value = empty
-                elif value is True:
-                    value = bool_true
-                elif value is False:
-                    value = bool_false
-                elif isinstance(value, (list, tuple)) and concat is not None:
-                    value = concat.join(map(str, value))
-                result.append(value)
-            self.results.append(result)
+        self.attributes = attributes
+        self.null = null
+        self.empty = empty
+        self.bool_true = bool_true
+        self.bool_false = bool_false
+        self.concat = concat
 
         self.headers = []
         for i, attribute in enumerate(attributes):
@@ -128,6 +156,23 @@ class IfcCsv:
             else:
                 self.headers.append(attribute)
 
+        if should_stream:
+            if groups or summaries or sort:
+                raise ValueError("Grouping, summarising, and sorting require all results and cannot be streamed")
+            self.summaries = [None] * len(attributes)
+            rows = self.export_elements(elements, processes=processes)
+            if formatting:
+                rows = self.format_rows(rows, formatting, attributes, null)
+            if format == "csv":
+                self.export_csv(output, delimiter=delimiter, rows=rows)
+            elif format == "parquet":
+                self.export_parquet(output, rows=rows)
+            else:
+                raise ValueError(f"Streaming is only supported for the csv and parquet formats, not {format}")
+            return
+
+        self.results = list(self.export_elements(elements, processes=processes))
+
         self.group_results(groups, attributes)
         self.summarise_results(summaries, attributes)
         self.sort_results(sort, attributes, include_global_id)
@@ -139,9 +184,68 @@ class IfcCsv:
             self.export_ods(output, should_preserve_existing=should_preserve_existing)
         elif format == "xlsx":
             self.export_xlsx(output, should_preserve_existing=should_preserve_existing)
+        elif format == "parquet":
+            self.export_parquet(output)
         elif format == "pd":
             return self.export_pd()
 
+    def export_element(self, element: ifcopenshell.entity_instance) -> list:
+        row = ifcopenshell.util.selector.get_element_values(element, self.attributes)
+        for i, value in enumerate(row):
+            if value is None:
+                row[i] = self.null
+            elif value == "":
+                row[i] = self.empty
+            elif value is True:
+                row[i] = self.bool_true
+            elif value is False:
+                row[i] = self.bool_false
+            elif isinstance(value, (list, tuple)) and self.concat is not None:
+                row[i] = self.concat.join(map(str, value))
+        return row
+
+    def export_elements(self, elements, processes: int = 1, chunk_size: int = 1000) -> Iterator[list]:
+        can_fork = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+        if processes <= 1 or not can_fork:
+            for element in elements:
+                yield self.export_element(element)
+            return
+
+        ids = [element.id() for element in elements]
+        chunks = [ids[i : i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        if len(chunks) < 2:
+            for element_id in ids:
+                yield self.export_element(self.ifc_file.by_id(element_id))
+            return
+
+        global worker_exporter
+        worker_exporter = self
+        try:
+            with multiprocessing.get_context("fork").Pool(processes) as pool:
+                for rows in pool.imap(export_chunk, chunks):
+                    for row in rows:
+                        yield [self.decode_value(value) for value in row]
+        finally:
+            worker_exporter = None
+
+    def export_chunk(self, ids: list[int]) -> list[list]:
+        # Entity instances belong to the file of the worker process, so only their IDs are sent back.
+        return [[self.encode_value(v) for v in self.export_element(self.ifc_file.by_id(i))] for i in ids]
+
+    def encode_value(self, value):
+        if isinstance(value, ifcopenshell.entity_instance):
+            return EntityId(value.id())
+        elif isinstance(value, (list, tuple)):
+            return type(value)(self.encode_value(v) for v in value)
+        return value
+
+    def decode_value(self, value):
+        if isinstance(value, EntityId):
+            return self.ifc_file.by_id(value)
+        elif isinstance(value, (list, tuple)):
+            return type(value)(self.decode_value(v) for v in value)
+        return value
+
     def group_results(self, groups, attributes):
         if not groups:
             return
@@ -255,15 +359,25 @@ class IfcCsv:
             for row in self.results:
                 if row[index] == null:
                     continue
-                row[index] = '"' + str(row[index]).replace('"', '\\"') + '"'
-                row[index] = ifcopenshell.util.selector.format(format_query.replace("{{value}}", row[index]))
+                row[index] = self.format_value(format_query, row[index])
 
             if self.summaries[index] is not None:
                 summary_label, summary_value = self.summaries[index].split(": ")
-                summary_value = '"' + str(summary_value).replace('"', '\\"') + '"'
-                summary_value = ifcopenshell.util.selector.format(format_query.replace("{{value}}", summary_value))
+                summary_value = self.format_value(format_query, summary_value)
                 self.summaries[index] = summary_label + ": " + str(summary_value)
 
+    def format_rows(self, rows, formatting, attributes, null) -> Iterator[list]:
+        formatting_indices = {attributes.index(data["name"]): data["format"] for data in formatting}
+        for row in rows:
+            for index, format_query in formatting_indices.items():
+                if row[index] != null:
+                    row[index] = self.format_value(format_query, row[index])
+            yield row
+
+    def format_value(self, format_query: str, value) -> str:
+        value = '"' + str(value).replace('"', '\\"') + '"'
+        return ifcopenshell.util.selector.format(format_query.replace("{{value}}", value))
+
     def sort_results(self, sort, attributes, include_global_id):
         if not self.results:
             return
@@ -287,15 +401,35 @@ class IfcCsv:
             elif not include_global_id:
                 self.results = sorted(self.results, key=lambda x: x[0])
 
-    def export_csv(self, output: str, delimiter: Optional[str] = None) -> None:
+    def export_csv(self, output: str, delimiter: Optional[str] = None, rows: Optional[Iterable[list]] = None) -> None:
         with open(output, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f, delimiter=delimiter)
             writer.writerow(self.headers)
-            for row in self.results:
+            for row in self.results if rows is None else rows:
                 writer.writerow(row)
             if any([s for s in self.summaries if s is not None]):
                 writer.writerow(self.summaries)
 
+    def export_parquet(self, output: str, rows: Optional[Iterable[list]] = None, batch_size: int = 10000) -> None:
+        # Like a CSV, every value is written as a string, as columns may mix values and null placeholders.
+        schema = pa.schema([(header, pa.string()) for header in self.headers])
+
+        def write_batch(writer, batch):
+            columns = [pa.array([str(row[i]) for row in batch], pa.string()) for i in range(len(self.headers))]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+        with pq.ParquetWriter(output, schema) as writer:
+            batch = []
+            for row in self.results if rows is None else rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    write_batch(writer, batch)
+                    batch = []
+            if any([s for s in self.summaries if s is not None]):
+                batch.append(["" if s is None else s for s in self.summaries])
+            if batch:
+                write_batch(writer, batch)
+
     def export_ods(self, output, should_preserve_existing=False):
         df = self.export_pd()
         if self.summaries:
@@ -494,7 +628,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Exports IFC data to and from CSV")
     parser.add_argument("-i", "--ifc", type=str, required=True, help="The IFC file")
     parser.add_argument("-s", "--spreadsheet", type=str, default="data.csv", help="The spreadsheet file")
-    parser.add_argument("-f", "--format", type=str, default="csv", help="The format, chosen from csv, ods, or xlsx")
+    parser.add_argument(
+        "-f", "--format", type=str, default="csv", help="The format, chosen from csv, ods, xlsx, or parquet"
+    )
     parser.add_argument("-d", "--delimiter", type=str, default=",", help="The delimiter in CSV. Defaults to a comma.")
     parser.add_argument("-n", "--null", type=str, default="N/A", help="How to represent null values. Defaults to N/A.")
     parser.add_argument(
@@ -514,6 +650,10 @@ if __name__ == "__main__":
     parser.add_argument("--sort", nargs="+", help="Specify one or more attributes to sort by.")
     parser.add_argument("--order", nargs="+", help="Choose the sort order from ASC or DESC for each sorted attribute.")
     parser.add_argument("--export", action="store_true", help="Export from IFC to the desired format.")
+    parser.add_argument("-p", "--processes", type=int, default=1, help="Number of processes used to export.")
+    parser.add_argument(
+        "--stream", action="store_true", help="Write csv or parquet rows as they are exported, without sorting."
+    )
     parser.add_argument("--import", action="store_true", help="Import from the autodetected format to IFC.")
     args = parser.parse_args()
 
@@ -538,6 +678,8 @@ if __name__ == "__main__":
             bool_false=args.bool_false,
             concat=args.concat,
             sort=sort,
+            processes=args.processes,
+            should_stream=args.stream,
         )
     elif getattr(args, "import"):
         ifc_csv = IfcCsv()
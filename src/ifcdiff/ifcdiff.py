@@ -20,10 +20,15 @@
 
 # This can be packaged with `pyinstaller --onefile --clean --icon=icon.ico ifcdiff.py`
 
+import os
+import math
 import time
 import json
+import hashlib
+import sqlite3
 import logging
 import argparse
+import tempfile
 import numpy as np
 import multiprocessing
 import ifcopenshell
@@ -37,7 +42,6 @@ from deepdiff import DeepDiff
 from orderly_set import OrderedSet
 from typing import Optional, Union, Literal, Any
 
-
 __version__ = version = "0.0.0"
 
 
@@ -58,6 +62,12 @@ class IfcDiff:
         that comparisons will take longer.
     :param filter_elements: An IFC filter query if you only want to compare a
         subset of elements. For example: ``IfcWall`` to only compare walls.
+    :param old_fingerprints: Path to a sidecar file for the fingerprints of
+        the old model. If it exists and matches the model, fingerprints are
+        loaded from it, otherwise they are computed and saved to it. See
+        :class:`Fingerprinter`.
+    :param new_fingerprints: Path to a sidecar file for the fingerprints of
+        the new model.
 
     Example::
 
@@ -81,6 +91,8 @@ class IfcDiff:
         relationships: Optional[list[RELATIONSHIP_TYPE]] = None,
         is_shallow: bool = True,
         filter_elements: Optional[str] = None,
+        old_fingerprints: Optional[str] = None,
+        new_fingerprints: Optional[str] = None,
     ):
         self.old = old
         self.new = new
@@ -90,6 +102,8 @@ class IfcDiff:
         self.precision = 1e-4
         self.is_shallow = is_shallow
         self.filter_elements = filter_elements
+        self.old_fingerprints = old_fingerprints
+        self.new_fingerprints = new_fingerprints
 
     def diff(self) -> None:
         logging.disable(logging.CRITICAL)
@@ -146,19 +160,30 @@ class IfcDiff:
             else:
                 should_check_other = True
 
+        print("... fingerprinting old model ...")
+        old_fingerprints = self.get_fingerprints(self.old, old_elements, self.old_fingerprints)
+        print("... fingerprinting new model ...")
+        new_fingerprints = self.get_fingerprints(self.new, new_elements, self.new_fingerprints)
+
         for global_id in same_elements:
             total_diffed += 1
             if total_diffed % 250 == 0:
                 print("{}/{} diffed ...".format(total_diffed, total_same_elements), end="\r", flush=True)
+            # Only relationships with mismatching fingerprints need a detailed check
+            old_fingerprint = old_fingerprints[global_id]
+            new_fingerprint = new_fingerprints[global_id]
+            changed = {r for r in self.relationships if old_fingerprint.get(r) != new_fingerprint.get(r)}
+            if not changed:
+                continue
             old = self.old.by_id(global_id)
             new = self.new.by_id(global_id)
-            if should_check_attributes:
+            if should_check_attributes and "attributes" in changed:
                 if self.diff_element(old, new) and self.is_shallow:
                     continue
-            if should_check_other:
-                if self.diff_element_relationships(old, new) and self.is_shallow:
+            if should_check_other and changed - {"attributes", "geometry"}:
+                if self.diff_element_relationships(old, new, changed) and self.is_shallow:
                     continue
-            if should_check_geometry:
+            if should_check_geometry and "geometry" in changed:
                 # Option 1: check everything heuristically using the iterator (seems faster)
                 if ifcopenshell.util.representation.get_representation(new, "Model", "Body", "MODEL_VIEW"):
                     potential_old_changes.append(old)
@@ -198,6 +223,19 @@ class IfcDiff:
 
         logging.disable(logging.NOTSET)
 
+    def get_fingerprints(
+        self, ifc: ifcopenshell.file, global_ids: set[str], path: Optional[str] = None
+    ) -> dict[str, dict[str, str]]:
+        fingerprinter = Fingerprinter(ifc, self.relationships, self.precision)
+        if path and os.path.isfile(path):
+            fingerprints = fingerprinter.load(path)
+            if fingerprints is not None and global_ids.issubset(fingerprints.keys()):
+                return fingerprints
+        fingerprints = fingerprinter.get_fingerprints(global_ids)
+        if path:
+            fingerprinter.save(path, fingerprints)
+        return fingerprints
+
     def summarise_shapes(
         self, ifc: ifcopenshell.file, elements: list[ifcopenshell.entity_instance]
     ) -> dict[str, dict[str, Any]]:
@@ -290,10 +328,12 @@ class IfcDiff:
             self.change_register.setdefault(new.GlobalId, {}).update({"attributes_changed": True})
             return True
 
-    def diff_element_relationships(self, old, new):
+    def diff_element_relationships(self, old, new, relationships=None):
         if not self.relationships:
             return
         for relationship in self.relationships:
+            if relationships is not None and relationship not in relationships:
+                continue
             if relationship == "type":
                 old_type = ifcopenshell.util.element.get_type(old)
                 new_type = ifcopenshell.util.element.get_type(new)
@@ -315,7 +355,7 @@ class IfcDiff:
                         math_epsilon=self.precision,
                         ignore_string_type_changes=True,
                         ignore_numeric_type_changes=True,
-                        exclude_regex_paths=[r".*id$"],
+                        exclude_regex_paths=[r".*\['id'\]$"],
                     )
                 except:
                     diff = True
@@ -414,6 +454,159 @@ class IfcDiff:
                 return representation.Items[0].MappingSource.MappedRepresentation.id()
 
 
+class IfcDiffHistory:
+    """Builds a change history of elements across many revisions of a model
+
+    Adjacent revisions are diffed with :class:`IfcDiff`. The revisions are
+    split into contiguous runs which are processed concurrently, one run per
+    process. Within a run, each revision is loaded and fingerprinted once and
+    reused for the comparison with both of its neighbours.
+
+    :param revisions: Paths to the IFC revisions, ordered from oldest to
+        newest.
+    :param relationships: Relationships to check, see :class:`IfcDiff`.
+    :param is_shallow: See :class:`IfcDiff`.
+    :param filter_elements: See :class:`IfcDiff`.
+    :param processes: The number of processes. Defaults to the CPU count.
+    :param should_save_fingerprints: If True, fingerprints are saved next to
+        each revision and reused in later runs, like the ``-f`` command line
+        option. Otherwise they are kept in a temporary directory.
+
+    Example::
+
+        from ifcdiff import IfcDiffHistory
+
+        history = IfcDiffHistory(["/path/to/r1.ifc", "/path/to/r2.ifc", "/path/to/r3.ifc"])
+        history.diff()
+        print(history.history)
+        history.export("/path/to/history.jsonl")
+    """
+
+    # GlobalIds to a list of changes, ordered by revision.
+    history: dict[str, list[dict[str, Any]]]
+
+    def __init__(
+        self,
+        revisions: list[str],
+        relationships: Optional[list[RELATIONSHIP_TYPE]] = None,
+        is_shallow: bool = True,
+        filter_elements: Optional[str] = None,
+        processes: Optional[int] = None,
+        should_save_fingerprints: bool = False,
+    ):
+        self.revisions = revisions
+        self.relationships = relationships
+        self.is_shallow = is_shallow
+        self.filter_elements = filter_elements
+        self.processes = processes or multiprocessing.cpu_count()
+        self.should_save_fingerprints = should_save_fingerprints
+        self.history = {}
+
+    def diff(self) -> None:
+        self.history = {}
+        total_pairs = len(self.revisions) - 1
+        if total_pairs < 1:
+            return
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fingerprints_dir = None if self.should_save_fingerprints else temp_dir
+            total_runs = min(self.processes, total_pairs)
+            boundaries = np.linspace(0, total_pairs, total_runs + 1).round().astype(int).tolist()
+            runs = [
+                (self.revisions[start : end + 1], start, fingerprints_dir)
+                for start, end in zip(boundaries[:-1], boundaries[1:])
+            ]
+            if total_runs == 1:
+                results = [self.diff_run(runs[0])]
+            else:
+                with multiprocessing.Pool(total_runs) as pool:
+                    results = pool.map(self.diff_run, runs)
+        for run_results in results:
+            for index, added, deleted, changed in run_results:
+                revision = self.revisions[index]
+                for global_id in added:
+                    self.add_change(global_id, index, revision, "added")
+                for global_id in deleted:
+                    self.add_change(global_id, index, revision, "deleted")
+                for global_id, changes in changed.items():
+                    self.add_change(global_id, index, revision, "changed", changes)
+
+    def diff_run(self, run: tuple[list[str], int, Optional[str]]) -> list[tuple[int, list[str], list[str], dict]]:
+        revisions, start, fingerprints_dir = run
+        results = []
+        old = ifcopenshell.open(revisions[0])
+        for i, path in enumerate(revisions[1:], start + 1):
+            new = ifcopenshell.open(path)
+            ifc_diff = IfcDiff(
+                old,
+                new,
+                self.relationships,
+                is_shallow=self.is_shallow,
+                filter_elements=self.filter_elements,
+                old_fingerprints=self.get_fingerprints_path(fingerprints_dir, self.revisions[i - 1]),
+                new_fingerprints=self.get_fingerprints_path(fingerprints_dir, path),
+            )
+            ifc_diff.diff()
+            # Results are sent between processes, so keep to plain JSON data
+            changed = json.loads(json.dumps(ifc_diff.change_register, default=ifc_diff.json_dump_default))
+            results.append((i, sorted(ifc_diff.added_elements), sorted(ifc_diff.deleted_elements), changed))
+            old = new
+        return results
+
+    def get_fingerprints_path(self, fingerprints_dir: Optional[str], revision: str) -> str:
+        if fingerprints_dir is None:
+            return f"{revision}.fingerprints.json"
+        key = hashlib.blake2b(os.path.abspath(revision).encode("utf-8"), digest_size=8).hexdigest()
+        return os.path.join(fingerprints_dir, f"{key}.fingerprints.json")
+
+    def add_change(
+        self, global_id: str, index: int, revision: str, status: str, changes: Optional[dict] = None
+    ) -> None:
+        change = {"index": index, "revision": revision, "status": status}
+        if changes:
+            change["changes"] = changes
+        self.history.setdefault(global_id, []).append(change)
+
+    def export(self, path: str) -> None:
+        """Exports the history as JSON Lines, or as SQLite if the path ends in .db or .sqlite
+
+        JSON Lines has one line per GlobalId. SQLite has a ``history`` table
+        with one row per GlobalId and revision it changed in.
+        """
+        if path.lower().endswith((".db", ".sqlite")):
+            return self.export_sqlite(path)
+        self.export_jsonl(path)
+
+    def export_jsonl(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for global_id, changes in self.history.items():
+                f.write(json.dumps({"global_id": global_id, "history": changes}) + "\n")
+
+    def export_sqlite(self, path: str) -> None:
+        db = sqlite3.connect(path)
+        db.execute("DROP TABLE IF EXISTS history;")
+        db.execute(
+            "CREATE TABLE history (global_id text NOT NULL, revision_index integer NOT NULL, "
+            "revision text NOT NULL, status text NOT NULL, changes JSON);"
+        )
+        db.executemany(
+            "INSERT INTO history VALUES (?, ?, ?, ?, ?);",
+            [
+                (
+                    global_id,
+                    c["index"],
+                    c["revision"],
+                    c["status"],
+                    json.dumps(c["changes"]) if "changes" in c else None,
+                )
+                for global_id, changes in self.history.items()
+                for c in changes
+            ],
+        )
+        db.execute("CREATE INDEX history_global_id ON history (global_id);")
+        db.commit()
+        db.close()
+
+
 class DiffTerminator:
     def match(self, level) -> bool:
         return True
@@ -424,10 +617,191 @@ class DiffTerminator:
         return False
 
 
+class Fingerprinter:
+    """Computes stable hashes of the parts of elements that IfcDiff compares
+
+    Each element gets one hash per relationship. If the hashes of an element
+    are equal in two models, that part of the element is unchanged, so only
+    elements with mismatching hashes need a detailed comparison. Hashes do not
+    depend on STEP IDs, and floats are rounded to the model precision.
+
+    Geometry is hashed from the definition of the representation and
+    placement subgraphs, and the openings and projections of the element.
+    Shared entities, such as mapped representations and parent placements,
+    are only hashed once.
+
+    :param ifc: The model to fingerprint.
+    :param relationships: The relationships to hash. See RELATIONSHIP_TYPE.
+    :param precision: The precision used to round floats.
+
+    Example::
+
+        fingerprinter = Fingerprinter(model, ["geometry", "attributes", "property"], 1e-4)
+        fingerprints = fingerprinter.get_fingerprints({e.GlobalId for e in model.by_type("IfcWall")})
+        fingerprinter.save("model.ifc.fingerprints.json", fingerprints)
+    """
+
+    version = 1
+
+    def __init__(self, ifc: ifcopenshell.file, relationships: list[RELATIONSHIP_TYPE], precision: float):
+        self.ifc = ifc
+        self.relationships = relationships
+        self.precision = precision
+        self.entity_digests = {}
+
+    def get_fingerprints(self, global_ids: set[str]) -> dict[str, dict[str, str]]:
+        elements = [self.ifc.by_id(global_id) for global_id in global_ids]
+        psets = {}
+        if "property" in self.relationships:
+            table = ifcopenshell.util.element.get_psets_table(self.ifc, elements)
+            for element_id, pset, prop, value in zip(
+                table["element"].tolist(), table["pset"], table["property"], table["value"]
+            ):
+                psets.setdefault(element_id, []).append((pset, prop, self.normalise(value)))
+
+        results = {}
+        for element in elements:
+            fingerprint = {}
+            for relationship in self.relationships:
+                if relationship == "attributes":
+                    value = [
+                        self.normalise(a) for a in element if not isinstance(a, (ifcopenshell.entity_instance, tuple))
+                    ]
+                elif relationship == "geometry":
+                    value = (
+                        self.get_entity_digest(element.Representation),
+                        self.get_entity_digest(element.ObjectPlacement),
+                        sorted(o.RelatedOpeningElement.GlobalId for o in getattr(element, "HasOpenings", []) or []),
+                        sorted(o.RelatedFeatureElement.GlobalId for o in getattr(element, "HasProjections", []) or []),
+                    )
+                elif relationship == "type":
+                    value = self.get_global_id(ifcopenshell.util.element.get_type(element))
+                elif relationship == "property":
+                    value = sorted(psets.get(element.id(), []))
+                elif relationship == "container":
+                    value = self.get_global_id(ifcopenshell.util.element.get_container(element))
+                elif relationship == "aggregate":
+                    value = self.get_global_id(ifcopenshell.util.element.get_aggregate(element))
+                elif relationship == "classification":
+                    attribute = "ItemReference" if self.ifc.schema == "IFC2X3" else "Identification"
+                    value = sorted(
+                        str(getattr(r, attribute)) for r in ifcopenshell.util.classification.get_references(element)
+                    )
+                else:
+                    continue
+                fingerprint[relationship] = self.hash(value)
+            results[element.GlobalId] = fingerprint
+        return results
+
+    def get_signature(self) -> dict[str, Any]:
+        header = self.ifc.header.file_name
+        return {
+            "version": self.version,
+            "schema": self.ifc.schema_identifier,
+            "name": header.name,
+            "time_stamp": header.time_stamp,
+            "total_entities": len(self.ifc.wrapped_data.entity_names()),
+            "max_id": self.ifc.wrapped_data.getMaxId(),
+            "relationships": sorted(self.relationships),
+            "precision": self.precision,
+        }
+
+    def save(self, path: str, fingerprints: dict[str, dict[str, str]]) -> None:
+        # Write then rename, so concurrent readers never see a partial file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.get_signature(), "fingerprints": fingerprints}, f)
+        os.replace(temp_path, path)
+
+    def load(self, path: str) -> Union[dict[str, dict[str, str]], None]:
+        """Loads fingerprints saved for this model
+
+        :return: The fingerprints, or None if the file is unreadable or was
+            saved for another model or other settings.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("signature") != self.get_signature():
+            return None
+        return data["fingerprints"]
+
+    def hash(self, value: Any) -> str:
+        return hashlib.blake2b(repr(value).encode("utf-8"), digest_size=16).hexdigest()
+
+    def normalise(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, str)):
+            return value
+        elif isinstance(value, (int, float)):
+            if not math.isfinite(value):
+                return repr(value)
+            return round(value / self.precision)
+        elif isinstance(value, (tuple, list)):
+            return tuple(self.normalise(v) for v in value)
+        elif isinstance(value, dict):
+            return tuple(sorted((k, self.normalise(v)) for k, v in value.items() if k != "id"))
+        elif isinstance(value, ifcopenshell.entity_instance):
+            if value.id():
+                return self.get_entity_digest(value)
+            return (value.is_a(), self.normalise(value.wrappedValue))
+        elif isinstance(value, ifcopenshell.ifcopenshell_wrapper.entity_instance):
+            if value.id():
+                return self.entity_digests[value.id()]
+            return (value.is_a(), self.normalise(value.get_argument(0)))
+        return repr(value)
+
+    def get_entity_digest(self, entity: Optional[ifcopenshell.entity_instance]) -> Optional[str]:
+        if entity is None:
+            return None
+        # Raw attribute access is much faster than going through entity_instance
+        entity = entity.wrapped_data
+        arguments = {}
+        # Depth first, so that references are hashed before the entities using them
+        stack = [entity]
+        while stack:
+            current = stack[-1]
+            current_id = current.id()
+            if current_id in self.entity_digests:
+                stack.pop()
+                continue
+            if (values := arguments.get(current_id)) is None:
+                values = arguments[current_id] = [current.get_argument(i) for i in range(len(current))]
+            references = [r for r in self.get_references(values) if r.id() not in self.entity_digests]
+            if references:
+                stack.extend(references)
+                continue
+            self.entity_digests[current_id] = self.hash((current.is_a(), [self.normalise(v) for v in values]))
+            del arguments[current_id]
+            stack.pop()
+        return self.entity_digests[entity.id()]
+
+    def get_references(self, values: Any) -> list[ifcopenshell.ifcopenshell_wrapper.entity_instance]:
+        results = []
+        for value in values:
+            if isinstance(value, ifcopenshell.ifcopenshell_wrapper.entity_instance):
+                if value.id():
+                    results.append(value)
+            elif isinstance(value, tuple):
+                results.extend(self.get_references(value))
+        return results
+
+    def get_global_id(self, element: Optional[ifcopenshell.entity_instance]) -> Optional[str]:
+        return element.GlobalId if element else None
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Show the difference between two IFC files")
     parser.add_argument("old", type=str, help="The old IFC file")
     parser.add_argument("new", type=str, help="The new IFC file")
+    parser.add_argument(
+        "revisions",
+        type=str,
+        nargs="*",
+        help="Further IFC revisions, ordered from oldest to newest. If given, or if the output ends in .jsonl, "
+        ".db or .sqlite, a change history across all revisions is output as JSON Lines or SQLite",
+    )
     parser.add_argument(
         "-o", "--output", type=str, help="The JSON diff file to output. Defaults to diff.json", default="diff.json"
     )
@@ -438,22 +812,50 @@ if __name__ == "__main__":
         help='A list of space-separated relationships, chosen from "type", "property", "container", "aggregate", "classification"',
         default="",
     )
+    parser.add_argument(
+        "-f",
+        "--fingerprints",
+        action="store_true",
+        help="Save fingerprints next to each IFC file, and reuse them if the file is diffed again",
+    )
+    parser.add_argument("-p", "--processes", type=int, help="The number of processes used for a change history")
     args = parser.parse_args()
 
     print("# IFC Diff")
 
-    start = time.time()
-    print("Loading old file ...")
-    old = ifcopenshell.open(args.old)
-    print("Loading new file ...")
-    new = ifcopenshell.open(args.new)
-
-    print("# Loading finished in {:.2f} seconds".format(time.time() - start))
-    start = time.time()
-
-    ifc_diff = IfcDiff(old, new, args.relationships.split())
-    ifc_diff.diff()
+    if args.revisions or args.output.lower().endswith((".jsonl", ".db", ".sqlite")):
+        start = time.time()
+        history = IfcDiffHistory(
+            [args.old, args.new] + args.revisions,
+            args.relationships.split(),
+            processes=args.processes,
+            should_save_fingerprints=args.fingerprints,
+        )
+        history.diff()
+        print("# History finished in {:.2f} seconds".format(time.time() - start))
+        history.export(args.output)
+    else:
+        start = time.time()
+        print("Loading old file ...")
+        old = ifcopenshell.open(args.old)
+        print("Loading new file ...")
+        new = ifcopenshell.open(args.new)
+
+        print("# Loading finished in {:.2f} seconds".format(time.time() - start))
+        start = time.time()
+
+        if args.fingerprints:
+            ifc_diff = IfcDiff(
+                old,
+                new,
+                args.relationships.split(),
+                old_fingerprints=f"{args.old}.fingerprints.json",
+                new_fingerprints=f"{args.new}.fingerprints.json",
+            )
+        else:
+            ifc_diff = IfcDiff(old, new, args.relationships.split())
+        ifc_diff.diff()
 
-    print("# Diff finished in {:.2f} seconds".format(time.time() - start))
+        print("# Diff finished in {:.2f} seconds".format(time.time() - start))
 
-    ifc_diff.export(args.output)
+        ifc_diff.export(args.output)
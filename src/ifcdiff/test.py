@@ -16,10 +16,13 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
+import sqlite3
 import ifcdiff
 import ifcopenshell
 import ifcopenshell.api.context
 import ifcopenshell.api.geometry
+import ifcopenshell.api.pset
 import ifcopenshell.api.root
 import ifcopenshell.util.representation
 
@@ -92,3 +95,102 @@ class TestIfcDiff:
         assert ifc_diff.added_elements == set()
         assert ifc_diff.deleted_elements == set()
         assert ifc_diff.change_register == {wall.GlobalId: {"geometry_changed": True}}
+
+    def test_changed_property(self):
+        ifc_file = setup_project()
+        wall = ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.pset.add_pset(ifc_file, wall, "Foo_Bar")
+        ifcopenshell.api.pset.edit_pset(ifc_file, pset, properties={"Foo": "Bar"})
+        slab = ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcSlab")
+        pset = ifcopenshell.api.pset.add_pset(ifc_file, slab, "Foo_Bar")
+        ifcopenshell.api.pset.edit_pset(ifc_file, pset, properties={"Foo": "Bar"})
+
+        new_file = ifc_file.from_string(ifc_file.to_string())
+        ifcopenshell.api.pset.edit_pset(new_file, new_file.by_id(pset.id()), properties={"Foo": "Baz"})
+
+        ifc_diff = ifcdiff.IfcDiff(ifc_file, new_file, relationships=["property"])
+        ifc_diff.diff()
+        assert set(ifc_diff.change_register.keys()) == {slab.GlobalId}
+        assert "properties_changed" in ifc_diff.change_register[slab.GlobalId]
+
+
+class TestFingerprinter:
+    def test_fingerprints_do_not_depend_on_ids(self):
+        ifc_file = setup_project()
+        wall = ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcWall", name="Foo")
+        context = ifcopenshell.util.representation.get_context(ifc_file, "Model", "Body", "MODEL_VIEW")
+        representation = ifcopenshell.api.geometry.add_slab_representation(ifc_file, context, depth=0.2)
+        ifcopenshell.api.geometry.assign_representation(ifc_file, wall, representation)
+        pset = ifcopenshell.api.pset.add_pset(ifc_file, wall, "Foo_Bar")
+        ifcopenshell.api.pset.edit_pset(ifc_file, pset, properties={"Foo": 1.0})
+
+        new_file = setup_project()
+        new_file.add(ifc_file.createIfcCartesianPoint((0.0, 0.0, 0.0)))  # Shift IDs
+        for element in ifc_file:
+            new_file.add(element)
+
+        relationships = ["attributes", "geometry", "property", "type", "container"]
+        old = ifcdiff.Fingerprinter(ifc_file, relationships, 1e-4).get_fingerprints({wall.GlobalId})
+        new = ifcdiff.Fingerprinter(new_file, relationships, 1e-4).get_fingerprints({wall.GlobalId})
+        assert new_file.by_id(wall.GlobalId).id() != wall.id()
+        assert old == new
+
+        new_file.by_type("IfcExtrudedAreaSolid")[0].Depth = 500.0
+        new = ifcdiff.Fingerprinter(new_file, relationships, 1e-4).get_fingerprints({wall.GlobalId})
+        assert {k for k in old[wall.GlobalId] if old[wall.GlobalId][k] != new[wall.GlobalId][k]} == {"geometry"}
+
+    def test_saving_and_loading(self, tmp_path):
+        ifc_file = setup_project()
+        wall = ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcWall")
+        fingerprinter = ifcdiff.Fingerprinter(ifc_file, ["attributes"], 1e-4)
+        fingerprints = fingerprinter.get_fingerprints({wall.GlobalId})
+        path = str(tmp_path / "fingerprints.json")
+        fingerprinter.save(path, fingerprints)
+        assert fingerprinter.load(path) == fingerprints
+        assert ifcdiff.Fingerprinter(ifc_file, ["geometry"], 1e-4).load(path) is None
+        ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcWall")
+        assert fingerprinter.load(path) is None
+
+
+class TestIfcDiffHistory:
+    def test_building_a_history(self, tmp_path):
+        ifc_file = setup_project()
+        wall = ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcWall", name="Foo")
+        revisions = [str(tmp_path / f"r{i}.ifc") for i in range(4)]
+        ifc_file.write(revisions[0])
+        slab = ifcopenshell.api.root.create_entity(ifc_file, ifc_class="IfcSlab")
+        slab_id = slab.GlobalId
+        ifc_file.write(revisions[1])
+        wall.Name = "Bar"
+        ifc_file.write(revisions[2])
+        ifc_file.remove(slab)
+        ifc_file.write(revisions[3])
+
+        for processes in (1, 2):
+            history = ifcdiff.IfcDiffHistory(revisions, relationships=["attributes"], processes=processes)
+            history.diff()
+            assert history.history == {
+                slab_id: [
+                    {"index": 1, "revision": revisions[1], "status": "added"},
+                    {"index": 3, "revision": revisions[3], "status": "deleted"},
+                ],
+                wall.GlobalId: [
+                    {
+                        "index": 2,
+                        "revision": revisions[2],
+                        "status": "changed",
+                        "changes": {"attributes_changed": True},
+                    }
+                ],
+            }
+
+        path = str(tmp_path / "history.jsonl")
+        history.export(path)
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        assert {"global_id": wall.GlobalId, "history": history.history[wall.GlobalId]} in lines
+
+        path = str(tmp_path / "history.db")
+        history.export(path)
+        rows = sqlite3.connect(path).execute("SELECT global_id, revision_index, status FROM history").fetchall()
+        assert sorted(rows) == sorted([(slab_id, 1, "added"), (slab_id, 3, "deleted"), (wall.GlobalId, 2, "changed")])
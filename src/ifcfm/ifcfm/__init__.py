@@ -18,11 +18,22 @@
 
 import os
 import re
+import sys
 import csv
+import time
+import shutil
+import hashlib
 import importlib
+import tempfile
+import multiprocessing
+import ifcopenshell
+import ifcopenshell.util.selector
+import ifcfm.relationships
+from typing import Any, Callable, Iterator, Optional, Union
 
 try:
     from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import PatternFill
 except:
     pass  # No XLSX support
@@ -44,6 +55,37 @@ except:
 __version__ = version = "0.0.0"
 
 
+def compile_element_data(get_element_data: Union[dict[str, str], Callable, None]) -> Optional[Callable]:
+    """Compiles a mapping of names to selector queries into a function
+
+    The queries are parsed once, rather than for every element, and values
+    shared between queries (such as the same property set) are only looked up
+    once per element. Functions are returned unchanged.
+
+    :param get_element_data: A dictionary of names to queries following the
+        syntax of :func:`ifcopenshell.util.selector.get_element_value`, or a
+        function taking an IFC file and an element and returning a dictionary.
+    :return: A function taking an IFC file and an element and returning a
+        dictionary of names to values.
+    """
+    if not isinstance(get_element_data, dict):
+        return get_element_data
+    names = list(get_element_data.keys())
+    queries = [ifcopenshell.util.selector.parse_element_query(q) for q in get_element_data.values()]
+
+    def get_compiled_element_data(ifc_file, element):
+        return dict(zip(names, ifcopenshell.util.selector.get_element_values(element, queries)))
+
+    return get_compiled_element_data
+
+
+worker_writer: Optional["Writer"] = None
+
+
+def write_category(args: tuple) -> tuple[str, str, list, float]:
+    return worker_writer.write_category(*args)
+
+
 class Parser:
     def __init__(self, preset="basic"):
         self.file = None
@@ -52,6 +94,7 @@ class Parser:
         self.config = None
         self.get_custom_element_data = {}
         self.duplicate_keys = []
+        self.timings = {}
 
         if isinstance(preset, str):
             module = importlib.import_module(f"ifcfm.{preset}")
@@ -60,33 +103,53 @@ class Parser:
             self.config = preset
 
     def parse(self, ifc_file, name=None):
-        for category_name, category_config in self.config["categories"].items():
+        """Extracts the data of each category from an IFC file
+
+        The relationships of the file are indexed once beforehand, so that
+        presets can look them up for each element using
+        :func:`ifcfm.relationships.get_index`. The time spent extracting each
+        category, in seconds, is recorded in ``timings``.
+        """
+        ifcfm.relationships.build_index(ifc_file)
+        for category_name in self.config["categories"].keys():
             self.categories.setdefault(category_name, {})
+            for data in self.get_category_data(ifc_file, category_name):
+                key = self.get_key(category_name, data)
+                if key in self.categories[category_name]:
+                    self.duplicate_keys.append((self.categories[category_name][key], data))
+                self.categories[category_name][key] = data
+
+    def get_category_data(self, ifc_file: ifcopenshell.file, category_name: str) -> Iterator[dict[str, Any]]:
+        """Gets the data of each element in a category, one element at a time
+
+        Unlike :meth:`parse`, the data is not stored, and elements with
+        duplicate keys are not detected.
+        """
+        category_config = self.config["categories"][category_name]
+        get_element_data = compile_element_data(category_config["get_element_data"])
+        get_custom_element_data = compile_element_data(
+            self.get_custom_element_data.get(category_name, lambda x, y: None)
+        )
+        start = time.perf_counter()
+        try:
             for element in category_config["get_category_elements"](ifc_file):
-                get_element_data = category_config["get_element_data"]
-
-                if isinstance(get_element_data, dict):
-                    data = {}
-                    for key, query in get_element_data.items():
-                        data[key] = ifcopenshell.util.selector.get_element_value(element, query)
-                else:
-                    data = get_element_data(ifc_file, element) or {}
-
-                get_custom_element_data = self.get_custom_element_data.get(category_name, lambda x, y: None)
-                if isinstance(get_custom_element_data, dict):
-                    custom_data = {}
-                    for key, query in get_custom_element_data.items():
-                        custom_data[key] = ifcopenshell.util.selector.get_element_value(element, query)
-                else:
-                    custom_data = get_custom_element_data(ifc_file, element) or {}
+                data = get_element_data(ifc_file, element) or {}
+                data.update(get_custom_element_data(ifc_file, element) or {})
+                if data:
+                    # Time spent by the consumer of each row is excluded.
+                    self.add_timing(category_name, start)
+                    start = None
+                    yield data
+                    start = time.perf_counter()
+        finally:
+            if start is not None:
+                self.add_timing(category_name, start)
 
-                data.update(custom_data)
+    def add_timing(self, category_name: str, start: float) -> None:
+        self.timings[category_name] = self.timings.get(category_name, 0.0) + time.perf_counter() - start
 
-                if data:
-                    key = "-".join([str(data[k]) for k in category_config["keys"]])
-                    if key in self.categories[category_name]:
-                        self.duplicate_keys.append((self.categories[category_name][key], data))
-                    self.categories[category_name][key] = data
+    def get_key(self, category_name: str, data: dict[str, Any]) -> str:
+        return "-".join([str(data[k]) for k in self.config["categories"][category_name]["keys"]])
 
     def federate(self, paths):
         for path in paths:
@@ -129,10 +192,7 @@ class Writer:
 
     def write(self, null="N/A", empty="-", bool_true="YES", bool_false="NO", list_separator=", "):
         self.categories = {}
-        null = self.config.get("null", null)
-        empty = self.config.get("empty", empty)
-        bool_true = self.config.get("bool_true", bool_true)
-        bool_false = self.config.get("bool_false", bool_false)
+        self.set_formats(null, empty, bool_true, bool_false, list_separator)
         for category, config in self.config["categories"].items():
             data = self.parser.categories.get(category, None)
             headers = config["headers"]
@@ -144,40 +204,183 @@ class Writer:
             if not headers:
                 headers = list(data[list(data.keys())[0]].keys())
 
-            rows = []
-            for row in data.values():
-                processed_row = []
-                for header in headers:
-                    value = row[header]
-                    if value is None:
-                        value = null
-                    elif value == "":
-                        value = empty
-                    elif value is True:
-                        value = bool_true
-                    elif value is False:
-                        value = bool_false
-                    elif isinstance(value, (list, tuple)):
-                        value = list_separator.join([str(v) for v in value])
-                    processed_row.append(value)
-                rows.append(processed_row)
-
-            sort = self.config.get("categories", {}).get(category, {}).get("sort", None)
-            if sort:
-
-                def natural_sort(value):
-                    if isinstance(value, str):
-                        convert = lambda text: int(text) if text.isdigit() else text.lower()
-                        return [convert(c) for c in re.split("([0-9]+)", value)]
-                    return [str(value)]
-
-                # Sort least important keys first, then more important keys.
-                # https://stackoverflow.com/questions/11476371/sort-by-multiple-keys-using-different-orderings
-                for sort_data in reversed(sort):
-                    i = headers.index(sort_data["name"])
-                    reverse = sort_data["order"] == "DESC"
-                    rows = sorted(rows, key=lambda x: natural_sort(x[i]), reverse=reverse)
-            self.categories[category] = {"headers": headers, "rows": rows}
+            rows = [self.format_row(row, headers) for row in data.values()]
+            self.categories[category] = {"headers": headers, "rows": self.sort_rows(category, headers, rows)}
+
+    def set_formats(self, null="N/A", empty="-", bool_true="YES", bool_false="NO", list_separator=", "):
+        self.null = self.config.get("null", null)
+        self.empty = self.config.get("empty", empty)
+        self.bool_true = self.config.get("bool_true", bool_true)
+        self.bool_false = self.config.get("bool_false", bool_false)
+        self.list_separator = list_separator
+
+    def format_row(self, row: dict[str, Any], headers: list[str]) -> list:
+        processed_row = []
+        for header in headers:
+            value = row[header]
+            if value is None:
+                value = self.null
+            elif value == "":
+                value = self.empty
+            elif value is True:
+                value = self.bool_true
+            elif value is False:
+                value = self.bool_false
+            elif isinstance(value, (list, tuple)):
+                value = self.list_separator.join([str(v) for v in value])
+            processed_row.append(value)
+        return processed_row
+
+    def sort_rows(self, category: str, headers: list[str], rows: list[list]) -> list[list]:
+        sort = self.config.get("categories", {}).get(category, {}).get("sort", None)
+        if sort:
+
+            def natural_sort(value):
+                if isinstance(value, str):
+                    convert = lambda text: int(text) if text.isdigit() else text.lower()
+                    return [convert(c) for c in re.split("([0-9]+)", value)]
+                return [str(value)]
+
+            # Sort least important keys first, then more important keys.
+            # https://stackoverflow.com/questions/11476371/sort-by-multiple-keys-using-different-orderings
+            for sort_data in reversed(sort):
+                i = headers.index(sort_data["name"])
+                reverse = sort_data["order"] == "DESC"
+                rows = sorted(rows, key=lambda x: natural_sort(x[i]), reverse=reverse)
+        return rows
+
+    def write_stream(
+        self,
+        ifc_file: ifcopenshell.file,
+        output: str,
+        format: str = "csv",
+        delimiter: str = ",",
+        null: str = "N/A",
+        empty: str = "-",
+        bool_true: str = "YES",
+        bool_false: str = "NO",
+        list_separator: str = ", ",
+        processes: int = 1,
+    ) -> None:
+        """Extracts and writes data from an IFC file without keeping it all in memory
+
+        This is an alternative to :meth:`Parser.parse` followed by
+        :meth:`write` and :meth:`write_csv` or :meth:`write_xlsx`, suitable
+        for very large models. Rows are written as soon as they are extracted,
+        so memory use does not grow with the number of elements, except for
+        categories which are configured to be sorted, a small hash of each
+        key used to detect duplicates, and the relationship index of the file
+        (see :class:`ifcfm.relationships.RelationshipIndex`), which does not
+        cache properties in this case.
+
+        Unlike :meth:`Parser.parse`, the first element with a key is written
+        and later elements with the same key are skipped. Duplicates are
+        recorded in the parser's ``duplicate_keys`` as ``(None, row)``, where
+        the row maps headers to values formatted for writing.
+
+        :param output: The output path, following the same conventions as
+            :meth:`write_csv` or :meth:`write_xlsx`.
+        :param format: Either ``csv`` or ``xlsx``. ODS can't be written
+            incrementally and so is not supported.
+        :param processes: The number of worker processes to extract categories
+            in parallel. Workers are forked, so this is only used on platforms
+            which support forking.
+        """
+        if format not in ("csv", "xlsx"):
+            raise ValueError(f"Streaming is only supported for csv and xlsx, not {format}")
+        self.set_formats(null, empty, bool_true, bool_false, list_separator)
+        self.ifc_file = ifc_file
+        self.delimiter = delimiter
+        # Indexed before any workers are forked so that it is only built once.
+        ifcfm.relationships.build_index(ifc_file, should_cache_properties=False)
+        categories = list(self.config["categories"].keys())
+
+        if format == "csv":
+            filename = output if len(categories) == 1 and "." in os.path.basename(output) else None
+            jobs = [(c, filename or os.path.join(output, f"{c}.csv")) for c in categories]
+            for category, path, duplicates, seconds in self.write_categories(jobs, processes):
+                self.parser.duplicate_keys.extend(duplicates)
+                self.parser.timings[category] = seconds
+            return
+
+        cell_formats = {}
+        for key, value in self.config.get("colours", {}).items():
+            cell_formats[key] = PatternFill(start_color=value, end_color=value, fill_type="solid")
+        workbook = Workbook(write_only=True)
+        tempdir = tempfile.mkdtemp()
+        try:
+            # Categories are extracted to temporary CSVs, as only a single process may write the workbook.
+            jobs = [(c, os.path.join(tempdir, f"{i}.csv")) for i, c in enumerate(categories)]
+            for category, path, duplicates, seconds in self.write_categories(jobs, processes):
+                self.parser.duplicate_keys.extend(duplicates)
+                self.parser.timings[category] = seconds
+                colours = self.config.get("categories", {}).get(category, {}).get("colours", [])
+                worksheet = workbook.create_sheet(category)
+                with open(path, newline="", encoding="utf-8") as f:
+                    for r, row in enumerate(csv.reader(f, delimiter=delimiter)):
+                        cells = []
+                        for c, col in enumerate(row):
+                            cell = WriteOnlyCell(worksheet, value=col)
+                            if r == 0:
+                                cell.fill = cell_formats["h"]
+                            else:
+                                cell.fill = cell_formats[colours[c] if c < len(colours) else "n"]
+                            cells.append(cell)
+                        worksheet.append(cells)
+                os.remove(path)
+            workbook.save(output)
+        finally:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+    def write_categories(
+        self, jobs: list[tuple[str, str]], processes: int = 1
+    ) -> Iterator[tuple[str, str, list, float]]:
+        can_fork = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+        if processes <= 1 or not can_fork or len(jobs) < 2:
+            for job in jobs:
+                yield self.write_category(*job)
+            return
+
+        global worker_writer
+        worker_writer = self
+        try:
+            with multiprocessing.get_context("fork").Pool(min(processes, len(jobs))) as pool:
+                yield from pool.imap(write_category, jobs)
+        finally:
+            worker_writer = None
+
+    def write_category(self, category: str, path: str) -> tuple[str, str, list, float]:
+        headers = self.config["categories"][category]["headers"]
+        duplicates = []
+        seen_keys = set()
+        rows = self.parser.get_category_data(self.ifc_file, category)
+        first_row = next(rows, None)
+        if first_row is not None:
+            rows = (row for rows in ([first_row], rows) for row in rows)
+            if not headers:
+                headers = list(first_row.keys())
+
+        def get_unique_rows():
+            for row in rows:
+                # Only a fixed size hash of each key is stored to keep memory usage low.
+                key = self.parser.get_key(category, row)
+                key_hash = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+                formatted_row = self.format_row(row, headers)
+                if key_hash in seen_keys:
+                    duplicates.append((None, dict(zip(headers, formatted_row))))
+                    continue
+                seen_keys.add(key_hash)
+                yield formatted_row
+
+        formatted_rows = get_unique_rows()
+        if self.config.get("categories", {}).get(category, {}).get("sort", None):
+            formatted_rows = self.sort_rows(category, headers, list(formatted_rows))
+
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter=self.delimiter)
+            writer.writerow(headers)
+            writer.writerows(formatted_rows)
+        return category, path, duplicates, self.parser.timings.get(category, 0.0)
 
     def write_csv(self, output, delimiter=","):
         filename = None
@@ -1,3 +1,4 @@
+import sys
 import ifcfm
 import argparse
 import ifcopenshell
@@ -28,16 +29,44 @@ parser.add_argument(
 )
 parser.add_argument("--bool_true", type=str, default="YES", help="How to represent true values. Defaults to YES.")
 parser.add_argument("--bool_false", type=str, default="NO", help="How to represent false values. Defaults to NO.")
+parser.add_argument(
+    "--stream",
+    action="store_true",
+    help="Write rows as they are extracted instead of keeping them in memory. Only supports csv and xlsx.",
+)
+parser.add_argument(
+    "--processes", type=int, default=1, help="The number of processes to extract categories in parallel when streaming."
+)
+parser.add_argument(
+    "--timings", action="store_true", help="Print the time spent extracting each category, slowest first."
+)
 args = parser.parse_args()
 
 ifc_file = ifcopenshell.open(args.ifc)
 parser = ifcfm.Parser(preset=args.preset)
-parser.parse(ifc_file)
 writer = ifcfm.Writer(parser)
-writer.write(null=args.null, empty=args.empty, bool_true=args.bool_true, bool_false=args.bool_false)
-if args.format == "csv":
-    writer.write_csv(args.spreadsheet, delimiter=args.delimiter)
-elif args.format == "ods":
-    writer.write_ods(args.spreadsheet)
-elif args.format == "xlsx":
-    writer.write_xlsx(args.spreadsheet)
+if args.stream:
+    writer.write_stream(
+        ifc_file,
+        args.spreadsheet,
+        format=args.format,
+        delimiter=args.delimiter,
+        null=args.null,
+        empty=args.empty,
+        bool_true=args.bool_true,
+        bool_false=args.bool_false,
+        processes=args.processes,
+    )
+else:
+    parser.parse(ifc_file)
+    writer.write(null=args.null, empty=args.empty, bool_true=args.bool_true, bool_false=args.bool_false)
+    if args.format == "csv":
+        writer.write_csv(args.spreadsheet, delimiter=args.delimiter)
+    elif args.format == "ods":
+        writer.write_ods(args.spreadsheet)
+    elif args.format == "xlsx":
+        writer.write_xlsx(args.spreadsheet)
+
+if args.timings:
+    for category, seconds in sorted(parser.timings.items(), key=lambda x: x[1], reverse=True):
+        print(f"{category}: {seconds:.3f}s", file=sys.stderr)
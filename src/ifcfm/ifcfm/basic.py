@@ -22,6 +22,7 @@ import ifcopenshell.util.date
 import ifcopenshell.util.system
 import ifcopenshell.util.placement
 import ifcopenshell.util.classification
+import ifcfm.relationships
 
 
 def get_facilities(ifc_file):
@@ -93,7 +94,7 @@ def get_storey_data(ifc_file, element):
 
 
 def get_space_data(ifc_file, element):
-    psets = ifcopenshell.util.element.get_psets(element)
+    psets = ifcfm.relationships.get_index(ifc_file).get_psets(element)
     return {
         "Name": element.Name,
         "Description": element.LongName,
@@ -123,7 +124,7 @@ def get_zone_data(ifc_file, element):
 
 
 def get_element_type_data(ifc_file, element):
-    psets = ifcopenshell.util.element.get_psets(element)
+    psets = ifcfm.relationships.get_index(ifc_file).get_psets(element)
     return {
         "Name": element.Name,
         "Description": element.Description,
@@ -144,14 +145,15 @@ def get_element_type_data(ifc_file, element):
 
 
 def get_element_data(ifc_file, element):
+    index = ifcfm.relationships.get_index(ifc_file)
     space = ifcopenshell.util.element.get_container(element)
     space_name = space.Name if space.is_a("IfcSpace") else None
-    systems = ifcopenshell.util.system.get_element_systems(element)
+    systems = index.get_systems(element)
     system = systems[0].Name if systems else None
-    psets = ifcopenshell.util.element.get_psets(element)
+    psets = index.get_psets(element)
     return {
         "Name": element.Name,
-        "TypeName": ifcopenshell.util.element.get_type(element).Name,
+        "TypeName": index.get_type(element).Name,
         "SpaceName": space_name,
         "SystemName": system,
         "OrganizationName": get_owner_name(element),
@@ -212,7 +214,7 @@ def get_facility_parent(element, ifc_class):
 
 
 def get_classification_identification(element):
-    references = list(ifcopenshell.util.classification.get_references(element))
+    references = list(ifcfm.relationships.get_index(element.file).get_references(element))
     if references:
         if hasattr(references[0], "Identification"):
             return references[0].Identification
@@ -220,7 +222,7 @@ def get_classification_identification(element):
 
 
 def get_classification_name(element):
-    references = list(ifcopenshell.util.classification.get_references(element))
+    references = list(ifcfm.relationships.get_index(element.file).get_references(element))
     if references:
         return references[0].Name
 
@@ -22,6 +22,7 @@ import ifcopenshell.util.date
 import ifcopenshell.util.system
 import ifcopenshell.util.placement
 import ifcopenshell.util.classification
+import ifcfm.relationships
 
 
 # The original BIMServer plugin has a function called ifcToCOBie:
@@ -164,6 +165,7 @@ def get_attributes(ifc_file):
     created_by = get_email_from_history(history) if history else None
     created_on = ifcopenshell.util.date.ifc2datetime(history.CreationDate).isoformat() if history else None
     external_system = history.OwningApplication.ApplicationFullName if history else None
+    index = ifcfm.relationships.get_index(ifc_file)
     get_sheets = {
         "Facility": get_facilities,
         "Floor": get_floors,
@@ -205,7 +207,7 @@ def get_attributes(ifc_file):
 
     for sheet_name, get_sheet in get_sheets.items():
         for element in get_sheet(ifc_file):
-            for pset_name, props in ifcopenshell.util.element.get_psets(element).items():
+            for pset_name, props in index.get_psets(element).items():
                 pset = ifc_file.by_id(props["id"])
                 pset_created_by = get_created_by(pset) or created_by
                 pset_created_on = get_created_on(pset) or created_on
@@ -328,7 +330,7 @@ def get_facility_data(ifc_file, element):
         "AreaUnits": get_unit_type_name(ifc_file, "AREAUNIT"),
         "VolumeUnits": get_unit_type_name(ifc_file, "VOLUMEUNIT"),
         "CurrencyUnit": get_unit_type_name(ifc_file, "IfcMonetaryUnit"),
-        "AreaMeasurement": get_area_measurement(element),
+        "AreaMeasurement": get_area_measurement(ifc_file, element),
         "ExternalSystem": get_external_system(element),
         "ExternalProjectObject": "IfcProject",
         "ExternalProjectIdentifier": project.GlobalId if project else None,
@@ -357,7 +359,7 @@ def get_floor_data(ifc_file, element):
     }
 
     height = None
-    for _, props in ifcopenshell.util.element.get_psets(element).items():
+    for _, props in ifcfm.relationships.get_index(ifc_file).get_psets(element).items():
         if height is not None:
             break
         for name, value in props.items():
@@ -396,7 +398,7 @@ def get_space_data(ifc_file, element):
     gross_area_names = {"GrossFloorArea", "GSA"}
     net_area = None
     net_area_names = {"NetFloorArea", "GSA"}
-    for _, props in ifcopenshell.util.element.get_psets(element).items():
+    for _, props in ifcfm.relationships.get_index(ifc_file).get_psets(element).items():
         for name, value in props.items():
             if not room_tag and name in room_tag_names and val(value):
                 room_tag = str(value)
@@ -478,7 +480,7 @@ def get_type_data(ifc_file, element):
     code_performance = None
     sustainability_performance = None
 
-    for pset_name, props in ifcopenshell.util.element.get_psets(element).items():
+    for pset_name, props in ifcfm.relationships.get_index(ifc_file).get_psets(element).items():
         pset_warranty_type = None
         if pset_name == "COBie_Warranty":
             warranty_guarantor_parts = props.get("WarrantyGuarantorParts", None)
@@ -556,13 +558,14 @@ def get_type_data(ifc_file, element):
 
 
 def get_component_data(ifc_file, element):
+    index = ifcfm.relationships.get_index(ifc_file)
     space = ifcopenshell.util.element.get_container(element)
     space_name = space.Name if space.is_a("IfcSpace") else None
-    systems = ifcopenshell.util.system.get_element_systems(element)
+    systems = index.get_systems(element)
     system = systems[0].Name if systems else None
 
     type_name = None
-    relating_type = ifcopenshell.util.element.get_type(element)
+    relating_type = index.get_type(element)
     if relating_type and val(relating_type.Name):
         type_name = relating_type.Name
     else:
@@ -576,7 +579,7 @@ def get_component_data(ifc_file, element):
     bar_code = None
     asset_identifier = None
 
-    for _, props in ifcopenshell.util.element.get_psets(element).items():
+    for _, props in index.get_psets(element).items():
         for name, value in props.items():
             if not serial_number and name == "SerialNumber" and val(value):
                 serial_number = str(value)
@@ -701,7 +704,7 @@ def get_spare_data(ifc_file, element):
     suppliers = None
     set_number = None
     part_number = None
-    for _, props in ifcopenshell.util.element.get_psets(element).items():
+    for _, props in ifcfm.relationships.get_index(ifc_file).get_psets(element).items():
         for name, value in props.items():
             if name == "Suppliers" and val(value):
                 suppliers = str(value)
@@ -760,7 +763,7 @@ def get_job_data(ifc_file, element):
     frequency = None
     frequency_unit = None
 
-    for _, props in ifcopenshell.util.element.get_psets(element).items():
+    for _, props in ifcfm.relationships.get_index(ifc_file).get_psets(element).items():
         pset = ifc_file.by_id(props["id"])
         for name, value in props.items():
             if not duration and name == "TaskDuration" and val(value):
@@ -930,7 +933,7 @@ def val(x):
     return x if x not in ("", "n/a") else None
 
 
-def get_area_measurement(element):
+def get_area_measurement(ifc_file, element):
     for relationship in getattr(element, "IsDefinedBy", []) or []:
         if relationship.is_a("IfcRelDefinesByProperties"):
             definition = relationship.RelatingPropertyDefinition
@@ -938,11 +941,11 @@ def get_area_measurement(element):
                 return definition.MethodOfMeasurement
     for rel in getattr(element, "IsDecomposedBy", []):
         for related_object in rel.RelatedObjects:
-            result = get_area_measurement(related_object)
+            result = get_area_measurement(ifc_file, related_object)
             if result:
                 return result
 
-    psets = ifcopenshell.util.element.get_psets(element)
+    psets = ifcfm.relationships.get_index(ifc_file).get_psets(element)
     if psets:
         for _, props in psets.items():
             for name, value in props.items():
@@ -951,7 +954,7 @@ def get_area_measurement(element):
 
 
 def get_category(element):
-    references = list(ifcopenshell.util.classification.get_references(element))
+    references = list(ifcfm.relationships.get_index(element.file).get_references(element))
     results = []
     for reference in references:
         if reference.is_a("IfcClassification"):
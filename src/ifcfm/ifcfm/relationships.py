@@ -0,0 +1,150 @@
+# IfcFM - IFC for facility management
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcFM.
+#
+# IfcFM is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcFM is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcFM.  If not, see <http://www.gnu.org/licenses/>.
+
+import weakref
+import ifcopenshell
+import ifcopenshell.util.element
+import ifcopenshell.util.classification
+from typing import Any, Optional
+
+SYSTEM_CLASSES = ("IfcSystem", "IfcDistributionSystem", "IfcBuildingSystem", "IfcZone")
+
+indices: "weakref.WeakKeyDictionary[ifcopenshell.file, RelationshipIndex]" = weakref.WeakKeyDictionary()
+
+
+class RelationshipIndex:
+    """Relationships of an IFC file, indexed once for all elements
+
+    Presets look up the same relationships for many elements, such as the
+    type of every component and then again for its inherited properties.
+    Rather than traversing inverse attributes for each element, every
+    relationship of a kind is read in a single pass and stored by element ID.
+
+    The results of each lookup are equivalent to the corresponding function
+    in :mod:`ifcopenshell.util`. The index is not updated if the file is
+    modified after it is built.
+
+    :param ifc_file: The IFC file to index.
+    :param should_cache_properties: If true, the properties of each property
+        set or quantity set are only read once, even if they are shared by
+        many elements or inherited from a type. The cache grows with the
+        number of property definitions in the file.
+    """
+
+    def __init__(self, ifc_file: ifcopenshell.file, should_cache_properties: bool = True):
+        self.file = ifc_file
+        self.should_cache_properties = should_cache_properties
+        self.types: dict[int, ifcopenshell.entity_instance] = {}
+        self.groups: dict[int, list[ifcopenshell.entity_instance]] = {}
+        self.references: dict[int, set[ifcopenshell.entity_instance]] = {}
+        self.property_definitions: dict[int, list[ifcopenshell.entity_instance]] = {}
+        self.properties: dict[int, dict[str, Any]] = {}
+        self.build()
+
+    def build(self) -> None:
+        for rel in self.file.by_type("IfcRelDefinesByType"):
+            for element in rel.RelatedObjects:
+                self.types.setdefault(element.id(), rel.RelatingType)
+        for rel in self.file.by_type("IfcRelAssignsToGroup"):
+            for element in rel.RelatedObjects:
+                self.groups.setdefault(element.id(), []).append(rel.RelatingGroup)
+        for rel in self.file.by_type("IfcRelAssociatesClassification"):
+            for element in rel.RelatedObjects:
+                self.references.setdefault(element.id(), set()).add(rel.RelatingClassification)
+        for rel in self.file.by_type("IfcRelDefinesByProperties"):
+            for element in rel.RelatedObjects:
+                self.property_definitions.setdefault(element.id(), []).append(rel.RelatingPropertyDefinition)
+
+    def get_type(self, element: ifcopenshell.entity_instance) -> Optional[ifcopenshell.entity_instance]:
+        """See :func:`ifcopenshell.util.element.get_type`"""
+        if element.is_a("IfcTypeObject"):
+            return element
+        return self.types.get(element.id())
+
+    def get_systems(self, element: ifcopenshell.entity_instance) -> list[ifcopenshell.entity_instance]:
+        """See :func:`ifcopenshell.util.system.get_element_systems`"""
+        return [g for g in self.groups.get(element.id(), []) if g.is_a() in SYSTEM_CLASSES]
+
+    def get_references(self, element: ifcopenshell.entity_instance) -> set[ifcopenshell.entity_instance]:
+        """See :func:`ifcopenshell.util.classification.get_references`"""
+        if not element.is_a("IfcRoot"):
+            return ifcopenshell.util.classification.get_references(element)
+        occurrence_results = self.references.get(element.id(), set())
+        element_type = self.get_type(element)
+        if not element_type or element_type == element:
+            return set(occurrence_results)
+        results = self.get_references(element_type)
+        if not results:
+            return set(occurrence_results)
+        # Occurrence references override type references from the same classification system.
+        get_classification = ifcopenshell.util.classification.get_classification
+        type_references_per_system = {}
+        occurrence_references_per_system = {}
+        for result in results:
+            type_references_per_system.setdefault(get_classification(result), []).append(result)
+        for result in occurrence_results:
+            occurrence_references_per_system.setdefault(get_classification(result), []).append(result)
+        type_references_per_system.update(occurrence_references_per_system)
+        return {r for references in type_references_per_system.values() for r in references}
+
+    def get_psets(self, element: ifcopenshell.entity_instance) -> dict[str, dict[str, Any]]:
+        """See :func:`ifcopenshell.util.element.get_psets`
+
+        Property values may be shared between the results for different
+        elements and should not be modified.
+        """
+        psets = {}
+        if element.is_a("IfcTypeObject"):
+            definitions = element.HasPropertySets or []
+        elif element.is_a("IfcMaterialDefinition") or element.is_a("IfcProfileDef"):
+            return ifcopenshell.util.element.get_psets(element)
+        elif getattr(element, "IsDefinedBy", None) is not None:
+            element_type = self.get_type(element)
+            if element_type:
+                psets = self.get_psets(element_type)
+            definitions = self.property_definitions.get(element.id(), [])
+        else:
+            return psets
+        for definition in definitions:
+            psets.setdefault(definition.Name, {}).update(self.get_property_definition(definition))
+        return psets
+
+    def get_property_definition(self, definition: ifcopenshell.entity_instance) -> dict[str, Any]:
+        if not self.should_cache_properties:
+            return ifcopenshell.util.element.get_property_definition(definition)
+        if (properties := self.properties.get(definition.id())) is None:
+            properties = self.properties[definition.id()] = ifcopenshell.util.element.get_property_definition(
+                definition
+            )
+        return properties
+
+
+def build_index(ifc_file: ifcopenshell.file, should_cache_properties: bool = True) -> RelationshipIndex:
+    """Indexes the relationships of a file, replacing any previous index
+
+    Call this again if the file is modified.
+    """
+    index = indices[ifc_file] = RelationshipIndex(ifc_file, should_cache_properties=should_cache_properties)
+    return index
+
+
+def get_index(ifc_file: ifcopenshell.file) -> RelationshipIndex:
+    """Gets the relationship index of a file, building it if it doesn't exist yet"""
+    if (index := indices.get(ifc_file)) is None:
+        index = build_index(ifc_file)
+    return index
@@ -96,10 +96,11 @@ __all__ = [
     "sqlite_entity",
     "stream",
     "stream_entity",
+    "indexed_stream",
 ]
 
 try:
-    from .stream import stream, stream_entity
+    from .stream import stream, stream_entity, indexed_stream
 except:
     pass
 
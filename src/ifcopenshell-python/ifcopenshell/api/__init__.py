@@ -39,13 +39,14 @@ Also see how to `create a simple model from scratch
 """
 
 import json
+import time
 import numpy
 import inspect
 import importlib
 import ifcopenshell
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Iterator, Optional
 from functools import partial
-
+from contextlib import contextmanager
 
 pre_listeners: dict[str, dict] = {}
 post_listeners: dict[str, dict] = {}
@@ -162,6 +163,169 @@ def remove_all_listeners():
     post_listeners.clear()
 
 
+class ListenerBatch:
+    """Queues post listener notifications so they may be dispatched all at once"""
+
+    def __init__(self, coalesce: bool = False):
+        self.coalesce = coalesce
+        self.notifications: list[tuple] = []
+
+    def add(self, usecase_path: str, ifc_file: Optional[ifcopenshell.file], settings: dict) -> None:
+        if usecase_path not in post_listeners and "*" not in post_listeners:
+            return
+        if self.coalesce:
+            for notification in self.notifications:
+                if notification[0] == usecase_path and notification[1] is ifc_file:
+                    if self.are_settings_identical(notification[2], settings):
+                        return
+        self.notifications.append((usecase_path, ifc_file, settings))
+
+    def are_settings_identical(self, a: dict, b: dict) -> bool:
+        if a.keys() != b.keys():
+            return False
+        for key, value in a.items():
+            other = b[key]
+            if value is other:
+                continue
+            try:
+                if not bool(value == other):
+                    return False
+            except (ValueError, TypeError):
+                # E.g. numpy arrays, which can't be compared as a whole.
+                return False
+        return True
+
+    def dispatch(self) -> None:
+        notifications, self.notifications = self.notifications, []
+        for usecase_path, ifc_file, settings in notifications:
+            dispatch_listeners(post_listeners, usecase_path, ifc_file, settings)
+
+
+listener_batch: Optional[ListenerBatch] = None
+
+
+@contextmanager
+def batch_listeners(coalesce: bool = False) -> Iterator[ListenerBatch]:
+    """Defers post listeners until the end of the block
+
+    Scripts which run many usecases in a row (e.g. assigning psets to every
+    element) pay for listener dispatch on every single call. Within this block
+    post listener notifications are queued instead and dispatched in order
+    once the block exits, even if an exception is raised. Pre listeners are
+    still dispatched immediately, so they see the file before each change.
+
+    If coalesced, repeated calls to the same usecase on the same file with
+    identical settings only notify each listener once. Calls with different
+    settings are always dispatched, as listeners may depend on them (e.g. to
+    know which element was changed).
+
+    Nested blocks join the outermost batch.
+
+    Example:
+
+    .. code:: python
+
+        with ifcopenshell.api.batch_listeners():
+            for wall in model.by_type("IfcWall"):
+                pset = ifcopenshell.api.pset.add_pset(model, product=wall, name="Pset_WallCommon")
+                ifcopenshell.api.pset.edit_pset(model, pset=pset, properties={"IsExternal": True})
+
+    :param coalesce: Whether to only notify once for repeated identical calls.
+    :return: The batch of queued notifications.
+    """
+    global listener_batch
+    if listener_batch is not None:
+        yield listener_batch
+        return
+    listener_batch = batch = ListenerBatch(coalesce)
+    try:
+        yield batch
+    finally:
+        listener_batch = None
+        batch.dispatch()
+
+
+def dispatch_listeners(
+    listeners: dict[str, dict], usecase_path: str, ifc_file: Optional[ifcopenshell.file], settings: dict
+) -> None:
+    for listener in (*listeners.get(usecase_path, {}).values(), *listeners.get("*", {}).values()):
+        listener(usecase_path, ifc_file, settings)
+
+
+class UsecaseProfile:
+    """Call counts and timings of API usecases
+
+    Total time includes any nested usecases, whereas self time excludes them.
+    """
+
+    def __init__(self):
+        self.stats: dict[str, list] = {}  # usecase_path: [calls, total time, self time]
+        self.stack: list[float] = []  # time spent in nested usecases for each running usecase
+
+    def start(self) -> float:
+        self.stack.append(0.0)
+        return time.perf_counter()
+
+    def stop(self, usecase_path: str, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        nested = self.stack.pop()
+        if self.stack:
+            self.stack[-1] += elapsed
+        stats = self.stats.get(usecase_path)
+        if stats is None:
+            stats = self.stats[usecase_path] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += elapsed - nested
+
+    def to_table(self, sort: str = "self", limit: Optional[int] = None) -> str:
+        """Formats the profile as a plain text table
+
+        :param sort: Either "calls", "total", or "self" to sort descending by
+            that column.
+        :param limit: The maximum number of usecases to include.
+        :return: The formatted table.
+        """
+        column = {"calls": 0, "total": 1, "self": 2}[sort]
+        rows = sorted(self.stats.items(), key=lambda x: x[1][column], reverse=True)[:limit]
+        width = max([len("Usecase")] + [len(r[0]) for r in rows])
+        lines = [f"{'Usecase':<{width}}{'Calls':>10}{'Total (s)':>12}{'Self (s)':>12}{'Self (us/call)':>16}"]
+        for usecase_path, (calls, total, self_time) in rows:
+            lines.append(
+                f"{usecase_path:<{width}}{calls:>10}{total:>12.3f}{self_time:>12.3f}{self_time / calls * 1e6:>16.1f}"
+            )
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.to_table()
+
+
+usecase_profile: Optional[UsecaseProfile] = None
+
+
+@contextmanager
+def profile_usecases() -> Iterator[UsecaseProfile]:
+    """Counts and times every API usecase called within the block
+
+    Example:
+
+    .. code:: python
+
+        with ifcopenshell.api.profile_usecases() as profile:
+            run_my_authoring_script(model)
+        print(profile.to_table(limit=10))
+
+    :return: The profile, which is populated as usecases are run.
+    """
+    global usecase_profile
+    previous_profile = usecase_profile
+    usecase_profile = profile = UsecaseProfile()
+    try:
+        yield profile
+    finally:
+        usecase_profile = previous_profile
+
+
 def extract_docs(module, usecase):
     import typing
     import collections
@@ -238,16 +402,17 @@ def wrap_usecase(usecase_path, usecase):
     def wrapper(*args, should_run_listeners: bool = True, **settings):
         ifc_file = args[0] if args else None
         nonlocal usecase_path
-        if should_run_listeners:
-            listeners = list(pre_listeners.get(usecase_path, {}).values())
-            listeners += pre_listeners.get("*", {}).values()
-            for listener in listeners:
-                listener(usecase_path, ifc_file, settings)
+        if should_run_listeners and pre_listeners:
+            dispatch_listeners(pre_listeners, usecase_path, ifc_file, settings)
 
         # see #4531
         if usecase_path in ARGUMENTS_DEPRECATION:
             usecase_path, settings = ARGUMENTS_DEPRECATION[usecase_path](usecase_path, settings)
 
+        profile = usecase_profile
+        if profile is not None:
+            start = profile.start()
+
         try:
             result = usecase(*args, **settings)
         except TypeError as e:
@@ -263,12 +428,15 @@ def wrap_usecase(usecase_path, usecase):
                 f"See help(ifcopenshell.api.{usecase_path}) for documentation."
             )
             raise TypeError(msg) from e
-
-        if should_run_listeners:
-            listeners = list(post_listeners.get(usecase_path, {}).values())
-            listeners += post_listeners.get("*", {}).values()
-            for listener in listeners:
-                listener(usecase_path, ifc_file, settings)
+        finally:
+            if profile is not None:
+                profile.stop(usecase_path, start)
+
+        if should_run_listeners and post_listeners:
+            if listener_batch is not None:
+                listener_batch.add(usecase_path, ifc_file, settings)
+            else:
+                dispatch_listeners(post_listeners, usecase_path, ifc_file, settings)
 
         return result
 
@@ -27,6 +27,7 @@ from .. import wrap_usecases
 from .add_pset import add_pset
 from .add_qto import add_qto
 from .edit_pset import edit_pset
+from .edit_psets import edit_psets
 from .edit_qto import edit_qto
 from .remove_pset import remove_pset
 
@@ -36,6 +37,7 @@ __all__ = [
     "add_pset",
     "add_qto",
     "edit_pset",
+    "edit_psets",
     "edit_qto",
     "remove_pset",
 ]
@@ -18,6 +18,7 @@
 
 import ifcopenshell
 import ifcopenshell.util.pset
+from functools import lru_cache
 from typing import Optional, Any, Union
 
 
@@ -170,6 +171,9 @@ class Usecase:
     def execute(self) -> None:
         self.update_pset_name()
         self.load_pset_template()
+        self.edit_properties()
+
+    def edit_properties(self) -> None:
         existing_props = self.update_existing_properties()
         new_props = self.add_new_properties()
         self.assign_new_properties(existing_props + new_props)
@@ -428,7 +432,7 @@ class Usecase:
                 return "IfcInteger"
 
     def cast_value_to_primary_measure_type(self, value, primary_measure_type):
-        type_str = self.file.create_entity(primary_measure_type).attribute_type(0)
+        type_str = get_value_type(self.file.schema_identifier, primary_measure_type)
         type_fn = {
             "AGGREGATE OF DOUBLE": list,
             "AGGREGATE OF INT": list,
@@ -459,3 +463,8 @@ class Usecase:
             return (value_candidate["Unit"], value_candidate["NominalValue"])
 
         return (None, value_candidate)
+
+
+@lru_cache(maxsize=None)
+def get_value_type(schema_identifier: str, primary_measure_type: str) -> str:
+    return ifcopenshell.create_entity(primary_measure_type, schema=schema_identifier).attribute_type(0)
@@ -0,0 +1,87 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import ifcopenshell
+import ifcopenshell.util.pset
+from ifcopenshell.api.pset.edit_pset import Usecase
+from typing import Optional, Any
+
+
+def edit_psets(
+    file: ifcopenshell.file,
+    psets: dict[ifcopenshell.entity_instance, dict[str, Any]],
+    pset_template: Optional[ifcopenshell.entity_instance] = None,
+    should_purge: bool = True,
+) -> None:
+    """Edits many property sets and their properties in a single pass
+
+    This is the bulk equivalent of calling
+    :func:`ifcopenshell.api.pset.edit_pset` once per property set, and
+    follows the same rules for how properties are added, edited, and purged.
+    However, the property set template of each distinct property set name is
+    only looked up once, rather than once per property set. Use this when
+    editing large numbers of property sets, such as setting a property on
+    every element in a model.
+
+    Unlike :func:`ifcopenshell.api.pset.edit_pset`, the properties
+    dictionaries are never modified, so the same dictionary may be safely
+    shared between many property sets.
+
+    :param psets: A dictionary mapping each IfcPropertySet (or other property
+        definition supported by :func:`ifcopenshell.api.pset.edit_pset`) to a
+        dictionary of property names and values to set.
+    :type psets: dict[ifcopenshell.entity_instance, dict[str, Any]]
+    :param pset_template: If specified, the property set template used for
+        all property sets. Otherwise, buildingSMART templates are looked up by
+        the name of each property set.
+    :type pset_template: ifcopenshell.entity_instance, optional
+    :param should_purge: If true, properties set to None are deleted.
+    :type should_purge: bool
+    :return: None
+    :rtype: None
+
+    Example:
+
+    .. code:: python
+
+        psets = {}
+        for wall in model.by_type("IfcWall"):
+            pset = ifcopenshell.api.pset.add_pset(model, product=wall, name="Pset_WallCommon")
+            psets[pset] = {"FireRating": "2HR", "IsExternal": wall.Name.startswith("EXT")}
+        ifcopenshell.api.pset.edit_psets(model, psets=psets)
+    """
+    psetqto = ifcopenshell.util.pset.get_template(file.schema_identifier)
+    templates: dict[str, Optional[ifcopenshell.entity_instance]] = {}
+    usecase = Usecase()
+    usecase.file = file
+    for pset, properties in psets.items():
+        if pset_template:
+            usecase.pset_template = pset_template
+        elif (name := pset.Name) in templates:
+            usecase.pset_template = templates[name]
+        else:
+            usecase.pset_template = templates[name] = psetqto.get_by_name(name)
+        usecase.settings = {
+            "pset": pset,
+            "name": None,
+            "properties": dict(properties) if properties else {},
+            "pset_template": pset_template,
+            "should_purge": should_purge,
+        }
+        usecase.edit_properties()
@@ -49,11 +49,7 @@ from .edit_work_calendar import edit_work_calendar
 from .edit_work_plan import edit_work_plan
 from .edit_work_schedule import edit_work_schedule
 from .edit_work_time import edit_work_time
-
-try:
-    from .recalculate_schedule import recalculate_schedule
-except ModuleNotFoundError as e:
-    print(f"Note: API not available due to missing dependencies: sequence.recalculate_schedule - {e}")
+from .recalculate_schedule import recalculate_schedule
 from .remove_task import remove_task
 from .remove_time_period import remove_time_period
 from .remove_work_calendar import remove_work_calendar
@@ -120,4 +120,5 @@ def assign_recurrence_pattern(
         if recurrence_old := settings["parent"].Recurrence and len(file.get_inverse(recurrence_old)) == 1:
             file.remove(recurrence_old)
         settings["parent"].Recurrence = recurrence
+    ifcopenshell.util.sequence.invalidate_work_calendars()
     return recurrence
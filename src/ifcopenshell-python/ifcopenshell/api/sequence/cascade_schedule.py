@@ -17,11 +17,18 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import ifcopenshell
 import ifcopenshell.util.date
 import ifcopenshell.util.sequence
+from collections import deque
+from typing import Optional
 
 
-def cascade_schedule(file: ifcopenshell.file, task: ifcopenshell.entity_instance) -> None:
+def cascade_schedule(
+    file: ifcopenshell.file,
+    task: Optional[ifcopenshell.entity_instance] = None,
+    work_schedule: Optional[ifcopenshell.entity_instance] = None,
+) -> None:
     """Cascades start and end dates of tasks based on durations
 
     Given a start task with a start date and duration, the end date, and the
@@ -40,8 +47,16 @@ def cascade_schedule(file: ifcopenshell.file, task: ifcopenshell.entity_instance
     software calculate start and end dates. Some may consider Monday 5pm to
     be equivalent to be Tuesday 8am, for instance.
 
+    If many tasks and sequences were created without cascading, such as when
+    importing a schedule, the whole work schedule may be cascaded at once
+    instead. Every task is then cascaded from its predecessors, and each task
+    is only visited once.
+
     :param task: The start task to begin cascading from.
-    :type task: ifcopenshell.entity_instance
+    :type task: ifcopenshell.entity_instance, optional
+    :param work_schedule: The IfcWorkSchedule to cascade all tasks of, if no
+        start task is specified.
+    :type work_schedule: ifcopenshell.entity_instance, optional
     :return: None
     :rtype: None
 
@@ -103,31 +118,86 @@ def cascade_schedule(file: ifcopenshell.file, task: ifcopenshell.entity_instance
     """
     usecase = Usecase()
     usecase.file = file
-    usecase.settings = {"task": task}
+    usecase.settings = {"task": task, "work_schedule": work_schedule}
     return usecase.execute()
 
 
 class Usecase:
     def execute(self):
         self.calendar_cache = {}
-        self.cascade_task(self.settings["task"], is_first_task=True)
-
-    def cascade_task(self, task, is_first_task=False, task_sequence=None):
-        if task_sequence is None:
-            task_sequence = []
-
-        if task in task_sequence:
+        if self.settings["task"]:
+            start_tasks = {self.settings["task"]}
+        else:
+            start_tasks = set()
+            for root_task in ifcopenshell.util.sequence.get_root_tasks(self.settings["work_schedule"]):
+                start_tasks.add(root_task)
+                start_tasks.update(ifcopenshell.util.sequence.get_all_nested_tasks(root_task))
+        self.build_network_graph(start_tasks)
+
+        # Cascade in topological order, so that each task is only cascaded
+        # once, after all of its predecessors have been cascaded.
+        in_degrees = {task: len(predecessors) for task, predecessors in self.predecessors.items()}
+        queue = deque(task for task, in_degree in in_degrees.items() if not in_degree)
+        pending_tasks = set(start_tasks)
+        total_cascaded = 0
+        while queue:
+            task = queue.popleft()
+            total_cascaded += 1
+            if task in pending_tasks and self.cascade_task(task, is_first_task=task in start_tasks):
+                pending_tasks.update(self.successors[task])
+            for successor in self.successors[task]:
+                in_degrees[successor] -= 1
+                if not in_degrees[successor]:
+                    queue.append(successor)
+
+        if total_cascaded != len(self.successors):
+            cycle = self.get_cycle({task for task, in_degree in in_degrees.items() if in_degree})
             print("Warning! Recursive sequence is as follows:")
-            for i, debug_task in enumerate(task_sequence):
+            for i, debug_task in enumerate(cycle):
                 if i == 0:
                     print("Starting at", debug_task)
                 else:
                     print("... is a predecessor to ...", debug_task)
-            print("... which is cyclically a predecessor to ...", task)
+            print("... which is cyclically a predecessor to ...", cycle[0])
             raise RecursionError("Recursive tasks found. Could not cascade schedule.")
 
+    def build_network_graph(self, tasks: set[ifcopenshell.entity_instance]) -> None:
+        # The network only includes the start tasks and all tasks which may cascade from them
+        self.successors = {}
+        self.predecessors = {task: [] for task in tasks}
+        queue = list(tasks)
+        while queue:
+            task = queue.pop()
+            successors = [rel.RelatedProcess for rel in task.IsPredecessorTo]
+            for rel in task.IsNestedBy:
+                successors.extend(rel.RelatedObjects or [])
+            self.successors[task] = successors
+            for successor in successors:
+                if successor not in self.predecessors:
+                    self.predecessors[successor] = []
+                    queue.append(successor)
+                self.predecessors[successor].append(task)
+
+    def get_cycle(self, tasks: set[ifcopenshell.entity_instance]) -> list[ifcopenshell.entity_instance]:
+        # Every task which could not be cascaded has a predecessor which could
+        # not be cascaded either, so walking backwards must revisit a task.
+        task = next(iter(tasks))
+        path = {}
+        while task not in path:
+            path[task] = len(path)
+            task = next(t for t in self.predecessors[task] if t in tasks)
+        cycle = [t for t, i in path.items() if i >= path[task]]
+        cycle.reverse()
+        return cycle
+
+    def cascade_task(self, task: ifcopenshell.entity_instance, is_first_task: bool = False) -> bool:
+        """Cascades dates from the predecessors of a task
+
+        :return: True if the dates of the task may have changed, and so should
+            be cascaded to its successors.
+        """
         if not task.TaskTime:
-            return
+            return False
 
         duration = (
             ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleDuration)
@@ -256,13 +326,13 @@ class Usecase:
             if potential_finish > finish:
                 start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
                 if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                    return
+                    return False
                 task.TaskTime.ScheduleStart = start_ifc
                 task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(potential_finish, "IfcDateTime")
             else:
                 finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
                 if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                    return
+                    return False
                 task.TaskTime.ScheduleFinish = finish_ifc
                 task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
                     ifcopenshell.util.sequence.get_start_or_finish_date(
@@ -278,7 +348,7 @@ class Usecase:
             finish = max(finishes)
             finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
             if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                return
+                return False
             task.TaskTime.ScheduleFinish = finish_ifc
             task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
                 ifcopenshell.util.sequence.get_start_or_finish_date(
@@ -294,7 +364,7 @@ class Usecase:
             start = max(starts)
             start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
             if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                return
+                return False
             task.TaskTime.ScheduleStart = start_ifc
             task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(
                 ifcopenshell.util.sequence.get_start_or_finish_date(
@@ -307,14 +377,7 @@ class Usecase:
                 "IfcDateTime",
             )
 
-        for rel in task.IsPredecessorTo:
-            self.cascade_task(rel.RelatedProcess, task_sequence=task_sequence + [task])
-
-        for rel in task.IsNestedBy:
-            [
-                self.cascade_task(nested_task, task_sequence=task_sequence + [task])
-                for nested_task in rel.RelatedObjects or []
-            ]
+        return True
 
     def get_lag_time_days(self, lag_time):
         return ifcopenshell.util.date.ifc2datetime(lag_time.LagValue.wrappedValue).days
@@ -63,5 +63,4 @@ def edit_recurrence_pattern(
     for name, value in settings["attributes"].items():
         setattr(settings["recurrence_pattern"], name, value)
 
-    ifcopenshell.util.sequence.is_working_day.cache_clear()
-    ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+    ifcopenshell.util.sequence.invalidate_work_calendars()
@@ -134,17 +134,12 @@ class Usecase:
         self.settings["task_time"].ScheduleFinish = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
 
     def calculate_duration(self):
-        start = ifcopenshell.util.date.ifc2datetime(self.settings["task_time"].ScheduleStart)
-        finish = ifcopenshell.util.date.ifc2datetime(self.settings["task_time"].ScheduleFinish)
-        current_date = datetime.date(start.year, start.month, start.day)
-        finish_date = datetime.date(finish.year, finish.month, finish.day)
-        duration = datetime.timedelta(days=1)
-        while current_date < finish_date:
-            if self.settings["task_time"].DurationType == "ELAPSEDTIME" or not self.calendar:
-                duration += datetime.timedelta(days=1)
-            elif ifcopenshell.util.sequence.is_working_day(current_date, self.calendar):
-                duration += datetime.timedelta(days=1)
-            current_date += datetime.timedelta(days=1)
+        duration = ifcopenshell.util.sequence.get_schedule_duration(
+            ifcopenshell.util.date.ifc2datetime(self.settings["task_time"].ScheduleStart),
+            ifcopenshell.util.date.ifc2datetime(self.settings["task_time"].ScheduleFinish),
+            self.settings["task_time"].DurationType,
+            self.calendar,
+        )
         self.settings["task_time"].ScheduleDuration = ifcopenshell.util.date.datetime2ifc(duration, "IfcDuration")
 
     def get_task(self) -> ifcopenshell.entity_instance:
@@ -17,13 +17,18 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
-import networkx as nx
 import ifcopenshell.api.sequence
 import ifcopenshell.util.date
 import ifcopenshell.util.sequence
+from collections import deque
+from typing import Optional
 
 
-def recalculate_schedule(file: ifcopenshell.file, work_schedule: ifcopenshell.entity_instance) -> None:
+def recalculate_schedule(
+    file: ifcopenshell.file,
+    work_schedule: ifcopenshell.entity_instance,
+    task: Optional[ifcopenshell.entity_instance] = None,
+) -> None:
     """Calculate the critical path and floats for a work schedule
 
     This implements critical path analysis, using the forward pass and
@@ -31,11 +36,21 @@ def recalculate_schedule(file: ifcopenshell.file, work_schedule: ifcopenshell.en
     marked as critical, and both the total and free floats will be
     populated for all task times.
 
-    Cyclical relationships are detected and will result in a recursion
-    error.
+    Each task is visited once in each pass, in the order of its sequence
+    relationships. Cyclical relationships are detected and will result in a
+    recursion error which describes the cycle.
+
+    If the schedule has already been calculated and only a single task has
+    since been edited, the task may be specified so that the early dates of
+    only that task and its successors are recalculated. The early dates of
+    all other tasks are reused from their task times. Late dates and floats
+    are always recalculated, as they depend on the finish of the schedule.
 
     :param work_schedule: The IfcWorkSchedule to perform the calculation on.
     :type work_schedule: ifcopenshell.entity_instance
+    :param task: The IfcTask that was edited since the schedule was last
+        calculated. If not specified, all tasks are recalculated.
+    :type task: ifcopenshell.entity_instance, optional
     :return: None
     :rtype: None
 
@@ -50,10 +65,14 @@ def recalculate_schedule(file: ifcopenshell.file, work_schedule: ifcopenshell.en
     """
     usecase = Usecase()
     usecase.file = file
-    usecase.settings = {"work_schedule": work_schedule}
+    usecase.settings = {"work_schedule": work_schedule, "task": task}
     return usecase.execute()
 
 
+START = 0
+FINISH = 1
+
+
 class Usecase:
     def execute(self):
         # The method implemented is the same as shown here:
@@ -64,39 +83,14 @@ class Usecase:
         if not self.start_dates:
             return
 
-        is_cyclic = False
-        attempts = 0
-        self.pending_nodes = set(self.g.nodes)
-        max_worst_case_attempts = pow(len(self.pending_nodes), 2)
-        while self.pending_nodes:
-            attempts += 1
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.forward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
-
-            # As we parse nodes, the remaining attempts can drop dramatically, so we recalculate the upper limit
-            max_remaining_attempts = pow(len(self.pending_nodes), 2)
-            if max_remaining_attempts < max_worst_case_attempts:
-                max_worst_case_attempts = max_remaining_attempts
-                attempts = 0
-
-            if attempts > max_worst_case_attempts:
-                is_cyclic = True
-                break  # We have an infinite loop due to a cyclic graph
-
-        if is_cyclic:
-            raise RecursionError("Task graph is cyclic and so critical path method cannot be performed.")
-            return
+        order = self.sort_network_graph()
+        downstream_nodes = self.get_downstream_nodes()
+        for node in order:
+            if downstream_nodes is None or node in downstream_nodes or not self.load_early_dates(node):
+                self.forward_pass(node)
 
-        self.pending_nodes = set(self.g.nodes)
-        while self.pending_nodes:
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.backward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
+        for node in reversed(order):
+            self.backward_pass(node)
 
         self.update_task_times()
 
@@ -110,22 +104,43 @@ class Usecase:
             "USERDEFINED": "FS",
             "NOTDEFINED": "FS",
         }
-        self.g = nx.DiGraph()
-        self.edges = []
-        self.g.add_node("start", duration=0, duration_type="ELAPSEDTIME", calendar=None)
-        self.g.add_node("finish", duration=0, duration_type="ELAPSEDTIME", calendar=None)
+        # Nodes are indexed by integers, with adjacency stored as a mapping of
+        # the neighbouring node index to the edge data for each node.
+        self.nodes = []
+        self.tasks = []
+        self.indices = {}
+        self.predecessors = []
+        self.successors = []
+        self.add_network_node(None, duration=0, duration_type="ELAPSEDTIME", calendar=None)
+        self.add_network_node(None, duration=0, duration_type="ELAPSEDTIME", calendar=None)
         for rel in self.settings["work_schedule"].Controls:
             for related_object in rel.RelatedObjects:
                 if not related_object.is_a("IfcTask"):
                     continue
                 self.add_node(related_object)
-        self.g.add_edges_from(self.edges)
+        for node in range(FINISH + 1, len(self.nodes)):
+            self.add_edges(node)
+
+    def add_network_node(self, task, **data):
+        self.nodes.append(data)
+        self.tasks.append(task)
+        self.predecessors.append({})
+        self.successors.append({})
+        if task:
+            self.indices[task.id()] = len(self.nodes) - 1
+
+    def add_edge(self, predecessor, successor, lag_time, sequence_type):
+        edge = {"lag_time": lag_time, "type": sequence_type}
+        self.successors[predecessor][successor] = edge
+        self.predecessors[successor][predecessor] = edge
 
     def add_node(self, task):
         if task.IsNestedBy:
             for rel in task.IsNestedBy:
                 [self.add_node(o) for o in rel.RelatedObjects]
             return
+        if task.id() in self.indices:
+            return
 
         if task.TaskTime and task.TaskTime.ScheduleDuration:
             duration = ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleDuration).days
@@ -134,69 +149,119 @@ class Usecase:
             duration = 0
             duration_type = "ELAPSEDTIME"
 
-        self.g.add_node(
-            task.id(),
+        self.add_network_node(
+            task,
             duration=duration,
             duration_type=duration_type,
             calendar=ifcopenshell.util.sequence.derive_calendar(task),
         )
 
-        self.edges.extend(
-            [
-                (
-                    rel.RelatingProcess.id(),
-                    task.id(),
-                    {
-                        "lag_time": (
-                            0
-                            if not rel.TimeLag
-                            else ifcopenshell.util.date.ifc2datetime(rel.TimeLag.LagValue.wrappedValue).days
-                        ),
-                        "type": self.sequence_type_map[rel.SequenceType],
-                    },
-                )
-                for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, sequence="predecessor")
-            ]
-        )
-
-        predecessor_types = [
-            rel.SequenceType for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, "predecessor")
-        ]
-        successor_types = [
-            rel.SequenceType for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, "successor")
-        ]
+    def add_edges(self, node):
+        task = self.tasks[node]
+        for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, sequence="predecessor"):
+            # Relationships to tasks outside of the work schedule are not part of the network
+            predecessor = self.indices.get(rel.RelatingProcess.id())
+            if predecessor is None:
+                continue
+            self.add_edge(
+                predecessor,
+                node,
+                0 if not rel.TimeLag else ifcopenshell.util.date.ifc2datetime(rel.TimeLag.LagValue.wrappedValue).days,
+                self.sequence_type_map[rel.SequenceType],
+            )
 
-        if not predecessor_types:
-            self.edges.append(("start", task.id(), {"lag_time": 0, "type": "FS"}))
+        if not self.predecessors[node]:
+            self.add_edge(START, node, 0, "FS")
             if task.TaskTime and task.TaskTime.ScheduleStart:
                 self.start_dates.append(ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleStart))
-                self.g.nodes[task.id()]["early_start"] = ifcopenshell.util.date.ifc2datetime(
+                self.nodes[node]["early_start"] = ifcopenshell.util.date.ifc2datetime(
                     task.TaskTime.ScheduleStart
                 )  # we assume this task is constrained to start on this date
-        if not successor_types:
-            self.edges.append((task.id(), "finish", {"lag_time": 0, "type": "FF"}))
+        if not any(
+            rel.RelatedProcess.id() in self.indices
+            for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, "successor")
+        ):
+            self.add_edge(node, FINISH, 0, "FF")
+
+    def sort_network_graph(self) -> list[int]:
+        """Sorts nodes such that every node comes after its predecessors, using Kahn's algorithm"""
+        in_degrees = [len(predecessors) for predecessors in self.predecessors]
+        queue = deque(node for node, in_degree in enumerate(in_degrees) if not in_degree)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for successor in self.successors[node]:
+                in_degrees[successor] -= 1
+                if not in_degrees[successor]:
+                    queue.append(successor)
+
+        if len(order) != len(self.nodes):
+            cycle = " -> ".join(self.get_node_name(n) for n in self.get_cycle(set(range(len(self.nodes))) - set(order)))
+            raise RecursionError(f"Task graph is cyclic and so critical path method cannot be performed: {cycle}")
+        return order
+
+    def get_cycle(self, nodes: set[int]) -> list[int]:
+        # Every node which could not be sorted has a predecessor which could
+        # not be sorted either, so walking backwards must revisit a node.
+        node = min(nodes)
+        path = {}
+        while node not in path:
+            path[node] = len(path)
+            node = next(p for p in self.predecessors[node] if p in nodes)
+        cycle = [n for n, i in path.items() if i >= path[node]]
+        cycle.reverse()
+        return cycle + [cycle[0]]
+
+    def get_node_name(self, node: int) -> str:
+        task = self.tasks[node]
+        return f"#{task.id()} {task.Name}" if task.Name else f"#{task.id()}"
+
+    def get_downstream_nodes(self) -> Optional[set[int]]:
+        if not self.settings["task"]:
+            return None
+        queue = [self.indices[t.id()] for t in self.get_leaf_tasks(self.settings["task"]) if t.id() in self.indices]
+        downstream_nodes = set(queue)
+        while queue:
+            for successor in self.successors[queue.pop()]:
+                if successor not in downstream_nodes:
+                    downstream_nodes.add(successor)
+                    queue.append(successor)
+        return downstream_nodes
+
+    def get_leaf_tasks(self, task):
+        if not task.IsNestedBy:
+            yield task
+        for rel in task.IsNestedBy:
+            for nested_task in rel.RelatedObjects:
+                yield from self.get_leaf_tasks(nested_task)
+
+    def load_early_dates(self, node: int) -> bool:
+        task = self.tasks[node]
+        if not task or not task.TaskTime or not task.TaskTime.EarlyStart or not task.TaskTime.EarlyFinish:
+            return False
+        data = self.nodes[node]
+        data["early_start"] = ifcopenshell.util.date.ifc2datetime(task.TaskTime.EarlyStart)
+        data["early_finish"] = ifcopenshell.util.date.ifc2datetime(task.TaskTime.EarlyFinish)
+        return True
 
     def update_task_times(self):
-        for ifc_definition_id in self.g.nodes:
-            if ifc_definition_id in ("start", "finish"):
+        for task, data in zip(self.tasks, self.nodes):
+            if not task or not task.TaskTime:
                 continue
-            data = self.g.nodes[ifc_definition_id]
-            task = self.file.by_id(ifc_definition_id)
-            if not task.TaskTime:
+            attributes = {
+                "FreeFloat": ifcopenshell.util.date.datetime2ifc(data["free_float"], "IfcDuration"),
+                "TotalFloat": ifcopenshell.util.date.datetime2ifc(data["total_float"], "IfcDuration"),
+                "IsCritical": data["total_float"].days == 0,
+                "EarlyStart": ifcopenshell.util.date.datetime2ifc(data["early_start"], "IfcDateTime"),
+                "EarlyFinish": ifcopenshell.util.date.datetime2ifc(data["early_finish"], "IfcDateTime"),
+                "LateStart": ifcopenshell.util.date.datetime2ifc(data["late_start"], "IfcDateTime"),
+                "LateFinish": ifcopenshell.util.date.datetime2ifc(data["late_finish"], "IfcDateTime"),
+            }
+            # Most task times are unchanged when recalculating after an edit
+            if all(getattr(task.TaskTime, name) == value for name, value in attributes.items()):
                 continue
-            ifcopenshell.api.sequence.edit_task_time(
-                self.file,
-                task_time=task.TaskTime,
-                attributes={
-                    "FreeFloat": ifcopenshell.util.date.datetime2ifc(data["free_float"], "IfcDuration"),
-                    "TotalFloat": ifcopenshell.util.date.datetime2ifc(data["total_float"], "IfcDuration"),
-                    "IsCritical": data["total_float"].days == 0,
-                    "EarlyStart": ifcopenshell.util.date.datetime2ifc(data["early_start"], "IfcDateTime"),
-                    "EarlyFinish": ifcopenshell.util.date.datetime2ifc(data["early_finish"], "IfcDateTime"),
-                    "LateStart": ifcopenshell.util.date.datetime2ifc(data["late_start"], "IfcDateTime"),
-                    "LateFinish": ifcopenshell.util.date.datetime2ifc(data["late_finish"], "IfcDateTime"),
-                },
-            )
+            ifcopenshell.api.sequence.edit_task_time(self.file, task_time=task.TaskTime, attributes=attributes)
 
     def offset_date(self, date, days, node):
         return ifcopenshell.util.sequence.offset_date(
@@ -204,11 +269,9 @@ class Usecase:
         )
 
     def forward_pass(self, node):
-        successors = self.g.successors(node)
-        predecessors = list(self.g.predecessors(node))
-        data = self.g.nodes[node]
+        data = self.nodes[node]
 
-        if node == "start":
+        if node == START:
             data["early_start"] = min(self.start_dates)
         else:
             finishes = []
@@ -221,15 +284,12 @@ class Usecase:
                     data["calendar"],
                     date_type="FINISH",
                 )
-                return True  # we're done! We assume this task is constrained and finish processing it
+                return  # we're done! We assume this task is constrained and finish processing it
 
-            for predecessor in predecessors:
-                predecessor_data = self.g.nodes[predecessor]
-                edge = self.g[predecessor][node]
+            for predecessor, edge in self.predecessors[node].items():
+                predecessor_data = self.nodes[predecessor]
                 if edge["type"] == "FS":
-                    finish = predecessor_data.get("early_finish")
-                    if finish is None:
-                        return
+                    finish = predecessor_data["early_finish"]
                     days = 0 if predecessor_data["duration"] == 0 else 1
                     if edge["lag_time"]:
                         days += edge["lag_time"]
@@ -244,27 +304,21 @@ class Usecase:
                     else:
                         starts.append(finish)
                 elif edge["type"] == "SS":
-                    start = predecessor_data.get("early_start")
-                    if start is None:
-                        return
+                    start = predecessor_data["early_start"]
                     if edge["lag_time"]:
                         starts.append(self.offset_date(start, edge["lag_time"], data))
                         starts.append(self.offset_date(start, edge["lag_time"], predecessor_data))
                     else:
                         starts.append(start)
                 elif edge["type"] == "FF":
-                    finish = predecessor_data.get("early_finish")
-                    if finish is None:
-                        return
+                    finish = predecessor_data["early_finish"]
                     if edge["lag_time"]:
                         finishes.append(self.offset_date(finish, edge["lag_time"], data))
                         finishes.append(self.offset_date(finish, edge["lag_time"], predecessor_data))
                     else:
                         finishes.append(finish)
                 elif edge["type"] == "SF":
-                    start = predecessor_data.get("early_start")
-                    if start is None:
-                        return
+                    start = predecessor_data["early_start"]
                     days = -1
                     if edge["lag_time"]:
                         days += edge["lag_time"]
@@ -324,26 +378,19 @@ class Usecase:
                 date_type="START",
             )
 
-        return True
-
     def backward_pass(self, node):
-        successors = list(self.g.successors(node))
-        predecessors = self.g.predecessors(node)
-        data = self.g.nodes[node]
+        data = self.nodes[node]
         free_floats = []
 
-        if node == "finish":
+        if node == FINISH:
             data["late_finish"] = data["early_finish"]
         else:
             finishes = []
             starts = []
-            for successor in successors:
-                successor_data = self.g.nodes[successor]
-                edge = self.g[node][successor]
+            for successor, edge in self.successors[node].items():
+                successor_data = self.nodes[successor]
                 if edge["type"] == "FS":
-                    start = successor_data.get("late_start")
-                    if start is None:
-                        return
+                    start = successor_data["late_start"]
                     days = 1
                     if edge["lag_time"]:
                         days += edge["lag_time"]
@@ -369,9 +416,7 @@ class Usecase:
                         )
                     )
                 elif edge["type"] == "SS":
-                    start = successor_data.get("late_start")
-                    if start is None:
-                        return
+                    start = successor_data["late_start"]
                     if edge["lag_time"]:
                         starts.append(self.offset_date(start, -edge["lag_time"], data))
                         starts.append(self.offset_date(start, -edge["lag_time"], successor_data))
@@ -387,9 +432,7 @@ class Usecase:
                         )
                     )
                 elif edge["type"] == "FF":
-                    finish = successor_data.get("late_finish")
-                    if finish is None:
-                        return
+                    finish = successor_data["late_finish"]
                     if edge["lag_time"]:
                         finishes.append(self.offset_date(finish, -edge["lag_time"], data))
                         finishes.append(self.offset_date(finish, -edge["lag_time"], successor_data))
@@ -405,9 +448,7 @@ class Usecase:
                         )
                     )
                 elif edge["type"] == "SF":
-                    finish = successor_data.get("late_finish")
-                    if finish is None:
-                        return
+                    finish = successor_data["late_finish"]
                     days = 0 if successor_data["duration"] == 0 else -1
                     if edge["lag_time"]:
                         days += edge["lag_time"]
@@ -492,8 +533,6 @@ class Usecase:
         if data["free_float"] and data["free_float"].seconds == 60 * 60 * 8:
             data["free_float"] = datetime.timedelta(days=data["free_float"].days + 1)
 
-        return True
-
     def calculate_free_float(
         self,
         predecessor_date,
@@ -17,6 +17,7 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 import ifcopenshell
 import ifcopenshell.api.sequence
+import ifcopenshell.util.sequence
 
 
 def remove_work_time(file: ifcopenshell.file, work_time: ifcopenshell.entity_instance) -> None:
@@ -48,3 +49,4 @@ def remove_work_time(file: ifcopenshell.file, work_time: ifcopenshell.entity_ins
         ifcopenshell.api.sequence.unassign_recurrence_pattern(file, recurrence_pattern)
 
     file.remove(work_time)
+    ifcopenshell.util.sequence.invalidate_work_calendars()
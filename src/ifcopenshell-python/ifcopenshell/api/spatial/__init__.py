@@ -24,6 +24,7 @@ elements (spaces, storeys, buildings, etc).
 
 from .. import wrap_usecases
 from .assign_container import assign_container
+from .assign_containers import assign_containers
 from .dereference_structure import dereference_structure
 from .reference_structure import reference_structure
 from .unassign_container import unassign_container
@@ -32,6 +33,7 @@ wrap_usecases(__path__, __name__)
 
 __all__ = [
     "assign_container",
+    "assign_containers",
     "dereference_structure",
     "reference_structure",
     "unassign_container",
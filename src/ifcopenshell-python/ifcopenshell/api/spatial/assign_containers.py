@@ -0,0 +1,135 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import ifcopenshell
+import ifcopenshell.guid
+import ifcopenshell.api.owner
+import ifcopenshell.api.geometry
+import ifcopenshell.api.aggregate
+import ifcopenshell.util.element
+import ifcopenshell.util.placement
+
+
+def assign_containers(
+    file: ifcopenshell.file,
+    relating_structures: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]],
+) -> list[ifcopenshell.entity_instance]:
+    """Assigns many products to many spatial containers in a single pass
+
+    This is the bulk equivalent of calling
+    :func:`ifcopenshell.api.spatial.assign_container` once per container, and
+    follows the same rules. However, every affected containment relationship
+    is only rewritten once, no matter how many products are moved in or out
+    of it. Use this when assigning large numbers of products, such as when
+    importing or generating a model, instead of assigning products one by
+    one.
+
+    If a product is listed under more than one container, it is assigned to
+    the last one.
+
+    :param relating_structures: A dictionary mapping each
+        IfcSpatialStructureElement (such as IfcBuilding, IfcBuildingStorey,
+        or IfcSpace) to the list of physical IfcElements existing in it.
+    :type relating_structures: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]]
+    :return: The IfcRelContainedInSpatialStructure relationship of each
+        container, in the same order as `relating_structures`, or `None` for
+        containers without any products.
+    :rtype: list[ifcopenshell.entity_instance]
+
+    Example:
+
+    .. code:: python
+
+        ground = ifcopenshell.api.root.create_entity(model, ifc_class="IfcBuildingStorey")
+        level1 = ifcopenshell.api.root.create_entity(model, ifc_class="IfcBuildingStorey")
+        walls = [ifcopenshell.api.root.create_entity(model, ifc_class="IfcWall") for i in range(10)]
+
+        # The first half of the walls are on the ground floor, and the rest are on level 1
+        ifcopenshell.api.spatial.assign_containers(model, relating_structures={ground: walls[:5], level1: walls[5:]})
+    """
+    targets: dict[ifcopenshell.entity_instance, ifcopenshell.entity_instance] = {}
+    for relating_structure, products in relating_structures.items():
+        for product in products:
+            targets[product] = relating_structure
+
+    structure_rels = {s: next(iter(s.ContainsElements), None) for s in relating_structures}
+    products_to_assign: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]] = {}
+    products_to_unassign: dict[ifcopenshell.entity_instance, set[ifcopenshell.entity_instance]] = {}
+    products_without_containers: list[ifcopenshell.entity_instance] = []
+    products_to_change: list[ifcopenshell.entity_instance] = []
+
+    # check if there is anything to change
+    for product, relating_structure in targets.items():
+        product_rel = next(iter(product.ContainedInStructure), None)
+        if product_rel is None:
+            products_without_containers.append(product)
+        elif product_rel == structure_rels[relating_structure]:
+            continue  # products with already assigned containers will be skipped
+        else:
+            products_to_unassign.setdefault(product_rel, set()).add(product)
+        products_to_assign.setdefault(relating_structure, []).append(product)
+        products_to_change.append(product)
+
+    if not products_to_change:
+        return list(structure_rels.values())
+
+    # can be either only aggregated or only contained at the same time
+    ifcopenshell.api.aggregate.unassign_object(file, products=products_without_containers)
+
+    # assign elements to their new containers, before previous containers are purged as they may be reused
+    for relating_structure, products in products_to_assign.items():
+        structure_rel = structure_rels[relating_structure]
+        if structure_rel:
+            structure_rel.RelatedElements = list(structure_rel.RelatedElements) + products
+            ifcopenshell.api.owner.update_owner_history(file, **{"element": structure_rel})
+        else:
+            structure_rels[relating_structure] = file.create_entity(
+                "IfcRelContainedInSpatialStructure",
+                **{
+                    "GlobalId": ifcopenshell.guid.new(),
+                    "OwnerHistory": ifcopenshell.api.owner.create_owner_history(file),
+                    "RelatedElements": products,
+                    "RelatingStructure": relating_structure,
+                }
+            )
+
+    # unassign elements from previous containers
+    for rel, products in products_to_unassign.items():
+        related_elements = [e for e in rel.RelatedElements if e not in products]
+        if related_elements:
+            rel.RelatedElements = related_elements
+            ifcopenshell.api.owner.update_owner_history(file, **{"element": rel})
+        else:
+            history = rel.OwnerHistory
+            file.remove(rel)
+            if history:
+                ifcopenshell.util.element.remove_deep2(file, history)
+
+    # localize placement relative to a new container for affected products
+    for product in products_to_change:
+        placement = getattr(product, "ObjectPlacement", None)
+        if placement and placement.is_a("IfcLocalPlacement"):
+            ifcopenshell.api.geometry.edit_object_placement(
+                file,
+                product=product,
+                matrix=ifcopenshell.util.placement.get_local_placement(product.ObjectPlacement),
+                is_si=False,
+            )
+
+    return list(structure_rels.values())
@@ -26,6 +26,7 @@ Using types is critical to the success of any project.
 
 from .. import wrap_usecases
 from .assign_type import assign_type
+from .assign_types import assign_types
 from .map_type_representations import map_type_representations
 from .unassign_type import unassign_type
 
@@ -33,6 +34,7 @@ wrap_usecases(__path__, __name__)
 
 __all__ = [
     "assign_type",
+    "assign_types",
     "map_type_representations",
     "unassign_type",
 ]
@@ -0,0 +1,139 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import ifcopenshell
+import ifcopenshell.api.type
+import ifcopenshell.api.owner
+import ifcopenshell.api.material
+import ifcopenshell.guid
+import ifcopenshell.util.element
+from typing import Union
+
+
+def assign_types(
+    file: ifcopenshell.file,
+    relating_types: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]],
+    should_map_representations: bool = True,
+) -> list[Union[ifcopenshell.entity_instance, None]]:
+    """Assigns many occurrences to many types in a single pass
+
+    This is the bulk equivalent of calling
+    :func:`ifcopenshell.api.type.assign_type` once per type, and follows the
+    same rules. However, every affected IfcRelDefinesByType relationship is
+    only rewritten once, no matter how many occurrences are moved in or out of
+    it. Use this when typing large numbers of occurrences, such as when
+    importing or generating a model, instead of assigning occurrences one by
+    one.
+
+    If an occurrence is listed under more than one type, it is assigned to
+    the last one.
+
+    :param relating_types: A dictionary mapping each element type (e.g.
+        IfcWallType) to the list of occurrences (e.g. IfcWall) to assign to
+        it.
+    :type relating_types: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]]
+    :param should_map_representations: If true, occurrences will also have
+        their representations mapped to the type's representation maps and
+        their material usages updated, as in
+        :func:`ifcopenshell.api.type.assign_type`.
+    :type should_map_representations: bool
+    :return: The IfcRelDefinesByType relationship of each type, in the same
+        order as `relating_types`, or `None` for types without any
+        occurrences.
+    :rtype: list[Union[ifcopenshell.entity_instance, None]]
+
+    Example:
+
+    .. code:: python
+
+        brick = ifcopenshell.api.root.create_entity(model, ifc_class="IfcWallType", name="Brick")
+        concrete = ifcopenshell.api.root.create_entity(model, ifc_class="IfcWallType", name="Concrete")
+        walls = [ifcopenshell.api.root.create_entity(model, ifc_class="IfcWall") for i in range(10)]
+
+        # The first half of the walls are brick, and the rest are concrete
+        ifcopenshell.api.type.assign_types(model, relating_types={brick: walls[:5], concrete: walls[5:]})
+    """
+    ifc2x3 = file.schema == "IFC2X3"
+
+    targets: dict[ifcopenshell.entity_instance, ifcopenshell.entity_instance] = {}
+    for relating_type, related_objects in relating_types.items():
+        for related_object in related_objects:
+            targets[related_object] = relating_type
+
+    if ifc2x3:
+        type_rels = {t: next(iter(t.ObjectTypeOf), None) for t in relating_types}
+    else:
+        type_rels = {t: next(iter(t.Types), None) for t in relating_types}
+    objects_to_assign: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]] = {}
+    objects_to_unassign: dict[ifcopenshell.entity_instance, set[ifcopenshell.entity_instance]] = {}
+
+    # check if there is anything to change
+    for related_object, relating_type in targets.items():
+        if ifc2x3:
+            object_rel = next((i for i in related_object.IsDefinedBy if i.is_a("IfcRelDefinesByType")), None)
+        else:
+            object_rel = next(iter(related_object.IsTypedBy), None)
+        if object_rel is not None:
+            if object_rel == type_rels[relating_type]:
+                continue  # objects already assigned to the type will be skipped
+            objects_to_unassign.setdefault(object_rel, set()).add(related_object)
+        objects_to_assign.setdefault(relating_type, []).append(related_object)
+
+    # assign objects to their new types, before previous types are purged as they may be reused
+    for relating_type, related_objects in objects_to_assign.items():
+        type_rel = type_rels[relating_type]
+        if type_rel:
+            type_rel.RelatedObjects = list(type_rel.RelatedObjects) + related_objects
+            ifcopenshell.api.owner.update_owner_history(file, **{"element": type_rel})
+        else:
+            type_rels[relating_type] = file.create_entity(
+                "IfcRelDefinesByType",
+                GlobalId=ifcopenshell.guid.new(),
+                OwnerHistory=ifcopenshell.api.owner.create_owner_history(file),
+                RelatedObjects=related_objects,
+                RelatingType=relating_type,
+            )
+
+    # unassign from previous types
+    for type_rel, related_objects in objects_to_unassign.items():
+        cur_related_objects = [o for o in type_rel.RelatedObjects if o not in related_objects]
+        if cur_related_objects:
+            type_rel.RelatedObjects = cur_related_objects
+            ifcopenshell.api.owner.update_owner_history(file, **{"element": type_rel})
+        else:
+            history = type_rel.OwnerHistory
+            file.remove(type_rel)
+            if history:
+                ifcopenshell.util.element.remove_deep2(file, history)
+
+    if should_map_representations:
+        for relating_type, related_objects in objects_to_assign.items():
+            if getattr(relating_type, "RepresentationMaps", None):
+                for related_object in related_objects:
+                    ifcopenshell.api.type.map_type_representations(
+                        file, related_object=related_object, relating_type=relating_type
+                    )
+            type_material = ifcopenshell.util.element.get_material(relating_type)
+            if type_material and (ifc_class := type_material.is_a()) in (
+                "IfcMaterialLayerSet",
+                "IfcMaterialProfileSet",
+            ):
+                ifcopenshell.api.material.assign_material(file, products=related_objects, type=f"{ifc_class}Usage")
+
+    return list(type_rels.values())
@@ -1,10 +1,16 @@
 import os
 import re
 import ast
+import sys
+import marshal
+import hashlib
 import collections
+import importlib.util
+import multiprocessing
 import ifcopenshell
 from logging import Logger
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 from codegen import indent
 
 
@@ -63,127 +69,242 @@ def fix_type(v):
     return v
 
 
-def run(f: ifcopenshell.file, logger: Logger) -> None:
-    from _pytest import assertion
+compiled_rules = {}
 
-    if hasattr(logger, "set_instance"):
-        # when using the json logger, we notify it of the relevant instance
-        pre_annotate_instance = lambda instance: logger.set_state('instance', instance) if hasattr(logger, 'set_state') else None
-        post_annotate_instance = lambda instance: instance
-        pre_annotate_attribute = lambda attribute: logger.set_state('attribute', attribute) if hasattr(logger, 'set_state') else None
-        post_annotate_attribute = lambda attribute: None
-    else:
-        # when using the normal text logger the instance is appended to the method
-        pre_annotate_instance = lambda instance: None
-        post_annotate_instance = lambda instance: instance
-        pre_annotate_attribute = lambda attribute: None
-        post_annotate_attribute = lambda attribute: attribute
-
-    orig = ifcopenshell.settings.unpack_non_aggregate_inverses
-    ifcopenshell.settings.unpack_non_aggregate_inverses = True
 
+def get_rules_path(f: ifcopenshell.file) -> str:
     fn = os.path.join(os.path.dirname(__file__), "rules", f"{f.schema_identifier}.py")
+    if os.path.exists(fn):
+        return fn
+
+    import time
+    import subprocess
+
+    current_dir_files = {fn.lower(): fn for fn in os.listdir('.')}
+    schema_name = str(f.schema_identifier).split(' ')[-1].lower()
+    schema_path = current_dir_files.get(schema_name + '.exp')
+    fn = schema_path[:-4] + '.py'
+    if not os.path.exists(fn):
+        subprocess.run([sys.executable, "-m", "ifcopenshell.express.rule_compiler", schema_path, fn], check=True)
+        time.sleep(1.)
+    return fn
+
+
+def load_rules(fn: str, schema_identifier: str):
+    """Returns the key, source lines and executed scope of a rules module
+
+    Rewriting the assertions of the multi-megabyte rule modules is the bulk of
+    the start up cost, so the compiled bytecode is cached in memory and in a
+    __pycache__ folder next to the rules, keyed by the hash of the source.
+    """
+    from _pytest import __version__ as pytest_version
+
+    with open(fn, "r") as fp:
+        source = fp.read()
+    h = hashlib.sha256(source.encode("utf-8"))
+    h.update(importlib.util.MAGIC_NUMBER)
+    h.update(pytest_version.encode("utf-8"))
+    key = h.hexdigest()[:16]
+
+    if (fn, key) in compiled_rules:
+        return compiled_rules[(fn, key)]
+
+    cache_fn = os.path.join(os.path.dirname(fn), "__pycache__", f"{schema_identifier}.{key}.rules")
     try:
-        source = open(fn, "r").read()
-    except FileNotFoundError as e:
-        import sys
-        import time
-        import subprocess
-
-        current_dir_files = {fn.lower(): fn for fn in os.listdir('.')}
-        schema_name = str(f.schema_identifier).split(' ')[-1].lower()
-        schema_path = current_dir_files.get(schema_name + '.exp')
-        fn = schema_path[:-4] + '.py'
-        if not os.path.exists(fn):
-            subprocess.run([sys.executable, "-m", "ifcopenshell.express.rule_compiler", schema_path, fn], check=True)
-            time.sleep(1.)
-        source = open(fn, "r").read()
-
-    a = ast.parse(source)
-    assertion.rewrite.rewrite_asserts(mod=a, source=source)
-    cd = compile(a, f"{f.schema_identifier}.py", "exec")
+        with open(cache_fn, "rb") as fp:
+            cd = marshal.load(fp)
+    except (OSError, EOFError, ValueError, TypeError):
+        from _pytest import assertion
+
+        a = ast.parse(source)
+        assertion.rewrite.rewrite_asserts(mod=a, source=source)
+        cd = compile(a, f"{schema_identifier}.py", "exec")
+        try:
+            os.makedirs(os.path.dirname(cache_fn), exist_ok=True)
+            with open(f"{cache_fn}.{os.getpid()}", "wb") as fp:
+                marshal.dump(cd, fp)
+            os.replace(f"{cache_fn}.{os.getpid()}", cache_fn)
+        except OSError:
+            # Read-only installations simply recompile on every new process
+            pass
+
     scope = {}
     exec(cd, scope)
-    S = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema_identifier)
+    compiled_rules[(fn, key)] = key, source.split("\n"), scope
+    return compiled_rules[(fn, key)]
 
-    rules = list(filter(lambda x: hasattr(x, "SCOPE"), scope.values()))
 
-    if hasattr(logger, 'set_state'):
-        logger.set_state('type', 'global_rule')
-
-    for R in [r for r in rules if r.SCOPE == "file"]:
-        try:
-            R()(f)
-        except Exception as e:
-            ln = e.__traceback__.tb_next.tb_lineno
-            pre_annotate_attribute(R.__name__)
-            logger.error(
-                str(
-                    error(
-                        post_annotate_attribute(R.__name__),
-                        reverse_compile(source.split("\n")[ln - 1]),
-                        reverse_compile(e.args[0]),
-                    )
-                )
+@dataclass
+class incremental_state:
+    """Keeps the results of a previous run so that only modified instances are checked again
+
+    Pass the same state to subsequent calls of run() on the same file.
+    """
+
+    key: Optional[str] = None
+    digests: dict = field(default_factory=dict)
+    references: dict = field(default_factory=dict)
+    simpletype_records: dict = field(default_factory=dict)
+    entity_records: dict = field(default_factory=dict)
+
+    def update(self, f: ifcopenshell.file, key: str):
+        """Returns the ids of modified instances and of instances with entity rules that may depend on them
+
+        Both are None when everything needs to be checked.
+        """
+        digests = {}
+        references = {}
+        for inst in f:
+            s = str(inst)
+            id = inst.id()
+            digests[id] = hashlib.blake2b(s.encode("utf-8"), digest_size=16).digest()
+            references[id] = tuple({int(r) for r in re.findall(r"#(\d+)", s)} - {id})
+
+        if self.key != key:
+            self.key = key
+            self.simpletype_records = {}
+            self.entity_records = {}
+            self.digests, self.references = digests, references
+            return None, None
+
+        modified = {id for id, digest in digests.items() if self.digests.get(id) != digest}
+        removed = self.digests.keys() - digests.keys()
+
+        # Entity rules navigate forward references and inverses, so the referenced
+        # instances (whose inverses changed) and everything referring to those are
+        # checked again as well.
+        dependents = set(modified)
+        for id in modified | removed:
+            dependents.update(references.get(id, ()))
+            dependents.update(self.references.get(id, ()))
+        queue = [id for id in dependents if id in digests]
+        inverses = set()
+        while queue:
+            for inverse in f.get_inverse(f.by_id(queue.pop())):
+                inverses.add(inverse.id())
+                if inverse.id() not in dependents:
+                    dependents.add(inverse.id())
+                    queue.append(inverse.id())
+
+        # Rules also go from an inverse back to a forward attribute, such as
+        # IsDefinedBy of an object to the RelatingPropertyDefinition, so the
+        # forward references of the referring instances are checked too.
+        for id in inverses:
+            dependents.update(references[id])
+            dependents.update(self.references.get(id, ()))
+
+        self.digests, self.references = digests, references
+        return modified, dependents
+
+
+class executor:
+    def __init__(self, f: ifcopenshell.file, logger: Logger, lines, scope):
+        self.file = f
+        self.logger = logger
+        self.lines = lines
+
+        if hasattr(logger, "set_instance"):
+            # when using the json logger, we notify it of the relevant instance
+            self.pre_annotate_instance = lambda instance: logger.set_state('instance', instance) if hasattr(logger, 'set_state') else None
+            self.post_annotate_instance = lambda instance: instance
+            self.pre_annotate_attribute = lambda attribute: logger.set_state('attribute', attribute) if hasattr(logger, 'set_state') else None
+            self.post_annotate_attribute = lambda attribute: None
+        else:
+            # when using the normal text logger the instance is appended to the method
+            self.pre_annotate_instance = lambda instance: None
+            self.post_annotate_instance = lambda instance: instance
+            self.pre_annotate_attribute = lambda attribute: None
+            self.post_annotate_attribute = lambda attribute: attribute
+
+        self.S = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema_identifier)
+        self.rules = list(filter(lambda x: hasattr(x, "SCOPE"), scope.values()))
+        self.rules_by_name = {r.__name__: r for r in self.rules if r.SCOPE == "entity"}
+
+        subtypes = collections.defaultdict(list)
+        for d in self.S.declarations():
+            if isinstance(d, ifcopenshell.ifcopenshell_wrapper.type_declaration):
+                if isinstance(
+                    d.declared_type(), ifcopenshell.ifcopenshell_wrapper.named_type
+                ):
+                    subtypes[d.declared_type().declared_type().name()].append(d.name())
+
+        self.D = collections.defaultdict(list)
+        for r in self.rules:
+            if r.SCOPE == "type":
+
+                def visit(nm):
+                    self.D[nm].append(r)
+                    for nm2 in subtypes[nm]:
+                        visit(nm2)
+
+                visit(r.TYPE_NAME)
+
+    def set_state(self, key, value):
+        if hasattr(self.logger, 'set_state'):
+            self.logger.set_state(key, value)
+
+    def emit(self, records):
+        """Logs records of (instance id, attribute, logger arguments) produced by the checks"""
+        for id, attribute, args in records:
+            if id is not None:
+                self.pre_annotate_instance(self.file.by_id(id))
+            if attribute is not None:
+                self.pre_annotate_attribute(attribute)
+            self.logger.error(*args)
+
+    def get_error(self, e, attribute, instance=None):
+        ln = e.__traceback__.tb_next.tb_lineno
+        return str(
+            error(
+                self.post_annotate_attribute(attribute),
+                reverse_compile(self.lines[ln - 1]),
+                reverse_compile(e.args[0]),
+                self.post_annotate_instance(instance),
             )
+        )
 
-    if hasattr(logger, 'set_state'):
-        logger.set_state('type', 'simpletype_rule')
-
-    types = {}
-    subtypes = collections.defaultdict(list)
-    for d in S.declarations():
-        if isinstance(d, ifcopenshell.ifcopenshell_wrapper.type_declaration):
-            types[d.name()] = d
-            if isinstance(
-                d.declared_type(), ifcopenshell.ifcopenshell_wrapper.named_type
-            ):
-                subtypes[d.declared_type().declared_type().name()].append(d.name())
-
-    D = collections.defaultdict(list)
-    for r in rules:
-        if r.SCOPE == "type":
-
-            def visit(nm):
-                D[nm].append(r)
-                for nm2 in subtypes[nm]:
-                    visit(nm2)
-
-            visit(r.TYPE_NAME)
+    def check_file(self):
+        records = []
+        for R in [r for r in self.rules if r.SCOPE == "file"]:
+            try:
+                R()(self.file)
+            except Exception as e:
+                records.append((None, R.__name__, (self.get_error(e, R.__name__),)))
+        return records
 
-    def type_name(ty):
-        if isinstance(ty, ifcopenshell.ifcopenshell_wrapper.named_type):
-            return type_name(ty.declared_type())
-        elif isinstance(ty, ifcopenshell.ifcopenshell_wrapper.aggregation_type):
-            # breakpoint()
-            pass
-        elif isinstance(ty, ifcopenshell.ifcopenshell_wrapper.simple_type):
-            pass
-        else:
-            return ty.name()
+    def check_instance(self, inst):
+        records = []
+        try:
+            values = list(inst)
+        except Exception as e:
+            if hasattr(self.logger, "set_state"):
+                records.append((None, None, (str(e),)))
+            else:
+                records.append((None, None, ("For instance:\n    %s\n%s", str(inst), str(e))))
+            return records
+        entity = self.S.declaration_by_name(inst.is_a())
+        attrs = entity.all_attributes()
+        for i, (attr, val, is_derived) in enumerate(
+            zip(attrs, values, entity.derived())
+        ):
+            if is_derived:
+                # @todo
+                pass
+            else:
+                self.check(val, attr.type_of_attribute(), inst, records)
+        return records
 
-    def check(value, type, instance):
+    def check(self, value, type, instance, records):
         if value is None:
             return
 
-        if type_name(type) in D:
-            for R in D[type_name(type)]:
+        if type_name(type) in self.D:
+            for R in self.D[type_name(type)]:
                 try:
                     R()(fix_type(value))
                 except Exception as e:
-                    ln = e.__traceback__.tb_next.tb_lineno
-                    pre_annotate_instance(instance)
-                    pre_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}")
-                    logger.error(
-                        str(
-                            error(
-                                post_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}"),
-                                reverse_compile(source.split("\n")[ln - 1]),
-                                reverse_compile(e.args[0]),
-                                post_annotate_instance(instance),
-                            )
-                        )
-                    )
+                    attribute = f"{R.TYPE_NAME}.{R.RULE_NAME}"
+                    records.append((instance.id(), attribute, (self.get_error(e, attribute, instance),)))
 
         # @nb something can be a named type with rules and still be an aggregation.
         # case in point IfcCompoundPlaneAngleMeasure. Therefore only unpack named
@@ -201,65 +322,139 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
             if isinstance(type, ifcopenshell.ifcopenshell_wrapper.aggregation_type):
                 ty = type.type_of_element()
                 for v in value:
-                    check(v, ty, instance=inst)
+                    self.check(v, ty, instance, records)
             else:
                 # Let's hope a schema validation error was reported for this case
                 pass
 
         elif isinstance(value, ifcopenshell.entity_instance):
             if isinstance(
-                S.declaration_by_name(value.is_a()),
+                self.S.declaration_by_name(value.is_a()),
                 ifcopenshell.ifcopenshell_wrapper.entity,
             ):
                 # top level entity instances will be checked on their own
                 pass
             else:
                 # unpack the type instance
-                check(value[0], S.declaration_by_name(value.is_a()), instance=inst)
+                self.check(value[0], self.S.declaration_by_name(value.is_a()), instance, records)
 
-    for inst in f:
+    def check_entity(self, R, inst):
         try:
-            values = list(inst)
+            R()(inst)
         except Exception as e:
-            if hasattr(logger, "set_state"):
-                logger.error(str(e))
-            else:
-                logger.error("For instance:\n    %s\n%s", inst, e)
-            continue
-        entity = S.declaration_by_name(inst.is_a())
-        attrs = entity.all_attributes()
-        for i, (attr, val, is_derived) in enumerate(
-            zip(attrs, values, entity.derived())
-        ):
-            if is_derived:
-                # @todo
-                pass
-            else:
-                check(val, attr.type_of_attribute(), instance=inst)
+            attribute = f"{R.TYPE_NAME}.{R.RULE_NAME}"
+            return [(inst.id(), attribute, (self.get_error(e, attribute, inst),))]
+        return []
+
+    def check_chunk(self, rule_name, ids):
+        if rule_name is None:
+            return [self.check_instance(self.file.by_id(id)) for id in ids]
+        R = self.rules_by_name[rule_name]
+        return [self.check_entity(R, self.file.by_id(id)) for id in ids]
+
+    def check_chunks(self, tasks, processes):
+        global worker_executor
+        worker_executor = self
+        can_fork = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+        if processes <= 1 or not can_fork or len(tasks) < 2:
+            yield from map(check_chunk, tasks)
+            return
+        # Forked workers share the already loaded file and compiled rules, only
+        # the formatted error records are sent back to be logged in order.
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            yield from pool.imap(check_chunk, tasks)
+
+    def get_tasks(self, rule_name, ids, processes, chunk_size=1000):
+        if processes > 1:
+            chunk_size = max(1, min(chunk_size, len(ids) // (processes * 4)))
+        return [(rule_name, ids[i : i + chunk_size]) for i in range(0, len(ids), chunk_size)]
+
+    def run(self, key, processes=1, state=None):
+        modified, dependents = None, None
+        if state is not None:
+            modified, dependents = state.update(self.file, key)
+
+        self.set_state('type', 'global_rule')
+        self.emit(self.check_file())
+
+        self.set_state('type', 'simpletype_rule')
+        ids = [inst.id() for inst in self.file]
+        tasks = self.get_tasks(None, ids if modified is None else [id for id in ids if id in modified], processes)
+        results = {}
+        for (_, chunk), chunk_records in zip(tasks, self.check_chunks(tasks, processes)):
+            results.update(zip(chunk, chunk_records))
+        simpletype_records = {}
+        for id in ids:
+            records = results.get(id)
+            if records is None and state is not None:
+                records = state.simpletype_records.get(id)
+            if records:
+                simpletype_records[id] = records
+                self.emit(records)
+
+        self.set_state('type', 'entity_rule')
+        # Rules are partitioned per entity type, so that the instances of each
+        # type can be checked in chunks independently of one another.
+        entity_rules = [
+            (r, [inst.id() for inst in self.file.by_type(r.TYPE_NAME)]) for r in self.rules if r.SCOPE == "entity"
+        ]
+        tasks = []
+        for R, ids in entity_rules:
+            ids = ids if dependents is None else [id for id in ids if id in dependents]
+            tasks.extend(self.get_tasks(R.__name__, ids, processes))
+        results = {}
+        for (rule_name, chunk), chunk_records in zip(tasks, self.check_chunks(tasks, processes)):
+            results.update(((rule_name, id), records) for id, records in zip(chunk, chunk_records))
+        entity_records = {}
+        for R, ids in entity_rules:
+            for id in ids:
+                records = results.get((R.__name__, id))
+                if records is None and state is not None:
+                    records = state.entity_records.get((R.__name__, id))
+                if records:
+                    entity_records[(R.__name__, id)] = records
+                    self.emit(records)
+
+        if state is not None:
+            state.simpletype_records = simpletype_records
+            state.entity_records = entity_records
+
+
+worker_executor = None
+
+
+def check_chunk(task):
+    return worker_executor.check_chunk(*task)
+
+
+def type_name(ty):
+    if isinstance(ty, ifcopenshell.ifcopenshell_wrapper.named_type):
+        return type_name(ty.declared_type())
+    elif isinstance(ty, ifcopenshell.ifcopenshell_wrapper.aggregation_type):
+        # breakpoint()
+        pass
+    elif isinstance(ty, ifcopenshell.ifcopenshell_wrapper.simple_type):
+        pass
+    else:
+        return ty.name()
 
-    if hasattr(logger, 'set_state'):
-        logger.set_state('type', 'entity_rule')
 
-    for R in [r for r in rules if r.SCOPE == "entity"]:
-        for inst in f.by_type(R.TYPE_NAME):
-            try:
-                R()(inst)
-            except Exception as e:
-                ln = e.__traceback__.tb_next.tb_lineno
-                pre_annotate_instance(inst)
-                pre_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}")
-                logger.error(
-                    str(
-                        error(
-                            post_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}"),
-                            reverse_compile(source.split("\n")[ln - 1]),
-                            reverse_compile(e.args[0]),
-                            post_annotate_instance(inst),
-                        )
-                    )
-                )
-
-    ifcopenshell.settings.unpack_non_aggregate_inverses = orig
+def run(
+    f: ifcopenshell.file, logger: Logger, processes: int = 1, state: Optional[incremental_state] = None
+) -> None:
+    """Checks the EXPRESS rules of the schema of f, logging violations as errors
+
+    :param processes: Number of forked worker processes checking the instances.
+    :param state: Results of a previous run on the same file, in which case only
+        instances modified since then are checked again.
+    """
+    orig = ifcopenshell.settings.unpack_non_aggregate_inverses
+    ifcopenshell.settings.unpack_non_aggregate_inverses = True
+    try:
+        key, lines, scope = load_rules(get_rules_path(f), f.schema_identifier)
+        executor(f, logger, lines, scope).run(key, processes, state)
+    finally:
+        ifcopenshell.settings.unpack_non_aggregate_inverses = orig
 
 
 if __name__ == "__main__":
@@ -271,6 +466,7 @@ if __name__ == "__main__":
 
     filenames = [x for x in sys.argv[1:] if not x.startswith("--")]
     flags = set(x for x in sys.argv[1:] if x.startswith("--"))
+    processes = next((int(x.split("=")[1]) for x in flags if x.startswith("--processes=")), 1)
 
     for fn in filenames:
         if "--json" in flags:
@@ -281,7 +477,7 @@ if __name__ == "__main__":
 
         f = ifcopenshell.open(fn)
 
-        run(f, logger)
+        run(f, logger, processes=processes)
 
         if "--json" in flags:
             print("\n".join(json.dumps(x, default=str) for x in logger.statements))
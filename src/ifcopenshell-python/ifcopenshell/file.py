@@ -19,10 +19,12 @@
 from __future__ import annotations
 import os
 import re
+import sys
 import numbers
 import zipfile
 import functools
 import ifcopenshell
+from array import array
 from pathlib import Path
 from typing import Optional, Any, Union, Callable, Generator, Literal
 
@@ -30,86 +32,218 @@ from . import ifcopenshell_wrapper
 from .entity_instance import entity_instance
 
 
+class EntityReference:
+    """A journaled reference to an entity instance by its STEP id"""
+
+    __slots__ = ("id",)
+
+    def __init__(self, id: int):
+        self.id = id
+
+
+class TypedValue:
+    """A journaled typed value, such as IfcLabel('Foo')"""
+
+    __slots__ = ("type", "value")
+
+    def __init__(self, type: str, value: Any):
+        self.type = type
+        self.value = value
+
+
 class Transaction:
-    def __init__(self, ifc_file):
+    """Journals changes to a file so that they may be undone and redone
+
+    Rather than storing a dictionary per operation, the journal is columnar.
+    The action, element id and attribute index of each operation are stored
+    in typed arrays, and attribute values are stored positionally in tuples.
+    Scalar values, type names and references are interned so that repeated
+    values (such as enumerations, names and shared references) are only
+    stored once.
+
+    The memory usage of the journal is estimated as operations are stored. If
+    a ``memory_limit`` in bytes is given and exceeded, the journal is dropped
+    and the transaction is marked as overflowed, as it can no longer be
+    undone.
+    """
+
+    CREATE, EDIT, DELETE, BATCH_DELETE = range(4)
+
+    def __init__(self, ifc_file, memory_limit: Optional[int] = None):
         self.file = ifc_file
-        self.operations = []
+        self.memory_limit = memory_limit
+        self.is_overflowed = False
         self.is_batched = False
         self.batch_delete_index = 0
         self.batch_delete_ids = set()
+        self.batch_captured = set()
         self.batch_inverses = []
+        self.clear()
+
+    def clear(self) -> None:
+        self.actions = array("B")
+        self.ids = array("Q")
+        self.indices = array("H")
+        self.payloads = []
+        self.interned = {}
+        self.nbytes = 0
+
+    def get_memory_usage(self) -> int:
+        """Returns an estimate of the memory used by the journal in bytes"""
+        arrays = sum(a.buffer_info()[1] * a.itemsize for a in (self.actions, self.ids, self.indices))
+        return arrays + self.nbytes
+
+    def intern(self, value: Any) -> Any:
+        # The type is part of the key as True == 1 == 1.0
+        key = (type(value), value)
+        result = self.interned.get(key, None)
+        if result is None:
+            result = self.interned[key] = value
+            self.nbytes += sys.getsizeof(value) + 64  # Plus an estimate of the dictionary overhead
+        return result
 
-    def serialise_entity_instance(self, element: ifcopenshell.entity_instance) -> dict[str, Any]:
-        info = element.get_info()
-        for key, value in info.items():
-            info[key] = self.serialise_value(element, value)
-        return info
+    def intern_reference(self, id: int) -> EntityReference:
+        key = (EntityReference, id)
+        result = self.interned.get(key, None)
+        if result is None:
+            result = self.interned[key] = EntityReference(id)
+            self.nbytes += sys.getsizeof(result) + 64
+        return result
 
-    def serialise_value(self, element, value):
-        return element.walk(
-            lambda v: isinstance(v, entity_instance),
-            lambda v: {"id": v.id()} if v.id() else {"type": v.is_a(), "value": v.wrappedValue},
-            value,
+    def serialise_entity_instance(self, element: ifcopenshell.entity_instance) -> tuple[str, tuple]:
+        wrapped_data = element.wrapped_data
+        attributes = tuple(
+            self.serialise_value(element, wrapped_data.get_argument(i)) for i in range(len(wrapped_data))
         )
+        return (self.intern(element.is_a()), attributes)
+
+    def serialise_value(self, element, value):
+        if isinstance(value, (tuple, list)):
+            value = tuple(self.serialise_value(element, v) for v in value)
+            self.nbytes += sys.getsizeof(value)
+            return value
+        elif isinstance(value, (entity_instance, ifcopenshell_wrapper.entity_instance)):
+            if value.id():
+                return self.intern_reference(value.id())
+            if isinstance(value, entity_instance):
+                wrapped_value = value.wrappedValue
+            else:
+                wrapped_value = value.get_argument(0)
+            self.nbytes += 64
+            return TypedValue(self.intern(value.is_a()), self.serialise_value(element, wrapped_value))
+        elif value is None:
+            return None
+        return self.intern(value)
 
     def unserialise_value(self, element, value):
-        return element.walk(
-            lambda v: isinstance(v, dict),
-            lambda v: self.file.by_id(v["id"]) if v.get("id") else self.file.create_entity(v["type"], v["value"]),
-            value,
-        )
+        if isinstance(value, tuple):
+            return tuple(self.unserialise_value(element, v) for v in value)
+        elif isinstance(value, EntityReference):
+            return self.file.by_id(value.id)
+        elif isinstance(value, TypedValue):
+            return self.file.create_entity(value.type, self.unserialise_value(element, value.value))
+        return value
 
     def batch(self) -> None:
         self.is_batched = True
-        self.batch_delete_index = len(self.operations)
+        self.batch_delete_index = len(self.actions)
         self.batch_delete_ids = set()
+        self.batch_captured = set()
         self.batch_inverses = []
 
     def unbatch(self) -> None:
         for inverses in self.batch_inverses:
-            if inverses:
-                self.operations.insert(self.batch_delete_index, {"action": "batch_delete", "inverses": inverses})
+            if inverses and not self.is_overflowed:
+                self.actions.insert(self.batch_delete_index, self.BATCH_DELETE)
+                self.ids.insert(self.batch_delete_index, 0)
+                self.indices.insert(self.batch_delete_index, 0)
+                self.payloads.insert(self.batch_delete_index, inverses)
         self.is_batched = False
         self.batch_delete_index = 0
         self.batch_delete_ids = set()
+        self.batch_captured = set()
         self.batch_inverses = []
 
+    def store(self, action: int, id: int, index: int, payload: Any) -> None:
+        if self.is_overflowed:
+            return
+        self.actions.append(action)
+        self.ids.append(id)
+        self.indices.append(index)
+        self.payloads.append(payload)
+        self.nbytes += sys.getsizeof(payload) + 8
+        if self.memory_limit is not None and self.get_memory_usage() > self.memory_limit:
+            self.is_overflowed = True
+            self.clear()
+
     def store_create(self, element: ifcopenshell.entity_instance) -> None:
-        if element.id():
-            self.operations.append({"action": "create", "value": self.serialise_entity_instance(element)})
+        if element.id() and not self.is_overflowed:
+            self.store(self.CREATE, element.id(), 0, self.serialise_entity_instance(element))
 
     def store_edit(self, element: ifcopenshell.entity_instance, index: int, value: Any) -> None:
-        if element.id():
-            self.operations.append(
-                {
-                    "action": "edit",
-                    "id": element.id(),
-                    "index": index,
-                    "old": self.serialise_value(element, element[index]),
-                    "new": self.serialise_value(element, value),
-                }
-            )
+        if element.id() and not self.is_overflowed:
+            old = self.serialise_value(element, element.wrapped_data.get_argument(index))
+            new = self.serialise_value(element, value)
+            self.store(self.EDIT, element.id(), index, (old, new))
 
     def store_delete(self, element: ifcopenshell.entity_instance) -> None:
-        inverses = {}
+        if self.is_overflowed:
+            return
+        inverses = ()
         if self.is_batched:
             if element.id() not in self.batch_delete_ids:
                 self.batch_inverses.append(self.get_element_inverses(element))
             self.batch_delete_ids.add(element.id())
         else:
             inverses = self.get_element_inverses(element)
-        self.operations.append(
-            {"action": "delete", "inverses": inverses, "value": self.serialise_entity_instance(element)}
-        )
+        self.store(self.DELETE, element.id(), 0, self.serialise_entity_instance(element) + (inverses,))
+
+    def get_element_inverses(
+        self, element: ifcopenshell.entity_instance
+    ) -> tuple[tuple[int, int, Any, Optional[tuple[int, ...]]], ...]:
+        """Captures the attributes of other elements that reference an element
+
+        Only the attributes which actually reference the element are captured,
+        rather than scanning every attribute of every inverse. When the element
+        is referenced in a flat aggregate, only its positions are captured
+        rather than a copy of the whole aggregate, so that deleting each member
+        of a large relationship does not copy the relationship each time.
 
-    def get_element_inverses(self, element):
-        inverses = {}
-        for inverse in self.file.get_inverse(element):
-            inverse_references = []
-            for i, attribute in enumerate(inverse):
-                if self.has_element_reference(attribute, element):
-                    inverse_references.append((i, self.serialise_value(inverse, attribute)))
-            inverses[inverse.id()] = inverse_references
+        While batched, references are only removed on unbatch, so each
+        attribute is captured in full the first time only.
+
+        :return: A tuple of (inverse id, attribute index, serialised value,
+            positions). If positions is not None, the value is the element
+            reference to insert at those positions.
+        """
+        if not self.file.get_total_inverses(element):
+            return ()
+        inverses = []
+        seen = set()
+        element_id = element.id()
+        for inverse, index in self.file.get_inverse(element, allow_duplicate=True, with_attribute_indices=True):
+            key = (inverse.id(), index)
+            if key in seen:
+                continue
+            seen.add(key)
+            if self.is_batched:
+                if key in self.batch_captured:
+                    continue
+                self.batch_captured.add(key)
+            value = inverse.wrapped_data.get_argument(index)
+            positions = None
+            if not self.is_batched and isinstance(value, tuple):
+                positions = tuple(
+                    i
+                    for i, v in enumerate(value)
+                    if isinstance(v, ifcopenshell_wrapper.entity_instance) and v.id() == element_id
+                )
+            if positions:
+                inverses.append((inverse.id(), index, self.intern_reference(element_id), positions))
+            else:
+                inverses.append((inverse.id(), index, self.serialise_value(inverse, value), None))
+        inverses = tuple(inverses)
+        self.nbytes += sys.getsizeof(inverses) + 96 * len(inverses)
         return inverses
 
     def has_element_reference(self, value: Any, element: ifcopenshell.entity_instance) -> bool:
@@ -120,57 +254,63 @@ class Transaction:
             return False
         return value == element
 
+    def restore_inverses(self, inverses: tuple[tuple[int, int, Any, Optional[tuple[int, ...]]], ...]) -> None:
+        for inverse_id, index, value, positions in inverses:
+            inverse = self.file.by_id(inverse_id)
+            value = self.unserialise_value(inverse, value)
+            if positions is not None:
+                aggregate = list(inverse[index] or ())
+                for position in positions:
+                    aggregate.insert(position, value)
+                value = aggregate
+            inverse[index] = value
+
+    def recreate(self, id: int, ifc_class: str, attributes: tuple) -> ifcopenshell.entity_instance:
+        e = self.file.create_entity(ifc_class, id=id)
+        for i, value in enumerate(attributes):
+            if value is None:
+                continue
+            try:
+                e[i] = self.unserialise_value(e, value)
+            except:
+                # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
+                pass
+        return e
+
     def rollback(self) -> None:
-        for operation in self.operations[::-1]:
-            if operation["action"] == "create":
-                element = self.file.by_id(operation["value"]["id"])
+        for i in range(len(self.actions) - 1, -1, -1):
+            action = self.actions[i]
+            payload = self.payloads[i]
+            if action == self.CREATE:
+                element = self.file.by_id(self.ids[i])
                 if hasattr(element, "GlobalId") and element.GlobalId is None:
                     # hack, otherwise ifcopenshell gets upset
                     element.GlobalId = "x"
                 self.file.remove(element)
-            elif operation["action"] == "edit":
-                element = self.file.by_id(operation["id"])
+            elif action == self.EDIT:
+                element = self.file.by_id(self.ids[i])
                 try:
-                    element[operation["index"]] = self.unserialise_value(element, operation["old"])
+                    element[self.indices[i]] = self.unserialise_value(element, payload[0])
                 except:
                     # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
                     pass
-            elif operation["action"] == "delete":
-                e = self.file.create_entity(operation["value"]["type"], id=operation["value"]["id"])
-                for k, v in operation["value"].items():
-                    try:
-                        setattr(e, k, self.unserialise_value(e, v))
-                    except:
-                        # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
-                        pass
-                for inverse_id, data in operation["inverses"].items():
-                    inverse = self.file.by_id(inverse_id)
-                    for index, value in data:
-                        inverse[index] = self.unserialise_value(inverse, value)
-            elif operation["action"] == "batch_delete":
-                for inverse_id, data in operation["inverses"].items():
-                    inverse = self.file.by_id(inverse_id)
-                    for index, value in data:
-                        inverse[index] = self.unserialise_value(inverse, value)
+            elif action == self.DELETE:
+                self.recreate(self.ids[i], payload[0], payload[1])
+                self.restore_inverses(payload[2])
+            elif action == self.BATCH_DELETE:
+                self.restore_inverses(payload)
 
     def commit(self) -> None:
-        for operation in self.operations:
-            if operation["action"] == "create":
-                e = self.file.create_entity(operation["value"]["type"], id=operation["value"]["id"])
-                for k, v in operation["value"].items():
-                    try:
-                        setattr(e, k, self.unserialise_value(e, v))
-                    except:
-                        # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
-                        pass
-            elif operation["action"] == "edit":
-                element = self.file.by_id(operation["id"])
-                element[operation["index"]] = self.unserialise_value(element, operation["new"])
-            elif operation["action"] == "delete":
-                element = self.file.by_id(operation["value"]["id"])
-                self.file.remove(element)
-            elif operation["action"] == "batch_delete":
-                pass
+        for i in range(len(self.actions)):
+            action = self.actions[i]
+            payload = self.payloads[i]
+            if action == self.CREATE:
+                self.recreate(self.ids[i], payload[0], payload[1])
+            elif action == self.EDIT:
+                element = self.file.by_id(self.ids[i])
+                element[self.indices[i]] = self.unserialise_value(element, payload[1])
+            elif action == self.DELETE:
+                self.file.remove(self.file.by_id(self.ids[i]))
 
 
 file_dict = {}
@@ -197,6 +337,7 @@ class file:
     """
 
     wrapped_data: ifcopenshell_wrapper.file
+    history_memory_limit: Optional[int] = None
 
     def __init__(
         self,
@@ -285,18 +426,41 @@ class file:
 
     def set_history_size(self, size: int) -> None:
         self.history_size = size
+        self.trim_history()
+
+    def set_history_memory_limit(self, limit: Optional[int]) -> None:
+        """Limits the estimated memory used by the undo history
+
+        When the limit is exceeded, the oldest transactions are discarded. A
+        single transaction which exceeds the limit stops being journaled and
+        cannot be undone, nor can any transaction before it.
+
+        :param limit: The limit in bytes, or None for no limit.
+        """
+        self.history_memory_limit = limit
+        self.trim_history()
+
+    def trim_history(self) -> None:
         while len(self.history) > self.history_size:
             self.history.pop(0)
+        if self.history_memory_limit is not None:
+            total = sum(t.get_memory_usage() for t in self.history)
+            while self.history and total > self.history_memory_limit:
+                total -= self.history.pop(0).get_memory_usage()
 
     def begin_transaction(self) -> None:
         if self.history_size:
-            self.transaction = Transaction(self)
+            self.transaction = Transaction(self, memory_limit=self.history_memory_limit)
 
     def end_transaction(self) -> None:
         if self.transaction:
-            self.history.append(self.transaction)
-            if len(self.history) > self.history_size:
-                self.history.pop(0)
+            if self.transaction.is_overflowed:
+                # Changes which weren't journaled can't be undone, so neither
+                # can anything which happened before them.
+                self.history = []
+            else:
+                self.history.append(self.transaction)
+                self.trim_history()
             self.future = []
             self.transaction = None
 
@@ -0,0 +1,381 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2024 Thomas Krijnen <thomas@aecgeeks.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent, content addressed cache of tessellated geometry
+
+Tessellating the same representations again and again is the most expensive
+part of many tools. This module caches triangulated iterator output on disk,
+keyed by a hash of everything that determines an element's geometry: its
+representation subgraph, placement, openings, materials, styles and the
+geometry settings. Since the key is derived from content rather than STEP ids
+or GlobalIds, a cache may be shared between revisions of a model and between
+different tools, and only new or edited representations are tessellated.
+
+Example:
+
+.. code:: python
+
+    settings = ifcopenshell.geom.settings()
+    cache = ifcopenshell.geom.cache.geometry_cache("/path/to/cache")
+    for shape in ifcopenshell.geom.cache.cached_iterator(settings, model, cache):
+        print(shape.guid, len(shape.geometry.verts))
+"""
+
+from __future__ import annotations
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+import ifcopenshell
+import ifcopenshell.util.element
+from typing import Optional, Union, Generator
+from .. import ifcopenshell_wrapper
+from ..file import file
+from ..entity_instance import entity_instance
+from .main import iterator, settings as geom_settings, GEOMETRY_LIBRARY
+
+CACHE_VERSION = "1"
+
+
+class CachedColour:
+    def __init__(self, components: tuple[float, float, float]):
+        self.components = tuple(components)
+
+    def r(self) -> float:
+        return self.components[0]
+
+    def g(self) -> float:
+        return self.components[1]
+
+    def b(self) -> float:
+        return self.components[2]
+
+
+class CachedStyle:
+    """A simplified stand-in for an iterator material style"""
+
+    def __init__(self, data: dict):
+        self.name = data["name"]
+        self.id = data["instance_id"]
+        self.diffuse = CachedColour(data["diffuse"]) if data["diffuse"] else None
+        self.specular = CachedColour(data["specular"]) if data["specular"] else None
+        self.specularity = data["specularity"]
+        self.transparency = data["transparency"]
+
+    def instance_id(self) -> int:
+        return self.id
+
+    def has_transparency(self) -> bool:
+        return self.transparency == self.transparency  # i.e. not NaN
+
+
+class CachedTriangulation:
+    """A stand-in for ``ifcopenshell_wrapper.Triangulation`` loaded from the cache
+
+    Buffers are exposed both as NumPy arrays and, like the wrapper, as tuples
+    and bytes.
+    """
+
+    def __init__(self, id: str, arrays: dict[str, np.ndarray], materials: list[CachedStyle]):
+        self.id = id
+        self.arrays = arrays
+        self.materials = materials
+
+    def __getattr__(self, name: str):
+        if name.endswith("_buffer"):
+            return self.arrays[name[: -len("_buffer")]].tobytes()
+        elif name in ("verts", "faces", "edges", "normals", "material_ids", "item_ids"):
+            return tuple(self.arrays[name].tolist())
+        raise AttributeError(name)
+
+
+class CachedTransformation:
+    def __init__(self, matrix: tuple[float, ...]):
+        self.matrix = matrix
+
+
+class CachedTriangulationElement:
+    """A stand-in for ``ifcopenshell_wrapper.TriangulationElement`` loaded from the cache"""
+
+    def __init__(self, element: entity_instance, data: dict, geometry: CachedTriangulation):
+        self.id = element.id()
+        self.guid = getattr(element, "GlobalId", "")
+        self.name = getattr(element, "Name", None) or ""
+        self.type = element.is_a()
+        self.parent_id = data["parent_id"]
+        self.context = data["context"]
+        self.unique_id = data["unique_id"]
+        self.transformation = CachedTransformation(tuple(data["matrix"]))
+        self.geometry = geometry
+
+
+class geometry_cache:
+    """A directory of cached triangulations, addressed by content hash
+
+    Each entry is stored as a NumPy ``.npz`` file at
+    ``<path>/<first two characters of the key>/<key>.npz``. Entries are
+    written atomically, so a cache may be shared by concurrent processes.
+    """
+
+    ARRAYS = {
+        "verts": np.float64,
+        "faces": np.int32,
+        "edges": np.int32,
+        "normals": np.float64,
+        "material_ids": np.int32,
+        "item_ids": np.int32,
+    }
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = os.fspath(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + ".npz")
+
+    def has(self, key: str) -> bool:
+        return os.path.isfile(self.get_path(key))
+
+    def load(self, key: str, element: entity_instance) -> Optional[Union[CachedTriangulationElement, bool]]:
+        """Loads a cached shape for an element
+
+        :return: The cached shape, False if the element is cached as producing
+            no shape, or None if the key is not cached.
+        """
+        try:
+            with np.load(self.get_path(key), allow_pickle=False) as data:
+                metadata = json.loads(str(data["metadata"]))
+                if metadata.get("empty"):
+                    return False
+                arrays = {name: data[name] for name in self.ARRAYS}
+        except (OSError, KeyError, ValueError):
+            return None
+        materials = [CachedStyle(m) for m in metadata["materials"]]
+        geometry = CachedTriangulation(metadata["geometry_id"], arrays, materials)
+        return CachedTriangulationElement(element, metadata, geometry)
+
+    def save(self, key: str, shape: ifcopenshell_wrapper.TriangulationElement) -> None:
+        geometry = shape.geometry
+        arrays = {
+            name: np.frombuffer(getattr(geometry, f"{name}_buffer"), dtype=dtype) for name, dtype in self.ARRAYS.items()
+        }
+        metadata = {
+            "geometry_id": geometry.id,
+            "parent_id": shape.parent_id,
+            "context": shape.context,
+            "unique_id": shape.unique_id,
+            "matrix": list(shape.transformation.matrix),
+            "materials": [self.serialise_style(m) for m in geometry.materials],
+        }
+        self.write(key, metadata, arrays)
+
+    def save_empty(self, key: str) -> None:
+        """Records that an element with this key produces no shape"""
+        self.write(key, {"empty": True}, {})
+
+    def write(self, key: str, metadata: dict, arrays: dict[str, np.ndarray]) -> None:
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, metadata=np.array(json.dumps(metadata)), **arrays)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def serialise_style(self, style) -> dict:
+        def colour(c):
+            return [c.r(), c.g(), c.b()] if c is not None else None
+
+        return {
+            "name": style.name,
+            "instance_id": style.instance_id(),
+            "diffuse": colour(style.diffuse),
+            "specular": colour(style.specular),
+            "specularity": style.specularity,
+            "transparency": style.transparency,
+        }
+
+
+class representation_hasher:
+    """Computes content hashes of the geometry defining subgraph of products
+
+    Instances are hashed bottom up (a Merkle hash), so that the hash of an
+    instance depends on the content of everything it references but not on
+    STEP ids. Hashes are memoised, so shared subgraphs such as representation
+    maps and placements of parent elements are only hashed once per file.
+    """
+
+    def __init__(self, ifc_file: file, settings: geom_settings, geometry_library: GEOMETRY_LIBRARY = "opencascade"):
+        self.file = ifc_file
+        self.memo: dict[int, bytes] = {}
+        prefix = hashlib.blake2b(digest_size=16)
+        for value in (CACHE_VERSION, ifcopenshell.version, geometry_library, repr(settings)):
+            prefix.update(str(value).encode("utf-8"))
+            prefix.update(b"\0")
+        self.prefix = prefix.digest()
+        self.styles: dict[int, list] = {}
+        for styled_item in ifc_file.by_type("IfcStyledItem"):
+            if styled_item.Item:
+                self.styles.setdefault(styled_item.Item.id(), []).append(styled_item.wrapped_data)
+
+    def hash_instance(self, inst: ifcopenshell_wrapper.entity_instance) -> bytes:
+        result = self.memo.get(inst.id(), None)
+        if result is not None:
+            return result
+        h = hashlib.blake2b(digest_size=16)
+        h.update(inst.is_a().encode("ascii"))
+        self.hash_arguments(h, inst)
+        # Styles reference the item they style, so are mixed into the item
+        # rather than traversed as a subgraph.
+        for styled_item in self.styles.get(inst.id(), ()):
+            h.update(b"S")
+            self.hash_arguments(h, styled_item, exclude="Item")
+        result = self.memo[inst.id()] = h.digest()
+        return result
+
+    def hash_arguments(self, h, inst: ifcopenshell_wrapper.entity_instance, exclude: Optional[str] = None) -> None:
+        for i in range(len(inst)):
+            if exclude and inst.get_argument_name(i) == exclude:
+                continue
+            self.hash_value(h, inst.get_argument(i))
+            h.update(b",")
+
+    def hash_value(self, h, value) -> None:
+        if isinstance(value, tuple):
+            h.update(b"(")
+            for v in value:
+                self.hash_value(h, v)
+                h.update(b",")
+            h.update(b")")
+        elif isinstance(value, ifcopenshell_wrapper.entity_instance):
+            if value.id():
+                h.update(self.hash_instance(value))
+            else:
+                h.update(value.is_a().encode("ascii"))
+                self.hash_value(h, value.get_argument(0))
+        else:
+            h.update(repr(value).encode("utf-8"))
+
+    def hash_entity(self, h, inst: Optional[entity_instance]) -> None:
+        h.update(self.hash_instance(inst.wrapped_data) if inst is not None else b"$")
+
+    def get_product_key(self, product: entity_instance) -> str:
+        """Returns the cache key of a product
+
+        The key covers the product's representation, placement, openings and
+        materials (including their styles), as well as the geometry settings.
+        """
+        h = hashlib.blake2b(self.prefix, digest_size=20)
+        h.update(product.is_a().encode("ascii"))
+        h.update(b"R")
+        self.hash_entity(h, product.Representation)
+        h.update(b"P")
+        self.hash_entity(h, product.ObjectPlacement)
+        openings = []
+        for rel in getattr(product, "HasOpenings", ()):
+            opening = rel.RelatedOpeningElement
+            opening_hash = hashlib.blake2b(digest_size=16)
+            self.hash_entity(opening_hash, opening.Representation)
+            self.hash_entity(opening_hash, opening.ObjectPlacement)
+            openings.append(opening_hash.digest())
+        h.update(b"O")
+        for opening_hash in sorted(openings):
+            h.update(opening_hash)
+        h.update(b"M")
+        material = ifcopenshell.util.element.get_material(product, should_skip_usage=False)
+        if material:
+            self.hash_entity(h, material)
+            for m in ifcopenshell.util.element.get_materials(product):
+                for definition in getattr(m, "HasRepresentation", None) or ():
+                    self.hash_entity(h, definition)
+        return h.hexdigest()
+
+
+class cached_iterator:
+    """Iterates over triangulated shapes, reusing shapes from a geometry cache
+
+    Cached shapes are yielded first as :class:`CachedTriangulationElement`
+    objects, which mirror the attributes of the wrapper's triangulation
+    elements. The remaining products are then processed by a regular
+    :class:`ifcopenshell.geom.iterator` and stored in the cache.
+
+    Only triangulated output is cached. Other output, such as breps or Python
+    OpenCASCADE shapes, is passed through uncached.
+    """
+
+    def __init__(
+        self,
+        settings: geom_settings,
+        ifc_file: file,
+        cache: geometry_cache,
+        num_threads: int = 1,
+        include: Optional[list[entity_instance]] = None,
+        exclude: Optional[list[entity_instance]] = None,
+        geometry_library: GEOMETRY_LIBRARY = "opencascade",
+    ):
+        self.settings = settings
+        self.file = ifc_file
+        self.cache = cache
+        self.num_threads = num_threads
+        self.include = include
+        self.exclude = exclude
+        self.geometry_library = geometry_library
+        self.hasher = representation_hasher(ifc_file, settings, geometry_library)
+        self.total_cached = 0
+        self.total_processed = 0
+
+    def get_products(self) -> list[entity_instance]:
+        if self.include is not None:
+            products = self.include
+        else:
+            products = [p for p in self.file.by_type("IfcProduct") if p.Representation]
+        if self.exclude is not None:
+            exclude = set(self.exclude)
+            products = [p for p in products if p not in exclude]
+        return products
+
+    def __iter__(self) -> Generator[Union[CachedTriangulationElement, ifcopenshell_wrapper.TriangulationElement]]:
+        keys = {}
+        misses = []
+        for product in self.get_products():
+            key = keys[product.id()] = self.hasher.get_product_key(product)
+            shape = self.cache.load(key, product) if self.cache.has(key) else None
+            if shape is None:
+                misses.append(product)
+            elif shape:
+                self.total_cached += 1
+                yield shape
+        if not misses:
+            return
+        processed = set()
+        it = iterator(
+            self.settings, self.file, self.num_threads, include=misses, geometry_library=self.geometry_library
+        )
+        for shape in it:
+            if isinstance(shape, ifcopenshell_wrapper.TriangulationElement) and shape.id in keys:
+                self.cache.save(keys[shape.id], shape)
+            processed.add(shape.id)
+            self.total_processed += 1
+            yield shape
+        for product in misses:
+            if product.id() not in processed:
+                self.cache.save_empty(keys[product.id()])
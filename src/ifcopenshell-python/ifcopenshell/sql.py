@@ -1,7 +1,9 @@
 try:
     import re
     import json
+    from collections import OrderedDict
 
+    import ifcopenshell
     from .file import file
     from . import ifcopenshell_wrapper
     from .entity_instance import entity_instance
@@ -10,7 +12,21 @@ except ImportError as e:
 
 
 class sqlite(file):
-    def __init__(self, filepath):
+    # SQLite builds before 3.32 limit a statement to 999 variables
+    batch_size = 999
+
+    def __init__(self, filepath, cache_size=100000):
+        """Opens an IFC SQLite database created by the Ifc2Sql patch recipe
+
+        Entities are loaded lazily. Only the classes of requested IDs are
+        looked up, and attribute values are loaded when first accessed or when
+        explicitly prefetched using :meth:`prefetch`.
+
+        :param filepath: The path to the SQLite database.
+        :param cache_size: The maximum number of entities, and separately
+            the maximum number of entity classes, kept in memory. Least
+            recently used entries are evicted beyond this size.
+        """
         import sqlite3
 
         self.wrapped_data = None
@@ -41,20 +57,24 @@ class sqlite(file):
         except:
             assert False, "SQLite schema not supported."
 
-        self.schema = row[1]
+        self.schema_name = row[1]
         self.ifc_schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(self.schema)
 
-        self.cursor.execute("SELECT ifc_id, ifc_class FROM id_map")
-        self.id_map = {}
-        self.class_map = {}
-        self.entity_cache = {}
-        for row in self.cursor.fetchall():
-            self.id_map[row[0]] = row[1]
-            self.class_map.setdefault(row[1], []).append(row[0])
+        self.cache_size = cache_size
+        self.id_map = OrderedDict()
+        self.entity_cache = OrderedDict()
 
         self.preprocess_schema()
 
+    @property
+    def schema(self):
+        return self.schema_name
+
+    def __del__(self):
+        pass
+
     def preprocess_schema(self):
+        import ifcopenshell.util.attribute
         import ifcopenshell.util.schema
 
         self.ifc_class_subtypes = {}
@@ -62,6 +82,7 @@ class sqlite(file):
         self.ifc_class_inverse_attributes = {}
         self.ifc_class_references = {}
         self.ifc_class_inverses = {}
+        self.ifc_class_primitives = {}
 
         for declaration in self.ifc_schema.entities():
             # print('Dealing with declaration', declaration.name())
@@ -74,8 +95,10 @@ class sqlite(file):
 
             entity = []
             entity_list = []
+            primitives = self.ifc_class_primitives[declaration.name()] = {}
             for attribute in declaration.all_attributes():
                 primitive = ifcopenshell.util.attribute.get_primitive_type(attribute)
+                primitives[attribute.name()] = primitive
                 if primitive == "entity":
                     entity.append(attribute.name())
 
@@ -100,7 +123,7 @@ class sqlite(file):
             self.ifc_class_references[declaration.name()] = {"entity": entity, "entity_list": entity_list}
 
     def clear_cache(self):
-        self.entity_cache = {}
+        self.entity_cache = OrderedDict()
 
     def create_entity(self, type, *args, **kawrgs):
         assert False
@@ -108,39 +131,102 @@ class sqlite(file):
     def by_id(self, id):
         entity = self.entity_cache.get(id, None)
         if entity:
+            self.entity_cache.move_to_end(id)
             return entity
-        ifc_class = self.id_map.get(id, None)
+        ifc_class = self.get_classes([id]).get(id, None)
         if ifc_class:
-            entity = sqlite_entity(id, ifc_class, self)
-            self.entity_cache[id] = entity
-            return entity
-        self.cursor.execute("SELECT ifc_id, ifc_class FROM id_map LIMIT 1")
-        row = self.cursor.fetchone()
-        if row:
-            self.id_map[row[0]] = row[1]
-            entity = sqlite_entity(id, ifc_class, self)
-            self.entity_cache[id] = entity
-            return entity
+            return self.cache_entity(sqlite_entity(id, ifc_class, self))
+
+    def cache_entity(self, entity):
+        self.entity_cache[entity.sqlite_wrapper.id] = entity
+        if len(self.entity_cache) > self.cache_size:
+            self.entity_cache.popitem(last=False)
+        return entity
+
+    def get_classes(self, ids):
+        """Gets the class of each ID, querying unknown IDs in batches
+
+        :param ids: An iterable of STEP IDs.
+        :return: A dictionary of STEP IDs to class names. IDs that do not
+            exist are omitted.
+        """
+        ids = list(ids)
+        classes = {}
+        unknown = []
+        for i in set(ids):
+            ifc_class = self.id_map.get(i, None)
+            if ifc_class is None:
+                unknown.append(i)
+            else:
+                self.id_map.move_to_end(i)
+                classes[i] = ifc_class
+        for i in range(0, len(unknown), self.batch_size):
+            batch = unknown[i : i + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            self.cursor.execute(f"SELECT ifc_id, ifc_class FROM id_map WHERE ifc_id IN ({placeholders})", batch)
+            for ifc_id, ifc_class in self.cursor.fetchall():
+                classes[ifc_id] = self.cache_class(ifc_id, ifc_class)
+        return {i: classes[i] for i in ids if i in classes}
+
+    def cache_class(self, id, ifc_class):
+        self.id_map[id] = ifc_class
+        if len(self.id_map) > self.cache_size:
+            self.id_map.popitem(last=False)
+        return ifc_class
 
     def by_type(self, type, include_subtypes=True):
-        # TODO use cached subtypes
-        import ifcopenshell.util.schema
+        subtypes = self.ifc_class_subtypes[type] if include_subtypes else self.ifc_class_subtypes[type][0:1]
+        names = [st.name() for st in subtypes]
+        self.cursor.execute(
+            f"SELECT ifc_id, ifc_class FROM id_map WHERE ifc_class IN ({','.join('?' * len(names))})", names
+        )
+        results = []
+        for ifc_id, ifc_class in self.cursor.fetchall():
+            self.cache_class(ifc_id, ifc_class)
+            results.append(self.by_id(ifc_id))
+        return results
 
-        if self.class_map:
-            results = []
-            subtypes = self.ifc_class_subtypes[type] if include_subtypes else self.ifc_class_subtypes[type][0:1]
-            for subtype in subtypes:
-                results.extend([self.by_id(i) for i in self.class_map.get(subtype.name(), [])])
-            return results
-        if include_subtypes:
-            declaration = self.ifc_schema.declaration_by_name(type)
-            subtypes = ",".join([f"'{st.name()}'" for st in ifcopenshell.util.schema.get_subtypes(declaration)])
-            self.cursor.execute(f"SELECT ifc_id, ifc_class FROM id_map WHERE ifc_class IN ({subtypes})")
-            rows = self.cursor.fetchall()
-            return [self.by_id(r[0]) for r in rows]
-        self.cursor.execute(f"SELECT ifc_id FROM id_map WHERE ifc_class='{type}'")
-        rows = self.cursor.fetchall()
-        return [self.by_id(r[0]) for r in rows]
+    def prefetch(self, entities, attributes=None):
+        """Loads the attributes of many entities using one query per class
+
+        Accessing attributes one entity at a time issues one query per entity.
+        When you know up front which entities you need (e.g. all walls to show
+        in a table), prefetching them is much faster.
+
+        :param entities: A list of entities or STEP IDs.
+        :param attributes: The names of the attributes to load. Attributes not
+            belonging to a class are ignored. If None, all forward attributes
+            are loaded.
+        :return: The prefetched entities, in the same order.
+        """
+        entities = [self.by_id(e) if isinstance(e, int) else e for e in entities]
+        by_class = {}
+        for entity in entities:
+            if entity is not None:
+                by_class.setdefault(entity.sqlite_wrapper.ifc_class, {})[entity.sqlite_wrapper.id] = entity
+        for ifc_class, class_entities in by_class.items():
+            names = list(self.ifc_class_attributes[ifc_class].keys())
+            if attributes is not None:
+                names = [n for n in names if n in attributes]
+                if not names:
+                    continue
+            columns = ",".join(["ifc_id"] + [f"`{n}`" for n in names])
+            ids = list(class_entities.keys())
+            for i in range(0, len(ids), self.batch_size):
+                batch = ids[i : i + self.batch_size]
+                placeholders = ",".join("?" * len(batch))
+                self.cursor.execute(f"SELECT {columns} FROM {ifc_class} WHERE ifc_id IN ({placeholders})", batch)
+                rows = self.cursor.fetchall()
+                references = [
+                    row[n]
+                    for row in rows
+                    for n in self.ifc_class_references[ifc_class]["entity"]
+                    if n in names and isinstance(row[n], int)
+                ]
+                self.get_classes(references)
+                for row in rows:
+                    class_entities[row["ifc_id"]].sqlite_wrapper.load_attributes(row, names)
+        return entities
 
     def traverse(self, inst, max_levels=None, breadth_first=False):
         results = [inst]
@@ -171,14 +257,9 @@ class sqlite(file):
         return results
 
     def get_inverse(self, inst, allow_duplicate=False, with_attribute_indices=False):
-        query = (
-            f"SELECT inverses FROM {inst.sqlite_wrapper.ifc_class} WHERE `ifc_id` = {inst.sqlite_wrapper.id} LIMIT 1"
-        )
-        self.cursor.execute(query)
-        row = self.cursor.fetchone()
-        if not row or not row[0]:
-            return set()
-        return {self.by_id(e) for e in json.loads(row[0])}
+        inverse_ids = inst.sqlite_wrapper.get_inverse_ids()
+        self.get_classes(inverse_ids)
+        return {self.by_id(e) for e in inverse_ids}
 
     def is_entity_list(self, attribute):
         attribute = str(attribute.type_of_attribute())
@@ -189,31 +270,49 @@ class sqlite(file):
             return True
         return False
 
-    def get_geometry(self, ids: list[int]) -> dict[str, dict]:
+    def get_geometry(self, ids: list[int], as_arrays: bool = False) -> dict[str, dict]:
+        """Gets the shapes and geometry of elements
+
+        :param ids: The STEP IDs of the elements.
+        :param as_arrays: If True, verts, edges, faces, and material IDs are
+            returned as read-only NumPy arrays viewing the database blobs
+            directly, instead of being copied into lists. This is much faster
+            for large meshes, e.g. when passing them on to a viewer.
+        :return: A dictionary with a "shapes" dictionary of element IDs to
+            their placement and geometry ID, and a "geometry" dictionary of
+            geometry IDs to their mesh data.
+        """
         import numpy as np
 
-        ids_csv = ",".join(map(str, ids))
-        query = f"SELECT ifc_id, x, y, z, matrix, geometry, verts, edges, faces, material_ids, materials FROM shape LEFT JOIN geometry ON shape.geometry = geometry.id WHERE `ifc_id` IN ({ids_csv})"
-        self.cursor.execute(query)
-        rows = self.cursor.fetchall()
+        def to_buffer(blob, dtype):
+            if not blob:
+                return np.empty(0, dtype=dtype) if as_arrays else []
+            array = np.frombuffer(blob, dtype=dtype)
+            return array if as_arrays else array.tolist()
+
         shapes = {}
         geometry = {}
-        for row in rows:
-            if row["geometry"] and row["geometry"] not in geometry:
-                geometry[row["geometry"]] = {
-                    "verts": np.frombuffer(row["verts"]).tolist() if row["verts"] else [],
-                    "edges": np.frombuffer(row["edges"], dtype=np.int64).tolist() if row["edges"] else [],
-                    "faces": np.frombuffer(row["faces"], dtype=np.int64).tolist() if row["faces"] else [],
-                    "material_ids": (
-                        np.frombuffer(row["material_ids"], dtype=np.int64).tolist() if row["material_ids"] else []
-                    ),
-                    "materials": json.loads(row["materials"]) if row["materials"] else [],
+        ids = list(ids)
+        for i in range(0, len(ids), self.batch_size):
+            batch = ids[i : i + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            query = f"SELECT ifc_id, x, y, z, matrix, geometry, verts, edges, faces, material_ids, materials FROM shape LEFT JOIN geometry ON shape.geometry = geometry.id WHERE `ifc_id` IN ({placeholders})"
+            self.cursor.execute(query, batch)
+            for row in self.cursor.fetchall():
+                if row["geometry"] and row["geometry"] not in geometry:
+                    geometry[row["geometry"]] = {
+                        "verts": to_buffer(row["verts"], np.float64),
+                        "edges": to_buffer(row["edges"], np.int64),
+                        "faces": to_buffer(row["faces"], np.int64),
+                        "material_ids": to_buffer(row["material_ids"], np.int64),
+                        "materials": json.loads(row["materials"]) if row["materials"] else [],
+                    }
+                matrix = np.frombuffer(row["matrix"]).reshape((4, 4))
+                shapes[row["ifc_id"]] = {
+                    "co": [row["x"], row["y"], row["z"]],
+                    "matrix": matrix if as_arrays else np.copy(matrix),
+                    "geometry": row["geometry"],
                 }
-            shapes[row["ifc_id"]] = {
-                "co": [row["x"], row["y"], row["z"]],
-                "matrix": np.copy(np.frombuffer(row["matrix"]).reshape((4, 4))),
-                "geometry": row["geometry"],
-            }
         ids_without_geometry = set(ids) - set(shapes.keys())
         for id in ids_without_geometry:
             shapes[id] = {
@@ -257,36 +356,8 @@ class sqlite_entity(entity_instance):
         INVALID, FORWARD, INVERSE = range(3)
         attr_cat = self.wrapped_data.get_attribute_category(name)
         if attr_cat == FORWARD:
-            if self.sqlite_wrapper.attribute_cache:
-                # print(self.sqlite_wrapper.ifc_class)
-                # print(self.sqlite_wrapper.attribute_cache)
-                return self.sqlite_wrapper.attribute_cache[name]
-
-            # print('first time for', self.sqlite_wrapper.ifc_class)
-
-            # print("IT IS A FORWARD")
-            query = f"SELECT * FROM {self.sqlite_wrapper.ifc_class} WHERE `ifc_id` = {self.sqlite_wrapper.id} LIMIT 1"
-            self.sqlite_wrapper.file.cursor.execute(query)
-            row = self.sqlite_wrapper.file.cursor.fetchone()
-
-            for attribute in self.sqlite_wrapper.attributes.values():
-                # attribute = self.sqlite_wrapper.attributes[name]
-                aname = attribute.name()
-                primitive = ifcopenshell.util.attribute.get_primitive_type(attribute)
-
-                if not row or row[aname] is None:
-                    self.sqlite_wrapper.attribute_cache[aname] = None
-                elif primitive == "entity":
-                    self.sqlite_wrapper.attribute_cache[aname] = self.sqlite_wrapper.file.by_id(row[aname])
-                elif isinstance(primitive, tuple):
-                    if isinstance(row[aname], int):
-                        self.sqlite_wrapper.attribute_cache[aname] = self.sqlite_wrapper.file.by_id(row[aname])
-                    else:
-                        self.sqlite_wrapper.attribute_cache[aname] = self.unserialise_value(json.loads(row[aname]))
-                else:
-                    self.sqlite_wrapper.attribute_cache[aname] = row[aname]
-                if isinstance(self.sqlite_wrapper.attribute_cache[aname], list):
-                    self.sqlite_wrapper.attribute_cache[aname] = tuple(self.sqlite_wrapper.attribute_cache[aname])
+            if name not in self.sqlite_wrapper.attribute_cache:
+                self.sqlite_wrapper.load_attributes()
             return self.sqlite_wrapper.attribute_cache[name]
         elif attr_cat == INVERSE:
             if self.sqlite_wrapper.inverse_attribute_cache:
@@ -296,10 +367,8 @@ class sqlite_entity(entity_instance):
 
             results = []
 
-            query = f"SELECT inverses FROM {self.sqlite_wrapper.ifc_class} WHERE `ifc_id` = {self.sqlite_wrapper.id} LIMIT 1"
-            self.sqlite_wrapper.file.cursor.execute(query)
-            row = self.sqlite_wrapper.file.cursor.fetchone()
-            if not row or not row[0]:
+            element_ids = self.sqlite_wrapper.get_inverse_ids()
+            if not element_ids:
                 self.sqlite_wrapper.inverse_attribute_cache[name] = tuple()
                 return self.sqlite_wrapper.inverse_attribute_cache[name]
 
@@ -309,10 +378,9 @@ class sqlite_entity(entity_instance):
             forward_name = attribute.attribute_reference().name()
 
             subtypes = [st.name() for st in ifcopenshell.util.schema.get_subtypes(declaration)]
-            element_ids = json.loads(row[0])
+            classes = self.sqlite_wrapper.file.get_classes(element_ids)
             for element_id in element_ids:
-                ifc_class = self.sqlite_wrapper.file.id_map[element_id]
-                if ifc_class in subtypes:
+                if classes.get(element_id) in subtypes:
                     potential_result = self.sqlite_wrapper.file.by_id(element_id)
                     forward_value = getattr(potential_result, forward_name, None)
                     if not forward_value:
@@ -331,17 +399,7 @@ class sqlite_entity(entity_instance):
         )
 
     def unserialise_value(self, value):
-        if isinstance(value, (tuple, list)):
-            for i, value2 in enumerate(value):
-                value[i] = self.unserialise_value(value2)
-            return value
-        elif isinstance(value, int):
-            return self.sqlite_wrapper.file.by_id(value)
-        elif isinstance(value, dict):
-            value2 = ifcopenshell.create_entity(value["type"])
-            value2[0] = value["value"]
-            return value2
-        return value
+        return self.sqlite_wrapper.unserialise_value(value)
 
     def __eq__(self, other):
         if not isinstance(self, type(other)):
@@ -358,9 +416,9 @@ class sqlite_entity(entity_instance):
 
     def get_info(self, include_identifier=True, recursive=False, return_type=dict, ignore=(), scalar_only=False):
         info = {"id": self.sqlite_wrapper.id, "type": self.sqlite_wrapper.ifc_class}
-        if not self.sqlite_wrapper.attribute_cache:
-            self.__getitem__(0)  # This will get all attributes
-        info.update(self.sqlite_wrapper.attribute_cache)
+        if len(self.sqlite_wrapper.attribute_cache) < len(self.sqlite_wrapper.attributes):
+            self.sqlite_wrapper.load_attributes()
+        info.update({name: self.sqlite_wrapper.attribute_cache[name] for name in self.sqlite_wrapper.attributes})
         return info
 
 
@@ -371,8 +429,54 @@ class sqlite_wrapper:
         self.file = file
         self.attributes = self.file.ifc_class_attributes[self.ifc_class]
         self.inverse_attributes = self.file.ifc_class_inverse_attributes[self.ifc_class]
+        self.primitives = self.file.ifc_class_primitives[self.ifc_class]
         self.attribute_cache = {}
         self.inverse_attribute_cache = {}
 
+    def load_attributes(self, row=None, names=None):
+        if row is None:
+            query = f"SELECT * FROM {self.ifc_class} WHERE `ifc_id` = {self.id} LIMIT 1"
+            self.file.cursor.execute(query)
+            row = self.file.cursor.fetchone()
+        if names is None:
+            names = self.attributes.keys()
+        for aname in names:
+            primitive = self.primitives[aname]
+            if not row or row[aname] is None:
+                value = None
+            elif primitive == "entity":
+                value = self.file.by_id(row[aname])
+            elif isinstance(primitive, tuple):
+                if isinstance(row[aname], int):
+                    value = self.file.by_id(row[aname])
+                else:
+                    value = self.unserialise_value(json.loads(row[aname]))
+            else:
+                value = row[aname]
+            if isinstance(value, list):
+                value = tuple(value)
+            self.attribute_cache[aname] = value
+
+    def unserialise_value(self, value):
+        if isinstance(value, (tuple, list)):
+            for i, value2 in enumerate(value):
+                value[i] = self.unserialise_value(value2)
+            return value
+        elif isinstance(value, int):
+            return self.file.by_id(value)
+        elif isinstance(value, dict):
+            value2 = ifcopenshell.create_entity(value["type"])
+            value2[0] = value["value"]
+            return value2
+        return value
+
+    def get_inverse_ids(self):
+        query = f"SELECT inverses FROM {self.ifc_class} WHERE `ifc_id` = {self.id} LIMIT 1"
+        self.file.cursor.execute(query)
+        row = self.file.cursor.fetchone()
+        if not row or not row[0]:
+            return []
+        return json.loads(row[0])
+
     def __repr__(self):
         return "todo"
@@ -1,12 +1,23 @@
 try:
+    import os
     import re
+    import mmap
+    import numpy as np
+    from collections import OrderedDict
 
     import ifcopenshell.util.schema
+    import ifcopenshell.util.attribute
     from .file import file
     from . import ifcopenshell_wrapper
     from .entity_instance import entity_instance
 
-    from lark import Lark, Transformer
+    try:
+        from lark import Lark, Transformer
+    except ImportError:
+        # Only the legacy line based stream depends on Lark, the indexed
+        # stream uses its own tokenizer.
+        Lark = None
+        Transformer = object
 
     class StreamTransformer(Transformer):
         def string(self, items):
@@ -62,7 +73,14 @@ try:
             return (int(items[0]), str(items[1]), items[2])
 
     class stream(file):
-        def __init__(self, filepath):
+        # Overrides the read-only property of ifcopenshell.file, as there is
+        # no wrapped C++ file to derive the schema from.
+        schema = None
+
+        def __init__(self, filepath, cache_size=100000):
+            if Lark is None:
+                raise ImportError("The line based stream requires lark, use indexed_stream instead")
+
             self.wrapped_data = None
             self.history_size = 64
             self.history = []
@@ -77,7 +95,8 @@ try:
             self.id_offset = {}
             self.schema = "IFC4"
             self.reference_pattern = re.compile(r"#(\d+)")
-            self.entity_cache = {}
+            self.cache_size = cache_size
+            self.entity_cache = OrderedDict()
             self.inverses = {}
 
             # common.INT doesn't support negative integers.
@@ -158,6 +177,9 @@ try:
 
             self.preprocess_schema()
 
+        def __del__(self):
+            pass
+
         def preprocess_schema(self):
             self.ifc_class_names = {}
             self.ifc_class_subtypes = {}
@@ -202,26 +224,50 @@ try:
                 self.ifc_class_references[declaration.name()] = {"entity": entity, "entity_list": entity_list}
 
         def clear_cache(self):
-            self.entity_cache = {}
+            self.entity_cache = OrderedDict()
 
         def create_entity(self, type, *args, **kawrgs):
             assert False
 
+        def get_class(self, id):
+            """Returns the upper case IFC class of an id, or None if it doesn't exist"""
+            return self.id_map.get(id, None)
+
+        def get_ids_by_class(self, ifc_class):
+            """Returns the ids of all instances of an upper case IFC class, excluding subtypes"""
+            return self.class_map.get(ifc_class, [])
+
+        def get_inverse_ids(self, id):
+            """Returns the ids of all instances referencing an id"""
+            return self.inverses.get(id, [])
+
+        def get_line(self, id):
+            """Returns the raw STEP record of an id"""
+            self.file.seek(self.id_offset[id])
+            return self.file.readline().strip()
+
+        def get_attributes(self, id):
+            """Returns the decoded forward attribute values of an id"""
+            return self.parser.parse(self.get_line(id))[2]
+
         def by_id(self, id):
             entity = self.entity_cache.get(id, None)
             if entity:
+                self.entity_cache.move_to_end(id)
                 return entity
-            ifc_class = self.id_map.get(id, None)
+            ifc_class = self.get_class(id)
             if ifc_class:
                 entity = stream_entity(id, self.ifc_class_names[ifc_class], self)
                 self.entity_cache[id] = entity
+                if len(self.entity_cache) > self.cache_size:
+                    self.entity_cache.popitem(last=False)
                 return entity
 
         def by_type(self, type, include_subtypes=True):
             results = []
             subtypes = self.ifc_class_subtypes[type] if include_subtypes else self.ifc_class_subtypes[type][0:1]
             for subtype in subtypes:
-                results.extend([self.by_id(i) for i in self.class_map.get(subtype.name().upper(), [])])
+                results.extend([self.by_id(int(i)) for i in self.get_ids_by_class(subtype.name().upper())])
             return results
 
         def traverse(self, inst, max_levels=None, breadth_first=False):
@@ -243,7 +289,7 @@ try:
             return results
 
         def get_inverse(self, inst, allow_duplicate=False, with_attribute_indices=False):
-            return {self.by_id(e) for e in self.inverses.get(inst.stream_wrapper.id, [])}
+            return {self.by_id(int(e)) for e in self.get_inverse_ids(inst.stream_wrapper.id)}
 
         def is_entity_list(self, attribute):
             attribute = str(attribute.type_of_attribute())
@@ -268,9 +314,7 @@ try:
             return self.stream_wrapper.id
 
         def __repr__(self):
-            offset = self.stream_wrapper.file.id_offset[self.stream_wrapper.id]
-            self.stream_wrapper.file.file.seek(offset)
-            return self.stream_wrapper.file.file.readline().strip()
+            return self.stream_wrapper.file.get_line(self.stream_wrapper.id)
 
         def __del__(self):
             pass
@@ -291,10 +335,7 @@ try:
                 if self.stream_wrapper.attribute_cache:
                     return self.stream_wrapper.attribute_cache[name]
 
-                offset = self.stream_wrapper.file.id_offset[self.stream_wrapper.id]
-                self.stream_wrapper.file.file.seek(offset)
-                line = self.stream_wrapper.file.file.readline()
-                attributes = self.stream_wrapper.file.parser.parse(line.strip())[2]
+                attributes = self.stream_wrapper.file.get_attributes(self.stream_wrapper.id)
 
                 for i, attribute in enumerate(self.stream_wrapper.attributes.values()):
                     self.stream_wrapper.attribute_cache[attribute.name()] = attributes[i]
@@ -307,8 +348,8 @@ try:
 
                 results = []
 
-                element_ids = self.stream_wrapper.file.inverses.get(self.stream_wrapper.id, [])
-                if not element_ids:
+                element_ids = self.stream_wrapper.file.get_inverse_ids(self.stream_wrapper.id)
+                if not len(element_ids):
                     self.stream_wrapper.inverse_attribute_cache[name] = tuple()
                     return self.stream_wrapper.inverse_attribute_cache[name]
 
@@ -319,7 +360,8 @@ try:
 
                 subtypes = [st.name() for st in ifcopenshell.util.schema.get_subtypes(declaration)]
                 for element_id in element_ids:
-                    ifc_class = self.stream_wrapper.file.ifc_class_names[self.stream_wrapper.file.id_map[element_id]]
+                    element_id = int(element_id)
+                    ifc_class = self.stream_wrapper.file.ifc_class_names[self.stream_wrapper.file.get_class(element_id)]
                     if ifc_class in subtypes:
                         potential_result = self.stream_wrapper.file.by_id(element_id)
                         forward_value = getattr(potential_result, forward_name, None)
@@ -371,6 +413,424 @@ try:
         def __repr__(self):
             return "todo"
 
+    # Matches either a complete string literal (so that its contents are
+    # skipped) or an instance name, optionally followed by the start of its
+    # entity record.
+    index_pattern = re.compile(rb"'(?:[^']|'')*'|#(\d+)\s*=\s*([A-Za-z0-9_]+)")
+    index_pattern_with_references = re.compile(rb"'(?:[^']|'')*'|#(\d+)(?:\s*=\s*([A-Za-z0-9_]+))?")
+
+    token_pattern = re.compile(
+        rb"""\s*(?:
+        (?P<string>'(?:[^']|'')*')
+        |(?P<reference>\#\d+)
+        |(?P<enum>\.[A-Za-z0-9_]+\.)
+        |(?P<binary>"[0-9A-Fa-f]*")
+        |(?P<real>[+-]?\d+\.\d*(?:[Ee][+-]?\d+)?)
+        |(?P<integer>[+-]?\d+)
+        |(?P<keyword>[A-Za-z_][A-Za-z0-9_]*)
+        |(?P<symbol>[$*(),;]))""",
+        re.X,
+    )
+
+    escape_pattern = re.compile(
+        r"\\X2\\((?:[0-9A-Fa-f]{4})*)\\X0\\|\\X4\\((?:[0-9A-Fa-f]{8})*)\\X0\\|\\X\\([0-9A-Fa-f]{2})|\\S\\(.)|\\\\"
+    )
+
+    def unescape(match):
+        if match.group(1) is not None:
+            return bytes.fromhex(match.group(1)).decode("utf-16-be")
+        elif match.group(2) is not None:
+            return bytes.fromhex(match.group(2)).decode("utf-32-be")
+        elif match.group(3) is not None:
+            return chr(int(match.group(3), 16))
+        elif match.group(4) is not None:
+            return chr(ord(match.group(4)) + 128)
+        return "\\"
+
+    def decode_string(token):
+        try:
+            value = token[1:-1].decode("utf-8")
+        except UnicodeDecodeError:
+            value = token[1:-1].decode("latin-1")
+        value = value.replace("''", "'")
+        if "\\" in value:
+            value = escape_pattern.sub(unescape, value)
+        return value
+
+    def tokenize_arguments(data, pos, get_reference, get_type):
+        """Decodes the argument list of a STEP entity record
+
+        :param data: A bytes-like buffer, such as a memory mapped file
+        :param pos: The offset of the opening parenthesis of the record
+        :param get_reference: Called with an integer id to resolve a reference
+        :param get_type: Called with a type name and value to resolve a typed
+            value, such as IFCLABEL('Foo')
+        :return: A tuple of the list of decoded arguments and the offset after
+            the closing parenthesis of the record
+        """
+        match = token_pattern.match
+        stack = []
+        current = None
+        keyword = None
+        while True:
+            m = match(data, pos)
+            if m is None:
+                raise ValueError(f"Unable to decode STEP data at offset {pos}")
+            pos = m.end()
+            kind = m.lastgroup
+            token = m.group(kind)
+            if kind == "symbol":
+                if token == b"(":
+                    stack.append((current, keyword))
+                    current = []
+                    keyword = None
+                elif token == b")":
+                    parent, typename = stack.pop()
+                    if not stack:
+                        return current, pos
+                    if typename is None:
+                        value = tuple(current)
+                    else:
+                        value = get_type(typename.decode("ascii"), current[0] if current else None)
+                    current = parent
+                    current.append(value)
+                elif token == b"$" or token == b"*":
+                    current.append(None)
+                elif token == b";":
+                    raise ValueError(f"Unexpected end of STEP record at offset {pos}")
+            elif kind == "keyword":
+                keyword = token
+            elif kind == "string":
+                current.append(decode_string(token))
+            elif kind == "reference":
+                current.append(get_reference(int(token[1:])))
+            elif kind == "real":
+                current.append(float(token))
+            elif kind == "integer":
+                current.append(int(token))
+            elif kind == "enum":
+                if token == b".T.":
+                    current.append(True)
+                elif token == b".F.":
+                    current.append(False)
+                elif token == b".U.":
+                    current.append("UNKNOWN")
+                else:
+                    current.append(token[1:-1].decode("ascii"))
+            elif kind == "binary":
+                current.append(token[1:-1].decode("ascii"))
+
+    def get_compact_array(values, dtypes=(np.uint8, np.uint16, np.uint32, np.uint64)):
+        """Converts an array of non-negative integers into the smallest unsigned dtype that fits"""
+        values = np.asarray(values)
+        maximum = int(values.max()) if len(values) else 0
+        for dtype in dtypes:
+            if maximum <= np.iinfo(dtype).max:
+                return values.astype(dtype, copy=False)
+        return values
+
+    class stream_index:
+        """A compact, array backed index of the entity records in an IFC-SPF file
+
+        Rather than Python dictionaries, ids, byte offsets and classes are
+        stored in NumPy arrays sorted by id. Lookups are done by binary search.
+        Inverse references are optionally stored in compressed sparse row form,
+        where the ids of the instances referencing ``inverse_keys[i]`` are
+        ``inverse_values[inverse_starts[i]:inverse_starts[i + 1]]``.
+
+        An index may be saved as a sidecar file next to the IFC file and loaded
+        again without rescanning the file, as long as the IFC file is unchanged.
+        """
+
+        VERSION = 1
+
+        def __init__(self):
+            self.schema = None
+            self.ids = np.zeros(0, dtype=np.uint32)
+            self.offsets = np.zeros(0, dtype=np.uint64)
+            self.classes = np.zeros(0, dtype=np.uint16)
+            self.class_names = []
+            self.inverse_keys = None
+            self.inverse_starts = None
+            self.inverse_values = None
+            self.source_size = 0
+            self.source_mtime = 0
+            self.class_order = None
+            self.class_starts = None
+
+        @property
+        def has_inverses(self):
+            return self.inverse_keys is not None
+
+        @classmethod
+        def build(cls, data, include_inverses=True):
+            """Scans an IFC-SPF buffer in a single pass and returns its index
+
+            :param data: A bytes-like buffer, typically a memory mapped file
+            :param include_inverses: Whether or not to also index which
+                instances reference each instance. This makes inverse
+                attributes available at the cost of more memory.
+            """
+            from array import array
+
+            self = cls()
+            header = re.search(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']*)'", data)
+            self.schema = header.group(1).decode("ascii").upper() if header else "IFC4"
+            data_section = re.search(rb"\bDATA\s*;", data)
+            start = data_section.end() if data_section else 0
+
+            ids = array("Q")
+            offsets = array("Q")
+            classes = array("H")
+            class_indices = {}
+            references_from = array("Q")
+            references_to = array("Q")
+
+            current_id = 0
+            pattern = index_pattern_with_references if include_inverses else index_pattern
+            for match in pattern.finditer(data, start):
+                step_id = match.group(1)
+                if step_id is None:
+                    continue  # A string literal
+                ifc_class = match.group(2)
+                if ifc_class is not None:
+                    current_id = int(step_id)
+                    ids.append(current_id)
+                    offsets.append(match.start())
+                    class_index = class_indices.get(ifc_class, None)
+                    if class_index is None:
+                        class_index = class_indices[ifc_class] = len(class_indices)
+                    classes.append(class_index)
+                else:
+                    references_from.append(current_id)
+                    references_to.append(int(step_id))
+
+            self.class_names = [name.decode("ascii").upper() for name in class_indices.keys()]
+            ids = np.frombuffer(ids, dtype=np.uint64) if ids else np.zeros(0, dtype=np.uint64)
+            offsets = np.frombuffer(offsets, dtype=np.uint64) if offsets else np.zeros(0, dtype=np.uint64)
+            classes = np.frombuffer(classes, dtype=np.uint16) if classes else np.zeros(0, dtype=np.uint16)
+
+            order = np.argsort(ids, kind="stable")
+            self.ids = get_compact_array(ids[order], dtypes=(np.uint32, np.uint64))
+            self.offsets = offsets[order]
+            self.classes = classes[order]
+
+            if include_inverses:
+                sources = np.frombuffer(references_from, dtype=np.uint64) if references_from else np.zeros(0, np.uint64)
+                targets = np.frombuffer(references_to, dtype=np.uint64) if references_to else np.zeros(0, np.uint64)
+                order = np.argsort(targets, kind="stable")
+                targets = targets[order]
+                self.inverse_keys, starts = np.unique(targets, return_index=True)
+                self.inverse_keys = get_compact_array(self.inverse_keys, dtypes=(np.uint32, np.uint64))
+                self.inverse_starts = np.append(starts, len(targets)).astype(np.uint64)
+                self.inverse_values = get_compact_array(sources[order], dtypes=(np.uint32, np.uint64))
+            return self
+
+        @classmethod
+        def load(cls, path, source=None):
+            """Loads a previously saved index
+
+            :param path: The filepath of the sidecar index
+            :param source: If provided, the filepath of the IFC file. If the IFC
+                file has changed since the index was saved, None is returned.
+            :return: The index, or None if it is missing or stale
+            """
+            if not os.path.isfile(path):
+                return None
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    if int(data["version"]) != cls.VERSION:
+                        return None
+                    self = cls()
+                    self.source_size = int(data["source_size"])
+                    self.source_mtime = int(data["source_mtime"])
+                    if source is not None:
+                        stat = os.stat(source)
+                        if stat.st_size != self.source_size or stat.st_mtime_ns != self.source_mtime:
+                            return None
+                    self.schema = str(data["schema"])
+                    self.ids = data["ids"]
+                    self.offsets = data["offsets"]
+                    self.classes = data["classes"]
+                    self.class_names = [str(name) for name in data["class_names"]]
+                    if "inverse_keys" in data.files:
+                        self.inverse_keys = data["inverse_keys"]
+                        self.inverse_starts = data["inverse_starts"]
+                        self.inverse_values = data["inverse_values"]
+                    return self
+            except (OSError, KeyError, ValueError):
+                return None
+
+        def save(self, path, source=None):
+            """Saves the index to a sidecar file
+
+            :param path: The filepath of the sidecar index
+            :param source: The filepath of the indexed IFC file, used to detect
+                when the index is stale.
+            """
+            if source is not None:
+                stat = os.stat(source)
+                self.source_size = stat.st_size
+                self.source_mtime = stat.st_mtime_ns
+            arrays = {
+                "version": np.array(self.VERSION),
+                "schema": np.array(self.schema),
+                "source_size": np.array(self.source_size, dtype=np.uint64),
+                "source_mtime": np.array(self.source_mtime, dtype=np.int64),
+                "ids": self.ids,
+                "offsets": self.offsets,
+                "classes": self.classes,
+                "class_names": np.array(self.class_names, dtype=str),
+            }
+            if self.has_inverses:
+                arrays["inverse_keys"] = self.inverse_keys
+                arrays["inverse_starts"] = self.inverse_starts
+                arrays["inverse_values"] = self.inverse_values
+            try:
+                with open(path, "wb") as f:
+                    np.savez(f, **arrays)
+            except OSError:
+                # Don't leave a partially written index behind
+                if os.path.isfile(path):
+                    os.remove(path)
+                raise
+
+        def get_position(self, id):
+            return self.search(self.ids, id)
+
+        def search(self, keys, id):
+            if id < 0 or id > np.iinfo(keys.dtype).max:
+                return None
+            # Cast to the array dtype, as otherwise NumPy casts the whole array
+            id = keys.dtype.type(id)
+            position = int(np.searchsorted(keys, id))
+            if position < len(keys) and keys[position] == id:
+                return position
+
+        def get_offset(self, id):
+            position = self.get_position(id)
+            if position is not None:
+                return int(self.offsets[position])
+
+        def get_class(self, id):
+            position = self.get_position(id)
+            if position is not None:
+                return self.class_names[self.classes[position]]
+
+        def get_ids_by_class(self, ifc_class):
+            try:
+                class_index = self.class_names.index(ifc_class)
+            except ValueError:
+                return self.ids[0:0]
+            if self.class_order is None:
+                self.class_order = np.argsort(self.classes, kind="stable")
+                self.class_starts = np.searchsorted(
+                    self.classes[self.class_order], np.arange(len(self.class_names) + 1)
+                )
+            start, end = self.class_starts[class_index], self.class_starts[class_index + 1]
+            return self.ids[self.class_order[start:end]]
+
+        def get_inverse_ids(self, id):
+            if not self.has_inverses:
+                raise ValueError("Inverses were not indexed")
+            position = self.search(self.inverse_keys, id)
+            if position is not None:
+                return self.inverse_values[self.inverse_starts[position] : self.inverse_starts[position + 1]]
+            return self.inverse_values[0:0]
+
+    class indexed_stream(stream):
+        """Random access to an IFC-SPF file without loading it into memory
+
+        The file is memory mapped and only a compact :class:`stream_index` of
+        the byte offset and class of each entity record is kept. Entity records
+        are decoded on demand when their attributes are accessed.
+
+        By default, the index is persisted as a sidecar file named
+        ``<filepath>.index.npz`` and is reused on subsequent opens as long as
+        the IFC file is unchanged.
+
+        Example:
+
+        .. code:: python
+
+            model = ifcopenshell.indexed_stream("/path/to/model.ifc")
+            for wall in model.by_type("IfcWall"):
+                print(wall.Name)
+        """
+
+        def __init__(self, filepath, index_path=None, include_inverses=True, persist_index=True, cache_size=100000):
+            """
+            :param filepath: The filepath of the IFC-SPF file
+            :param index_path: The filepath of the sidecar index. Defaults to
+                ``<filepath>.index.npz``.
+            :param include_inverses: Whether or not to index inverse references.
+                Inverse attributes and ``get_inverse`` require this.
+            :param persist_index: Whether or not to save a newly built index to
+                ``index_path``. If it can't be saved, such as in a read-only
+                directory, the index is only kept in memory.
+            :param cache_size: The maximum number of entities kept in memory.
+                Least recently used entities are evicted beyond this size.
+            """
+            self.wrapped_data = None
+            self.history_size = 64
+            self.history = []
+            self.future = []
+            self.transaction = None
+
+            self.filepath = str(filepath)
+            self.file = open(self.filepath, "rb")
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.reference_pattern = re.compile(r"#(\d+)")
+            self.cache_size = cache_size
+            self.entity_cache = OrderedDict()
+
+            self.index_path = str(index_path) if index_path else self.filepath + ".index.npz"
+            self.index = stream_index.load(self.index_path, self.filepath)
+            if self.index is None or (include_inverses and not self.index.has_inverses):
+                self.index = stream_index.build(self.data, include_inverses=include_inverses)
+                if persist_index:
+                    try:
+                        self.index.save(self.index_path, self.filepath)
+                    except OSError:
+                        pass
+
+            self.schema = self.index.schema
+            self.ifc_schema = ifcopenshell_wrapper.schema_by_name(self.schema)
+            self.preprocess_schema()
+
+        def close(self):
+            self.data.close()
+            self.file.close()
+
+        def get_class(self, id):
+            return self.index.get_class(id)
+
+        def get_ids_by_class(self, ifc_class):
+            return self.index.get_ids_by_class(ifc_class)
+
+        def get_inverse_ids(self, id):
+            return self.index.get_inverse_ids(id)
+
+        def get_line(self, id):
+            offset = self.index.get_offset(id)
+            _, end = self.decode(offset)
+            return self.data[offset:end].decode("utf-8", errors="replace") + ";"
+
+        def get_attributes(self, id):
+            return self.decode(self.index.get_offset(id))[0]
+
+        def decode(self, offset):
+            return tokenize_arguments(self.data, self.data.find(b"(", offset), self.by_id, self.create_type)
+
+        def create_type(self, type, value):
+            return ifcopenshell.create_entity(type, self.schema, value)
+
+        def __len__(self):
+            return len(self.index.ids)
+
+        def __iter__(self):
+            return (self.by_id(int(i)) for i in self.index.ids)
+
 except ImportError as e:
     import sys
 
@@ -16,12 +16,17 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy as np
+import numpy.typing as npt
 import ifcopenshell
 import ifcopenshell.guid
 import ifcopenshell.util.element
-from typing import Any, Callable, Optional, Union, Literal, overload
+from typing import Any, Callable, Iterable, Optional, Union, Literal, overload, TYPE_CHECKING
 from collections import namedtuple
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 MATERIAL_TYPE = Literal[
     "IfcMaterial",
@@ -194,6 +199,164 @@ def get_psets(
     return psets
 
 
+PSETS_TABLE_COLUMNS = ("element", "pset", "property", "value", "unit", "definition")
+
+
+def get_psets_table(
+    ifc_file: ifcopenshell.file,
+    elements: Optional[Iterable[ifcopenshell.entity_instance]] = None,
+    psets_only=False,
+    qtos_only=False,
+    should_inherit=True,
+    as_dataframe=False,
+) -> Union[dict[str, npt.NDArray], "pd.DataFrame"]:
+    """Retrieve the properties of many elements at once as a columnar table
+
+    This is equivalent to calling :func:`get_psets` for every element, but
+    relationships are traversed once for the whole file, each property
+    definition is only read once even if it is shared by many elements, and
+    type properties are resolved once per type rather than once per
+    occurrence.
+
+    The table has one row per element, property set and property, with the
+    following columns:
+
+    - ``element``: the ID of the element
+    - ``pset``: the name of the property set or quantity set
+    - ``property``: the name of the property or quantity
+    - ``value``: the value, as returned by :func:`get_psets`
+    - ``unit``: the ID of the property's unit entity, or 0 if it has no unit
+      and the project default unit applies
+    - ``definition``: the ID of the property set the value is from, which may
+      be the type's property set if it is inherited
+
+    :param ifc_file: The IFC file
+    :type ifc_file: ifcopenshell.file
+    :param elements: The elements to retrieve properties for. Defaults to all
+        objects and types in the file which have properties.
+    :type elements: Iterable[ifcopenshell.entity_instance], optional
+    :param psets_only: Default as False. Set to true if only property sets are needed.
+    :type psets_only: bool,optional
+    :param qtos_only: Default as False. Set to true if only quantities are needed.
+    :type qtos_only: bool,optional
+    :param should_inherit: Default as True. Set to false if you don't want to inherit property sets from the Type.
+    :type should_inherit: bool,optional
+    :param as_dataframe: Return a pandas DataFrame instead of a dictionary of
+        NumPy arrays. Requires pandas to be installed.
+    :type as_dataframe: bool,optional
+    :return: A dictionary of column names and NumPy arrays, or a DataFrame.
+    :rtype: Union[dict[str, np.ndarray], pd.DataFrame]
+
+    Example:
+
+    .. code:: python
+
+        table = ifcopenshell.util.element.get_psets_table(ifc_file, ifc_file.by_type("IfcWall"))
+        is_external = (table["pset"] == "Pset_WallCommon") & (table["property"] == "IsExternal")
+        print(table["element"][is_external], table["value"][is_external])
+    """
+    definition_rows: dict[int, list[tuple[str, str, Any, int]]] = {}
+
+    def get_definition_rows(definition: ifcopenshell.entity_instance) -> list[tuple[str, str, Any, int]]:
+        if (rows := definition_rows.get(definition.id())) is not None:
+            return rows
+        rows = []
+        ifc_class = definition.is_a()
+        if props := get_property_definition(definition):
+            units = {}
+            if ifc_class == "IfcElementQuantity":
+                units = {q[0]: q[2] for q in definition[5] or () if q.is_a("IfcPhysicalSimpleQuantity")}
+            elif ifc_class == "IfcPropertySet":
+                units = {p[0]: getattr(p, "Unit", None) for p in definition[4] or ()}
+            pset_name = definition.Name
+            for prop_name, value in props.items():
+                if prop_name == "id":
+                    continue
+                unit = units.get(prop_name)
+                rows.append((pset_name, prop_name, value, unit.id() if unit else 0))
+        definition_rows[definition.id()] = rows
+        return rows
+
+    def get_definitions_psets(
+        definitions: Iterable[ifcopenshell.entity_instance], should_filter: bool = True
+    ) -> dict[tuple[str, str], tuple]:
+        # Like get_psets, later definitions override properties of earlier ones with the same names.
+        results = {}
+        for definition in definitions:
+            if should_filter:
+                if psets_only and not definition.is_a("IfcPropertySet"):
+                    continue
+                if qtos_only and not definition.is_a("IfcElementQuantity"):
+                    continue
+            for pset_name, prop_name, value, unit in get_definition_rows(definition):
+                results[(pset_name, prop_name)] = (value, unit, definition.id())
+        return results
+
+    occurrence_definitions: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]] = {}
+    for rel in ifc_file.by_type("IfcRelDefinesByProperties"):
+        definition = rel.RelatingPropertyDefinition
+        if not isinstance(definition, ifcopenshell.entity_instance):
+            continue  # An IfcPropertySetDefinitionSet, which get_psets doesn't support either
+        for related_object in rel.RelatedObjects:
+            occurrence_definitions.setdefault(related_object, []).append(definition)
+
+    occurrence_types = {}
+    if should_inherit:
+        for rel in ifc_file.by_type("IfcRelDefinesByType"):
+            for related_object in rel.RelatedObjects:
+                occurrence_types[related_object] = rel.RelatingType
+
+    type_psets: dict[ifcopenshell.entity_instance, dict[tuple[str, str], tuple]] = {}
+
+    def get_type_psets(element_type: ifcopenshell.entity_instance) -> dict[tuple[str, str], tuple]:
+        if (psets := type_psets.get(element_type)) is None:
+            psets = type_psets[element_type] = get_definitions_psets(element_type.HasPropertySets or ())
+        return psets
+
+    if elements is None:
+        elements = set(occurrence_definitions) | set(occurrence_types)
+        elements |= {t for t in ifc_file.by_type("IfcTypeObject") if t.HasPropertySets}
+        if ifc_file.schema != "IFC2X3":  # IFC2X3 materials and profiles have no HasProperties
+            elements |= {e for e in ifc_file.by_type("IfcMaterialDefinition") if e.HasProperties}
+            elements |= {e for e in ifc_file.by_type("IfcProfileDef") if e.HasProperties}
+        elements = sorted(elements, key=lambda e: e.id())
+
+    columns = {name: [] for name in PSETS_TABLE_COLUMNS}
+    for element in elements:
+        if element.is_a("IfcTypeObject"):
+            psets = get_type_psets(element)
+        elif element.is_a("IfcMaterialDefinition") or element.is_a("IfcProfileDef"):
+            psets = {} if qtos_only else get_definitions_psets(getattr(element, "HasProperties", None) or (), False)
+        else:
+            psets = {}
+            if should_inherit:
+                if (element_type := occurrence_types.get(element)) is not None:
+                    psets = get_type_psets(element_type)
+            if definitions := occurrence_definitions.get(element):
+                psets = psets | get_definitions_psets(definitions)
+        element_id = element.id()
+        for (pset_name, prop_name), (value, unit, definition_id) in psets.items():
+            columns["element"].append(element_id)
+            columns["pset"].append(pset_name)
+            columns["property"].append(prop_name)
+            columns["value"].append(value)
+            columns["unit"].append(unit)
+            columns["definition"].append(definition_id)
+
+    table = {}
+    for name, values in columns.items():
+        if name in ("element", "unit", "definition"):
+            table[name] = np.array(values, dtype=np.int64)
+        else:
+            table[name] = np.empty(len(values), dtype=object)
+            table[name][:] = values
+    if as_dataframe:
+        import pandas as pd
+
+        return pd.DataFrame(table)
+    return table
+
+
 @overload
 def get_property_definition(
     definition: Optional[ifcopenshell.entity_instance], prop: None = None, verbose=False
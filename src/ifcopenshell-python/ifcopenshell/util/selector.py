@@ -18,6 +18,7 @@
 
 import re
 import lark
+import weakref
 import numpy as np
 import ifcopenshell.api.pset
 import ifcopenshell.api.geometry
@@ -33,7 +34,8 @@ import ifcopenshell.util.schema
 import ifcopenshell.util.shape
 import ifcopenshell.util.system
 from decimal import Decimal
-from typing import Optional, Any, Union, Iterable
+from functools import lru_cache
+from typing import Optional, Any, Union, Iterable, Callable
 
 
 filter_elements_grammar = lark.Lark(
@@ -276,9 +278,47 @@ def format(query: str) -> str:
     return FormatTransformer().transform(format_grammar.parse(query))
 
 
+@lru_cache(maxsize=1024)
+def parse_element_query(query: str) -> tuple[Union[str, re.Pattern], ...]:
+    return tuple(GetElementTransformer().transform(get_element_grammar.parse(query)))
+
+
 def get_element_value(element: ifcopenshell.entity_instance, query: str) -> Any:
-    keys: list[str] = GetElementTransformer().transform(get_element_grammar.parse(query))
-    return _get_element_value(element, keys)
+    return _get_element_value(element, list(parse_element_query(query)))
+
+
+def get_element_values(
+    element: ifcopenshell.entity_instance, queries: Iterable[Union[str, tuple[Union[str, re.Pattern], ...]]]
+) -> list[Any]:
+    """Gets the values of many queries for a single element
+
+    This is equivalent to calling :func:`get_element_value` for each query,
+    except that intermediate values shared by several queries are only looked
+    up once. For example, ``Pset_WallCommon.FireRating`` and
+    ``Pset_WallCommon.IsExternal`` only fetch the property set once, and
+    ``type.Name`` and ``type.Description`` only fetch the type once.
+
+    :param element: The element to get values from.
+    :param queries: The queries, using the same syntax as
+        :func:`get_element_value`. Queries may also be given as already
+        parsed by :func:`parse_element_query`, to avoid parsing them again
+        when getting values from many elements.
+    :return: The value of each query, in the same order as the queries.
+    """
+    values: dict[tuple, Any] = {(): element}
+    results = []
+    for query in queries:
+        keys = query if isinstance(query, tuple) else parse_element_query(query)
+        i = len(keys)
+        while keys[:i] not in values:
+            i -= 1
+        value = values[keys[:i]]
+        for i in range(i, len(keys)):
+            if value is not None:
+                value = _get_element_value(value, [keys[i]])
+            values[keys[: i + 1]] = value
+        results.append(value)
+    return results
 
 
 def _get_element_value(element: ifcopenshell.entity_instance, keys: list[str]) -> Any:
@@ -413,6 +453,7 @@ def filter_elements(
     query: str,
     elements: Optional[set[ifcopenshell.entity_instance]] = None,
     edit_in_place=False,
+    index: Optional["SelectorIndex"] = None,
 ) -> set[ifcopenshell.entity_instance]:
     """
     Filter elements based on the provided `query`.
@@ -428,6 +469,10 @@ def filter_elements(
     :type elements: set[ifcopenshell.entity_instance], optional
     :param edit_in_place: If `True`, mutate the provided `elements` in place. Defaults to `False`
     :type edit_in_place: bool
+    :param index: An optional index of the file, which stores the values
+        looked up by facets such as properties, materials, classifications
+        and locations so that repeated queries do not look them up again.
+    :type index: SelectorIndex, optional
     :return: Set of filtered elements
     :rtype: set[ifcopenshell.entity_instance]
 
@@ -446,16 +491,168 @@ def filter_elements(
 
         # {#1=IfcWall(...), #2=IfcDoor(...)}
         print(elements)
+
+        # Run many queries against the same model.
+        index = ifcopenshell.util.selector.SelectorIndex(ifc_file)
+        for query in queries:
+            elements = ifcopenshell.util.selector.filter_elements(ifc_file, query, index=index)
     """
     if not query:
         return elements or set()
     if elements and not edit_in_place:
         elements = elements.copy()
-    transformer = FacetTransformer(ifc_file, elements)
-    transformer.transform(filter_elements_grammar.parse(query))
+    transformer = FacetTransformer(ifc_file, elements, index)
+    transformer.execute(compile_query(query))
     return transformer.get_results()
 
 
+QueryPlan = tuple[tuple[tuple[str, tuple], ...], ...]
+"""A tuple of facet lists, each a tuple of (facet name, facet arguments)"""
+
+FACET_COSTS = {
+    "attribute": 1,
+    "type": 2,
+    "group": 3,
+    "parent": 3,
+    "material": 4,
+    "classification": 4,
+    "location": 5,
+    "property": 6,
+    "query": 10,
+}
+"""Relative costs of filtering facets, used to order them in a query plan"""
+
+
+@lru_cache(maxsize=1024)
+def compile_query(query: str) -> QueryPlan:
+    """Parses a filter query into a cached query plan
+
+    Within a facet list, instance and class facets add or remove elements,
+    whereas all other facets filter the elements gathered so far. Runs of
+    consecutive filtering facets are reordered so that cheap facets, such as
+    attribute filters, are evaluated first and expensive facets, such as
+    property and query filters, only see the remaining elements.
+
+    :param query: Query to compile
+    :type query: str
+    :return: The query plan, to be executed by a FacetTransformer
+    :rtype: QueryPlan
+    """
+    plan = []
+    for facet_list in FacetCompiler().transform(filter_elements_grammar.parse(query)):
+        facets = []
+        filters = []
+        for facet in facet_list:
+            if facet[0] in FACET_COSTS:
+                filters.append(facet)
+                continue
+            facets.extend(sorted(filters, key=lambda f: FACET_COSTS[f[0]]))
+            filters = []
+            facets.append(facet)
+        facets.extend(sorted(filters, key=lambda f: FACET_COSTS[f[0]]))
+        plan.append(tuple(facets))
+    return tuple(plan)
+
+
+class SelectorIndex:
+    """Stores values looked up by filter facets for elements in a file
+
+    Facets such as properties, materials, classifications and locations look
+    up related data for every element they filter. When passed to
+    ``filter_elements``, an index stores these values per element, so that
+    repeatedly running queries against the same model only looks them up
+    once.
+
+    The index is cleared whenever ``ifcopenshell.api`` is used to change the
+    file. If you edit the file directly, call ``invalidate`` yourself.
+    """
+
+    def __init__(self, file: ifcopenshell.file, should_track_api: bool = True):
+        """
+        :param file: The IFC file to index
+        :type file: ifcopenshell.file
+        :param should_track_api: Whether to clear the index when
+            ``ifcopenshell.api`` is used to change the file. Defaults to true.
+        :type should_track_api: bool
+        """
+        self.file = file
+        self.values: dict[tuple, dict[ifcopenshell.entity_instance, Any]] = {}
+        self.sets: dict[tuple, set[ifcopenshell.entity_instance]] = {}
+        self.listener_name = None
+        if should_track_api:
+            self.track_api()
+
+    def get_values(
+        self,
+        key: tuple,
+        elements: Iterable[ifcopenshell.entity_instance],
+        get_value: Callable[[ifcopenshell.entity_instance], Any],
+    ) -> dict[ifcopenshell.entity_instance, Any]:
+        """Gets the indexed values of elements, looking up any missing ones
+
+        :param key: The key of the index, such as ``("material",)``
+        :type key: tuple
+        :param elements: The elements to get values for
+        :type elements: Iterable[ifcopenshell.entity_instance]
+        :param get_value: Looks up the value of an element which isn't indexed yet
+        :type get_value: Callable
+        :return: A dictionary of elements and their values
+        :rtype: dict[ifcopenshell.entity_instance, Any]
+        """
+        values = self.values.setdefault(key, {})
+        results = {}
+        for element in elements:
+            if (value := values.get(element, values)) is values:
+                value = values[element] = get_value(element)
+            results[element] = value
+        return results
+
+    def get_set(
+        self, key: tuple, get_set: Callable[[], set[ifcopenshell.entity_instance]]
+    ) -> set[ifcopenshell.entity_instance]:
+        """Gets an indexed set of elements, such as the children of parents
+
+        :param key: The key of the index
+        :type key: tuple
+        :param get_set: Calculates the set if it isn't indexed yet
+        :type get_set: Callable
+        :return: The set of elements
+        :rtype: set[ifcopenshell.entity_instance]
+        """
+        if (result := self.sets.get(key)) is None:
+            result = self.sets[key] = get_set()
+        return result
+
+    def invalidate(self) -> None:
+        """Clears the index"""
+        self.values.clear()
+        self.sets.clear()
+
+    def track_api(self) -> None:
+        """Clears the index when ``ifcopenshell.api`` is used to change the file"""
+        import ifcopenshell.api
+
+        self.listener_name = f"{type(self).__name__}.{id(self)}"
+        index = weakref.ref(self)
+
+        def on_post_usecase(usecase_path: str, file: ifcopenshell.file, settings: dict) -> None:
+            if (self := index()) is None:
+                ifcopenshell.api.remove_post_listener("*", name, on_post_usecase)
+            elif file is self.file:
+                self.invalidate()
+
+        name = self.listener_name
+        ifcopenshell.api.add_post_listener("*", name, on_post_usecase)
+
+    def untrack_api(self) -> None:
+        """Stops clearing the index when ``ifcopenshell.api`` is used"""
+        import ifcopenshell.api
+
+        if self.listener_name:
+            ifcopenshell.api.remove_post_listener("*", self.listener_name, None)
+            self.listener_name = None
+
+
 class SetElementValueException(Exception): ...
 
 
@@ -629,9 +826,51 @@ def set_element_value(
     )
 
 
+class FacetCompiler(lark.Transformer):
+    """Transforms a parsed filter query into facet lists for a query plan"""
+
+    def start(self, args):
+        return args[0]
+
+    def filter_group(self, args):
+        return args
+
+    def facet_list(self, args):
+        return args
+
+    def facet(self, args):
+        return args[0]
+
+    def __default__(self, data, children, meta):
+        if data in FACET_COSTS or data in ("instance", "entity"):
+            return (data, tuple(children))
+        return super().__default__(data, children, meta)
+
+    def comparison(self, args):
+        return FacetTransformer.comparison(self, args)
+
+    def keys(self, args):
+        return self.value(args)
+
+    def pset(self, args):
+        return self.value(args)
+
+    def prop(self, args):
+        return self.value(args)
+
+    def value(self, args):
+        return FacetTransformer.value(self, args)
+
+
 class FacetTransformer(lark.Transformer):
-    def __init__(self, ifc_file: ifcopenshell.file, elements: Optional[set[ifcopenshell.entity_instance]] = None):
+    def __init__(
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[set[ifcopenshell.entity_instance]] = None,
+        index: Optional[SelectorIndex] = None,
+    ):
         self.file = ifc_file
+        self.index = index
         self.results = []
         if elements is None:
             self.base_elements = None
@@ -653,6 +892,46 @@ class FacetTransformer(lark.Transformer):
             self.results.append(self.elements)
             self.elements = set()
 
+    def execute(self, plan: QueryPlan) -> None:
+        for facet_list in plan:
+            for facet, args in facet_list:
+                getattr(self, facet)(list(args))
+            self.facet_list(None)
+
+    def filter_by_value(
+        self,
+        key: Optional[tuple],
+        get_value: Callable[[ifcopenshell.entity_instance], Any],
+        evaluate: Callable[[Any], bool],
+    ) -> None:
+        """Filters elements by a value looked up for each element
+
+        Values are looked up from the index if available and a key is given.
+        Each distinct value is only evaluated once.
+        """
+        if self.index is None or key is None:
+            values = {e: get_value(e) for e in self.elements}
+        else:
+            values = self.index.get_values(key, self.elements, get_value)
+        results = {}
+
+        def evaluate_once(value):
+            if (cache_key := self.get_cache_key(value)) is None:
+                return evaluate(value)
+            elif (result := results.get(cache_key)) is None:
+                result = results[cache_key] = evaluate(value)
+            return result
+
+        self.elements = {e for e, v in values.items() if evaluate_once(v)}
+
+    def get_cache_key(self, value):
+        # Values like 1, 1.0, and True are equal but compare differently.
+        if isinstance(value, (str, int, float, bool, type(None))):
+            return (type(value), value)
+        elif isinstance(value, tuple):
+            key = tuple(self.get_cache_key(v) for v in value)
+            return None if None in key else key
+
     def instance(self, args):
         if self.base_elements is None:
             if args[0].data == "globalid":
@@ -697,56 +976,67 @@ class FacetTransformer(lark.Transformer):
         name, comparison, value = args
         name = name.children[0].value
 
-        def filter_function(element):
+        def get_value(element):
             if name == "PredefinedType":
-                element_value = ifcopenshell.util.element.get_predefined_type(element)
-            else:
-                element_value = getattr(element, name, None)
+                return ifcopenshell.util.element.get_predefined_type(element)
+            return getattr(element, name, None)
+
+        def evaluate(element_value):
             return self.compare(element_value, comparison, value)
 
-        self.elements = set(filter(filter_function, self.elements))
+        # Attributes are cheap to get and often edited directly, so they aren't indexed.
+        self.filter_by_value(None, get_value, evaluate)
 
     def type(self, args):
         comparison, value = args
 
-        def filter_function(element):
-            element_value = getattr(ifcopenshell.util.element.get_type(element), "Name", None)
+        def get_value(element):
+            return getattr(ifcopenshell.util.element.get_type(element), "Name", None)
+
+        def evaluate(element_value):
             return self.compare(element_value, comparison, value)
 
-        self.elements = set(filter(filter_function, self.elements))
+        self.filter_by_value(("type",), get_value, evaluate)
 
     def material(self, args):
         comparison, value = args
 
-        def filter_function(element):
+        def get_value(element):
             materials = ifcopenshell.util.element.get_materials(element)
+            return tuple((m.Name, getattr(m, "Category", None)) for m in materials)
+
+        def evaluate(materials):
             result = False if materials else None
-            for material in materials:
-                if self.compare(material.Name, comparison, value):
+            for name, category in materials:
+                if self.compare(name, comparison, value):
                     result = True
-                if self.compare(getattr(material, "Category", None), comparison, value):
+                if self.compare(category, comparison, value):
                     result = True
             if result is not None:
                 return result if comparison == "=" else not result
             return self.compare(None, comparison, value)
 
-        self.elements = set(filter(filter_function, self.elements))
+        self.filter_by_value(("material",), get_value, evaluate)
 
     def property(self, args):
         pset, prop, comparison, value = args
 
-        def filter_function(element):
+        def get_value(element):
+            if isinstance(pset, str) and isinstance(prop, str):
+                return ifcopenshell.util.element.get_pset(element, pset, prop)
+            elif isinstance(pset, str) and isinstance(prop, re.Pattern):
+                return ifcopenshell.util.element.get_pset(element, pset) or {}
+            return ifcopenshell.util.element.get_psets(element)
+
+        def evaluate(element_value):
             if isinstance(pset, str) and isinstance(prop, str):
-                element_value = ifcopenshell.util.element.get_pset(element, pset, prop)
                 return self.compare(element_value, comparison, value)
             elif isinstance(pset, str) and isinstance(prop, re.Pattern):
-                element_props = ifcopenshell.util.element.get_pset(element, pset) or {}
-                for element_prop, element_value in element_props.items():
+                for element_prop, element_value in element_value.items():
                     if prop.match(element_prop):
                         return self.compare(element_value, comparison, value)
             elif isinstance(pset, re.Pattern):
-                element_psets = ifcopenshell.util.element.get_psets(element)
-                for element_pset, element_props in element_psets.items():
+                for element_pset, element_props in element_value.items():
                     if not pset.match(element_pset):
                         continue
                     if isinstance(prop, str):
@@ -759,61 +1049,87 @@ class FacetTransformer(lark.Transformer):
                                 return self.compare(element_value, comparison, value)
             return self.compare(None, comparison, value)
 
-        self.elements = set(filter(filter_function, self.elements))
+        if isinstance(pset, str) and isinstance(prop, str):
+            key = ("property", pset, prop)
+        elif isinstance(pset, str):
+            key = ("property", pset)
+        else:
+            key = ("properties",)
+        self.filter_by_value(key, get_value, evaluate)
 
     def classification(self, args):
         comparison, value = args
 
-        def filter_function(element):
+        def get_value(element):
             references = ifcopenshell.util.classification.get_references(element)
+            return tuple((r.Name, getattr(r, "Identification", getattr(r, "ItemReference", None))) for r in references)
+
+        def evaluate(references):
             result = False if references else None
-            for reference in references:
-                if self.compare(reference.Name, comparison, value):
+            for name, identification in references:
+                if self.compare(name, comparison, value):
                     result = True
-                if self.compare(
-                    getattr(reference, "Identification", getattr(reference, "ItemReference", None)), comparison, value
-                ):
+                if self.compare(identification, comparison, value):
                     result = True
             if result is not None:
                 return result if comparison == "=" else not result
             return self.compare(None, comparison, value)
 
-        self.elements = set(filter(filter_function, self.elements))
+        self.filter_by_value(("classification",), get_value, evaluate)
 
     def location(self, args):
         comparison, value = args
 
-        def filter_function(element):
+        def get_value(element):
             container = ifcopenshell.util.element.get_container(element)
             if not container:
                 container = ifcopenshell.util.element.get_aggregate(element)
-            containers = self.get_container_tree(container)
-            result = False if containers else None
-            for container in containers:
-                if self.compare(container.Name, "=", value):
+            return tuple(c.Name for c in self.get_container_tree(container))
+
+        def evaluate(names):
+            result = False if names else None
+            for name in names:
+                if self.compare(name, "=", value):
                     result = True
             if result is not None:
                 return result if comparison == "=" else not result
             return self.compare(None, comparison, value)
 
-        self.elements = set(filter(filter_function, self.elements))
+        self.filter_by_value(("location",), get_value, evaluate)
 
     def group(self, args):
         comparison, value = args
 
-        def filter_function(element):
+        def get_value(element):
+            return tuple(
+                rel.RelatingGroup.Name
+                for rel in getattr(element, "HasAssignments", [])
+                if rel.is_a("IfcRelAssignsToGroup") and rel.RelatingGroup
+            )
+
+        def evaluate(names):
             result = False
-            for rel in getattr(element, "HasAssignments", []):
-                if rel.is_a("IfcRelAssignsToGroup") and rel.RelatingGroup:
-                    if self.compare(rel.RelatingGroup.Name, "=", value):
-                        result = True
+            for name in names:
+                if self.compare(name, "=", value):
+                    result = True
             return result if comparison == "=" else not result
 
-        self.elements = set(filter(filter_function, self.elements))
+        self.filter_by_value(("group",), get_value, evaluate)
 
     def parent(self, args):
         comparison, value = args
+        if self.index is None:
+            children = self.get_children(comparison, value)
+        else:
+            key = ("parent", comparison, self.get_cache_key(value) or value)
+            children = self.index.get_set(key, lambda: self.get_children(comparison, value))
 
+        if comparison == "=":
+            self.elements = self.elements & children
+        else:
+            self.elements -= children
+
+    def get_children(self, comparison, value) -> set[ifcopenshell.entity_instance]:
         parents = set()
         for rel in self.file.by_type("IfcRelAggregates"):
             parent = rel.RelatingObject
@@ -848,19 +1164,18 @@ class FacetTransformer(lark.Transformer):
         children = set()
         for parent in parents:
             children |= set(ifcopenshell.util.element.get_decomposition(parent))
-
-        if comparison == "=":
-            self.elements = self.elements & children
-        else:
-            self.elements -= children
+        return children
 
     def query(self, args):
         keys, comparison, value = args
 
-        def filter_function(element):
-            return self.compare(get_element_value(element, keys), comparison, value)
+        def get_value(element):
+            return get_element_value(element, keys)
+
+        def evaluate(element_value):
+            return self.compare(element_value, comparison, value)
 
-        self.elements = set(filter(filter_function, self.elements))
+        self.filter_by_value(("query", keys), get_value, evaluate)
 
     def get_container_tree(self, container):
         tree = self.container_trees.get(container, None)
@@ -16,13 +16,13 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import weakref
 import datetime
+import numpy as np
 import ifcopenshell.util.date
 from math import floor
-from functools import lru_cache
 from typing import Union, Literal, Optional, Iterator
 
-
 DURATION_TYPE = Literal["ELAPSEDTIME", "WORKTIME", "NOTDEFINED"]
 RECURRENCE_TYPE = Literal[
     "BY_DAY_COUNT",
@@ -81,18 +81,15 @@ def get_calendar(task: ifcopenshell.entity_instance) -> Union[ifcopenshell.entit
 
 
 def count_working_days(start, finish, calendar: ifcopenshell.entity_instance) -> int:
-    result = 0
     if start == finish:
         return 0
-    current_date = datetime.date(start.year, start.month, start.day)
+    start_date = datetime.date(start.year, start.month, start.day)
     finish_date = datetime.date(finish.year, finish.month, finish.day)
-    while current_date <= finish_date:
-        if calendar and calendar.WorkingTimes and is_working_day(current_date, calendar):
-            result += 1
-        elif not calendar or not is_calendar_applicable(current_date, calendar):
-            result += 1
-        current_date += datetime.timedelta(days=1)
-    return result
+    if finish_date < start_date:
+        return 0
+    if not calendar or not calendar.WorkingTimes:
+        return (finish_date - start_date).days + 1
+    return get_work_calendar(calendar).count_working_days(start_date, finish_date)
 
 
 def get_start_or_finish_date(
@@ -119,19 +116,40 @@ def get_start_or_finish_date(
     return datetime.datetime.combine(result, datetime.time(17))
 
 
+def get_schedule_duration(
+    start, finish, duration_type: DURATION_TYPE, calendar: ifcopenshell.entity_instance
+) -> datetime.timedelta:
+    """Gets the duration of a task from its start and finish, inclusive of both days
+
+    Only working days are counted, unless the duration type is elapsed time
+    or there is no calendar.
+    """
+    current_date = datetime.date(start.year, start.month, start.day)
+    finish_date = datetime.date(finish.year, finish.month, finish.day)
+    duration = datetime.timedelta(days=1)
+    while current_date < finish_date:
+        if duration_type == "ELAPSEDTIME" or not calendar:
+            duration += datetime.timedelta(days=1)
+        elif is_working_day(current_date, calendar):
+            duration += datetime.timedelta(days=1)
+        current_date += datetime.timedelta(days=1)
+    return duration
+
+
 def offset_date(start, duration, duration_type: DURATION_TYPE, calendar: ifcopenshell.entity_instance):
-    current_date = start
     months = getattr(duration, "months", 0)
     years = getattr(duration, "years", 0)
 
     abs_duration = abs((duration.days + months * 30 + years * 12 * 30))
-    date_offset = datetime.timedelta(days=1 if duration.days > 0 else -1)
-    while abs_duration > 0:
-        if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(current_date, calendar):
-            abs_duration -= 1
-        elif is_working_day(current_date, calendar):
-            abs_duration -= 1
-        current_date += date_offset
+    direction = 1 if duration.days > 0 else -1
+    if not abs_duration:
+        current_date = start
+    elif duration_type == "ELAPSEDTIME" or not calendar or not calendar.WorkingTimes:
+        current_date = start + datetime.timedelta(days=abs_duration * direction)
+    else:
+        # The date after the last working day (or day outside of the calendar) within the duration
+        day = get_work_calendar(calendar).get_working_day(start, abs_duration, direction)
+        current_date = start + datetime.timedelta(days=day.toordinal() - start.toordinal() + direction)
     if duration.days > 0:
         current_date = get_soonest_working_day(current_date, duration_type, calendar)
     else:
@@ -142,49 +160,175 @@ def offset_date(start, duration, duration_type: DURATION_TYPE, calendar: ifcopen
 def get_soonest_working_day(start, duration_type: DURATION_TYPE, calendar: ifcopenshell.entity_instance):
     if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(start, calendar):
         return start
-    while not is_working_day(start, calendar):
-        if not is_calendar_applicable(start, calendar):
-            break
-        start += datetime.timedelta(days=1)
-    return start
+    day = get_work_calendar(calendar).get_working_day(start, 1, 1)
+    return start + datetime.timedelta(days=day.toordinal() - start.toordinal())
 
 
 def get_recent_working_day(start, duration_type: DURATION_TYPE, calendar: ifcopenshell.entity_instance):
     if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(start, calendar):
         return start
-    while not is_working_day(start, calendar):
-        if not is_calendar_applicable(start, calendar):
-            break
-        start -= datetime.timedelta(days=1)
-    return start
+    day = get_work_calendar(calendar).get_working_day(start, 1, -1)
+    return start + datetime.timedelta(days=day.toordinal() - start.toordinal())
 
 
-@lru_cache(maxsize=None)
 def is_working_day(day, calendar: ifcopenshell.entity_instance) -> bool:
-    is_working_day = False
-    for work_time in calendar.WorkingTimes or []:
-        if is_work_time_applicable_to_day(work_time, day):
-            is_working_day = True
-            break
-    if not is_working_day:
-        return is_working_day
-    for work_time in calendar.ExceptionTimes or []:
-        if is_work_time_applicable_to_day(work_time, day):
-            is_working_day = False
-            break
-    return is_working_day
+    return get_work_calendar(calendar).is_working_day(day)
 
 
-@lru_cache(maxsize=None)
 def is_calendar_applicable(day, calendar: ifcopenshell.entity_instance) -> bool:
     if not calendar or not calendar.WorkingTimes:
         return False
-    is_applicable = False
-    for work_time in calendar.WorkingTimes or []:
-        if is_day_in_work_time(day, work_time):
-            is_applicable = True
-            break
-    return is_applicable
+    return get_work_calendar(calendar).is_calendar_applicable(day)
+
+
+class WorkCalendar:
+    """An IfcWorkCalendar precomputed for every day over a range of dates
+
+    Each day is only evaluated against the working times and exception times
+    of the calendar once. Afterwards, checking whether a day is a working day
+    takes constant time, counting working days between two dates takes
+    constant time, and finding the Nth working day from a date takes
+    logarithmic time. The range of dates grows as needed.
+
+    Days outside of all working times of the calendar are not covered by it,
+    and so are treated like working days when counting or offsetting dates.
+
+    The calendar is not updated if the IfcWorkCalendar is edited. Instead,
+    call :func:`invalidate_work_calendars` after editing it.
+
+    Only a weak reference to the file is kept, so cached calendars don't
+    keep their file alive.
+    """
+
+    def __init__(self, calendar: ifcopenshell.entity_instance):
+        self.file = weakref.ref(calendar.file)
+        self.calendar_id = calendar.id()
+        self.start = self.finish = 0  # Ordinals of the first and after the last compiled day
+        self.working_days = np.zeros(0, dtype=bool)
+        self.applicable_days = np.zeros(0, dtype=bool)
+        # The number of working days or days outside of the calendar before each compiled day
+        self.totals = np.zeros(1, dtype=np.int64)
+
+    @property
+    def calendar(self) -> ifcopenshell.entity_instance:
+        return self.file().by_id(self.calendar_id)
+
+    def get_index(self, day) -> int:
+        ordinal = day.toordinal()
+        self.extend(ordinal, ordinal + 1)
+        return ordinal - self.start
+
+    def extend(self, start: int, finish: int) -> None:
+        """Ensures that days from the start ordinal and before the finish ordinal are compiled"""
+        if start >= self.start and finish <= self.finish:
+            return
+        if self.finish > self.start:
+            # Grow by at least the existing range, so the cost of compiling is amortised.
+            padding = self.finish - self.start
+            start = min(start, self.start - padding) if start < self.start else self.start
+            finish = max(finish, self.finish + padding) if finish > self.finish else self.finish
+        else:
+            start, finish = start - 366, finish + 366
+        start, finish = max(start, 1), min(finish, datetime.date.max.toordinal() + 1)
+        if start == self.start and finish == self.finish:
+            raise OverflowError("Working day is out of the range of supported dates")
+        if self.finish == self.start:
+            self.start = self.finish = start
+        before, after = self.compile(start, self.start), self.compile(self.finish, finish)
+        self.working_days = np.concatenate((before[0], self.working_days, after[0]))
+        self.applicable_days = np.concatenate((before[1], self.applicable_days, after[1]))
+        self.totals = np.concatenate(([0], np.cumsum(self.working_days | ~self.applicable_days)))
+        self.start, self.finish = start, finish
+
+    def compile(self, start: int, finish: int) -> tuple[np.ndarray, np.ndarray]:
+        calendar = self.calendar
+        days = [datetime.date.fromordinal(d) for d in range(start, finish)]
+        working_days = np.array([self.evaluate_working_day(calendar, d) for d in days], dtype=bool)
+        applicable_days = np.array([self.evaluate_calendar_applicable(calendar, d) for d in days], dtype=bool)
+        return working_days, applicable_days
+
+    def is_working_day(self, day) -> bool:
+        index = self.get_index(day)
+        return bool(self.working_days[index])
+
+    def is_calendar_applicable(self, day) -> bool:
+        index = self.get_index(day)
+        return bool(self.applicable_days[index])
+
+    def count_working_days(self, start, finish) -> int:
+        """Counts working days and days outside of the calendar, inclusive of the start and finish"""
+        self.extend(start.toordinal(), finish.toordinal() + 1)
+        return int(self.totals[finish.toordinal() - self.start + 1] - self.totals[start.toordinal() - self.start])
+
+    def get_working_day(self, start, n: int, direction: int) -> datetime.date:
+        """Gets the Nth working day or day outside of the calendar from a start date, inclusive of it
+
+        :param direction: 1 to search forwards in time, or -1 to search backwards.
+        """
+        while True:
+            index = self.get_index(start)
+            if direction > 0:
+                i = int(np.searchsorted(self.totals, self.totals[index] + n, side="left")) - 1
+                if i < len(self.working_days):
+                    return datetime.date.fromordinal(self.start + i)
+                self.extend(self.finish, self.finish + 1)
+            else:
+                i = int(np.searchsorted(self.totals, self.totals[index + 1] - n, side="right")) - 1
+                if i >= 0:
+                    return datetime.date.fromordinal(self.start + i)
+                self.extend(self.start - 1, self.start)
+
+    def evaluate_working_day(self, calendar: ifcopenshell.entity_instance, day: datetime.date) -> bool:
+        is_working_day = False
+        for work_time in calendar.WorkingTimes or []:
+            if is_work_time_applicable_to_day(work_time, day):
+                is_working_day = True
+                break
+        if not is_working_day:
+            return is_working_day
+        for work_time in calendar.ExceptionTimes or []:
+            if is_work_time_applicable_to_day(work_time, day):
+                is_working_day = False
+                break
+        return is_working_day
+
+    def evaluate_calendar_applicable(self, calendar: ifcopenshell.entity_instance, day: datetime.date) -> bool:
+        for work_time in calendar.WorkingTimes or []:
+            if is_day_in_work_time(day, work_time):
+                return True
+        return False
+
+
+# Precomputed calendars by calendar ID, for each file which is still alive
+work_calendars: weakref.WeakKeyDictionary[ifcopenshell.file, dict[int, WorkCalendar]] = weakref.WeakKeyDictionary()
+
+
+def get_work_calendar(calendar: ifcopenshell.entity_instance) -> WorkCalendar:
+    """Gets the precomputed working days of a work calendar
+
+    :param calendar: The IfcWorkCalendar.
+    :return: The precomputed calendar, which is reused until invalidated.
+    """
+    file_calendars = work_calendars.get(calendar.file)
+    if file_calendars is None:
+        file_calendars = work_calendars[calendar.file] = {}
+    work_calendar = file_calendars.get(calendar.id())
+    if work_calendar is None:
+        work_calendar = file_calendars[calendar.id()] = WorkCalendar(calendar)
+    return work_calendar
+
+
+def invalidate_work_calendars(calendar: Optional[ifcopenshell.entity_instance] = None) -> None:
+    """Discards precomputed working days after a work calendar is edited
+
+    :param calendar: The edited IfcWorkCalendar. If not specified, all
+        precomputed calendars are discarded, such as when a work time or
+        recurrence pattern which may be shared between calendars is edited.
+    """
+    if calendar is None:
+        work_calendars.clear()
+    elif file_calendars := work_calendars.get(calendar.file):
+        file_calendars.pop(calendar.id(), None)
 
 
 def is_day_in_work_time(day, work_time: ifcopenshell.entity_instance) -> bool:
@@ -24,7 +24,7 @@ import ifcopenshell.util.element
 import ifcopenshell.util.placement
 import ifcopenshell.util.representation
 from ifcopenshell.geom import ShapeElementType, ShapeType
-from typing import Optional, Literal, Union, Iterable
+from typing import Optional, Literal, Union, Iterable, Sequence
 
 tol = 1e-6
 AXIS_LITERAL = Literal["X", "Y", "Z"]
@@ -64,25 +64,25 @@ def get_volume(geometry: ShapeType) -> float:
     :rtype: float
     """
 
+    return get_volume_vf(get_vertices(geometry), get_faces(geometry))
+
+
+def get_volume_vf(vertices: npt.NDArray[np.float64], faces: npt.NDArray[np.int32]) -> float:
+    """Calculates the internal volume given a list of vertices and triangulated faces
+
+    The volume is the sum of the signed volumes of the tetrahedrons formed by
+    each triangle and the origin.
+
+    :param vertices: A list of 3D vertices, such as returned from get_vertices.
+    :type: np.array[iterable[float]]
+    :param faces: A list of faces, such as returned from get_faces.
+    :type: np.array[iterable[int]]
+    :return: The volume.
+    :rtype: float
+    """
     # https://stackoverflow.com/questions/1406029/how-to-calculate-the-volume-of-a-3d-mesh-object-the-surface-of-which-is-made-up
-    def signed_triangle_volume(p1, p2, p3):
-        v321 = p3[0] * p2[1] * p1[2]
-        v231 = p2[0] * p3[1] * p1[2]
-        v312 = p3[0] * p1[1] * p2[2]
-        v132 = p1[0] * p3[1] * p2[2]
-        v213 = p2[0] * p1[1] * p3[2]
-        v123 = p1[0] * p2[1] * p3[2]
-        return (1.0 / 6.0) * (-v321 + v231 + v312 - v132 - v213 + v123)
-
-    # Can't optimize it using buffers - performance seems to get only worse.
-    verts = geometry.verts
-    faces = geometry.faces
-    grouped_verts = [[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)]
-    volumes = [
-        signed_triangle_volume(grouped_verts[faces[i]], grouped_verts[faces[i + 1]], grouped_verts[faces[i + 2]])
-        for i in range(0, len(faces), 3)
-    ]
-    return abs(sum(volumes))
+    # The determinant of the triangle's vertices is six times its signed volume.
+    return abs(float(np.linalg.det(vertices[faces]).sum())) / 6.0
 
 
 def get_x(geometry: ShapeType) -> float:
@@ -423,16 +423,10 @@ def get_bbox(vertices: Iterable[VECTOR_3D]) -> tuple[npt.NDArray[np.float64], np
         maxz]))
     :rtype: tuple[np.array[float]]
     """
-    x_values = [v[0] for v in vertices]
-    y_values = [v[1] for v in vertices]
-    z_values = [v[2] for v in vertices]
-    minx = min(x_values)
-    maxx = max(x_values)
-    miny = min(y_values)
-    maxy = max(y_values)
-    minz = min(z_values)
-    maxz = max(z_values)
-    return (np.array([minx, miny, minz]), np.array([maxx, maxy, maxz]))
+    if not isinstance(vertices, np.ndarray):
+        vertices = np.array(list(vertices), dtype="d")
+    vertices = vertices.reshape(-1, 3)
+    return (vertices.min(axis=0), vertices.max(axis=0))
 
 
 def get_area_vf(vertices: npt.NDArray[np.float64], faces: npt.NDArray[np.int32]) -> float:
@@ -585,15 +579,10 @@ def get_footprint_area(
     filtered_face_indices = np.where(dot_products > normal_tol)[0]
     filtered_faces = faces[filtered_face_indices]
 
-    # Flatten vertices along the direction
-    vertices = vertices.copy()  # Buffers are read-only.
-    for idx in range(len(vertices)):
-        vertices[idx] = vertices[idx] - np.dot(vertices[idx], direction) * direction
-
     # Now flatten 3D vertices into 2D polygons which can be unioned to find a footprint.
 
     # Create an orthonormal basis using the direction
-    d = np.array(direction) / np.linalg.norm(direction)
+    d = direction
 
     # Find a vector not parallel to d
     a = np.array(d)
@@ -609,11 +598,12 @@ def get_footprint_area(
     # Second basis vector
     c = np.cross(d, b)
 
-    # Project the flattened vertices onto the basis to get 2D coordinates
-    vertices_2d = np.array([[np.dot(v, b), np.dot(v, c)] for v in vertices])
+    # Project the vertices onto the basis to get 2D coordinates. Since the
+    # basis is perpendicular to the direction, this also flattens them.
+    vertices_2d = vertices @ np.column_stack((b, c))
 
-    polygons = [shapely.Polygon(vertices_2d[face]) for face in filtered_faces]
-    unioned_polygon = shapely.ops.unary_union(polygons)
+    polygons = shapely.polygons(vertices_2d[filtered_faces])
+    unioned_polygon = shapely.union_all(polygons)
 
     return unioned_polygon.area
 
@@ -672,25 +662,11 @@ def get_footprint_perimeter(geometry: ShapeType) -> float:
     negative_z_face_indices = np.where(triangle_normals[:, 2] < -tol)[0]
     negative_z_faces = faces[negative_z_face_indices]
 
-    # Initialize the set of counted edges and the perimeter
-    all_edges = set()
-    shared_edges = set()
-    perimeter = 0
-
-    # Loop through each face
-    for face in negative_z_faces:
-        # Loop through each edge of the face
-        for i in range(3):
-            # Get the indices of the two vertices that define the edge
-            edge = (face[i], face[(i + 1) % 3])
-            # Keep track of shared edges. Perimeter edges are unshared.
-            if (edge[1], edge[0]) in all_edges or (edge[0], edge[1]) in all_edges:
-                shared_edges.add((edge[0], edge[1]))
-                shared_edges.add((edge[1], edge[0]))
-            else:
-                all_edges.add(edge)
-
-    return sum([np.linalg.norm(vertices[e[0]] - vertices[e[1]]) for e in (all_edges - shared_edges)])
+    # Perimeter edges are the edges which are not shared between faces.
+    edges = np.sort(negative_z_faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1).astype(np.int64)
+    keys, counts = np.unique(edges[:, 0] * len(vertices) + edges[:, 1], return_counts=True)
+    v1, v2 = np.divmod(keys[counts == 1], len(vertices))
+    return float(np.linalg.norm(vertices[v2] - vertices[v1], axis=1).sum())
 
 
 def get_profiles(element: ifcopenshell.entity_instance) -> list[ifcopenshell.entity_instance]:
@@ -746,3 +722,123 @@ def get_total_edge_length(geometry: ShapeType) -> float:
     vertices = get_vertices(geometry)
     vertices = vertices[get_edges(geometry)]
     return np.linalg.norm(vertices[:, 1] - vertices[:, 0], axis=1).sum()
+
+
+def get_measures(
+    geometries: Sequence[ShapeType], measures: Iterable[str] = ("get_volume", "get_area")
+) -> dict[str, npt.NDArray[np.float64]]:
+    """Calculates many measures for many geometries in a single call
+
+    Instead of calling a measurement function per geometry, the buffers of all
+    geometries are concatenated and each measure is calculated for all of them
+    at once. This is significantly faster when measuring many small shapes,
+    such as during quantity take-off.
+
+    Measures are named after the equivalent function in this module. The
+    following are calculated together: ``get_volume``, ``get_area``,
+    ``get_side_area`` (along Y), ``get_max_side_area``,
+    ``get_outer_surface_area``, ``get_total_edge_length``, ``get_x``,
+    ``get_y``, ``get_z``, ``get_max_xy``, ``get_max_xyz`` and
+    ``get_min_xyz``. Any other function in this module which takes a single
+    geometry, such as ``get_footprint_area``, is called per geometry.
+
+    Example:
+
+    .. code:: python
+
+        shapes = [shape for shape in ifcopenshell.geom.iterate(settings, model)]
+        results = ifcopenshell.util.shape.get_measures([s.geometry for s in shapes], ["get_volume"])
+        for shape, volume in zip(shapes, results["get_volume"]):
+            print(shape.guid, volume)
+
+    :param geometries: A sequence of geometry output calculated by IfcOpenShell
+    :type geometries: Sequence[geometry]
+    :param measures: The names of the measures to calculate.
+    :type measures: Iterable[str]
+    :return: A dictionary mapping each measure name to an array of values,
+        ordered in the same order as the geometries.
+    :rtype: dict[str, np.array[float]]
+    """
+    measures = list(measures)
+    total = len(geometries)
+    vertices = [get_vertices(g) for g in geometries]
+    faces = [get_faces(g) for g in geometries]
+    vertex_counts = np.array([len(v) for v in vertices], dtype=np.int64)
+    face_counts = np.array([len(f) for f in faces], dtype=np.int64)
+    vertex_offsets = np.cumsum(vertex_counts) - vertex_counts
+    all_vertices = np.concatenate(vertices) if total else np.empty((0, 3))
+    all_faces = np.concatenate(faces) if total else np.empty((0, 3), dtype=np.int32)
+    all_faces = all_faces + np.repeat(vertex_offsets, face_counts)[:, np.newaxis]
+    face_owners = np.repeat(np.arange(total), face_counts)
+
+    def sum_by_face(weights: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return np.bincount(face_owners, weights=weights, minlength=total)
+
+    cache = {}
+
+    def get_triangle_normals() -> npt.NDArray[np.float64]:
+        if "normals" not in cache:
+            p1 = all_vertices[all_faces[:, 0]]
+            cache["normals"] = np.cross(all_vertices[all_faces[:, 1]] - p1, all_vertices[all_faces[:, 2]] - p1)
+        return cache["normals"]
+
+    def get_double_areas() -> npt.NDArray[np.float64]:
+        if "double_areas" not in cache:
+            cache["double_areas"] = np.linalg.norm(get_triangle_normals(), axis=1)
+        return cache["double_areas"]
+
+    def get_unit_normals() -> npt.NDArray[np.float64]:
+        if "unit_normals" not in cache:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cache["unit_normals"] = get_triangle_normals() / get_double_areas()[:, np.newaxis]
+        return cache["unit_normals"]
+
+    def get_dimensions() -> npt.NDArray[np.float64]:
+        if "dimensions" not in cache:
+            dimensions = np.full((total, 3), np.nan)
+            has_vertices = vertex_counts > 0
+            if has_vertices.any():
+                offsets = vertex_offsets[has_vertices]
+                dimensions[has_vertices] = np.maximum.reduceat(all_vertices, offsets, axis=0) - np.minimum.reduceat(
+                    all_vertices, offsets, axis=0
+                )
+            cache["dimensions"] = dimensions
+        return cache["dimensions"]
+
+    def get_side_areas(axis: int) -> npt.NDArray[np.float64]:
+        normal_tol = 0.01  # See get_side_area
+        return sum_by_face(get_double_areas() * (get_unit_normals()[:, axis] > normal_tol)) / 2
+
+    results = {}
+    for measure in measures:
+        if measure == "get_volume":
+            results[measure] = np.abs(sum_by_face(np.linalg.det(all_vertices[all_faces]))) / 6.0
+        elif measure == "get_area":
+            results[measure] = sum_by_face(get_double_areas()) / 2
+        elif measure == "get_side_area":
+            results[measure] = get_side_areas(1)
+        elif measure == "get_max_side_area":
+            results[measure] = np.max([get_side_areas(0), get_side_areas(1), get_side_areas(2)], axis=0)
+        elif measure == "get_outer_surface_area":
+            results[measure] = sum_by_face(get_double_areas() * (np.abs(get_unit_normals()[:, 2]) < tol)) / 2
+        elif measure == "get_total_edge_length":
+            edges = [get_edges(g) for g in geometries]
+            edge_counts = np.array([len(e) for e in edges], dtype=np.int64)
+            all_edges = np.concatenate(edges) if total else np.empty((0, 2), dtype=np.int32)
+            all_edges = all_edges + np.repeat(vertex_offsets, edge_counts)[:, np.newaxis]
+            lengths = np.linalg.norm(all_vertices[all_edges[:, 1]] - all_vertices[all_edges[:, 0]], axis=1)
+            results[measure] = np.bincount(np.repeat(np.arange(total), edge_counts), weights=lengths, minlength=total)
+        elif measure in ("get_x", "get_y", "get_z"):
+            results[measure] = get_dimensions()[:, "xyz".index(measure[-1])]
+        elif measure == "get_max_xy":
+            results[measure] = get_dimensions()[:, :2].max(axis=1)
+        elif measure == "get_max_xyz":
+            results[measure] = get_dimensions().max(axis=1)
+        elif measure == "get_min_xyz":
+            results[measure] = get_dimensions().min(axis=1)
+        else:
+            function = globals().get(measure)
+            if not measure.startswith("get_") or function is None:
+                raise ValueError(f"Unknown measure {measure}")
+            results[measure] = np.array([function(g) for g in geometries], dtype="d")
+    return results
@@ -30,12 +30,14 @@ Available flags:
 - ``--rules``: Also check express rules.
 - ``--json``: Produce JSON output.
 - ``--fields``: Output more detailed information about failed entities (available only with ``--json``).
+- ``--processes=N``: Validate using N worker processes.
 """
 
 import os
 import sys
 import json
 import functools
+import multiprocessing
 
 from collections import namedtuple
 from typing import Union, Iterator, Any, Optional
@@ -256,14 +258,14 @@ def assert_valid(
         return True
 
 
-def log_internal_cpp_errors(f: ifcopenshell.file, filename: str, logger: Logger) -> None:
+def log_internal_cpp_errors(f: ifcopenshell.file, filename: str, logger: Logger, worker_log: str = "") -> None:
     import re
     import bisect
 
     chr_offset_re = re.compile(r"at offset (\d+)\s*")
     for_instance_re = re.compile(r"\s*for instance #(\d+)\s*")
 
-    log = ifcopenshell.get_log()
+    log = worker_log + ifcopenshell.get_log()
     msgs = list(map(json.loads, filter(None, log.split("\n"))))
     chr_offsets = [chr_offset_re.findall(m["message"]) for m in msgs]
     if chr_offsets:
@@ -324,7 +326,271 @@ def get_entity_attributes(schema: schema_definition, entity: str) -> tuple[entit
     return entity_attrs
 
 
-def validate(f: Union[ifcopenshell.file, str], logger: Logger, express_rules=False) -> None:
+entity_descriptor_type = namedtuple(
+    "entity_descriptor_type",
+    (
+        "entity",
+        "name",
+        "is_abstract",
+        "attributes",
+        "attribute_names",
+        "attribute_types",
+        "optional",
+        "derived",
+        "inverse_attributes",
+        "inverse_names",
+        "guid_index",
+    ),
+)
+entity_descriptor_map: dict[tuple[str, str], entity_descriptor_type] = {}
+
+
+def get_entity_descriptor(schema: schema_definition, entity: str) -> entity_descriptor_type:
+    """Returns everything about an entity that is needed to validate its instances
+
+    Looking these up through the schema wrapper for every instance is a
+    significant part of the validation time, so they are cached per entity.
+    """
+    cache_key = schema.name(), entity
+    from_cache = entity_descriptor_map.get(cache_key)
+    if from_cache:
+        return from_cache
+
+    ent, attrs = get_entity_attributes(schema, entity)
+    name = ent.name()
+    attribute_names = tuple(a.name() for a in attrs)
+    inverse_attributes = tuple(ent.all_inverse_attributes())
+    descriptor = entity_descriptor_map[cache_key] = entity_descriptor_type(
+        ent,
+        name,
+        ent.is_abstract(),
+        attrs,
+        tuple(f"{name}.{a}" for a in attribute_names),
+        tuple(a.type_of_attribute() for a in attrs),
+        tuple(a.optional() for a in attrs),
+        tuple(ent.derived()),
+        inverse_attributes,
+        tuple(f"{name}.{a.name()}" for a in inverse_attributes),
+        attribute_names.index("GlobalId") if "GlobalId" in attribute_names else None,
+    )
+    return descriptor
+
+
+def validate_instance(inst: ifcopenshell.entity_instance, schema: schema_definition, logger: Logger) -> None:
+    """Validates the attribute values and inverse cardinalities of a single instance"""
+    descriptor = get_entity_descriptor(schema, inst.is_a())
+    entity, attrs = descriptor.entity, descriptor.attributes
+
+    if descriptor.is_abstract:
+        e = "Entity %s is abstract" % descriptor.name
+        if hasattr(logger, "set_state"):
+            logger.set_state("attribute", None)
+            logger.error(e)
+        else:
+            logger.error("For instance:\n    %s\n%s", inst, e)
+
+    has_invalid_value = False
+    values = [None] * len(attrs)
+    for i in range(len(attrs)):
+        try:
+            values[i] = inst[i]
+            pass
+        except:
+            if hasattr(logger, "set_state"):
+                logger.set_state("attribute", descriptor.attribute_names[i])
+                logger.error("Invalid attribute value")
+            else:
+                logger.error(
+                    "For instance:\n    %s\n    %s\nInvalid attribute value for %s.%s",
+                    inst,
+                    annotate_inst_attr_pos(inst, i),
+                    entity,
+                    attrs[i],
+                )
+            has_invalid_value = True
+
+    if not has_invalid_value:
+        for i, (attr, val, is_derived) in enumerate(zip(attrs, values, descriptor.derived)):
+            if is_derived and not isinstance(val, ifcopenshell.ifcopenshell_wrapper.attribute_value_derived):
+                if hasattr(logger, "set_state"):
+                    logger.set_state("attribute", descriptor.attribute_names[i])
+                    logger.error("Attribute is derived in subtype")
+                else:
+                    logger.error(
+                        "For instance:\n    %s\n    %s\nWith attribute:\n    %s\nDerived in subtype\n",
+                        inst,
+                        annotate_inst_attr_pos(inst, i),
+                        attr,
+                    )
+
+            if val is None and not descriptor.optional[i] and not is_derived:
+                if hasattr(logger, "set_state"):
+                    logger.set_state("attribute", descriptor.attribute_names[i])
+                    logger.error("Attribute not optional")
+                else:
+                    logger.error(
+                        "For instance:\n    %s\n    %s\nWith attribute:\n    %s\nNot optional\n",
+                        inst,
+                        annotate_inst_attr_pos(inst, i),
+                        attr,
+                    )
+
+            if val is not None and not is_derived:
+                try:
+                    assert_valid(descriptor.attribute_types[i], val, schema, attr=attr)
+                except ValidationError as e:
+                    if hasattr(logger, "set_state"):
+                        logger.set_state("attribute", e.attribute)
+                        logger.error(str(e))
+                    else:
+                        logger.error(
+                            "For instance:\n    %s\n    %s\n%s",
+                            inst,
+                            annotate_inst_attr_pos(inst, i),
+                            e,
+                        )
+
+    for attr, attribute_name in zip(descriptor.inverse_attributes, descriptor.inverse_names):
+        try:
+            val = getattr(inst, attr.name())
+        except Exception as e:
+            if hasattr(logger, "set_state"):
+                logger.set_state("attribute", attribute_name)
+                logger.error(str(e))
+            else:
+                logger.error("For instance:\n    %s\n%s", inst, e)
+            continue
+        try:
+            assert_valid_inverse(attr, val, schema)
+        except ValidationError as e:
+            if hasattr(logger, "set_state"):
+                logger.set_state("attribute", attribute_name)
+                logger.error(str(e))
+            else:
+                logger.error("For instance:\n    %s\n%s", inst, e)
+
+
+def get_global_id(inst: ifcopenshell.entity_instance, schema: schema_definition) -> Optional[str]:
+    guid_index = get_entity_descriptor(schema, inst.is_a()).guid_index
+    if guid_index is not None:
+        try:
+            return inst[guid_index]
+        except:
+            # Reported as an invalid attribute value
+            pass
+
+
+def check_global_id(
+    inst: ifcopenshell.entity_instance,
+    guid: Optional[str],
+    used_guids: dict[str, ifcopenshell.entity_instance],
+    logger: Logger,
+) -> None:
+    if guid is not None and guid in used_guids:
+        rule = "Rule IfcRoot.UR1:\n    The attribute GlobalId should be unique"
+        previous_element = used_guids[guid]
+        logger.error(
+            "On instance:\n    %s\n   %s\n%s\nViolated by:\n    %s\n    %s",
+            inst,
+            annotate_inst_attr_pos(inst, 0),
+            rule,
+            previous_element,
+            annotate_inst_attr_pos(previous_element, 0),
+        )
+    else:
+        used_guids[guid] = inst
+
+
+class recording_logger:
+    """Records the logging calls made in a worker process, to be replayed on the actual logger
+
+    Instances are recorded by their id and all other arguments by their string
+    representation. State changes are only recorded when they precede an error.
+    """
+
+    def __init__(self, has_state):
+        self.records = []
+        self.state = {}
+        if has_state:
+            self.set_state = self.state.__setitem__
+
+    def flush_state(self):
+        for key, value in self.state.items():
+            if isinstance(value, ifcopenshell.entity_instance):
+                self.records.append(("instance", key, value.id()))
+            else:
+                self.records.append(("state", key, value))
+        self.state.clear()
+
+    def error(self, msg, *args):
+        self.flush_state()
+        self.records.append(("error", msg, tuple(map(str, args))))
+
+    def replay(self, f: ifcopenshell.file, logger: Logger, used_guids: dict[str, ifcopenshell.entity_instance]):
+        for record_type, key, value in self.records:
+            if record_type == "error":
+                logger.error(key, *value)
+            elif record_type == "instance":
+                logger.set_state(key, f.by_id(value))
+            elif record_type == "state":
+                logger.set_state(key, value)
+            elif record_type == "guid":
+                # GlobalId uniqueness spans all shards and is checked while merging.
+                inst = f.by_id(key)
+                if value is not None and value in used_guids and hasattr(logger, "set_state"):
+                    logger.set_state("instance", inst)
+                check_global_id(inst, value, used_guids, logger)
+
+
+class shard_validator:
+    def __init__(self, f: ifcopenshell.file, has_state: bool):
+        self.file = f
+        self.schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema_identifier)
+        self.has_state = has_state
+
+    def validate_shard(self, ids: list[int]) -> tuple[list, str]:
+        logger = recording_logger(self.has_state)
+        for id in ids:
+            inst = self.file.by_id(id)
+            if self.has_state:
+                logger.set_state("instance", inst)
+            logger.records.append(("guid", id, get_global_id(inst, self.schema)))
+            validate_instance(inst, self.schema, logger)
+        logger.flush_state()
+        # Errors found while lazily parsing the instances of this shard
+        return logger.records, ifcopenshell.get_log()
+
+
+worker_validator = None
+
+
+def validate_shard(ids):
+    return worker_validator.validate_shard(ids)
+
+
+def validate_shards(f: ifcopenshell.file, logger: Logger, processes: int, shard_size: int = 10000) -> str:
+    """Validates the instances of f in shards of consecutive ids, merging the results in file order
+
+    :return: The C++ log messages emitted by the workers while parsing.
+    """
+    global worker_validator
+    worker_validator = shard_validator(f, hasattr(logger, "set_state"))
+    ids = [inst.id() for inst in f]
+    shard_size = max(1, min(shard_size, len(ids) // (processes * 4)))
+    shards = [ids[i : i + shard_size] for i in range(0, len(ids), shard_size)]
+    used_guids: dict[str, ifcopenshell.entity_instance] = dict()
+    logs = []
+    # Forked workers share the already parsed file.
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        for records, log in pool.imap(validate_shard, shards):
+            recorder = recording_logger(False)
+            recorder.records = records
+            recorder.replay(f, logger, used_guids)
+            logs.append(log)
+    return "".join(logs)
+
+
+def validate(f: Union[ifcopenshell.file, str], logger: Logger, express_rules=False, processes=1) -> None:
     """
     For an IFC population model `f` (or filepath to such a file) validate whether the entity attribute values are correctly supplied. As this
     is a function that is applied after a file has been parsed, certain types of errors in syntax, duplicate
@@ -343,6 +609,10 @@ def validate(f: Union[ifcopenshell.file, str], logger: Logger, express_rules=Fal
     It is recommended to supply the path to the file, so that internal C++ errors reported during the parse stage
     are also captured.
 
+    With `processes` larger than one, the instances are validated in shards of consecutive ids by forked worker
+    processes (where available). The results are merged in file order, so that the same statements are logged as
+    when validating in a single process.
+
     Example:
 
     .. code:: python
@@ -390,118 +660,20 @@ def validate(f: Union[ifcopenshell.file, str], logger: Logger, express_rules=Fal
         log_internal_cpp_errors(f, filename, logger)
 
     schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema_identifier)
-    used_guids: dict[str, ifcopenshell.entity_instance] = dict()
-
-    for inst in f:
-        if hasattr(logger, "set_state"):
-            logger.set_state("instance", inst)
-
-        if hasattr(inst, "GlobalId"):
-            guid = inst.GlobalId
-            if guid is not None and guid in used_guids:
-                rule = "Rule IfcRoot.UR1:\n    The attribute GlobalId should be unique"
-                previous_element = used_guids[guid]
-                logger.error(
-                    "On instance:\n    %s\n   %s\n%s\nViolated by:\n    %s\n    %s",
-                    inst,
-                    annotate_inst_attr_pos(inst, 0),
-                    rule,
-                    previous_element,
-                    annotate_inst_attr_pos(previous_element, 0),
-                )
-            else:
-                used_guids[guid] = inst
+    can_fork = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+    worker_log = ""
 
-        entity, attrs = get_entity_attributes(schema, inst.is_a())
+    if processes > 1 and can_fork:
+        worker_log = validate_shards(f, logger, processes)
+    else:
+        used_guids: dict[str, ifcopenshell.entity_instance] = dict()
 
-        if entity.is_abstract():
-            e = "Entity %s is abstract" % entity.name()
+        for inst in f:
             if hasattr(logger, "set_state"):
-                logger.set_state("attribute", None)
-                logger.error(e)
-            else:
-                logger.error("For instance:\n    %s\n%s", inst, e)
+                logger.set_state("instance", inst)
 
-        has_invalid_value = False
-        values = [None] * len(attrs)
-        for i in range(len(attrs)):
-            try:
-                values[i] = inst[i]
-                pass
-            except:
-                if hasattr(logger, "set_state"):
-                    logger.set_state("attribute", f"{entity.name()}.{attrs[i].name()}")
-                    logger.error("Invalid attribute value")
-                else:
-                    logger.error(
-                        "For instance:\n    %s\n    %s\nInvalid attribute value for %s.%s",
-                        inst,
-                        annotate_inst_attr_pos(inst, i),
-                        entity,
-                        attrs[i],
-                    )
-                has_invalid_value = True
-
-        if not has_invalid_value:
-            for i, (attr, val, is_derived) in enumerate(zip(attrs, values, entity.derived())):
-                if is_derived and not isinstance(val, ifcopenshell.ifcopenshell_wrapper.attribute_value_derived):
-                    if hasattr(logger, "set_state"):
-                        logger.set_state("attribute", f"{entity.name()}.{attr.name()}")
-                        logger.error("Attribute is derived in subtype")
-                    else:
-                        logger.error(
-                            "For instance:\n    %s\n    %s\nWith attribute:\n    %s\nDerived in subtype\n",
-                            inst,
-                            annotate_inst_attr_pos(inst, i),
-                            attr,
-                        )
-
-                if val is None and not attr.optional() and not is_derived:
-                    if hasattr(logger, "set_state"):
-                        logger.set_state("attribute", f"{entity.name()}.{attr.name()}")
-                        logger.error("Attribute not optional")
-                    else:
-                        logger.error(
-                            "For instance:\n    %s\n    %s\nWith attribute:\n    %s\nNot optional\n",
-                            inst,
-                            annotate_inst_attr_pos(inst, i),
-                            attr,
-                        )
-
-                if val is not None and not is_derived:
-                    attr_type = attr.type_of_attribute()
-                    try:
-                        assert_valid(attr_type, val, schema, attr=attr)
-                    except ValidationError as e:
-                        if hasattr(logger, "set_state"):
-                            logger.set_state("attribute", e.attribute)
-                            logger.error(str(e))
-                        else:
-                            logger.error(
-                                "For instance:\n    %s\n    %s\n%s",
-                                inst,
-                                annotate_inst_attr_pos(inst, i),
-                                e,
-                            )
-
-        for attr in entity.all_inverse_attributes():
-            try:
-                val = getattr(inst, attr.name())
-            except Exception as e:
-                if hasattr(logger, "set_state"):
-                    logger.set_state("attribute", f"{entity.name()}.{attr.name()}")
-                    logger.error(str(e))
-                else:
-                    logger.error("For instance:\n    %s\n%s", inst, e)
-                continue
-            try:
-                assert_valid_inverse(attr, val, schema)
-            except ValidationError as e:
-                if hasattr(logger, "set_state"):
-                    logger.set_state("attribute", f"{entity.name()}.{attr.name()}")
-                    logger.error(str(e))
-                else:
-                    logger.error("For instance:\n    %s\n%s", inst, e)
+            check_global_id(inst, get_global_id(inst, schema), used_guids, logger)
+            validate_instance(inst, schema, logger)
 
     if filename:
         # IfcOpenShell uses lazy-loading, so entity instance
@@ -509,7 +681,7 @@ def validate(f: Union[ifcopenshell.file, str], logger: Logger, express_rules=Fal
         # Re capturing the log when validate() is finished
         # iterating over every instance so that all attribute counts
         # are verified.
-        log_internal_cpp_errors(f, filename, logger)
+        log_internal_cpp_errors(f, filename, logger, worker_log)
 
     # Restore the original value for 'use_attribute_value_derived'
     ifcopenshell.ifcopenshell_wrapper.set_feature("use_attribute_value_derived", attribute_value_derived_org)
@@ -518,7 +690,7 @@ def validate(f: Union[ifcopenshell.file, str], logger: Logger, express_rules=Fal
         if hasattr(logger, "set_state"):
             logger.set_state("instance", None)
             logger.set_state("attribute", None)
-        ifcopenshell.express.rule_executor.run(f, logger)
+        ifcopenshell.express.rule_executor.run(f, logger, processes=processes)
 
 
 class LogDetectionHandler(Handler):
@@ -535,6 +707,7 @@ if __name__ == "__main__":
 
     filenames = [x for x in sys.argv[1:] if not x.startswith("--")]
     flags = set(x for x in sys.argv[1:] if x.startswith("--"))
+    processes = next((int(x.split("=")[1]) for x in flags if x.startswith("--processes=")), 1)
 
     for fn in filenames:
         handler = None
@@ -547,7 +720,7 @@ if __name__ == "__main__":
             logger.setLevel(logging.DEBUG)
 
         print("Validating", fn, file=sys.stderr)
-        validate(fn, logger, "--rules" in flags)
+        validate(fn, logger, "--rules" in flags, processes=processes)
 
         if "--json" in flags:
             sys.stdout.reconfigure(encoding="utf-8")
@@ -0,0 +1,60 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import test.bootstrap
+import ifcopenshell.api.pset
+import ifcopenshell.api.root
+import ifcopenshell.api.pset_template
+import ifcopenshell.util.element
+
+
+class TestEditPsets(test.bootstrap.IFC4):
+    def test_editing_many_psets(self):
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(3)]
+        properties = {"FireRating": "2HR", "ThermalTransmittance": 42}
+        psets = {
+            ifcopenshell.api.pset.add_pset(self.file, product=w, name="Pset_WallCommon"): properties for w in walls
+        }
+        ifcopenshell.api.pset.edit_psets(self.file, psets=psets)
+        assert properties == {"FireRating": "2HR", "ThermalTransmittance": 42}
+        for pset in psets:
+            values = {p.Name: p.NominalValue for p in pset.HasProperties}
+            assert values["FireRating"].is_a("IfcLabel")
+            assert values["FireRating"].wrappedValue == "2HR"
+            assert values["ThermalTransmittance"].is_a("IfcThermalTransmittanceMeasure")
+            assert values["ThermalTransmittance"].wrappedValue == 42.0
+
+    def test_editing_and_purging_existing_properties(self):
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(2)]
+        psets = [ifcopenshell.api.pset.add_pset(self.file, product=w, name="Foo_Bar") for w in walls]
+        for pset in psets:
+            ifcopenshell.api.pset.edit_pset(self.file, pset=pset, properties={"Foo": "Bar", "Baz": 1})
+        ifcopenshell.api.pset.edit_psets(self.file, psets={psets[0]: {"Foo": "Qux"}, psets[1]: {"Baz": None}})
+        assert ifcopenshell.util.element.get_pset(walls[0], "Foo_Bar") == {"Foo": "Qux", "Baz": 1, "id": psets[0].id()}
+        assert ifcopenshell.util.element.get_pset(walls[1], "Foo_Bar") == {"Foo": "Bar", "id": psets[1].id()}
+
+    def test_using_a_pset_template(self):
+        template = ifcopenshell.api.pset_template.add_pset_template(self.file, name="Foo_Bar")
+        ifcopenshell.api.pset_template.add_prop_template(
+            self.file, pset_template=template, name="Foo", primary_measure_type="IfcLengthMeasure"
+        )
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Foo_Bar")
+        ifcopenshell.api.pset.edit_psets(self.file, psets={pset: {"Foo": 1}}, pset_template=template)
+        assert pset.HasProperties[0].NominalValue.is_a("IfcLengthMeasure")
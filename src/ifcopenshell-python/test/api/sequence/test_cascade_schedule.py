@@ -19,7 +19,9 @@
 import pytest
 import datetime
 import test.bootstrap
+import ifcopenshell.api.root
 import ifcopenshell.api.sequence
+import ifcopenshell.guid
 
 
 # NOTE: sequence module features relies on entities introduced in IFC4
@@ -64,6 +66,22 @@ class TestCascadeSchedule(test.bootstrap.IFC4):
             self._create_sequence(task2, task, "FINISH_START")
             ifcopenshell.api.sequence.cascade_schedule(self.file, task=task)
 
+    def test_cascading_to_a_successor_once_all_predecessors_are_cascaded(self):
+        task = self._create_task("P1D")
+        task2 = self._create_task("P1D")
+        task3 = self._create_task("P3D")
+        task4 = self._create_task("P1D")
+        self._create_sequence(task, task2, "FINISH_START")
+        self._create_sequence(task, task3, "FINISH_START")
+        self._create_sequence(task2, task4, "FINISH_START")
+        self._create_sequence(task3, task4, "FINISH_START")
+
+        ifcopenshell.api.sequence.cascade_schedule(self.file, task=task)
+        assert task2.TaskTime.ScheduleFinish == "2000-01-02T17:00:00"
+        assert task3.TaskTime.ScheduleFinish == "2000-01-04T17:00:00"
+        assert task4.TaskTime.ScheduleStart == "2000-01-05T09:00:00"
+        assert task4.TaskTime.ScheduleFinish == "2000-01-05T17:00:00"
+
     def test_cascading_finish_to_start(self):
         task = self._create_task("P1D")
         task2 = self._create_task("P2D")
@@ -154,8 +172,33 @@ class TestCascadeSchedule(test.bootstrap.IFC4):
         assert task3.TaskTime.ScheduleStart == "1999-12-30T09:00:00"
         assert task3.TaskTime.ScheduleFinish == "2000-01-01T17:00:00"
 
-    def _create_task(self, duration):
-        task = ifcopenshell.api.sequence.add_task(self.file)
+    def test_cascading_all_tasks_of_a_work_schedule(self):
+        ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcProject")
+        schedule = ifcopenshell.api.sequence.add_work_schedule(self.file)
+        parent = ifcopenshell.api.sequence.add_task(self.file, work_schedule=schedule)
+        task = self._create_task("P1D", parent_task=parent)
+        task2 = self._create_task("P2D", parent_task=parent)
+        task3 = self._create_task("P3D")
+        ifcopenshell.api.sequence.add_task(self.file, work_schedule=schedule)
+        # Sequences created directly don't cascade
+        for predecessor, successor in ((task, task2), (task2, task3)):
+            self.file.createIfcRelSequence(
+                ifcopenshell.guid.new(),
+                RelatingProcess=predecessor,
+                RelatedProcess=successor,
+                SequenceType="FINISH_START",
+            )
+        assert task3.TaskTime.ScheduleStart == "2000-01-01T09:00:00"
+
+        ifcopenshell.api.sequence.cascade_schedule(self.file, work_schedule=schedule)
+        assert task.TaskTime.ScheduleStart == "2000-01-01T09:00:00"
+        assert task2.TaskTime.ScheduleStart == "2000-01-02T09:00:00"
+        assert task2.TaskTime.ScheduleFinish == "2000-01-03T17:00:00"
+        assert task3.TaskTime.ScheduleStart == "2000-01-04T09:00:00"
+        assert task3.TaskTime.ScheduleFinish == "2000-01-06T17:00:00"
+
+    def _create_task(self, duration, parent_task=None):
+        task = ifcopenshell.api.sequence.add_task(self.file, parent_task=parent_task)
         if duration == "P0D":
             task.IsMilestone = True
         task_time = ifcopenshell.api.sequence.add_task_time(self.file, task=task)
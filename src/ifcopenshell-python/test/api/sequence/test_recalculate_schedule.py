@@ -19,6 +19,7 @@
 import pytest
 import datetime
 import test.bootstrap
+import ifcopenshell.guid
 import ifcopenshell.api.root
 import ifcopenshell.api.sequence
 
@@ -47,6 +48,46 @@ class TestRecalculateSchedule(test.bootstrap.IFC4):
         with pytest.raises(RecursionError):
             ifcopenshell.api.sequence.recalculate_schedule(self.file, work_schedule=self.work_schedule)
 
+    def test_describing_the_cycle_in_cyclic_relationships(self):
+        self._add_work_schedule()
+        task = self._create_task("P1D")
+        task2 = self._create_task("P2D")
+        task3 = self._create_task("P2D")
+        task2.Name = "Foo"
+        self._create_sequence(task, task2, "FINISH_START")
+        self._create_sequence(task2, task3, "FINISH_START")
+        # Bypass the API, which would otherwise catch the cycle while cascading
+        self.file.createIfcRelSequence(
+            ifcopenshell.guid.new(), RelatingProcess=task3, RelatedProcess=task2, SequenceType="FINISH_START"
+        )
+        with pytest.raises(RecursionError, match=f"#{task2.id()} Foo -> #{task3.id()}"):
+            ifcopenshell.api.sequence.recalculate_schedule(self.file, work_schedule=self.work_schedule)
+
+    def test_recalculating_only_successors_of_an_edited_task(self):
+        self._add_work_schedule()
+        task = self._create_task("P1D")
+        task2 = self._create_task("P2D")
+        task3 = self._create_task("P3D")
+        self._create_sequence(task, task2, "FINISH_START")
+        self._create_sequence(task, task3, "FINISH_START", lag="P1D")
+        ifcopenshell.api.sequence.recalculate_schedule(self.file, work_schedule=self.work_schedule)
+        # Early dates of tasks that are not successors of the edited task are reused
+        task.TaskTime.EarlyStart = "1999-12-31T09:00:00"
+        ifcopenshell.api.sequence.edit_task_time(
+            self.file, task_time=task2.TaskTime, attributes={"ScheduleDuration": "P5D"}
+        )
+        ifcopenshell.api.sequence.recalculate_schedule(self.file, work_schedule=self.work_schedule, task=task2)
+        assert task.TaskTime.EarlyStart == "1999-12-31T09:00:00"
+        assert task.TaskTime.LateFinish == "2000-01-01T17:00:00"
+        assert task2.TaskTime.EarlyStart == "2000-01-02T09:00:00"
+        assert task2.TaskTime.EarlyFinish == "2000-01-06T17:00:00"
+        assert task2.TaskTime.TotalFloat == "P0D"
+        assert task2.TaskTime.IsCritical is True
+        assert task3.TaskTime.LateStart == "2000-01-04T09:00:00"
+        assert task3.TaskTime.LateFinish == "2000-01-06T17:00:00"
+        assert task3.TaskTime.TotalFloat == "P1D"
+        assert task3.TaskTime.IsCritical is False
+
     def test_recalculating_for_a_single_task(self):
         self._add_work_schedule()
         task = self._create_task("P1D")
@@ -0,0 +1,88 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import pytest
+import test.bootstrap
+import ifcopenshell.api.root
+import ifcopenshell.api.spatial
+import ifcopenshell.api.aggregate
+import ifcopenshell.util.element
+
+
+class TestAssignContainers(test.bootstrap.IFC4):
+    def test_assigning_many_containers(self):
+        storey1 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        storey2 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(4)]
+        rels = ifcopenshell.api.spatial.assign_containers(
+            self.file, relating_structures={storey1: walls[:2], storey2: walls[2:]}
+        )
+        assert [r.RelatingStructure for r in rels] == [storey1, storey2]
+        assert rels[0].RelatedElements == tuple(walls[:2])
+        assert rels[1].RelatedElements == tuple(walls[2:])
+        assert len(self.file.by_type("IfcRelContainedInSpatialStructure")) == 2
+
+    def test_moving_products_between_containers(self):
+        storey1 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        storey2 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(4)]
+        ifcopenshell.api.spatial.assign_container(self.file, products=walls[:3], relating_structure=storey1)
+        ifcopenshell.api.spatial.assign_container(self.file, products=walls[3:], relating_structure=storey2)
+        old_rel_id = storey2.ContainsElements[0].id()
+        rels = ifcopenshell.api.spatial.assign_containers(
+            self.file, relating_structures={storey1: walls[3:], storey2: walls[:2]}
+        )
+        assert [ifcopenshell.util.element.get_container(w) for w in walls] == [storey2, storey2, storey1, storey1]
+        assert set(rels[0].RelatedElements) == {walls[2], walls[3]}
+        assert set(rels[1].RelatedElements) == {walls[0], walls[1]}
+        assert rels[1].id() == old_rel_id
+        ifcopenshell.api.spatial.assign_containers(self.file, relating_structures={storey1: walls[:2]})
+        with pytest.raises(RuntimeError):
+            self.file.by_id(old_rel_id)
+
+    def test_assigning_to_the_last_listed_container(self):
+        storey1 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        storey2 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        rels = ifcopenshell.api.spatial.assign_containers(
+            self.file, relating_structures={storey1: [wall], storey2: [wall]}
+        )
+        assert rels[0] is None
+        assert ifcopenshell.util.element.get_container(wall) == storey2
+
+    def test_doing_nothing_if_the_containers_are_already_assigned(self):
+        storey = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        rel = ifcopenshell.api.spatial.assign_container(self.file, products=[wall], relating_structure=storey)
+        total_elements = len([e for e in self.file])
+        assert ifcopenshell.api.spatial.assign_containers(self.file, relating_structures={storey: [wall]}) == [rel]
+        assert len([e for e in self.file]) == total_elements
+
+    def test_unassigning_aggregates(self):
+        building = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuilding")
+        storey = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        ifcopenshell.api.aggregate.assign_object(self.file, products=[wall], relating_object=building)
+        ifcopenshell.api.spatial.assign_containers(self.file, relating_structures={storey: [wall]})
+        assert ifcopenshell.util.element.get_aggregate(wall) is None
+        assert ifcopenshell.util.element.get_container(wall) == storey
+
+
+class TestAssignContainersIFC2X3(test.bootstrap.IFC2X3, TestAssignContainers):
+    pass
@@ -18,6 +18,11 @@
 
 import test.bootstrap
 import ifcopenshell.api
+import ifcopenshell.api.aggregate
+import ifcopenshell.api.attribute
+import ifcopenshell.api.geometry
+import ifcopenshell.api.root
+import ifcopenshell.util.placement
 from datetime import datetime
 from typing import Union
 
@@ -32,3 +37,85 @@ def deprecation_check(test):
 
 class TestTemporarySupportForDeprecatedAPIArguments(test.bootstrap.IFC4):
     pass
+
+
+class TestBatchListeners(test.bootstrap.IFC4):
+    def setup_listeners(self):
+        self.notifications = []
+        ifcopenshell.api.add_pre_listener("root.create_entity", "test", lambda *a: self.notifications.append("pre"))
+        ifcopenshell.api.add_post_listener(
+            "root.create_entity", "test", lambda u, f, s: self.notifications.append(s["name"])
+        )
+
+    def teardown_method(self):
+        ifcopenshell.api.remove_all_listeners()
+
+    def test_deferring_post_listeners_until_the_end_of_the_batch(self):
+        self.setup_listeners()
+        with ifcopenshell.api.batch_listeners():
+            ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Foo")
+            ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Foo")
+            ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Bar")
+            assert self.notifications == ["pre", "pre", "pre"]
+        assert self.notifications == ["pre", "pre", "pre", "Foo", "Foo", "Bar"]
+
+    def test_coalescing_repeated_identical_notifications(self):
+        self.setup_listeners()
+        with ifcopenshell.api.batch_listeners(coalesce=True):
+            with ifcopenshell.api.batch_listeners():
+                ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Foo")
+                ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Bar")
+                ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Foo")
+            assert self.notifications == ["pre", "pre", "pre"]
+        assert self.notifications == ["pre", "pre", "pre", "Foo", "Bar"]
+
+    def test_dispatching_listeners_after_an_error(self):
+        self.setup_listeners()
+        try:
+            with ifcopenshell.api.batch_listeners():
+                ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Foo")
+                raise ValueError()
+        except ValueError:
+            pass
+        assert self.notifications == ["pre", "Foo"]
+
+    def test_notifying_listeners_which_depend_on_settings(self):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        ifcopenshell.api.geometry.edit_object_placement(self.file, product=wall)
+        resolver = ifcopenshell.util.placement.PlacementResolver(self.file)
+        point = wall.ObjectPlacement.RelativePlacement.Location
+        for coalesce in (False, True):
+            assert resolver.get_local_placement(wall.ObjectPlacement)[0][3] == 0.0
+            with ifcopenshell.api.batch_listeners(coalesce=coalesce):
+                ifcopenshell.api.attribute.edit_attributes(
+                    self.file, product=point, attributes={"Coordinates": (5.0, 0.0, 0.0)}
+                )
+                ifcopenshell.api.attribute.edit_attributes(self.file, product=wall, attributes={"Name": "x"})
+            assert resolver.get_local_placement(wall.ObjectPlacement)[0][3] == 5.0
+            ifcopenshell.api.attribute.edit_attributes(
+                self.file, product=point, attributes={"Coordinates": (0.0, 0.0, 0.0)}
+            )
+
+
+class TestProfileUsecases(test.bootstrap.IFC4):
+    def test_counting_and_timing_usecases(self):
+        with ifcopenshell.api.profile_usecases() as profile:
+            ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcProject")
+            ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+            ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab")
+        calls, total, self_time = profile.stats["root.create_entity"]
+        assert calls == 3
+        assert 0 < self_time <= total
+        assert ifcopenshell.api.usecase_profile is None
+        table = profile.to_table().splitlines()
+        assert table[0].startswith("Usecase")
+        assert table[1].split()[:2] == ["root.create_entity", "3"]
+
+    def test_excluding_nested_usecases_from_self_time(self):
+        project = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcProject")
+        site = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcSite")
+        with ifcopenshell.api.profile_usecases() as profile:
+            ifcopenshell.api.aggregate.assign_object(self.file, products=[site], relating_object=project)
+        assert profile.stats["owner.create_owner_history"][0] == 1
+        calls, total, self_time = profile.stats["aggregate.assign_object"]
+        assert self_time < total
@@ -0,0 +1,79 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import pytest
+import test.bootstrap
+import ifcopenshell.api.root
+import ifcopenshell.api.type
+import ifcopenshell.api.material
+import ifcopenshell.api.geometry
+import ifcopenshell.util.element
+import ifcopenshell.util.representation
+
+
+class TestAssignTypes(test.bootstrap.IFC4):
+    def test_assigning_many_types(self):
+        type1 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType")
+        type2 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType")
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(4)]
+        rels = ifcopenshell.api.type.assign_types(self.file, relating_types={type1: walls[:2], type2: walls[2:]})
+        assert [r.RelatingType for r in rels] == [type1, type2]
+        assert rels[0].RelatedObjects == tuple(walls[:2])
+        assert rels[1].RelatedObjects == tuple(walls[2:])
+        assert [ifcopenshell.util.element.get_type(w) for w in walls] == [type1, type1, type2, type2]
+
+    def test_moving_occurrences_between_types(self):
+        type1 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType")
+        type2 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType")
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(4)]
+        ifcopenshell.api.type.assign_type(self.file, related_objects=walls[:3], relating_type=type1)
+        old_rel = ifcopenshell.api.type.assign_type(self.file, related_objects=walls[3:], relating_type=type2)
+        old_rel_id = old_rel.id()
+        rels = ifcopenshell.api.type.assign_types(self.file, relating_types={type1: walls[3:], type2: walls[:2]})
+        assert [ifcopenshell.util.element.get_type(w) for w in walls] == [type2, type2, type1, type1]
+        assert set(rels[0].RelatedObjects) == {walls[2], walls[3]}
+        assert set(rels[1].RelatedObjects) == {walls[0], walls[1]}
+        assert rels[1].id() == old_rel_id
+        ifcopenshell.api.type.assign_types(self.file, relating_types={type1: walls[:2]})
+        with pytest.raises(RuntimeError):
+            self.file.by_id(old_rel_id)
+
+    def test_doing_nothing_if_the_types_are_already_assigned(self):
+        element_type = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType")
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        rel = ifcopenshell.api.type.assign_type(self.file, related_objects=[wall], relating_type=element_type)
+        total_elements = len([e for e in self.file])
+        assert ifcopenshell.api.type.assign_types(self.file, relating_types={element_type: [wall]}) == [rel]
+        assert len([e for e in self.file]) == total_elements
+
+    def test_mapping_representations_and_material_usages(self):
+        element_type = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType")
+        context = self.file.createIfcGeometricRepresentationContext()
+        rep = self.file.createIfcShapeRepresentation(ContextOfItems=context)
+        ifcopenshell.api.geometry.assign_representation(self.file, product=element_type, representation=rep)
+        ifcopenshell.api.material.assign_material(self.file, products=[element_type], type="IfcMaterialLayerSet")
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(2)]
+        ifcopenshell.api.type.assign_types(self.file, relating_types={element_type: walls})
+        for wall in walls:
+            assert ifcopenshell.util.representation.get_representation(wall, context=context)
+            assert ifcopenshell.util.element.get_material(wall).is_a("IfcMaterialLayerSetUsage")
+
+
+class TestAssignTypesIFC2X3(test.bootstrap.IFC2X3, TestAssignTypes):
+    pass
@@ -0,0 +1,102 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares per-element API usecases with their bulk equivalents
+
+Usage: python -m test.benchmark.bench_api_bulk [number of elements] [number of containers or types]
+"""
+
+import sys
+import time
+import ifcopenshell
+import ifcopenshell.api.pset
+import ifcopenshell.api.root
+import ifcopenshell.api.type
+import ifcopenshell.api.spatial
+
+
+def create_model(total, total_groups):
+    f = ifcopenshell.file(schema="IFC4")
+    ifcopenshell.api.root.create_entity(f, ifc_class="IfcProject")
+    storeys = [ifcopenshell.api.root.create_entity(f, ifc_class="IfcBuildingStorey") for i in range(total_groups)]
+    types = [ifcopenshell.api.root.create_entity(f, ifc_class="IfcWallType") for i in range(total_groups)]
+    walls = [ifcopenshell.api.root.create_entity(f, ifc_class="IfcWall") for i in range(total)]
+    psets = [ifcopenshell.api.pset.add_pset(f, product=w, name="Pset_WallCommon") for w in walls]
+    return f, storeys, types, walls, psets
+
+
+def group(elements, groups):
+    return {g: elements[i :: len(groups)] for i, g in enumerate(groups)}
+
+
+def assign_container(f, storeys, types, walls, psets):
+    for storey, products in group(walls, storeys).items():
+        for product in products:
+            ifcopenshell.api.spatial.assign_container(f, products=[product], relating_structure=storey)
+
+
+def assign_containers(f, storeys, types, walls, psets):
+    ifcopenshell.api.spatial.assign_containers(f, relating_structures=group(walls, storeys))
+
+
+def assign_type(f, storeys, types, walls, psets):
+    for relating_type, related_objects in group(walls, types).items():
+        for related_object in related_objects:
+            ifcopenshell.api.type.assign_type(f, related_objects=[related_object], relating_type=relating_type)
+
+
+def assign_types(f, storeys, types, walls, psets):
+    ifcopenshell.api.type.assign_types(f, relating_types=group(walls, types))
+
+
+def edit_pset(f, storeys, types, walls, psets):
+    for pset in psets:
+        ifcopenshell.api.pset.edit_pset(f, pset=pset, properties={"FireRating": "2HR", "IsExternal": True})
+
+
+def edit_psets(f, storeys, types, walls, psets):
+    properties = {"FireRating": "2HR", "IsExternal": True}
+    ifcopenshell.api.pset.edit_psets(f, psets={pset: properties for pset in psets})
+
+
+def measure(operation, total, total_groups):
+    model = create_model(total, total_groups)
+    start = time.perf_counter()
+    operation(*model)
+    return time.perf_counter() - start
+
+
+def run(total, total_groups):
+    print(f"{'Usecase':<18}{'Per element (us/op)':>22}{'Bulk (us/op)':>16}{'Speedup':>10}")
+    for per_element, bulk in (
+        (assign_container, assign_containers),
+        (assign_type, assign_types),
+        (edit_pset, edit_psets),
+    ):
+        per_element_time = measure(per_element, total, total_groups)
+        bulk_time = measure(bulk, total, total_groups)
+        print(
+            f"{per_element.__name__:<18}"
+            f"{per_element_time / total * 1e6:>22.2f}"
+            f"{bulk_time / total * 1e6:>16.2f}"
+            f"{per_element_time / bulk_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000, int(sys.argv[2]) if len(sys.argv) > 2 else 10)
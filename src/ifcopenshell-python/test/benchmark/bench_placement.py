@@ -0,0 +1,71 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares resolving element placements one by one with a PlacementResolver
+
+Usage: python -m test.benchmark.bench_placement [number of elements]
+"""
+
+import sys
+import time
+import numpy as np
+import ifcopenshell
+import ifcopenshell.util.placement
+
+
+def create_model(total):
+    f = ifcopenshell.file()
+    z = f.createIfcDirection((0.0, 0.0, 1.0))
+    x = f.createIfcDirection((1.0, 0.0, 0.0))
+
+    def create_placement(parent, coordinates):
+        location = f.createIfcCartesianPoint(coordinates)
+        return f.createIfcLocalPlacement(parent, f.createIfcAxis2Placement3D(location, z, x))
+
+    site = create_placement(None, (100.0, 200.0, 0.0))
+    building = create_placement(site, (10.0, 0.0, 0.0))
+    storeys = [create_placement(building, (0.0, 0.0, i * 3.0)) for i in range(10)]
+    for i in range(total):
+        f.createIfcWall(ObjectPlacement=create_placement(storeys[i % 10], (float(i), 0.0, 0.0)))
+    return f
+
+
+def run(total):
+    f = create_model(total)
+    walls = f.by_type("IfcWall")
+
+    start = time.perf_counter()
+    expected = [ifcopenshell.util.placement.get_local_placement(w.ObjectPlacement) for w in walls]
+    print(f"{'get_local_placement':<40}{time.perf_counter() - start:>10.3f}s")
+
+    resolver = ifcopenshell.util.placement.PlacementResolver(f, should_track_api=False)
+    start = time.perf_counter()
+    results = [resolver.get_local_placement(w.ObjectPlacement) for w in walls]
+    print(f"{'PlacementResolver.get_local_placement':<40}{time.perf_counter() - start:>10.3f}s")
+    assert np.allclose(results, expected)
+
+    resolver.invalidate()
+    start = time.perf_counter()
+    ids, matrices = resolver.get_all_placements()
+    print(f"{'PlacementResolver.get_all_placements':<40}{time.perf_counter() - start:>10.3f}s")
+    indices = {placement_id: i for i, placement_id in enumerate(ids.tolist())}
+    assert np.allclose([matrices[indices[w.ObjectPlacement.id()]] for w in walls], expected)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
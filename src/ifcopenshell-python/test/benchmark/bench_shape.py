@@ -0,0 +1,145 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares per-face Python measurements with the vectorised and batch ones
+
+Usage: python -m test.benchmark.bench_shape [number of elements]
+"""
+
+import sys
+import time
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api.context
+import ifcopenshell.api.geometry
+import ifcopenshell.api.project
+import ifcopenshell.api.root
+import ifcopenshell.api.unit
+import ifcopenshell.geom
+import ifcopenshell.util.shape
+
+
+def get_volume_per_face(geometry):
+    # The previous implementation of ifcopenshell.util.shape.get_volume
+    def signed_triangle_volume(p1, p2, p3):
+        v321 = p3[0] * p2[1] * p1[2]
+        v231 = p2[0] * p3[1] * p1[2]
+        v312 = p3[0] * p1[1] * p2[2]
+        v132 = p1[0] * p3[1] * p2[2]
+        v213 = p2[0] * p1[1] * p3[2]
+        v123 = p1[0] * p2[1] * p3[2]
+        return (1.0 / 6.0) * (-v321 + v231 + v312 - v132 - v213 + v123)
+
+    verts = geometry.verts
+    faces = geometry.faces
+    grouped_verts = [[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)]
+    volumes = [
+        signed_triangle_volume(grouped_verts[faces[i]], grouped_verts[faces[i + 1]], grouped_verts[faces[i + 2]])
+        for i in range(0, len(faces), 3)
+    ]
+    return abs(sum(volumes))
+
+
+def get_footprint_perimeter_per_face(geometry):
+    # The previous implementation of ifcopenshell.util.shape.get_footprint_perimeter
+    vertices = ifcopenshell.util.shape.get_vertices(geometry)
+    faces = ifcopenshell.util.shape.get_faces(geometry)
+    v1 = vertices[faces[:, 1]] - vertices[faces[:, 0]]
+    v2 = vertices[faces[:, 2]] - vertices[faces[:, 0]]
+    triangle_normals = np.cross(v1, v2)
+    triangle_normals = triangle_normals / np.linalg.norm(triangle_normals, axis=1)[:, np.newaxis]
+    negative_z_faces = faces[np.where(triangle_normals[:, 2] < -1e-6)[0]]
+    all_edges = set()
+    shared_edges = set()
+    for face in negative_z_faces:
+        for i in range(3):
+            edge = (face[i], face[(i + 1) % 3])
+            if (edge[1], edge[0]) in all_edges or (edge[0], edge[1]) in all_edges:
+                shared_edges.add((edge[0], edge[1]))
+                shared_edges.add((edge[1], edge[0]))
+            else:
+                all_edges.add(edge)
+    return sum([np.linalg.norm(vertices[e[0]] - vertices[e[1]]) for e in (all_edges - shared_edges)])
+
+
+def create_shapes(total, is_dense=False):
+    f = ifcopenshell.api.project.create_file()
+    ifcopenshell.api.root.create_entity(f, ifc_class="IfcProject")
+    ifcopenshell.api.unit.assign_unit(f)
+    model = ifcopenshell.api.context.add_context(f, context_type="Model")
+    body = ifcopenshell.api.context.add_context(
+        f, context_type="Model", context_identifier="Body", target_view="MODEL_VIEW", parent=model
+    )
+    for i in range(total):
+        if is_dense:
+            element = ifcopenshell.api.root.create_entity(f, ifc_class="IfcColumn")
+            profile = f.createIfcCircleProfileDef("AREA", None, None, 0.1 + i % 10 * 0.05)
+            extrusion = f.createIfcExtrudedAreaSolid(profile, None, f.createIfcDirection((0.0, 0.0, 1.0)), 3.0)
+            representation = f.createIfcShapeRepresentation(body, "Body", "SweptSolid", [extrusion])
+        else:
+            element = ifcopenshell.api.root.create_entity(f, ifc_class="IfcWall")
+            representation = ifcopenshell.api.geometry.add_wall_representation(
+                f, context=body, length=1.0 + i % 10, height=3.0, thickness=0.2
+            )
+        ifcopenshell.api.geometry.assign_representation(f, product=element, representation=representation)
+    return [ifcopenshell.geom.create_shape(ifcopenshell.geom.settings(), e) for e in f.by_type("IfcElement")]
+
+
+def measure(name, function, baseline=None):
+    start = time.perf_counter()
+    result = function()
+    duration = time.perf_counter() - start
+    if baseline is not None:
+        assert np.allclose(result, baseline)
+    print(f"{name:<40}{duration * 1e3:>12.2f}")
+    return result
+
+
+def run(total):
+    for is_dense in (False, True):
+        # Keep the shapes alive, as they own the geometry buffers.
+        shapes = create_shapes(total, is_dense)
+        geometries = [s.geometry for s in shapes]
+        triangles = sum(len(g.faces) for g in geometries) // 3 // total
+        print(f"{total} elements with {triangles} triangles each")
+        print(f"{'Measure':<40}{'Total (ms)':>12}")
+        volumes = measure("get_volume (per face)", lambda: [get_volume_per_face(g) for g in geometries])
+        measure("get_volume", lambda: [ifcopenshell.util.shape.get_volume(g) for g in geometries], volumes)
+        perimeters = measure(
+            "get_footprint_perimeter (per face)", lambda: [get_footprint_perimeter_per_face(g) for g in geometries]
+        )
+        measure(
+            "get_footprint_perimeter",
+            lambda: [ifcopenshell.util.shape.get_footprint_perimeter(g) for g in geometries],
+            perimeters,
+        )
+        measures = ["get_volume", "get_area", "get_side_area", "get_outer_surface_area", "get_total_edge_length"]
+        per_geometry = measure(
+            "5 measures (per geometry)",
+            lambda: [[getattr(ifcopenshell.util.shape, m)(g) for g in geometries] for m in measures],
+        )
+        measure(
+            "5 measures (get_measures)",
+            lambda: [r for r in ifcopenshell.util.shape.get_measures(geometries, measures).values()],
+            per_geometry,
+        )
+        print()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,96 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measures the overhead of journaling undo history per operation type
+
+Usage: python -m test.benchmark.bench_transaction [number of operations]
+"""
+
+import sys
+import time
+import tracemalloc
+import ifcopenshell
+import ifcopenshell.guid
+
+
+def create_walls(f, total):
+    history = f.createIfcOwnerHistory()
+    return [
+        f.createIfcWall(ifcopenshell.guid.new(), history, f"Wall {i}", PredefinedType="NOTDEFINED")
+        for i in range(total)
+    ]
+
+
+def create(f, total):
+    create_walls(f, total)
+
+
+def edit(f, total):
+    for wall in f.by_type("IfcWall"):
+        wall.Name = "Edited"
+
+
+def delete(f, total):
+    for wall in f.by_type("IfcWall"):
+        f.remove(wall)
+
+
+def batch_delete(f, total):
+    f.batch()
+    for wall in f.by_type("IfcWall"):
+        f.remove(wall)
+    f.unbatch()
+
+
+def measure(operation, total, is_journaled):
+    f = ifcopenshell.file()
+    if operation is not create:
+        walls = create_walls(f, total)
+        f.createIfcRelContainedInSpatialStructure(
+            ifcopenshell.guid.new(), RelatedElements=walls, RelatingStructure=f.createIfcBuildingStorey()
+        )
+    tracemalloc.start()
+    start = time.perf_counter()
+    if is_journaled:
+        f.begin_transaction()
+    operation(f, total)
+    if is_journaled:
+        f.end_transaction()
+    duration = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    journal = f.history[-1].get_memory_usage() if is_journaled else 0
+    return duration, memory, journal
+
+
+def run(total):
+    print(f"{'Operation':<14}{'Plain (us/op)':>16}{'Journaled (us/op)':>20}{'Traced (B/op)':>16}{'Journal (B/op)':>16}")
+    for operation in (create, edit, delete, batch_delete):
+        plain, plain_memory, _ = measure(operation, total, False)
+        journaled, journaled_memory, journal = measure(operation, total, True)
+        print(
+            f"{operation.__name__:<14}"
+            f"{plain / total * 1e6:>16.2f}"
+            f"{journaled / total * 1e6:>20.2f}"
+            f"{(journaled_memory - plain_memory) / total:>16.1f}"
+            f"{journal / total:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,61 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measures schema validation time for an increasing number of worker processes
+
+Usage: python -m test.benchmark.bench_validate [model.ifc] [maximum number of processes]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+import ifcopenshell
+import ifcopenshell.guid
+import ifcopenshell.validate
+
+
+def create_model(filepath, total):
+    f = ifcopenshell.file(schema="IFC4")
+    history = f.createIfcOwnerHistory()
+    for i in range(total):
+        # Every 10th wall lacks its mandatory owner history, so that errors are merged as well
+        f.createIfcWall(ifcopenshell.guid.new(), history if i % 10 else None, f"Wall {i}")
+    f.write(filepath)
+
+
+def run(filepath, max_processes):
+    processes = 1
+    while processes <= max_processes:
+        logger = ifcopenshell.validate.json_logger()
+        start = time.perf_counter()
+        ifcopenshell.validate.validate(filepath, logger, processes=processes)
+        duration = time.perf_counter() - start
+        print(f"{processes:>3} processes{duration:>10.3f}s{len(logger.statements):>10} errors")
+        processes *= 2
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        filepath = sys.argv[1]
+    else:
+        filepath = os.path.join(tempfile.gettempdir(), "bench_validate.ifc")
+        if not os.path.exists(filepath):
+            create_model(filepath, 100000)
+    run(filepath, int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count())
@@ -151,6 +151,78 @@ class TestTransaction(test.bootstrap.IFC4):
         self.file.redo()
         assert len(list(self.file)) == 2
 
+    def test_that_undoing_deletion_restores_the_order_of_aggregated_inverse_relationships(self):
+        elements = [self.file.createIfcWall(GlobalId=f"id{i}") for i in range(4)]
+        rel = self.file.createIfcRelAggregates(RelatedObjects=elements)
+        self.file.begin_transaction()
+        self.file.remove(elements[2])
+        self.file.remove(elements[0])
+        self.file.end_transaction()
+        assert [e.GlobalId for e in rel.RelatedObjects] == ["id1", "id3"]
+        self.file.undo()
+        assert [e.GlobalId for e in rel.RelatedObjects] == ["id0", "id1", "id2", "id3"]
+
+    def test_that_undoing_batched_deletion_restores_the_order_of_aggregated_inverse_relationships(self):
+        elements = [self.file.createIfcWall(GlobalId=f"id{i}") for i in range(4)]
+        rel = self.file.createIfcRelAggregates(RelatedObjects=elements)
+        self.file.begin_transaction()
+        self.file.batch()
+        self.file.remove(elements[2])
+        self.file.remove(elements[0])
+        self.file.unbatch()
+        self.file.end_transaction()
+        assert [e.GlobalId for e in rel.RelatedObjects] == ["id1", "id3"]
+        self.file.undo()
+        assert [e.GlobalId for e in rel.RelatedObjects] == ["id0", "id1", "id2", "id3"]
+
+    def test_that_you_can_undo_and_redo_deletion_with_typed_values(self):
+        value = self.file.createIfcPropertySingleValue(Name="Foo", NominalValue=self.file.createIfcLabel("Bar"))
+        value_id = value.id()
+        self.file.begin_transaction()
+        self.file.remove(value)
+        self.file.end_transaction()
+        self.file.undo()
+        value = self.file.by_id(value_id)
+        assert value.Name == "Foo"
+        assert value.NominalValue.is_a() == "IfcLabel"
+        assert value.NominalValue.wrappedValue == "Bar"
+
+    def test_that_journaled_values_are_interned(self):
+        self.file.begin_transaction()
+        for i in range(10):
+            self.file.createIfcWall(GlobalId=f"id{i}", PredefinedType="NOTDEFINED")
+        walls = self.file.by_type("IfcWall")
+        for wall in walls:
+            wall.Name = "Name"
+        enums = {id(payload[1][-1]) for payload in self.file.transaction.payloads[:10]}
+        names = {id(payload[1]) for payload in self.file.transaction.payloads[10:]}
+        assert len(enums) == 1
+        assert len(names) == 1
+        self.file.end_transaction()
+
+    def test_exceeding_the_history_memory_limit(self):
+        self.file.begin_transaction()
+        self.file.createIfcWall()
+        self.file.end_transaction()
+        assert len(self.file.history) == 1
+        self.file.set_history_memory_limit(1024)
+        self.file.begin_transaction()
+        for i in range(100):
+            self.file.createIfcWall()
+        self.file.end_transaction()
+        assert len(self.file.history) == 0
+        self.file.undo()
+        assert len(self.file.by_type("IfcWall")) == 101
+
+    def test_trimming_old_transactions_to_fit_the_history_memory_limit(self):
+        for i in range(3):
+            self.file.begin_transaction()
+            self.file.createIfcWall()
+            self.file.end_transaction()
+        limit = self.file.history[-1].get_memory_usage() * 2
+        self.file.set_history_memory_limit(limit)
+        assert len(self.file.history) == 2
+
 
 class TestFile(test.bootstrap.IFC4):
     def test_creating_a_new_file(self):
@@ -0,0 +1,86 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2024 Thomas Krijnen <thomas@aecgeeks.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.api.context
+import ifcopenshell.api.geometry
+import ifcopenshell.api.root
+import ifcopenshell.api.unit
+import ifcopenshell.geom
+import ifcopenshell.geom.cache
+
+
+class TestCachedIterator(test.bootstrap.IFC4):
+    def setup_walls(self, total=3):
+        ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcProject")
+        ifcopenshell.api.unit.assign_unit(self.file)
+        model = ifcopenshell.api.context.add_context(self.file, context_type="Model")
+        body = ifcopenshell.api.context.add_context(
+            self.file, context_type="Model", context_identifier="Body", target_view="MODEL_VIEW", parent=model
+        )
+        walls = []
+        for i in range(total):
+            wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+            matrix = np.eye(4)
+            matrix[0][3] = i * 2.0
+            ifcopenshell.api.geometry.edit_object_placement(self.file, product=wall, matrix=matrix)
+            representation = ifcopenshell.api.geometry.add_wall_representation(
+                self.file, context=body, length=1.0, height=3.0, thickness=0.2
+            )
+            ifcopenshell.api.geometry.assign_representation(self.file, product=wall, representation=representation)
+            walls.append(wall)
+        return walls
+
+    def iterate(self, cache):
+        it = ifcopenshell.geom.cache.cached_iterator(ifcopenshell.geom.settings(), self.file, cache)
+        shapes = {s.id: (s.guid, s.geometry.verts, s.geometry.faces, s.transformation.matrix) for s in it}
+        return it, shapes
+
+    def test_reusing_cached_shapes(self, tmp_path):
+        self.setup_walls()
+        cache = ifcopenshell.geom.cache.geometry_cache(tmp_path)
+        it, shapes = self.iterate(cache)
+        assert (it.total_cached, it.total_processed) == (0, 3)
+        it, cached_shapes = self.iterate(cache)
+        assert (it.total_cached, it.total_processed) == (3, 0)
+        assert cached_shapes == shapes
+
+    def test_only_processing_edited_shapes(self, tmp_path):
+        walls = self.setup_walls()
+        cache = ifcopenshell.geom.cache.geometry_cache(tmp_path)
+        self.iterate(cache)
+        walls[0].ObjectPlacement.RelativePlacement.Location.Coordinates = (10.0, 0.0, 0.0)
+        it, shapes = self.iterate(cache)
+        assert (it.total_cached, it.total_processed) == (2, 1)
+
+    def test_sharing_the_cache_between_files_with_identical_content(self, tmp_path):
+        self.setup_walls()
+        cache = ifcopenshell.geom.cache.geometry_cache(tmp_path)
+        self.iterate(cache)
+        self.file = ifcopenshell.file.from_string(self.file.wrapped_data.to_string())
+        it, shapes = self.iterate(cache)
+        assert (it.total_cached, it.total_processed) == (3, 0)
+
+    def test_keys_depend_on_settings(self):
+        wall = self.setup_walls(1)[0]
+        settings = ifcopenshell.geom.settings()
+        key = ifcopenshell.geom.cache.representation_hasher(self.file, settings).get_product_key(wall)
+        settings.set("use-world-coords", True)
+        assert key != ifcopenshell.geom.cache.representation_hasher(self.file, settings).get_product_key(wall)
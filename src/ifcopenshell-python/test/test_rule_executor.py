@@ -0,0 +1,110 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Thomas Krijnen <thomas@aecgeeks.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import ast
+import pytest
+import test.bootstrap
+import ifcopenshell.api.pset
+import ifcopenshell.api.root
+import ifcopenshell.validate
+import ifcopenshell.express.rule_executor as subject
+
+
+class RuleExecutorTest(test.bootstrap.IFC4):
+    def get_errors(self, **kwargs):
+        logger = ifcopenshell.validate.json_logger()
+        subject.run(self.file, logger, **kwargs)
+        return [(str(s["instance"]), s["attribute"], s["message"]) for s in logger.statements]
+
+    def get_rules(self, errors):
+        return sorted((instance, attribute) for instance, attribute, message in errors)
+
+    def create_model(self):
+        self.project = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcProject")
+        self.walls = []
+        for i in range(3):
+            wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+            ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Pset_A")
+            self.walls.append(wall)
+
+
+class TestLoadRules(RuleExecutorTest):
+    def test_compiling_rules_once(self, monkeypatch):
+        fn = subject.get_rules_path(self.file)
+        key, lines, scope = subject.load_rules(fn, self.file.schema_identifier)
+        assert subject.load_rules(fn, self.file.schema_identifier)[2] is scope
+        assert os.path.isfile(os.path.join(os.path.dirname(fn), "__pycache__", f"IFC4.{key}.rules"))
+
+        # A new process loads the marshalled bytecode instead of rewriting the assertions again
+        monkeypatch.setattr(subject, "compiled_rules", {})
+        monkeypatch.setattr(ast, "parse", None)
+        key2, lines2, scope2 = subject.load_rules(fn, self.file.schema_identifier)
+        assert key2 == key
+        assert lines2 == lines
+        assert scope2 is not scope
+        assert scope2.keys() == scope.keys()
+
+
+class TestRun(RuleExecutorTest):
+    def test_run(self):
+        self.create_model()
+        assert self.get_rules(self.get_errors()) == [(str(self.project), "IfcProject.HasName")]
+
+    def test_checking_in_parallel(self):
+        self.create_model()
+        self.project.Name = None
+        for wall in self.walls:
+            ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Pset_B").Name = "Pset_A"
+        errors = self.get_errors()
+        assert len(errors) == 4
+        assert self.get_errors(processes=2) == errors
+
+
+class TestRunIncrementally(RuleExecutorTest):
+    def test_run(self):
+        self.create_model()
+        state = subject.incremental_state()
+        assert self.get_errors(state=state) == self.get_errors()
+        self.project.Name = "Foo"
+        assert self.get_errors(state=state) == []
+        self.project.Name = None
+        assert self.get_errors(state=state) == self.get_errors()
+
+    def test_checking_instances_reaching_a_modified_instance_through_an_inverse(self):
+        self.create_model()
+        wall = self.walls[0]
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Pset_B")
+        state = subject.incremental_state()
+        assert (str(wall), "IfcObject.UniquePropertySetNames") not in self.get_rules(self.get_errors(state=state))
+        pset.Name = "Pset_A"
+        errors = self.get_errors(state=state)
+        assert (str(wall), "IfcObject.UniquePropertySetNames") in self.get_rules(errors)
+        assert errors == self.get_errors()
+
+    def test_removing_instances(self):
+        self.create_model()
+        wall = self.walls[0]
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Pset_B")
+        pset.Name = "Pset_A"
+        state = subject.incremental_state()
+        assert (str(wall), "IfcObject.UniquePropertySetNames") in self.get_rules(self.get_errors(state=state))
+        ifcopenshell.api.pset.remove_pset(self.file, product=wall, pset=pset)
+        errors = self.get_errors(state=state)
+        assert (str(wall), "IfcObject.UniquePropertySetNames") not in self.get_rules(errors)
+        assert errors == self.get_errors()
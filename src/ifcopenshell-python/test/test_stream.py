@@ -0,0 +1,136 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Thomas Krijnen <thomas@aecgeeks.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pytest
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.api.root
+import ifcopenshell.api.pset
+from ifcopenshell.stream import stream_index, tokenize_arguments, decode_string
+
+
+class TestIndexedStream(test.bootstrap.IFC4):
+    def write(self, tmp_path):
+        filepath = str(tmp_path / "model.ifc")
+        self.file.write(filepath)
+        return filepath
+
+    def test_reading_attributes(self, tmp_path):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="It's a \\ wall")
+        wall.Description = "Ünïcode"
+        filepath = self.write(tmp_path)
+        stream = ifcopenshell.indexed_stream(filepath)
+        streamed_wall = stream.by_id(wall.id())
+        assert streamed_wall.is_a() == "IfcWall"
+        assert streamed_wall.GlobalId == wall.GlobalId
+        assert streamed_wall.Name == "It's a \\ wall"
+        assert streamed_wall.Description == "Ünïcode"
+        assert streamed_wall.OwnerHistory is None
+
+    def test_reading_references_and_typed_values(self, tmp_path):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Foo_Bar")
+        ifcopenshell.api.pset.edit_pset(self.file, pset=pset, properties={"Label": "Baz", "Number": 4.2})
+        filepath = self.write(tmp_path)
+        stream = ifcopenshell.indexed_stream(filepath)
+        streamed_pset = stream.by_id(pset.id())
+        values = {p.Name: p.NominalValue for p in streamed_pset.HasProperties}
+        assert values["Label"].is_a() == "IfcLabel"
+        assert values["Label"].wrappedValue == "Baz"
+        assert values["Number"].wrappedValue == 4.2
+
+    def test_getting_by_type_and_inverses(self, tmp_path):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        slab = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcSlab")
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Foo_Bar")
+        filepath = self.write(tmp_path)
+        stream = ifcopenshell.indexed_stream(filepath)
+        assert {e.id() for e in stream.by_type("IfcElement")} == {wall.id(), slab.id()}
+        assert [e.id() for e in stream.by_type("IfcElement", include_subtypes=False)] == []
+        streamed_wall = stream.by_id(wall.id())
+        assert {e.id() for e in stream.get_inverse(streamed_wall)} == {pset.DefinesOccurrence[0].id()}
+        assert streamed_wall.IsDefinedBy[0].RelatingPropertyDefinition.id() == pset.id()
+
+    def test_repr_is_the_raw_record(self, tmp_path):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Foo")
+        filepath = self.write(tmp_path)
+        stream = ifcopenshell.indexed_stream(filepath)
+        assert repr(stream.by_id(wall.id())) == f"#{wall.id()}=IFCWALL('{wall.GlobalId}',$,'Foo',$,$,$,$,$,$);"
+
+    def test_persisting_and_reloading_the_index(self, tmp_path):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        ifcopenshell.api.pset.add_pset(self.file, product=wall, name="Foo_Bar")
+        filepath = self.write(tmp_path)
+        stream = ifcopenshell.indexed_stream(filepath)
+        assert os.path.isfile(filepath + ".index.npz")
+        index = stream_index.load(filepath + ".index.npz", filepath)
+        assert index is not None
+        assert list(index.ids) == list(stream.index.ids)
+        assert index.get_class(wall.id()) == "IFCWALL"
+        assert list(index.get_inverse_ids(wall.id())) == [wall.IsDefinedBy[0].id()]
+
+    def test_rebuilding_a_stale_index(self, tmp_path):
+        filepath = self.write(tmp_path)
+        ifcopenshell.indexed_stream(filepath).close()
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        self.file.write(filepath)
+        os.utime(filepath, ns=(0, 0))
+        assert stream_index.load(filepath + ".index.npz", filepath) is None
+        assert ifcopenshell.indexed_stream(filepath).by_id(wall.id()).is_a() == "IfcWall"
+
+    def test_not_indexing_inverses(self, tmp_path):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        filepath = self.write(tmp_path)
+        stream = ifcopenshell.indexed_stream(filepath, include_inverses=False, persist_index=False)
+        assert not os.path.isfile(filepath + ".index.npz")
+        assert stream.by_id(wall.id()).GlobalId == wall.GlobalId
+        with pytest.raises(ValueError):
+            stream.get_inverse(stream.by_id(wall.id()))
+
+    def test_keeping_the_index_in_memory_if_it_cant_be_saved(self, tmp_path):
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        filepath = self.write(tmp_path)
+        index_path = str(tmp_path / "missing" / "model.ifc.index.npz")
+        stream = ifcopenshell.indexed_stream(filepath, index_path=index_path)
+        assert not os.path.exists(index_path)
+        assert stream.by_id(wall.id()).GlobalId == wall.GlobalId
+
+    def test_evicting_least_recently_used_entities(self, tmp_path):
+        walls = [ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall") for i in range(3)]
+        filepath = self.write(tmp_path)
+        stream = ifcopenshell.indexed_stream(filepath, persist_index=False, cache_size=2)
+        first = stream.by_id(walls[0].id())
+        stream.by_id(walls[1].id())
+        assert stream.by_id(walls[0].id()) is first
+        stream.by_id(walls[2].id())
+        assert list(stream.entity_cache.keys()) == [walls[0].id(), walls[2].id()]
+        assert stream.by_id(walls[1].id()).GlobalId == walls[1].GlobalId
+        assert len(stream.entity_cache) == 2
+
+
+class TestTokenizeArguments:
+    def test_nested_lists_and_literals(self):
+        data = b"#1=IFCFOO((1,2.,-3.5E-2),.T.,.F.,.U.,.ENUM.,$,*,'a''b',\"0F\");"
+        arguments, end = tokenize_arguments(data, data.find(b"("), None, None)
+        assert arguments == [(1, 2.0, -0.035), True, False, "UNKNOWN", "ENUM", None, None, "a'b", "0F"]
+        assert data[end:] == b";"
+
+    def test_decoding_string_escapes(self):
+        assert decode_string(rb"'\X2\00E9\X0\t\\'") == "ét\\"
+        assert decode_string(rb"'\X\E9'") == "é"
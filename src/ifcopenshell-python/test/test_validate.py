@@ -41,5 +41,21 @@ def test_file(file):
         assert len(logger.statements) == 0
 
 
+@pytest.mark.parametrize(
+    "file",
+    glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/validate/fail-*.ifc")),
+)
+def test_sharded_file(file):
+    statements = []
+    for processes in (1, 2):
+        logger = ifcopenshell.validate.json_logger()
+        try:
+            ifcopenshell.validate.validate(file, logger, processes=processes)
+        except ifcopenshell.SchemaError as e:
+            pytest.skip()
+        statements.append([{k: str(v) for k, v in s.items()} for s in logger.statements])
+    assert statements[0] == statements[1]
+
+
 if __name__ == "__main__":
     pytest.main(["-sx", __file__])
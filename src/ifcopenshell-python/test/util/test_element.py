@@ -195,6 +195,70 @@ class TestGetPsetsIFC4(test.bootstrap.IFC4):
         assert subject.get_psets(element, qtos_only=True) == {"qto": {"x": 42, "id": qto.id()}}
 
 
+class TestGetPsetsTableIFC4(test.bootstrap.IFC4):
+    def get_rows(self, table):
+        return {(e, p, n): (v, u, d) for e, p, n, v, u, d in zip(*(table[c] for c in subject.PSETS_TABLE_COLUMNS))}
+
+    def setup_elements(self):
+        element = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        element2 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        type_element = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType")
+        ifcopenshell.api.type.assign_type(self.file, related_objects=[element, element2], relating_type=type_element)
+        type_pset = ifcopenshell.api.pset.add_pset(self.file, product=type_element, name="name")
+        ifcopenshell.api.pset.edit_pset(self.file, pset=type_pset, properties={"a": 1, "x": 1})
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=element, name="name")
+        ifcopenshell.api.pset.edit_pset(self.file, pset=pset, properties={"a": 2, "b": "3"})
+        qto = ifcopenshell.api.pset.add_qto(self.file, product=element, name="qto")
+        ifcopenshell.api.pset.edit_qto(self.file, qto=qto, properties={"Length": 42.0})
+        return element, element2, type_element, type_pset, pset, qto
+
+    def test_getting_psets_with_inheritance(self):
+        element, element2, type_element, type_pset, pset, qto = self.setup_elements()
+        rows = self.get_rows(subject.get_psets_table(self.file))
+        assert rows == {
+            (element.id(), "name", "a"): (2, 0, pset.id()),
+            (element.id(), "name", "x"): (1, 0, type_pset.id()),
+            (element.id(), "name", "b"): ("3", 0, pset.id()),
+            (element.id(), "qto", "Length"): (42.0, 0, qto.id()),
+            (element2.id(), "name", "a"): (1, 0, type_pset.id()),
+            (element2.id(), "name", "x"): (1, 0, type_pset.id()),
+            (type_element.id(), "name", "a"): (1, 0, type_pset.id()),
+            (type_element.id(), "name", "x"): (1, 0, type_pset.id()),
+        }
+
+    def test_matching_get_psets(self):
+        element, element2, type_element, type_pset, pset, qto = self.setup_elements()
+        for kwargs in ({}, {"psets_only": True}, {"qtos_only": True}, {"should_inherit": False}):
+            rows = self.get_rows(subject.get_psets_table(self.file, [element, element2, type_element], **kwargs))
+            expected = {}
+            for e in (element, element2, type_element):
+                for pset_name, props in subject.get_psets(e, **kwargs).items():
+                    for name, value in props.items():
+                        if name != "id":
+                            expected[(e.id(), pset_name, name)] = value
+            assert {k: v[0] for k, v in rows.items()} == expected
+
+    def test_getting_units(self):
+        element = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=element, name="name")
+        ifcopenshell.api.pset.edit_pset(self.file, pset=pset, properties={"a": 1.0})
+        unit = self.file.createIfcSIUnit(UnitType="LENGTHUNIT", Name="METRE")
+        pset.HasProperties[0].Unit = unit
+        table = subject.get_psets_table(self.file, [element])
+        assert list(table["unit"]) == [unit.id()]
+
+    def test_getting_a_dataframe(self):
+        pytest.importorskip("pandas")
+        element, element2, type_element, type_pset, pset, qto = self.setup_elements()
+        df = subject.get_psets_table(self.file, [element], as_dataframe=True)
+        assert list(df.columns) == list(subject.PSETS_TABLE_COLUMNS)
+        assert len(df) == 4
+
+
+class TestGetPsetsTableIFC2X3(test.bootstrap.IFC2X3, TestGetPsetsTableIFC4):
+    pass
+
+
 class TestGetPropertyDefinitionIFC4(test.bootstrap.IFC4):
     def test_getting_the_properties_of_a_pset(self):
         element = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
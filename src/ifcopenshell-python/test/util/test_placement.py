@@ -16,7 +16,14 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy as np
 import ifcopenshell
+import ifcopenshell.guid
+import ifcopenshell.api.aggregate
+import ifcopenshell.api.attribute
+import ifcopenshell.api.geometry
+import ifcopenshell.api.root
+import ifcopenshell.api.spatial
 import test.bootstrap
 import ifcopenshell.util.placement as subject
 
@@ -41,3 +48,85 @@ class TestGetStoreyElevationIFC4(test.bootstrap.IFC4):
         assert subject.get_storey_elevation(storey) == 0.0
         building = self.file.createIfcBuilding()
         assert subject.get_storey_elevation(building) == 0.0
+
+
+class TestPlacementResolver(test.bootstrap.IFC4):
+    def setup_hierarchy(self):
+        self.file.createIfcProject(ifcopenshell.guid.new())
+        building = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuilding")
+        storey = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcBuildingStorey")
+        ifcopenshell.api.aggregate.assign_object(self.file, products=[storey], relating_object=building)
+        matrix = subject.rotation(90, "Z")
+        matrix[:3, 3] = (10.0, 0.0, 0.0)
+        ifcopenshell.api.geometry.edit_object_placement(self.file, product=building, matrix=matrix)
+        matrix = np.eye(4)
+        matrix[:3, 3] = (10.0, 0.0, 3.0)
+        ifcopenshell.api.geometry.edit_object_placement(self.file, product=storey, matrix=matrix)
+        walls = []
+        for i in range(3):
+            wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+            ifcopenshell.api.spatial.assign_container(self.file, products=[wall], relating_structure=storey)
+            matrix = np.eye(4)
+            matrix[:3, 3] = (i, 1.0, 3.0)
+            ifcopenshell.api.geometry.edit_object_placement(self.file, product=wall, matrix=matrix)
+            walls.append(wall)
+        return building, storey, walls
+
+    def test_getting_local_placements(self):
+        building, storey, walls = self.setup_hierarchy()
+        resolver = subject.PlacementResolver(self.file)
+        for element in walls + [storey, building]:
+            expected = subject.get_local_placement(element.ObjectPlacement)
+            assert np.allclose(resolver.get_local_placement(element.ObjectPlacement), expected)
+        assert np.allclose(resolver.get_local_placement(None), np.eye(4))
+
+    def test_caching_parent_placements(self):
+        building, storey, walls = self.setup_hierarchy()
+        resolver = subject.PlacementResolver(self.file)
+        resolver.get_local_placement(walls[0].ObjectPlacement)
+        assert storey.ObjectPlacement.id() in resolver.matrices
+        assert building.ObjectPlacement.id() in resolver.matrices
+
+    def test_getting_all_placements(self):
+        self.setup_hierarchy()
+        resolver = subject.PlacementResolver(self.file)
+        ids, matrices = resolver.get_all_placements()
+        assert matrices.shape == (len(self.file.by_type("IfcLocalPlacement")), 4, 4)
+        for placement_id, matrix in zip(ids, matrices):
+            assert np.allclose(matrix, subject.get_local_placement(self.file.by_id(int(placement_id))))
+
+    def test_invalidating_children_when_a_placement_is_edited_using_the_api(self):
+        building, storey, walls = self.setup_hierarchy()
+        resolver = subject.PlacementResolver(self.file)
+        resolver.get_all_placements()
+        matrix = np.eye(4)
+        matrix[:3, 3] = (0.0, 0.0, 6.0)
+        ifcopenshell.api.geometry.edit_object_placement(
+            self.file, product=storey, matrix=matrix, should_transform_children=True
+        )
+        for element in walls + [storey]:
+            expected = subject.get_local_placement(element.ObjectPlacement)
+            assert np.allclose(resolver.get_local_placement(element.ObjectPlacement), expected)
+        assert resolver.get_local_placement(storey.ObjectPlacement)[2][3] == 6.0
+
+    def test_invalidating_when_placement_attributes_are_edited_using_the_api(self):
+        building, storey, walls = self.setup_hierarchy()
+        resolver = subject.PlacementResolver(self.file)
+        resolver.get_local_placement(walls[0].ObjectPlacement)
+        point = building.ObjectPlacement.RelativePlacement.Location
+        ifcopenshell.api.attribute.edit_attributes(
+            self.file, product=point, attributes={"Coordinates": (0.0, 0.0, 0.0)}
+        )
+        expected = subject.get_local_placement(walls[0].ObjectPlacement)
+        assert np.allclose(resolver.get_local_placement(walls[0].ObjectPlacement), expected)
+
+    def test_invalidating_manually(self):
+        building, storey, walls = self.setup_hierarchy()
+        resolver = subject.PlacementResolver(self.file, should_track_api=False)
+        resolver.get_local_placement(walls[0].ObjectPlacement)
+        resolver.invalidate(storey.ObjectPlacement)
+        assert building.ObjectPlacement.id() in resolver.matrices
+        assert storey.ObjectPlacement.id() not in resolver.matrices
+        assert walls[0].ObjectPlacement.id() not in resolver.matrices
+        resolver.invalidate()
+        assert not resolver.matrices
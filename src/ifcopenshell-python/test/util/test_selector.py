@@ -136,6 +136,27 @@ class TestGetElementValue(test.bootstrap.IFC4):
         assert subject.get_element_value(element, "/Pset_.*Common/.Status") == ["New"]
         assert subject.get_element_value(element, "/Pset_.*Common/.Status.0") == "New"
 
+    def test_selecting_many_values_at_once(self):
+        element = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall", name="Foobar")
+        element_type = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWallType", name="Type")
+        ifcopenshell.api.type.assign_type(self.file, related_objects=[element], relating_type=element_type)
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=element, name="Foobar")
+        ifcopenshell.api.pset.edit_pset(self.file, pset=pset, properties={"Foo": "Bar", "Baz": 123})
+        queries = ["Name", "Foobar.Foo", "Foobar.Baz", "/Foo.*/./.*/", "type.Name", "type.Description", "type", "x"]
+        assert subject.get_element_values(element, queries) == [
+            "Foobar",
+            "Bar",
+            123,
+            ["Bar", 123],
+            "Type",
+            None,
+            element_type,
+            None,
+        ]
+        assert subject.get_element_values(element, queries) == [subject.get_element_value(element, q) for q in queries]
+        parsed_queries = [subject.parse_element_query(q) for q in queries]
+        assert subject.get_element_values(element, parsed_queries) == subject.get_element_values(element, queries)
+
 
 class TestFilterElements(test.bootstrap.IFC4):
     def test_selecting_by_globalid(self):
@@ -316,6 +337,40 @@ class TestFilterElements(test.bootstrap.IFC4):
         new_set = subject.filter_elements(self.file, "IfcWall", original_set, edit_in_place=True)
         assert new_set == original_set == {wall}
 
+    def test_using_an_index(self):
+        element = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        element2 = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.pset.add_pset(self.file, product=element, name="Foobar")
+        ifcopenshell.api.pset.edit_pset(self.file, pset=pset, properties={"Foo": "Bar"})
+        index = subject.SelectorIndex(self.file)
+        assert subject.filter_elements(self.file, "IfcWall, Foobar.Foo=Bar", index=index) == {element}
+        assert index.values[("property", "Foobar", "Foo")] == {element: "Bar", element2: None}
+        assert subject.filter_elements(self.file, "IfcWall, Foobar.Foo!=Bar", index=index) == {element2}
+
+    def test_invalidating_an_index_when_using_the_api(self):
+        element = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        index = subject.SelectorIndex(self.file)
+        assert subject.filter_elements(self.file, "IfcWall, material=CON01", index=index) == set()
+        material = ifcopenshell.api.material.add_material(self.file, name="CON01")
+        ifcopenshell.api.material.assign_material(self.file, products=[element], material=material)
+        assert subject.filter_elements(self.file, "IfcWall, material=CON01", index=index) == {element}
+
+
+class TestCompileQuery:
+    def test_caching_query_plans(self):
+        assert subject.compile_query("IfcWall, Name=Foo") is subject.compile_query("IfcWall, Name=Foo")
+
+    def test_evaluating_cheap_facets_first(self):
+        plan = subject.compile_query("IfcWall, Pset.Prop=Foo, material=Bar, Name=Baz + IfcSlab")
+        assert [[facet[0] for facet in facet_list] for facet_list in plan] == [
+            ["entity", "attribute", "material", "property"],
+            ["entity"],
+        ]
+
+    def test_not_reordering_facets_across_class_facets(self):
+        plan = subject.compile_query("IfcWall, Pset.Prop=Foo, IfcSlab, Name=Baz")
+        assert [facet[0] for facet in plan[0]] == ["entity", "property", "entity", "attribute"]
+
 
 class TestSetElementValue(test.bootstrap.IFC4):
     def test_set_xyz_coordinates(self):
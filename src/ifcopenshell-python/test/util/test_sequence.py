@@ -0,0 +1,122 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import gc
+import weakref
+import datetime
+import test.bootstrap
+import ifcopenshell.api.root
+import ifcopenshell.api.sequence
+import ifcopenshell.util.sequence as subject
+
+
+class WorkCalendarTest(test.bootstrap.IFC4):
+    def add_weekday_calendar(self, start=None, finish=None):
+        ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcProject")
+        calendar = ifcopenshell.api.sequence.add_work_calendar(self.file)
+        work_time = ifcopenshell.api.sequence.add_work_time(self.file, work_calendar=calendar)
+        if start or finish:
+            ifcopenshell.api.sequence.edit_work_time(
+                self.file, work_time=work_time, attributes={"Start": start, "Finish": finish}
+            )
+        pattern = ifcopenshell.api.sequence.assign_recurrence_pattern(self.file, parent=work_time)
+        ifcopenshell.api.sequence.edit_recurrence_pattern(
+            self.file, recurrence_pattern=pattern, attributes={"WeekdayComponent": [1, 2, 3, 4, 5]}
+        )
+        return calendar
+
+
+class TestCountWorkingDays(WorkCalendarTest):
+    def test_run(self):
+        calendar = self.add_weekday_calendar()
+        # Monday to the Friday of the following week
+        assert subject.count_working_days(datetime.date(2024, 1, 1), datetime.date(2024, 1, 12), calendar) == 10
+        assert subject.count_working_days(datetime.date(2024, 1, 6), datetime.date(2024, 1, 7), calendar) == 0
+
+    def test_counting_days_outside_of_the_calendar(self):
+        calendar = self.add_weekday_calendar(finish=datetime.date(2024, 1, 6))
+        assert subject.count_working_days(datetime.date(2024, 1, 1), datetime.date(2024, 1, 12), calendar) == 12
+
+    def test_counting_all_days_without_a_calendar(self):
+        assert subject.count_working_days(datetime.date(2024, 1, 1), datetime.date(2024, 1, 12), None) == 12
+
+    def test_counting_over_many_years(self):
+        calendar = self.add_weekday_calendar()
+        assert subject.count_working_days(datetime.date(2000, 1, 3), datetime.date(2099, 12, 31), calendar) == 26089
+
+    def test_recounting_after_the_calendar_is_edited(self):
+        calendar = self.add_weekday_calendar()
+        assert subject.count_working_days(datetime.date(2024, 1, 1), datetime.date(2024, 1, 12), calendar) == 10
+        pattern = calendar.WorkingTimes[0].RecurrencePattern
+        ifcopenshell.api.sequence.edit_recurrence_pattern(
+            self.file, recurrence_pattern=pattern, attributes={"WeekdayComponent": [1, 2, 3, 4, 5, 6]}
+        )
+        assert subject.count_working_days(datetime.date(2024, 1, 1), datetime.date(2024, 1, 12), calendar) == 11
+
+    def test_not_keeping_files_alive(self):
+        calendar = self.add_weekday_calendar()
+        assert subject.count_working_days(datetime.date(2024, 1, 1), datetime.date(2024, 1, 12), calendar) == 10
+        assert calendar.id() in subject.work_calendars[self.file]
+        file = weakref.ref(self.file)
+        del calendar, self.file
+        gc.collect()
+        assert file() is None
+
+
+class TestOffsetDate(WorkCalendarTest):
+    def test_run(self):
+        calendar = self.add_weekday_calendar()
+        start = datetime.datetime(2024, 1, 5, 9)  # Friday
+        assert subject.offset_date(start, datetime.timedelta(days=1), "WORKTIME", calendar) == datetime.datetime(
+            2024, 1, 8, 9
+        )
+        assert subject.offset_date(start, datetime.timedelta(days=6), "WORKTIME", calendar) == datetime.datetime(
+            2024, 1, 15, 9
+        )
+        assert subject.offset_date(start, datetime.timedelta(days=-5), "WORKTIME", calendar) == datetime.datetime(
+            2023, 12, 29, 9
+        )
+
+    def test_offsetting_by_elapsed_time(self):
+        calendar = self.add_weekday_calendar()
+        start = datetime.datetime(2024, 1, 5, 9)
+        assert subject.offset_date(start, datetime.timedelta(days=2), "ELAPSEDTIME", calendar) == datetime.datetime(
+            2024, 1, 7, 9
+        )
+
+    def test_offsetting_far_beyond_the_compiled_range(self):
+        calendar = self.add_weekday_calendar()
+        start = datetime.date(2024, 1, 1)
+        assert subject.offset_date(start, datetime.timedelta(days=5), "WORKTIME", calendar) == datetime.date(2024, 1, 8)
+        assert subject.offset_date(start, datetime.timedelta(days=26090), "WORKTIME", calendar) == datetime.date(
+            2124, 1, 3
+        )
+
+
+class TestGetSoonestWorkingDay(WorkCalendarTest):
+    def test_run(self):
+        calendar = self.add_weekday_calendar()
+        saturday = datetime.date(2024, 1, 6)
+        assert subject.get_soonest_working_day(saturday, "WORKTIME", calendar) == datetime.date(2024, 1, 8)
+        assert subject.get_recent_working_day(saturday, "WORKTIME", calendar) == datetime.date(2024, 1, 5)
+        assert subject.get_soonest_working_day(saturday, "ELAPSEDTIME", calendar) == saturday
+
+    def test_stopping_outside_of_the_calendar(self):
+        calendar = self.add_weekday_calendar(finish=datetime.date(2024, 1, 7))
+        saturday = datetime.date(2024, 1, 6)
+        assert subject.get_soonest_working_day(saturday, "WORKTIME", calendar) == datetime.date(2024, 1, 7)
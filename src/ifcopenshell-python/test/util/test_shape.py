@@ -0,0 +1,103 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import numpy as np
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.api.context
+import ifcopenshell.api.geometry
+import ifcopenshell.api.root
+import ifcopenshell.api.unit
+import ifcopenshell.geom
+import ifcopenshell.util.shape as subject
+
+
+class Bootstrap(test.bootstrap.IFC4):
+    def create_geometry(self, length, height, thickness):
+        if not self.file.by_type("IfcProject"):
+            ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcProject")
+            ifcopenshell.api.unit.assign_unit(self.file)
+            model = ifcopenshell.api.context.add_context(self.file, context_type="Model")
+            ifcopenshell.api.context.add_context(
+                self.file, context_type="Model", context_identifier="Body", target_view="MODEL_VIEW", parent=model
+            )
+        body = self.file.by_type("IfcGeometricRepresentationSubContext")[0]
+        wall = ifcopenshell.api.root.create_entity(self.file, ifc_class="IfcWall")
+        ifcopenshell.api.geometry.edit_object_placement(self.file, product=wall)
+        representation = ifcopenshell.api.geometry.add_wall_representation(
+            self.file, context=body, length=length, height=height, thickness=thickness
+        )
+        ifcopenshell.api.geometry.assign_representation(self.file, product=wall, representation=representation)
+        # Keep the shape alive, as the geometry is owned by it.
+        self.shapes = getattr(self, "shapes", []) + [ifcopenshell.geom.create_shape(ifcopenshell.geom.settings(), wall)]
+        return self.shapes[-1].geometry
+
+
+class TestGetVolume(Bootstrap):
+    def test_run(self):
+        assert subject.get_volume(self.create_geometry(2.0, 3.0, 0.5)) == pytest.approx(3.0)
+
+
+class TestGetFootprintArea(Bootstrap):
+    def test_run(self):
+        assert subject.get_footprint_area(self.create_geometry(2.0, 3.0, 0.5)) == pytest.approx(1.0)
+
+
+class TestGetFootprintPerimeter(Bootstrap):
+    def test_run(self):
+        assert subject.get_footprint_perimeter(self.create_geometry(2.0, 3.0, 0.5)) == pytest.approx(5.0)
+
+
+class TestGetBbox:
+    def test_run(self):
+        bbox = subject.get_bbox(iter([(0.0, 1.0, 2.0), (3.0, -1.0, 1.0)]))
+        assert np.allclose(bbox[0], (0.0, -1.0, 1.0))
+        assert np.allclose(bbox[1], (3.0, 1.0, 2.0))
+
+
+class TestGetMeasures(Bootstrap):
+    def test_run(self):
+        geometries = [self.create_geometry(2.0, 3.0, 0.5), self.create_geometry(1.0, 1.0, 0.2)]
+        measures = [
+            "get_volume",
+            "get_area",
+            "get_side_area",
+            "get_max_side_area",
+            "get_outer_surface_area",
+            "get_total_edge_length",
+            "get_x",
+            "get_y",
+            "get_z",
+            "get_max_xy",
+            "get_max_xyz",
+            "get_min_xyz",
+            "get_footprint_area",
+            "get_footprint_perimeter",
+        ]
+        results = subject.get_measures(geometries, measures)
+        for measure in measures:
+            expected = [getattr(subject, measure)(g) for g in geometries]
+            assert results[measure] == pytest.approx(expected), measure
+
+    def test_measuring_no_geometries(self):
+        assert list(subject.get_measures([], ["get_volume"])["get_volume"]) == []
+
+    def test_unknown_measures_are_rejected(self):
+        with pytest.raises(ValueError):
+            subject.get_measures([], ["foo"])
@@ -19,6 +19,7 @@
 
 import os
 import re
+import sys
 import json
 import time
 import tempfile
@@ -32,6 +33,7 @@ import ifcopenshell.util.unit
 import ifcopenshell.util.shape
 import ifcopenshell.util.schema
 import ifcopenshell.util.attribute
+import ifcopenshell.util.element
 import ifcopenshell.util.placement
 
 SQLTypes = typing.Literal["SQLite", "MySQL"]
@@ -60,6 +62,7 @@ class Patcher:
         username: str = "root",
         password: str = "pass",
         database: str = "test",
+        processes: int = 1,
     ):
         """Convert an IFC-SPF model to SQLite or MySQL.
 
@@ -83,9 +86,24 @@ class Patcher:
         - should_skip_geometry_data: Whether or not to also create tables for
           IfcRepresentation and IfcRepresentationItem classes. These tables are
           unnecessary if you are not interested in geometry.
+        - chunk_size: the maximum number of rows written per transaction.
+          Rows are written as soon as a chunk is ready, rather than all at the
+          end, so memory use stays bounded on large models.
+        - max_geometry_buffer: the maximum number of bytes of geometry blobs
+          held in memory before they are written.
+
+        The time taken and rows written per phase are printed and stored in
+        ``phase_stats``.
 
         :param sql_type: Choose between "SQLite" or "MySQL"
         :type sql_type: typing.Literal["SQLite", "MySQL"]
+        :param processes: The number of worker processes used to serialise
+            instances. Workers are forked from the main process so they share
+            the loaded model, so only use more than 1 in a standalone script
+            rather than in an application like Blender, and without other open
+            connections. If forking is unavailable, instances are serialised
+            in the main process.
+        :type processes: int
 
         Example:
 
@@ -102,6 +120,7 @@ class Patcher:
         self.username = username
         self.password = password
         self.database = database
+        self.processes = processes
 
     def patch(self):
         self.full_schema = True  # Set true for ifcopenshell.sqlite
@@ -111,8 +130,11 @@ class Patcher:
         self.should_get_psets = True
         self.should_get_geometry = True  # Set true for ifcopenshell.sqlite
         self.should_skip_geometry_data = False  # Set false for ifcopenshell.sqlite
+        self.chunk_size = 10000
+        self.max_geometry_buffer = 64 * 1024 * 1024
 
         self.schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(self.file.schema)
+        self.phase_stats = {}
 
         if self.sql_type == "sqlite":
             tmp = tempfile.NamedTemporaryFile(delete=False)
@@ -120,6 +142,7 @@ class Patcher:
             self.db = sqlite3.connect(db_file)
             self.c = self.db.cursor()
             self.file_patched = db_file
+            self.tune_sqlite()
         elif self.sql_type == "mysql":
             self.db = mysql.connector.connect(
                 host=self.host, user=self.username, password=self.password, database=self.database
@@ -130,18 +153,23 @@ class Patcher:
         self.create_id_map()
         self.create_metadata()
 
+        self.shape_ids = set()
+
         if self.should_get_psets:
             self.create_pset_table()
 
         if self.should_get_geometry:
             self.create_geometry_table()
+            self.start_phase("geometry")
             self.create_geometry()
+            self.end_phase("geometry")
 
         if self.full_schema:
             ifc_classes = [d.name() for d in self.schema.declarations() if str(d).startswith("<entity")]
         else:
             ifc_classes = self.file.wrapped_data.types()
 
+        tasks = []
         for ifc_class in ifc_classes:
             declaration = self.schema.declaration_by_name(ifc_class)
 
@@ -155,29 +183,75 @@ class Patcher:
                 self.create_sqlite_table(ifc_class, declaration)
             elif self.sql_type == "mysql":
                 self.create_mysql_table(ifc_class, declaration)
-            self.insert_data(ifc_class)
 
-        if self.should_get_geometry:
-            if self.sql_type == "sqlite":
-                if self.shape_rows:
-                    self.c.executemany("INSERT INTO shape VALUES (?, ?, ?, ?, ?, ?);", self.shape_rows.values())
-                if self.geometry_rows:
-                    self.c.executemany("INSERT INTO geometry VALUES (?, ?, ?, ?, ?, ?);", self.geometry_rows.values())
-            elif self.sql_type == "mysql":
-                if self.shape_rows:
-                    self.c.executemany("INSERT INTO shape VALUES (%s, %s, %s, %s, %s, %s);", self.shape_rows.values())
-                # Do row by row in case of max_allowed_packet
-                for row in self.geometry_rows.values():
-                    self.c.execute("INSERT INTO geometry VALUES (%s, %s, %s, %s, %s, %s);", row)
+            try:
+                total = len(self.file.by_type(ifc_class, include_subtypes=False))
+            except RuntimeError:  # Abstract or otherwise uninstantiable
+                continue
+            tasks.extend((ifc_class, i, i + self.chunk_size) for i in range(0, total, self.chunk_size))
+
+        self.start_phase("instances")
+        for rows, id_map_rows, shape_rows in self.serialise_chunks(tasks):
+            print("Extracting data for", id_map_rows[0][1])
+            self.insert_rows(id_map_rows[0][1], rows)
+            self.insert_rows("id_map", id_map_rows)
+            self.insert_rows("shape", shape_rows)
+            self.db.commit()
+            self.phase_stats["instances"][0] += len(rows)
+        self.end_phase("instances")
+
+        if self.should_get_psets:
+            self.start_phase("psets")
+            self.insert_psets()
+            self.end_phase("psets")
 
         self.db.commit()
         self.db.close()
 
+    def tune_sqlite(self):
+        # The database is a new temporary file, so durability is traded for
+        # bulk loading speed. A crash leaves an unusable file either way.
+        self.c.execute("PRAGMA journal_mode = OFF;")
+        self.c.execute("PRAGMA synchronous = OFF;")
+        self.c.execute("PRAGMA temp_store = MEMORY;")
+        self.c.execute("PRAGMA cache_size = -262144;")  # 256MB
+
+    def start_phase(self, phase):
+        self.phase_stats[phase] = [0, time.time()]
+
+    def end_phase(self, phase):
+        rows, start = self.phase_stats[phase]
+        duration = time.time() - start
+        self.phase_stats[phase] = [rows, duration]
+        print(f"Phase {phase}: {rows} rows in {duration:.2f}s ({rows / max(duration, 1e-9):.0f} rows/s)")
+
+    def insert_rows(self, table, rows):
+        if not rows:
+            return
+        placeholder = "?" if self.sql_type == "sqlite" else "%s"
+        statement = f"INSERT INTO {table} VALUES ({', '.join([placeholder] * len(rows[0]))});"
+        if self.sql_type == "mysql" and table == "geometry":
+            # Do row by row in case of max_allowed_packet
+            for row in rows:
+                self.c.execute(statement, row)
+        else:
+            self.c.executemany(statement, rows)
+
     def create_geometry(self):
         self.unit_scale = ifcopenshell.util.unit.calculate_unit_scale(self.file)
 
-        self.shape_rows = {}
-        self.geometry_rows = {}
+        shape_rows = []
+        geometry_rows = []
+        geometry_ids = set()
+        geometry_buffer = 0
+
+        def flush():
+            nonlocal shape_rows, geometry_rows, geometry_buffer
+            self.insert_rows("geometry", geometry_rows)
+            self.insert_rows("shape", shape_rows)
+            self.db.commit()
+            self.phase_stats["geometry"][0] += len(shape_rows) + len(geometry_rows)
+            shape_rows, geometry_rows, geometry_buffer = [], [], 0
 
         if self.file.schema in ("IFC2X3", "IFC4"):
             self.elements = self.file.by_type("IfcElement") + self.file.by_type("IfcProxy")
@@ -203,8 +277,12 @@ class Patcher:
         self.settings.set("context-ids", self.body_contexts)
 
         products = self.elements
+        if not products:
+            return
         iterator = ifcopenshell.geom.iterator(self.settings, self.file, multiprocessing.cpu_count(), include=products)
         valid_file = iterator.initialize()
+        if not valid_file:
+            return
         checkpoint = time.time()
         progress = 0
         total = len(products)
@@ -221,22 +299,30 @@ class Patcher:
                 )
                 checkpoint = time.time()
             shape = iterator.get()
-            if shape:
-                if shape.geometry.id not in self.geometry_rows:
-                    v = np.array(shape.geometry.verts).tobytes()
-                    e = np.array(shape.geometry.edges).tobytes()
-                    f = np.array(shape.geometry.faces).tobytes()
-                    mids = np.array(shape.geometry.material_ids).tobytes()
-                    m = json.dumps([m.instance_id() for m in shape.geometry.materials])
-                    self.geometry_rows[shape.geometry.id] = [shape.geometry.id, v, e, f, mids, m]
+            if shape and shape.id not in self.shape_ids:
+                geometry = shape.geometry
+                if geometry.id not in geometry_ids:
+                    # Blobs are stored as float64 and int64 arrays.
+                    v = geometry.verts_buffer
+                    e = np.frombuffer(geometry.edges_buffer, dtype=np.int32).astype(np.int64).tobytes()
+                    f = np.frombuffer(geometry.faces_buffer, dtype=np.int32).astype(np.int64).tobytes()
+                    mids = np.frombuffer(geometry.material_ids_buffer, dtype=np.int32).astype(np.int64).tobytes()
+                    m = json.dumps([m.instance_id() for m in geometry.materials])
+                    geometry_rows.append([geometry.id, v, e, f, mids, m])
+                    geometry_ids.add(geometry.id)
+                    geometry_buffer += len(v) + len(e) + len(f) + len(mids)
                 m = ifcopenshell.util.shape.get_shape_matrix(shape)
                 m[0][3] /= self.unit_scale
                 m[1][3] /= self.unit_scale
                 m[2][3] /= self.unit_scale
                 x, y, z = m[:, 3][0:3]
-                self.shape_rows[shape.id] = [shape.id, float(x), float(y), float(z), m.tobytes(), shape.geometry.id]
+                shape_rows.append([shape.id, float(x), float(y), float(z), m.tobytes(), geometry.id])
+                self.shape_ids.add(shape.id)
+                if len(shape_rows) >= self.chunk_size or geometry_buffer >= self.max_geometry_buffer:
+                    flush()
             if not iterator.next():
                 break
+        flush()
         print("Done creating geometry")
 
     def create_id_map(self):
@@ -404,13 +490,25 @@ class Patcher:
         print(statement)
         self.c.execute(statement)
 
-    def insert_data(self, ifc_class):
-        print("Extracting data for", ifc_class)
-        elements = self.file.by_type(ifc_class, include_subtypes=False)
+    def serialise_chunks(self, tasks):
+        global worker_patcher
+        worker_patcher = self
+        can_fork = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+        if self.processes <= 1 or not can_fork or len(tasks) < 2:
+            yield from map(serialise_chunk, tasks)
+            return
+        with multiprocessing.get_context("fork").Pool(self.processes) as pool:
+            yield from pool.imap(serialise_chunk, tasks)
+
+    def serialise_instances(self, ifc_class, start, end):
+        if getattr(self, "instances_cache", (None,))[0] != ifc_class:
+            self.instances_cache = (ifc_class, self.file.by_type(ifc_class, include_subtypes=False))
+            self.placement_resolver = ifcopenshell.util.placement.PlacementResolver(self.file, should_track_api=False)
+        elements = self.instances_cache[1][start:end]
 
         rows = []
         id_map_rows = []
-        pset_rows = []
+        shape_rows = []
 
         for element in elements:
             nested_indices = []
@@ -449,34 +547,30 @@ class Patcher:
 
             id_map_rows.append([element.id(), ifc_class])
 
-            if self.should_get_psets:
-                psets = ifcopenshell.util.element.get_psets(element)
-                for pset_name, pset_data in psets.items():
-                    for prop_name, value in pset_data.items():
-                        if prop_name == "id":
-                            continue
-                        if isinstance(value, list):
-                            value = json.dumps(value)
-                        pset_rows.append([element.id(), pset_name, prop_name, value])
-
             if self.should_get_geometry:
-                if element.id() not in self.shape_rows and getattr(element, "ObjectPlacement", None):
-                    m = ifcopenshell.util.placement.get_local_placement(element.ObjectPlacement)
+                if element.id() not in self.shape_ids and getattr(element, "ObjectPlacement", None):
+                    m = self.placement_resolver.get_local_placement(element.ObjectPlacement)
                     x, y, z = m[:, 3][0:3]
-                    self.shape_rows[element.id()] = [element.id(), float(x), float(y), float(z), m.tobytes(), None]
+                    shape_rows.append([element.id(), float(x), float(y), float(z), m.tobytes(), None])
 
-        if self.sql_type == "sqlite":
-            if rows:
-                self.c.executemany(f"INSERT INTO {ifc_class} VALUES ({','.join(['?']*len(rows[0]))});", rows)
-                self.c.executemany("INSERT INTO id_map VALUES (?, ?);", id_map_rows)
-            if pset_rows:
-                self.c.executemany("INSERT INTO psets VALUES (?, ?, ?, ?);", pset_rows)
-        elif self.sql_type == "mysql":
-            if rows:
-                self.c.executemany(f"INSERT INTO {ifc_class} VALUES ({','.join(['%s']*len(rows[0]))});", rows)
-                self.c.executemany("INSERT INTO id_map VALUES (%s, %s);", id_map_rows)
-            if pset_rows:
-                self.c.executemany("INSERT INTO psets VALUES (%s, %s, %s, %s);", pset_rows)
+        return rows, id_map_rows, shape_rows
+
+    def insert_psets(self):
+        table = ifcopenshell.util.element.get_psets_table(self.file)
+        rows = []
+        for ifc_id, pset_name, prop_name, value in zip(
+            table["element"].tolist(), table["pset"], table["property"], table["value"]
+        ):
+            if isinstance(value, list):
+                value = json.dumps(value)
+            rows.append([ifc_id, pset_name, prop_name, value])
+            if len(rows) >= self.chunk_size:
+                self.insert_rows("psets", rows)
+                self.phase_stats["psets"][0] += len(rows)
+                rows = []
+        self.insert_rows("psets", rows)
+        self.phase_stats["psets"][0] += len(rows)
+        self.db.commit()
 
     def serialise_value(self, element, value):
         return element.walk(
@@ -509,3 +603,10 @@ class Patcher:
                     return False
             return True
         return False
+
+
+worker_patcher = None
+
+
+def serialise_chunk(task):
+    return worker_patcher.serialise_instances(*task)
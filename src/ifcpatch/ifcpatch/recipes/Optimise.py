@@ -16,8 +16,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
+import hashlib
 import ifcopenshell
-import ifcopenshell.util.element
+from typing import Any, Optional
 
 
 class Patcher:
@@ -37,8 +38,13 @@ class Patcher:
         can usually be solved through other means. Consult the bonsai Add-on
         documentation on dealing with large models for more details.
 
-        Warning: this optimise recipe is very, very slow. Please consider using
-        RecycleNonRootedElements instead.
+        Identical non-rooted elements (i.e. those which aren't an IfcRoot) are
+        merged in place. Elements are fingerprinted bottom up in a single pass
+        through the model, where the fingerprint of an element includes the
+        fingerprints of the elements it references. This means entire
+        identical subgraphs, such as repeated geometry, are merged at once.
+        Unlike RecycleNonRootedElements, this does not need to be run multiple
+        times.
 
         Example:
 
@@ -49,52 +55,112 @@ class Patcher:
         self.src = src
         self.file = file
         self.logger = logger
-        self.optimized_file = ifcopenshell.file(schema=self.file.schema)
 
     def patch(self):
-        from toposort import toposort_flatten as toposort
-
-        def generate_instances_and_references():
-            """
-            Generator which yields an entity id and
-            the set of all of its references contained in its attributes.
-            """
-            for inst in self.file:
-                yield inst.id(), set(i.id() for i in self.file.traverse(inst)[1:] if i.id())
-
-        instance_mapping = {}
-
-        def map_value(v):
-            """
-            Recursive function which replicates an entity instance, with
-            its attributes, mapping references to already registered
-            instances. Indeed, because of the toposort we know that
-            forward attribute value instances are mapped before the instances
-            that reference them.
-            """
-            if isinstance(v, (list, tuple)):
-                # lists are recursively traversed
-                return type(v)(map(map_value, v))
-            elif isinstance(v, ifcopenshell.entity_instance):
-                if v.id() == 0:
-                    # express simple types are not part of the toposort and just copied
-                    return self.optimized_file.create_entity(v.is_a(), v[0])
-
-                return instance_mapping[v]
+        # The ID of the element each element is merged into, which is itself if it is unique.
+        self.representatives: dict[int, int] = {}
+        self.is_rooted: dict[str, bool] = {}
+        fingerprints: dict[bytes, int] = {}
+        duplicate_ids: set[int] = set()
+        to_rewrite: list[tuple[ifcopenshell.entity_instance, list]] = []
+        visiting: set[int] = set()
+
+        for element in self.file:
+            if element.id() in self.representatives:
+                continue
+            # Depth first, so referenced elements are fingerprinted before the elements referencing them.
+            stack: list[tuple[ifcopenshell.entity_instance, Optional[list]]] = [(element, None)]
+            while stack:
+                element, values = stack.pop()
+                element_id = element.id()
+                if element_id in self.representatives:
+                    continue
+                if values is None:
+                    values = list(element)
+                    visiting.add(element_id)
+                    stack.append((element, values))
+                    for reference in self.get_references(values):
+                        reference_id = reference.id()
+                        if reference_id not in self.representatives and reference_id not in visiting:
+                            stack.append((reference, None))
+                    continue
+                visiting.discard(element_id)
+
+                self.has_duplicate_references = False
+                self.has_cyclic_references = False
+                key = (element.is_a(), tuple(self.get_key(v) for v in values))
+                if not self.has_cyclic_references and not self.get_is_rooted(element):
+                    fingerprint = hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+                    representative = fingerprints.setdefault(fingerprint, element_id)
+                    self.representatives[element_id] = representative
+                    if representative != element_id:
+                        duplicate_ids.add(element_id)
+                        continue
+                else:
+                    self.representatives[element_id] = element_id
+                if self.has_duplicate_references:
+                    to_rewrite.append((element, values))
+
+        for element, values in to_rewrite:
+            for i, value in enumerate(values):
+                if self.has_duplicates(value):
+                    element[i] = self.get_representative(value)
+
+        # Removing many elements one at a time is slow, so duplicates are instead skipped whilst serialising.
+        total_bytes = 0
+        lines = []
+        for line in self.file.wrapped_data.to_string().split("\n"):
+            if line.startswith("#") and int(line[1 : line.index("=")]) in duplicate_ids:
+                total_bytes += len(line) + 1
             else:
-                # a plain python value can just be returned
-                return v
-
-        info_to_id = {}
-
-        for id in toposort(dict(generate_instances_and_references())):
-            inst = self.file[id]
-            info = inst.get_info(include_identifier=False, recursive=True, return_type=frozenset)
-            if info in info_to_id:
-                mapped = instance_mapping[inst] = instance_mapping[self.file[info_to_id[info]]]
-
-            else:
-                info_to_id[info] = id
-                instance_mapping[inst] = self.optimized_file.create_entity(inst.is_a(), *map(map_value, inst))
-
-        self.file = self.optimized_file
+                lines.append(line)
+        self.file = ifcopenshell.file.from_string("\n".join(lines))
+        self.logger.info(f"Merged {len(duplicate_ids)} duplicate elements, saving {total_bytes} bytes")
+
+    def get_is_rooted(self, element: ifcopenshell.entity_instance) -> bool:
+        ifc_class = element.is_a()
+        is_rooted = self.is_rooted.get(ifc_class)
+        if is_rooted is None:
+            is_rooted = self.is_rooted[ifc_class] = element.is_a("IfcRoot")
+        return is_rooted
+
+    def get_references(self, value: Any):
+        if isinstance(value, ifcopenshell.entity_instance):
+            if value.id():
+                yield value
+            return
+        elif isinstance(value, (list, tuple)):
+            for v in value:
+                yield from self.get_references(v)
+
+    def get_key(self, value: Any) -> Any:
+        if isinstance(value, ifcopenshell.entity_instance):
+            value_id = value.id()
+            if not value_id:
+                return (value.is_a(), self.get_key(value.wrappedValue))
+            representative = self.representatives.get(value_id)
+            if representative is None:
+                self.has_cyclic_references = True
+                return value_id
+            if representative != value_id:
+                self.has_duplicate_references = True
+            return ("#", representative)
+        elif isinstance(value, (list, tuple)):
+            return tuple(self.get_key(v) for v in value)
+        return value
+
+    def has_duplicates(self, value: Any) -> bool:
+        if isinstance(value, ifcopenshell.entity_instance):
+            return bool(value.id()) and self.representatives[value.id()] != value.id()
+        elif isinstance(value, (list, tuple)):
+            return any(self.has_duplicates(v) for v in value)
+        return False
+
+    def get_representative(self, value: Any) -> Any:
+        if isinstance(value, ifcopenshell.entity_instance):
+            if value.id() and (representative := self.representatives[value.id()]) != value.id():
+                return self.file.by_id(representative)
+            return value
+        elif isinstance(value, (list, tuple)):
+            return type(value)(self.get_representative(v) for v in value)
+        return value
@@ -0,0 +1,94 @@
+# IfcPatch - IFC patching utiliy
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcPatch.
+#
+# IfcPatch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcPatch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pytest
+import sqlite3
+import ifcpatch
+import ifcopenshell
+import ifcopenshell.api
+import test.bootstrap
+
+
+class TestIfc2Sql(test.bootstrap.IFC4):
+    @pytest.fixture(autouse=True)
+    def cleanup(self):
+        self.filepaths = []
+        yield
+        for filepath in self.filepaths:
+            os.remove(filepath)
+
+    def convert(self, *arguments):
+        filepath = ifcpatch.execute({"file": self.file, "recipe": "Ifc2Sql", "arguments": list(arguments)})
+        self.filepaths.append(filepath)
+        return filepath
+
+    def read_tables(self, filepath):
+        db = sqlite3.connect(filepath)
+        try:
+            tables = [r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+            return {t: sorted(db.execute(f"SELECT * FROM `{t}`").fetchall(), key=repr) for t in tables}
+        finally:
+            db.close()
+
+    def create_model(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        for i in range(5):
+            wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name=f"Wall {i}")
+            pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall, name="Foo_Bar")
+            ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": f"Bar {i}"})
+
+    def test_run(self):
+        self.create_model()
+        data = self.read_tables(self.convert("SQLite"))
+        assert len([r for r in data["id_map"] if r[1] == "IfcWall"]) == 5
+        assert len([r for r in data["psets"] if r[1] == "Foo_Bar"]) == 5
+
+    def test_serialising_in_parallel(self):
+        self.create_model()
+        serial = self.read_tables(self.convert("SQLite", "localhost", "root", "pass", "test", 1))
+        parallel = self.read_tables(self.convert("SQLite", "localhost", "root", "pass", "test", 2))
+        assert serial == parallel
+
+    def test_reading_the_database_with_ifcopenshell(self):
+        self.create_model()
+        model = ifcopenshell.sqlite(self.convert("SQLite"))
+        walls = {w.GlobalId: w for w in self.file.by_type("IfcWall")}
+        results = model.by_type("IfcWall")
+        assert len(results) == 5
+        for result in results:
+            wall = walls[result.GlobalId]
+            assert result.id() == wall.id()
+            assert result.Name == wall.Name
+            pset = result.IsDefinedBy[0].RelatingPropertyDefinition
+            assert pset.Name == "Foo_Bar"
+            assert pset.HasProperties[0].NominalValue.wrappedValue == wall.Name.replace("Wall", "Bar")
+            assert result.get_info()["Name"] == wall.Name
+        prefetched = model.prefetch([w.id() for w in walls.values()], attributes=["Name"])
+        assert [w.Name for w in prefetched] == [w.Name for w in walls.values()]
+
+    def test_bounding_the_cached_entities_and_classes(self):
+        self.create_model()
+        model = ifcopenshell.sqlite(self.convert("SQLite"), cache_size=2)
+        assert len(model.id_map) == 0
+        names = [w.Name for w in model.by_type("IfcWall")]
+        assert sorted(names) == [f"Wall {i}" for i in range(5)]
+        assert len(model.entity_cache) == 2
+        assert len(model.id_map) == 2
+        wall = self.file.by_type("IfcWall")[0]
+        assert model.by_id(wall.id()).GlobalId == wall.GlobalId
@@ -0,0 +1,64 @@
+# IfcPatch - IFC patching utiliy
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcPatch.
+#
+# IfcPatch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcPatch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
+
+import ifcpatch
+import ifcopenshell
+import ifcopenshell.api
+import test.bootstrap
+
+
+class TestOptimise(test.bootstrap.IFC4):
+    def create_placement(self, x=0.0):
+        point = self.file.createIfcCartesianPoint((x, 0.0, 0.0))
+        direction = self.file.createIfcDirection((0.0, 0.0, 1.0))
+        return self.file.createIfcLocalPlacement(None, self.file.createIfcAxis2Placement3D(point, direction, None))
+
+    def test_merging_identical_subgraphs(self):
+        walls = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        for wall in walls:
+            wall.ObjectPlacement = self.create_placement()
+        output = ifcpatch.execute({"file": self.file, "recipe": "Optimise", "arguments": []})
+        walls = output.by_type("IfcWall")
+        assert len(walls) == 3
+        assert len({w.ObjectPlacement for w in walls}) == 1
+        assert len(output.by_type("IfcLocalPlacement")) == 1
+        assert len(output.by_type("IfcCartesianPoint")) == 1
+
+    def test_keeping_different_elements(self):
+        walls = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(2)]
+        walls[0].ObjectPlacement = self.create_placement(0.0)
+        walls[1].ObjectPlacement = self.create_placement(1.0)
+        output = ifcpatch.execute({"file": self.file, "recipe": "Optimise", "arguments": []})
+        walls = [output.by_guid(w.GlobalId) for w in walls]
+        assert walls[0].ObjectPlacement != walls[1].ObjectPlacement
+        assert walls[0].ObjectPlacement.RelativePlacement.Axis == walls[1].ObjectPlacement.RelativePlacement.Axis
+        assert len(output.by_type("IfcCartesianPoint")) == 2
+        assert len(output.by_type("IfcDirection")) == 1
+
+    def test_merging_elements_in_aggregates(self):
+        points = [self.file.createIfcCartesianPoint((float(i % 2), 0.0)) for i in range(4)]
+        polyline = self.file.createIfcPolyline(points)
+        output = ifcpatch.execute({"file": self.file, "recipe": "Optimise", "arguments": []})
+        polyline = output.by_id(polyline.id())
+        assert [p.Coordinates for p in polyline.Points] == [(0.0, 0.0), (1.0, 0.0), (0.0, 0.0), (1.0, 0.0)]
+        assert len(set(polyline.Points)) == 2
+        assert len(output.by_type("IfcCartesianPoint")) == 2
+
+
+class TestOptimiseIFC2X3(test.bootstrap.IFC2X3, TestOptimise):
+    pass
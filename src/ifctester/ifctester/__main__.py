@@ -18,6 +18,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcTester.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
 import time
 import argparse
 import ifcopenshell
@@ -31,35 +32,45 @@ parser.add_argument("-r", "--reporter", type=str, help="The reporting method to
 parser.add_argument("--no-color", help="Disable colour output (supported by Console reporting)", action="store_true")
 parser.add_argument("--excel-safe", help="Make sure exported ODS is safely exported for Excel", action="store_true")
 parser.add_argument("-o", "--output", help="Output file (supported for all types of reporting except Console)")
+parser.add_argument(
+    "--sample-size", type=int, help="Maximum number of entities reported per requirement (not supported by Console)"
+)
+parser.add_argument("-p", "--processes", type=int, help="Number of processes validating specifications", default=1)
 args = parser.parse_args()
 
 specs = ids.open(args.ids)
-if args.ifc:
-    start = time.time()
-    ifc = ifcopenshell.open(args.ifc)
-    print("Finished loading:", time.time() - start)
-    start = time.time()
-    specs.validate(ifc)
-    print("Finished validating:", time.time() - start)
 
 if args.reporter == "Console":
     engine = reporter.Console(specs, use_colour=not args.no_color)
 elif args.reporter == "Txt":
     engine = reporter.Txt(specs)
 elif args.reporter == "Json":
-    engine = reporter.Json(specs)
+    engine = reporter.Json(specs, sample_size=args.sample_size)
+elif args.reporter == "JsonLines":
+    engine = reporter.JsonLines(specs, args.output or sys.stdout, sample_size=args.sample_size)
 elif args.reporter == "Html":
-    engine = reporter.Html(specs)
+    engine = reporter.Html(specs, sample_size=args.sample_size)
 elif args.reporter == "Ods":
-    engine = reporter.Ods(specs, excel_safe=args.excel_safe)
+    engine = reporter.Ods(specs, excel_safe=args.excel_safe, sample_size=args.sample_size)
 elif args.reporter == "OdsSummary":
-    engine = reporter.OdsSummary(specs, excel_safe=args.excel_safe)
+    engine = reporter.OdsSummary(specs, excel_safe=args.excel_safe, sample_size=args.sample_size)
 elif args.reporter == "Bcf":
-    engine = reporter.Bcf(specs)
+    engine = reporter.Bcf(specs, sample_size=args.sample_size)
+
+if args.ifc:
+    start = time.time()
+    ifc = ifcopenshell.open(args.ifc)
+    print("Finished loading:", time.time() - start, file=sys.stderr)
+    start = time.time()
+    on_specification = engine.add_specification if isinstance(engine, reporter.JsonLines) else None
+    specs.validate(ifc, processes=args.processes, on_specification=on_specification)
+    print("Finished validating:", time.time() - start, file=sys.stderr)
 
 engine.report()
 
-if args.output:
+if isinstance(engine, reporter.JsonLines):
+    pass  # Already streamed
+elif args.output:
     engine.to_file(args.output)
 else:
     print(engine.to_string())
@@ -68,6 +68,86 @@ def get_psets(element):
     return ifcopenshell.util.element.get_psets(element)
 
 
+@lru_cache
+def compile_pattern(pattern: str) -> re.Pattern:
+    return re.compile(identities.translate_pattern(pattern))
+
+
+class ElementIndex:
+    """Lookup tables of a model shared by facets evaluating whole sets of elements
+
+    The tables are built lazily and at most once per model. They may contain
+    more elements than strictly necessary: an element absent from a table
+    certainly has no such property set, classification or material, whereas
+    elements present in a table are still checked individually.
+    """
+
+    def __init__(self, ifc_file: ifcopenshell.file):
+        self.file = ifc_file
+        self.definitions: Optional[dict[str, list[ifcopenshell.entity_instance]]] = None
+        self.pset_holders: dict[str, set[int]] = {}
+        self.typed_occurrences: Optional[dict[int, list[int]]] = None
+        self.associations: dict[str, set[int]] = {}
+
+    def by_type(self, ifc_class: str) -> list[ifcopenshell.entity_instance]:
+        try:
+            return self.file.by_type(ifc_class)
+        except:
+            # If the class doesn't exist in the version
+            return []
+
+    def get_typed_occurrences(self, type_ids: set[int]) -> set[int]:
+        if self.typed_occurrences is None:
+            self.typed_occurrences = {}
+            for rel in self.by_type("IfcRelDefinesByType"):
+                if rel.RelatingType:
+                    occurrences = self.typed_occurrences.setdefault(rel.RelatingType.id(), [])
+                    occurrences.extend(o.id() for o in rel.RelatedObjects or [])
+        results = set()
+        for type_id in type_ids:
+            results.update(self.typed_occurrences.get(type_id, ()))
+        return results
+
+    def get_pset_names(self) -> list[str]:
+        if self.definitions is None:
+            self.definitions = {}
+            for ifc_class in ("IfcPropertySetDefinition", "IfcMaterialProperties", "IfcProfileProperties"):
+                for definition in self.by_type(ifc_class):
+                    name = getattr(definition, "Name", None)
+                    if name is not None:
+                        self.definitions.setdefault(name, []).append(definition)
+        return list(self.definitions.keys())
+
+    def get_pset_holders(self, name: str) -> set[int]:
+        """Returns ids of elements which may have a property set named name, possibly inherited from their type"""
+        if (results := self.pset_holders.get(name)) is not None:
+            return results
+        self.get_pset_names()
+        results = set()
+        for definition in self.definitions.get(name, []):
+            for inverse in self.file.get_inverse(definition):
+                if inverse.is_a("IfcRelDefinesByProperties"):
+                    results.update(o.id() for o in inverse.RelatedObjects or [])
+                else:
+                    # e.g. types with HasPropertySets
+                    results.add(inverse.id())
+            for attribute in ("Material", "ProfileDefinition"):
+                if isinstance(holder := getattr(definition, attribute, None), ifcopenshell.entity_instance):
+                    results.add(holder.id())
+        results |= self.get_typed_occurrences(results)
+        self.pset_holders[name] = results
+        return results
+
+    def get_associated(self, ifc_class: str) -> set[int]:
+        """Returns ids of elements associated by an ifc_class relationship, possibly through their type"""
+        if (results := self.associations.get(ifc_class)) is not None:
+            return results
+        results = {o.id() for rel in self.by_type(ifc_class) for o in rel.RelatedObjects or []}
+        results |= self.get_typed_occurrences(results)
+        self.associations[ifc_class] = results
+        return results
+
+
 Cardinality = Literal["required", "optional", "prohibited"]
 
 
@@ -112,11 +192,24 @@ class Facet:
         return self
 
     def filter(
-        self, ifc_file: ifcopenshell.file, elements: Optional[list[ifcopenshell.entity_instance]]
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[list[ifcopenshell.entity_instance]],
+        index: Optional[ElementIndex] = None,
     ) -> list[ifcopenshell.entity_instance]:
         if not elements:
             return []
-        return [e for e in elements if self(e)]
+        return [e for e, result in zip(elements, self.evaluate(elements, index)) if result]
+
+    def evaluate(
+        self, elements: list[ifcopenshell.entity_instance], index: Optional[ElementIndex] = None
+    ) -> list[Result]:
+        """Evaluates the facet for a whole set of elements at once
+
+        Facets may use the lookup tables of the index to dismiss most elements
+        without checking them one by one.
+        """
+        return [self(e) for e in elements]
 
     def to_string(
         self,
@@ -188,10 +281,13 @@ class Entity(Facet):
         super().__init__(name, predefinedType, instructions)
 
     def filter(
-        self, ifc_file: ifcopenshell.file, elements: Optional[list[ifcopenshell.entity_instance]] = None
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[list[ifcopenshell.entity_instance]] = None,
+        index: Optional[ElementIndex] = None,
     ) -> list[ifcopenshell.entity_instance]:
         if isinstance(elements, list):
-            return super().filter(ifc_file, elements)
+            return super().filter(ifc_file, elements, index)
 
         if isinstance(self.name, str):
             try:
@@ -247,10 +343,13 @@ class Attribute(Facet):
         super().__init__(name, value, cardinality, instructions)
 
     def filter(
-        self, ifc_file: ifcopenshell.file, elements: Optional[list[ifcopenshell.entity_instance]]
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[list[ifcopenshell.entity_instance]],
+        index: Optional[ElementIndex] = None,
     ) -> list[ifcopenshell.entity_instance]:
         if isinstance(elements, list):
-            return super().filter(ifc_file, elements)
+            return super().filter(ifc_file, elements, index)
 
         results = []
         schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(ifc_file.schema)
@@ -383,12 +482,27 @@ class Classification(Facet):
         super().__init__(value, system, uri, cardinality, instructions)
 
     def filter(
-        self, ifc_file: ifcopenshell.file, elements: Optional[list[ifcopenshell.entity_instance]]
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[list[ifcopenshell.entity_instance]],
+        index: Optional[ElementIndex] = None,
     ) -> list[ifcopenshell.entity_instance]:
         if isinstance(elements, list):
-            return super().filter(ifc_file, elements)
+            return super().filter(ifc_file, elements, index)
         return ifc_file.by_type("IfcObjectDefinition")
 
+    def evaluate(
+        self, elements: list[ifcopenshell.entity_instance], index: Optional[ElementIndex] = None
+    ) -> list[ClassificationResult]:
+        if index is None or self.cardinality == "optional":
+            return super().evaluate(elements, index)
+        classified = index.get_associated("IfcRelAssociatesClassification")
+        if self.cardinality == "prohibited":
+            unclassified = ClassificationResult(True, {"type": "PROHIBITED"})
+        else:
+            unclassified = ClassificationResult(False, {"type": "NOVALUE"})
+        return [self(e) if e.id() in classified or not e.is_a("IfcRoot") else unclassified for e in elements]
+
     def __call__(self, inst: ifcopenshell.entity_instance, logger: Optional[Logger] = None) -> ClassificationResult:
         if self.cardinality == "optional":
             return ClassificationResult(True)  # Is this really the correct behaviour?
@@ -448,10 +562,13 @@ class PartOf(Facet):
         super().__init__(name, predefinedType, relation, cardinality, instructions)
 
     def filter(
-        self, ifc_file: ifcopenshell.file, elements: Optional[list[ifcopenshell.entity_instance]]
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[list[ifcopenshell.entity_instance]],
+        index: Optional[ElementIndex] = None,
     ) -> list[ifcopenshell.entity_instance]:
         if isinstance(elements, list):
-            return super().filter(ifc_file, elements)
+            return super().filter(ifc_file, elements, index)
         return list(ifc_file)  # Lazy
 
     def asdict(self, clause_type: str) -> dict[str, Any]:
@@ -639,10 +756,13 @@ class Property(Facet):
         super().__init__(propertySet, baseName, value, dataType, uri, cardinality, instructions)
 
     def filter(
-        self, ifc_file: ifcopenshell.file, elements: Optional[list[ifcopenshell.entity_instance]]
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[list[ifcopenshell.entity_instance]],
+        index: Optional[ElementIndex] = None,
     ) -> list[ifcopenshell.entity_instance]:
         if isinstance(elements, list):
-            return super().filter(ifc_file, elements)
+            return super().filter(ifc_file, elements, index)
         if ifc_file.schema == "IFC2X3":
             return ifc_file.by_type("IfcObjectDefinition")
         return (
@@ -651,6 +771,24 @@ class Property(Facet):
             + ifc_file.by_type("IfcProfileDef")
         )
 
+    def evaluate(
+        self, elements: list[ifcopenshell.entity_instance], index: Optional[ElementIndex] = None
+    ) -> list[PropertyResult]:
+        if index is None or self.cardinality == "optional":
+            return super().evaluate(elements, index)
+        if isinstance(self.propertySet, str):
+            holders = index.get_pset_holders(self.propertySet)
+        else:
+            holders = set()
+            for name in index.get_pset_names():
+                if name == self.propertySet:
+                    holders |= index.get_pset_holders(name)
+        if self.cardinality == "prohibited":
+            no_pset = PropertyResult(True, {"type": "PROHIBITED"})
+        else:
+            no_pset = PropertyResult(False, {"type": "NOPSET"})
+        return [self(e) if e.id() in holders else no_pset for e in elements]
+
     def __call__(self, inst: ifcopenshell.entity_instance, logger: Optional[Logger] = None) -> PropertyResult:
         if self.cardinality == "optional":
             return PropertyResult(True)
@@ -906,12 +1044,27 @@ class Material(Facet):
         super().__init__(value, uri, cardinality, instructions)
 
     def filter(
-        self, ifc_file: ifcopenshell.file, elements: Optional[list[ifcopenshell.entity_instance]]
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[list[ifcopenshell.entity_instance]],
+        index: Optional[ElementIndex] = None,
     ) -> list[ifcopenshell.entity_instance]:
         if isinstance(elements, list):
-            return super().filter(ifc_file, elements)
+            return super().filter(ifc_file, elements, index)
         return ifc_file.by_type("IfcObjectDefinition")
 
+    def evaluate(
+        self, elements: list[ifcopenshell.entity_instance], index: Optional[ElementIndex] = None
+    ) -> list[MaterialResult]:
+        if index is None or self.cardinality == "optional":
+            return super().evaluate(elements, index)
+        associated = index.get_associated("IfcRelAssociatesMaterial")
+        if self.cardinality == "prohibited":
+            no_material = MaterialResult(True, {"type": "PROHIBITED"})
+        else:
+            no_material = MaterialResult(False, {"type": "NOVALUE"})
+        return [self(e) if e.id() in associated or not e.is_a("IfcRoot") else no_material for e in elements]
+
     def __call__(self, inst: ifcopenshell.entity_instance, logger: Optional[Logger] = None) -> MaterialResult:
         if self.cardinality == "optional":
             return MaterialResult(True)
@@ -1015,7 +1168,7 @@ class Restriction:
                         return False
                     value = value if isinstance(value, list) else [value]
                     for pattern in value:
-                        if re.compile(identities.translate_pattern(pattern)).fullmatch(other) is None:
+                        if compile_pattern(pattern).fullmatch(other) is None:
                             return False
                 elif constraint == "length":
                     if len(str(other)) != int(value):
@@ -18,7 +18,9 @@
 
 from __future__ import annotations
 import os
+import sys
 import datetime
+import multiprocessing
 import ifcopenshell
 from xmlschema import XMLSchema
 from xmlschema import etree_tostring
@@ -32,12 +34,13 @@ from .facet import (
     PartOf,
     Material,
     Restriction,
+    ElementIndex,
     get_pset,
     get_psets,
     Cardinality,
     FacetFailure,
 )
-from typing import List, Optional, Union, overload, Literal
+from typing import Callable, List, Optional, Union, overload, Literal
 
 cwd = os.path.dirname(os.path.realpath(__file__))
 schema = None
@@ -140,8 +143,21 @@ class Ids:
         return get_schema().is_valid(filepath)
 
     def validate(
-        self, ifc_file: ifcopenshell.file, should_filter_version: bool = False, filepath: Optional[str] = None
+        self,
+        ifc_file: ifcopenshell.file,
+        should_filter_version: bool = False,
+        filepath: Optional[str] = None,
+        processes: int = 1,
+        on_specification: Optional[Callable[[Specification], None]] = None,
     ) -> None:
+        """Validates the IFC file against all specifications
+
+        :param processes: The number of worker processes to validate
+            independent specifications in parallel. The workers are forked, so
+            this is ignored on platforms that can't fork.
+        :param on_specification: Called with every specification as soon as it
+            is validated, in order, e.g. to stream a report.
+        """
         if filepath:
             self.filepath = filepath
             self.filename = os.path.basename(filepath)
@@ -149,10 +165,44 @@ class Ids:
             self.filepath = self.filename = None
         get_pset.cache_clear()
         get_psets.cache_clear()
+        index = ElementIndex(ifc_file)
         for specification in self.specifications:
             specification.reset_status()
             specification.check_ifc_version(ifc_file)
-            specification.validate(ifc_file, should_filter_version=should_filter_version)
+
+        can_fork = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+        if processes <= 1 or not can_fork or len(self.specifications) < 2:
+            for specification in self.specifications:
+                specification.validate(ifc_file, should_filter_version=should_filter_version, index=index)
+                if on_specification:
+                    on_specification(specification)
+            return
+
+        global worker_task
+        worker_task = (self, ifc_file, should_filter_version, index)
+        # Forked workers share the already loaded IFC file, results are sent back as element ids.
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            for specification, results in zip(
+                self.specifications, pool.imap(validate_specification, range(len(self.specifications)))
+            ):
+                specification.set_results(ifc_file, results)
+                if on_specification:
+                    on_specification(specification)
+
+    def validate_specification(
+        self, i: int, ifc_file: ifcopenshell.file, should_filter_version: bool, index: ElementIndex
+    ) -> dict:
+        specification = self.specifications[i]
+        specification.validate(ifc_file, should_filter_version=should_filter_version, index=index)
+        return specification.get_results()
+
+
+worker_task = None
+
+
+def validate_specification(i: int) -> dict:
+    ids, *args = worker_task
+    return ids.validate_specification(i, *args)
 
 
 class Specification:
@@ -254,30 +304,31 @@ class Specification:
         self.is_ifc_version = ifc_file.schema_identifier in self.ifcVersion
         return self.is_ifc_version
 
-    def validate(self, ifc_file: ifcopenshell.file, should_filter_version: bool = False) -> None:
+    def validate(
+        self, ifc_file: ifcopenshell.file, should_filter_version: bool = False, index: Optional[ElementIndex] = None
+    ) -> None:
         if should_filter_version and not self.is_ifc_version:
             return
 
+        if index is None:
+            index = ElementIndex(ifc_file)
+
         elements = None
 
         # This is a broadphase filter of applicability. We almost never want to
         # test every single class in an IFC model.
         for i, facet in enumerate(self.applicability):
-            elements = facet.filter(ifc_file, elements)
-
-        for element in elements or []:
-            is_applicable = True
-            for facet in self.applicability:
-                if isinstance(facet, Entity):
-                    continue
-                if not bool(facet(element)):
-                    is_applicable = False
-                    break
-            if not is_applicable:
-                continue
-            self.applicable_entities.append(element)
-            for facet in self.requirements:
-                result = facet(element)
+            elements = facet.filter(ifc_file, elements, index)
+            if i == 0 and not isinstance(facet, Entity):
+                # Only entity facets filter precisely without a set of elements
+                elements = facet.filter(ifc_file, elements, index)
+
+        self.applicable_entities.extend(elements or [])
+        results = [facet.evaluate(self.applicable_entities, index) for facet in self.requirements]
+
+        for i, element in enumerate(self.applicable_entities):
+            for facet, facet_results in zip(self.requirements, results):
+                result = facet_results[i]
                 is_pass = bool(result)
                 if self.maxOccurs != 0:  # This is a required or optional specification
                     if is_pass:
@@ -309,6 +360,35 @@ class Specification:
             if self.applicable_entities and not self.requirements:
                 self.status = False
 
+    def get_results(self) -> dict:
+        """Returns the validation results with elements as ids, so they can be sent between processes"""
+        return {
+            "status": self.status,
+            "applicable_entities": [e.id() for e in self.applicable_entities],
+            "passed_entities": [e.id() for e in self.passed_entities],
+            "failed_entities": [e.id() for e in self.failed_entities],
+            "requirements": [
+                {
+                    "status": facet.status,
+                    "passed_entities": [e.id() for e in facet.passed_entities],
+                    "failures": [(f["element"].id(), f["reason"]) for f in facet.failures],
+                }
+                for facet in self.requirements
+            ],
+        }
+
+    def set_results(self, ifc_file: ifcopenshell.file, results: dict) -> None:
+        self.status = results["status"]
+        self.applicable_entities[:] = [ifc_file.by_id(i) for i in results["applicable_entities"]]
+        self.passed_entities = {ifc_file.by_id(i) for i in results["passed_entities"]}
+        self.failed_entities = {ifc_file.by_id(i) for i in results["failed_entities"]}
+        for facet, facet_results in zip(self.requirements, results["requirements"]):
+            facet.status = facet_results["status"]
+            facet.passed_entities = {ifc_file.by_id(i) for i in facet_results["passed_entities"]}
+            facet.failures[:] = [
+                FacetFailure(element=ifc_file.by_id(i), reason=reason) for i, reason in facet_results["failures"]
+            ]
+
     def get_usage(self) -> Cardinality:
         if self.minOccurs != 0:
             return "required"
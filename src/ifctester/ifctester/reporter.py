@@ -27,11 +27,20 @@ import ifcopenshell.util.unit
 import ifcopenshell.util.element
 from .ids import Specification, Ids
 from .facet import Facet, FacetFailure
-from typing import TypedDict, Union, Literal, Optional
+from typing import TypedDict, Union, Literal, Optional, IO
 
 cwd = os.path.dirname(os.path.realpath(__file__))
 
 
+def sample(items, sample_size: Optional[int]) -> list:
+    """Returns at most sample_size items, evenly spread so that they are representative of all items"""
+    items = list(items)
+    if sample_size is None or len(items) <= sample_size:
+        return items
+    step = len(items) / sample_size
+    return [items[int(i * step)] for i in range(sample_size)]
+
+
 class Reporter:
     def __init__(self, ids: Ids):
         self.ids = ids
@@ -235,34 +244,60 @@ class Txt(Console):
 
 
 class Json(Reporter):
-    def __init__(self, ids: Ids):
+    def __init__(self, ids: Ids, sample_size: Optional[int] = None):
+        """
+        :param sample_size: The maximum number of passed and of failed entities
+            reported per requirement, evenly sampled from all of them. Totals
+            always account for all entities. If None, all entities are reported.
+        """
         super().__init__(ids)
+        self.sample_size = sample_size
         self.results = Results()
+        self.totals: Optional[dict] = None
 
     def report(self) -> Results:
-        self.results["title"] = self.ids.info.get("title", "Untitled IDS")
-        self.results["date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.results["filepath"] = self.ids.filepath
-        self.results["filename"] = self.ids.filename
-        total_specifications = 0
-        total_specifications_pass = 0
-        total_requirements = 0
-        total_requirements_pass = 0
-        total_checks = 0
-        total_checks_pass = 0
-        status = True
+        self.report_header()
         self.results["specifications"] = []
         for specification in self.ids.specifications:
             specification_report = self.report_specification(specification)
             self.results["specifications"].append(specification_report)
-            total_specifications += 1
-            total_specifications_pass += 1 if specification_report["status"] else 0
-            total_requirements += len(specification_report["requirements"])
-            total_requirements_pass += len([r for r in specification_report["requirements"] if r["status"]])
-            total_checks += specification_report["total_checks"]
-            total_checks_pass += specification_report["total_checks_pass"]
-            if not specification_report["status"]:
-                status = False
+            self.add_totals(specification_report)
+        self.report_totals()
+        return self.results
+
+    def report_header(self) -> None:
+        self.results["title"] = self.ids.info.get("title", "Untitled IDS")
+        self.results["date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.results["filepath"] = self.ids.filepath
+        self.results["filename"] = self.ids.filename
+        self.totals = {
+            "status": True,
+            "total_specifications": 0,
+            "total_specifications_pass": 0,
+            "total_requirements": 0,
+            "total_requirements_pass": 0,
+            "total_checks": 0,
+            "total_checks_pass": 0,
+        }
+
+    def add_totals(self, specification_report: ResultsSpecification) -> None:
+        self.totals["total_specifications"] += 1
+        self.totals["total_specifications_pass"] += 1 if specification_report["status"] else 0
+        self.totals["total_requirements"] += len(specification_report["requirements"])
+        self.totals["total_requirements_pass"] += len([r for r in specification_report["requirements"] if r["status"]])
+        self.totals["total_checks"] += specification_report["total_checks"]
+        self.totals["total_checks_pass"] += specification_report["total_checks_pass"]
+        if not specification_report["status"]:
+            self.totals["status"] = False
+
+    def report_totals(self) -> None:
+        status = self.totals["status"]
+        total_specifications = self.totals["total_specifications"]
+        total_specifications_pass = self.totals["total_specifications_pass"]
+        total_requirements = self.totals["total_requirements"]
+        total_requirements_pass = self.totals["total_requirements_pass"]
+        total_checks = self.totals["total_checks"]
+        total_checks_pass = self.totals["total_checks_pass"]
         self.results["status"] = status
         self.results["total_specifications"] = total_specifications
         self.results["total_specifications_pass"] = total_specifications_pass
@@ -282,7 +317,6 @@ class Json(Reporter):
         self.results["percent_checks_pass"] = (
             math.floor((total_checks_pass / total_checks) * 100) if total_checks else "N/A"
         )
-        return self.results
 
     def report_specification(self, specification: Specification) -> ResultsSpecification:
         applicability = [a.to_string("applicability") for a in specification.applicability]
@@ -389,7 +423,7 @@ class Json(Reporter):
                     "tag": getattr(e, "Tag", None),
                 }
             )
-            for e in requirement.passed_entities
+            for e in sample(requirement.passed_entities, self.sample_size)
         ]
 
     def report_failed_entities(self, requirement: Facet) -> list[ResultsEntity]:
@@ -408,7 +442,7 @@ class Json(Reporter):
                     "tag": getattr(f["element"], "Tag", None),
                 }
             )
-            for f in requirement.failures
+            for f in sample(requirement.failures, self.sample_size)
         ]
 
     def to_string(self) -> str:
@@ -427,60 +461,75 @@ class Json(Reporter):
 
 
 class Html(Json):
-    def __init__(self, ids: Ids):
+    def __init__(self, ids: Ids, sample_size: Optional[int] = None):
         self.entity_limit = 100
-        super().__init__(ids)
+        super().__init__(ids, sample_size)
 
     def report(self) -> None:
         super().report()
-        for spec in self.results["specifications"]:
-            for requirement in spec["requirements"]:
-                total_passed_entities = len(requirement["passed_entities"])
-                total_failed_entities = len(requirement["failed_entities"])
-                requirement["passed_entities"] = self.limit_entities(requirement["passed_entities"])
-                requirement["failed_entities"] = self.limit_entities(requirement["failed_entities"])
-                requirement["total_failed_entities"] = total_failed_entities
-                requirement["total_omitted_failures"] = total_failed_entities - self.entity_limit
-                requirement["has_omitted_failures"] = total_failed_entities > self.entity_limit
-                requirement["total_passed_entities"] = total_passed_entities
-                requirement["total_omitted_passes"] = total_passed_entities - self.entity_limit
-                requirement["has_omitted_passes"] = total_passed_entities > self.entity_limit
-
-    def limit_entities(self, entities):
-        if len(entities) > self.entity_limit:
-            if entities[0]["element_type"]:
-                return self.group_by_type(entities)
-            return entities[0 : self.entity_limit]
-        return entities
-
-    def group_by_type(self, entities):
+        for spec, specification in zip(self.results["specifications"], self.ids.specifications):
+            for requirement, facet in zip(spec["requirements"], specification.requirements):
+                # Entities may have been sampled, so count them on the facet
+                passed_elements = list(facet.passed_entities)
+                failed_elements = [f["element"] for f in facet.failures]
+                requirement["passed_entities"], omitted_passes = self.limit_entities(
+                    requirement["passed_entities"], passed_elements
+                )
+                requirement["failed_entities"], omitted_failures = self.limit_entities(
+                    requirement["failed_entities"], failed_elements
+                )
+                requirement["total_failed_entities"] = len(failed_elements)
+                requirement["total_omitted_failures"] = omitted_failures
+                requirement["has_omitted_failures"] = omitted_failures > 0
+                requirement["total_passed_entities"] = len(passed_elements)
+                requirement["total_omitted_passes"] = omitted_passes
+                requirement["has_omitted_passes"] = omitted_passes > 0
+
+    def limit_entities(self, entities, elements):
+        """Returns the entities to show, and how many elements are neither shown nor summarised by type
+
+        :param entities: The reported, possibly sampled, entities.
+        :param elements: All elements the entities were reported from.
+        """
+        if len(entities) > self.entity_limit and entities[0]["element_type"]:
+            type_totals = None
+            if len(entities) < len(elements):
+                type_totals = {}
+                for element in elements:
+                    element_type = ifcopenshell.util.element.get_type(element)
+                    type_totals[element_type] = type_totals.get(element_type, 0) + 1
+            entities = self.group_by_type(entities, type_totals)
+        else:
+            entities = entities[0 : self.entity_limit]
+        total_shown = len(entities) + sum(e.get("extra_of_type", 0) for e in entities)
+        return entities, len(elements) - total_shown
+
+    def group_by_type(self, entities, type_totals=None):
+        """Shows a few entities of each type, summarising how many more of that type there are
+
+        :param type_totals: The number of elements of each type, if the
+            entities are only a sample of them.
+        """
         results = []
         group_limit = 5
         grouped_by_type = {}
         [grouped_by_type.setdefault(e["element_type"], []).append(e) for e in entities]
         total_entities = 0
         for element_type, entities in grouped_by_type.items():
+            total_of_type = type_totals[element_type] if type_totals else len(entities)
             for i, entity in enumerate(entities):
                 results.append(entity)
                 total_entities += 1
 
-                if element_type and i > group_limit:
+                if (element_type and i > group_limit) or total_entities == self.entity_limit:
                     results[-1]["type_name"] = element_type.Name if element_type else "Untyped"
                     if element_type:
                         results[-1]["type_tag"] = element_type.Tag
                         results[-1]["type_global_id"] = element_type.GlobalId
-                    results[-1]["extra_of_type"] = len(entities) - i
+                    results[-1]["extra_of_type"] = total_of_type - i - 1
                     if total_entities == self.entity_limit:
                         return results
                     break
-
-                if total_entities == self.entity_limit:
-                    results[-1]["type_name"] = element_type.Name if element_type else "Untyped"
-                    if element_type:
-                        results[-1]["type_tag"] = element_type.Tag
-                        results[-1]["type_global_id"] = element_type.GlobalId
-                    results[-1]["extra_of_type"] = len(entities) - i
-                    return results
         return results
 
     def to_string(self) -> str:
@@ -498,8 +547,8 @@ class Html(Json):
 
 
 class Ods(Json):
-    def __init__(self, ids: Ids, excel_safe=False):
-        super().__init__(ids)
+    def __init__(self, ids: Ids, excel_safe=False, sample_size: Optional[int] = None):
+        super().__init__(ids, sample_size)
         self.excel_safe = excel_safe
         self.colours = {
             "h": "cccccc",  # Header
@@ -639,8 +688,8 @@ class Ods(Json):
 
 
 class OdsSummary(Json):
-    def __init__(self, ids: Ids, excel_safe=False):
-        super().__init__(ids)
+    def __init__(self, ids: Ids, excel_safe=False, sample_size: Optional[int] = None):
+        super().__init__(ids, sample_size)
         self.excel_safe = excel_safe
         self.colours = {
             "h": "cccccc",  # Header
@@ -762,7 +811,7 @@ class OdsSummary(Json):
 
 class Bcf(Json):
     def report_failed_entities(self, requirement: Facet) -> list[FacetFailure]:
-        return [FacetFailure(f) for f in requirement.failures]
+        return [FacetFailure(f) for f in sample(requirement.failures, self.sample_size)]
 
     def to_file(self, filepath: str) -> None:
         import numpy as np
@@ -801,3 +850,90 @@ class Bcf(Json):
                     if element.is_a("IfcElement"):
                         topic.add_viewpoint(element)
         bcfxml.save_project(filepath)
+
+
+class JsonLines(Json):
+    """Streams results as JSON Lines while specifications complete
+
+    The first line describes the IDS, followed by a line per specification,
+    a line per requirement and a line per (sampled) failure, each of which
+    refers to its specification and requirement by index. The last line holds
+    the overall totals. Reported specifications are not kept in memory.
+
+    Example:
+
+    .. code:: python
+
+        engine = reporter.JsonLines(specs, "report.jsonl", sample_size=100)
+        specs.validate(ifc, on_specification=engine.add_specification)
+        engine.report()
+    """
+
+    def __init__(self, ids: Ids, output: Union[str, IO[str], None] = None, sample_size: Optional[int] = None):
+        super().__init__(ids, sample_size)
+        self.output = output
+        self.stream: Optional[IO[str]] = None
+        self.lines: list[str] = []
+        self.reported: set[int] = set()
+
+    def write_line(self, line: dict) -> None:
+        import json
+
+        if self.stream is None and self.output is not None:
+            self.stream = open(self.output, "w", encoding="utf-8") if isinstance(self.output, str) else self.output
+        line = json.dumps(line, ensure_ascii=False, default=self.encode)
+        if self.stream is None:
+            self.lines.append(line)
+        else:
+            self.stream.write(line + "\n")
+
+    def add_specification(self, specification: Specification) -> None:
+        if self.totals is None:
+            self.report_header()
+            self.write_line({"type": "ids", **self.results})
+        index = len(self.reported)
+        self.reported.add(id(specification))
+        specification_report = self.report_specification(specification)
+        self.add_totals(specification_report)
+        requirements = specification_report.pop("requirements")
+        self.write_line({"type": "specification", "index": index, **specification_report})
+        for i, requirement in enumerate(requirements):
+            failures = requirement.pop("failed_entities")
+            requirement.pop("passed_entities")
+            requirement["total_omitted_failures"] = requirement["total_fail"] - len(failures)
+            self.write_line({"type": "requirement", "specification": index, "index": i, **requirement})
+            for failure in failures:
+                failure.pop("element")
+                failure["element_type"] = failure["element_type"].id() if failure["element_type"] else None
+                self.write_line({"type": "failure", "specification": index, "requirement": i, **failure})
+
+    def report_passed_entities(self, requirement: Facet) -> list[ResultsEntity]:
+        # Only totals of passed entities are streamed
+        return []
+
+    def report(self) -> None:
+        for specification in self.ids.specifications:
+            if id(specification) not in self.reported:
+                self.add_specification(specification)
+        if self.totals is None:
+            self.report_header()
+            self.write_line({"type": "ids", **self.results})
+        self.report_totals()
+        self.write_line(
+            {
+                "type": "summary",
+                **{k: v for k, v in self.results.items() if k.startswith(("total_", "percent_", "status"))},
+            }
+        )
+        if self.stream is not None:
+            self.stream.flush()
+            if isinstance(self.output, str):
+                self.stream.close()
+
+    def to_string(self) -> str:
+        return "\n".join(self.lines)
+
+    def to_file(self, filepath: str) -> None:
+        with open(filepath, "w", encoding="utf-8") as outfile:
+            for line in self.lines:
+                outfile.write(line + "\n")
@@ -33,6 +33,8 @@ def run(name, *, facet, inst, expected):
     ifctester.facet.get_pset.cache_clear()
     ifctester.facet.get_psets.cache_clear()
     assert bool(facet(inst)) is expected
+    index = ifctester.facet.ElementIndex(inst.file)
+    assert bool(facet.evaluate([inst], index)[0]) is expected
 
 
 class TestEntity:
@@ -249,6 +249,34 @@ class TestIds:
         assert spec.requirements[0].failures[0]["element"] == wall
         assert spec2.requirements[0].failures[0]["element"] == wall
 
+    def test_validating_specifications_in_parallel(self):
+        def create_ids():
+            specs = ids.Ids(title="Title")
+            for name, entity in (("Walls", "IFCWALL"), ("Slabs", "IFCSLAB"), ("Missing", "IFCBEAM")):
+                spec = ids.Specification(name=name, minOccurs=1)
+                spec.applicability.append(ids.Entity(name=entity))
+                spec.requirements.append(ids.Attribute(name="Name", value="Waldo"))
+                spec.requirements.append(ids.Attribute(name="Description", value="Foobar"))
+                specs.specifications.append(spec)
+            return specs
+
+        model = ifcopenshell.file()
+        model.createIfcWall(Name="Waldo", Description="Foobar")
+        model.createIfcWall(Name="Wally")
+        model.createIfcSlab(Name="Waldo")
+        model.createIfcSlab(Description="Foobar")
+
+        serial = create_ids()
+        serial.validate(model)
+        parallel = create_ids()
+        validated = []
+        parallel.validate(model, processes=2, on_specification=lambda spec: validated.append(spec.name))
+        assert validated == ["Walls", "Slabs", "Missing"]
+        assert [s.get_results() for s in parallel.specifications] == [s.get_results() for s in serial.specifications]
+        assert [s.status for s in parallel.specifications] == [False, False, False]
+        failures = parallel.specifications[0].requirements[0].failures
+        assert [f["element"].Name for f in failures] == ["Wally"]
+
 
 class TestSpecification:
     def test_create_specification_with_minimal_information(self):
@@ -371,3 +399,30 @@ class TestSpecification:
             [wall],
             [],
         )
+
+    def test_getting_and_setting_results(self):
+        def create_specification():
+            spec = ids.Specification(name="Name")
+            spec.applicability.append(ids.Entity(name="IFCWALL"))
+            spec.requirements.append(ids.Attribute(name="Name", value="Waldo"))
+            return spec
+
+        model = ifcopenshell.file()
+        wall = model.createIfcWall()
+        waldo = model.createIfcWall(Name="Waldo")
+        spec = create_specification()
+        spec.validate(model)
+        results = spec.get_results()
+        assert results["applicable_entities"] == [e.id() for e in spec.applicable_entities]
+        assert results["requirements"][0]["failures"] == [(wall.id(), spec.requirements[0].failures[0]["reason"])]
+
+        spec2 = create_specification()
+        spec2.set_results(model, results)
+        assert spec2.status is False
+        assert spec2.applicable_entities == spec.applicable_entities
+        assert spec2.passed_entities == {waldo}
+        assert spec2.failed_entities == {wall}
+        assert spec2.requirements[0].status is False
+        assert spec2.requirements[0].passed_entities == {waldo}
+        assert spec2.requirements[0].failures == spec.requirements[0].failures
+        assert spec2.get_results() == results
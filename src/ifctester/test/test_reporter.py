@@ -0,0 +1,133 @@
+# IfcTester - IDS based model auditing
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcTester.
+#
+# IfcTester is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcTester is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcTester.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import json
+import ifcopenshell
+from ifctester import ids, reporter
+
+
+def create_specs():
+    specs = ids.Ids(title="Title")
+    spec = ids.Specification(name="Named walls")
+    spec.applicability.append(ids.Entity(name="IFCWALL"))
+    spec.requirements.append(ids.Attribute(name="Name", value="Waldo"))
+    specs.specifications.append(spec)
+    spec = ids.Specification(name="Described walls")
+    spec.applicability.append(ids.Entity(name="IFCWALL"))
+    spec.requirements.append(ids.Attribute(name="Description"))
+    specs.specifications.append(spec)
+    model = ifcopenshell.file()
+    for i in range(10):
+        model.createIfcWall(Name="Waldo" if i < 3 else "Wally")
+    return specs, model
+
+
+class TestJson:
+    def test_sampling_entities_with_accurate_totals(self):
+        specs, model = create_specs()
+        specs.validate(model)
+        results = reporter.Json(specs, sample_size=4).report()
+        requirement = results["specifications"][0]["requirements"][0]
+        assert len(requirement["failed_entities"]) == 4
+        assert len(requirement["passed_entities"]) == 3
+        assert requirement["total_fail"] == 7
+        assert requirement["total_pass"] == 3
+        assert results["total_checks"] == 20
+        assert results["total_checks_pass"] == 3
+
+
+class TestHtml:
+    def test_counting_omitted_entities_when_sampling(self):
+        specs, model = create_specs()
+        specs.validate(model)
+        engine = reporter.Html(specs, sample_size=4)
+        engine.report()
+        requirement = engine.results["specifications"][0]["requirements"][0]
+        assert len(requirement["failed_entities"]) == 4
+        assert requirement["total_failed_entities"] == 7
+        assert requirement["total_omitted_failures"] == 3
+        assert requirement["has_omitted_failures"] is True
+        assert len(requirement["passed_entities"]) == 3
+        assert requirement["total_omitted_passes"] == 0
+        assert requirement["has_omitted_passes"] is False
+
+    def test_counting_entities_of_each_type_when_sampling(self):
+        specs = create_specs()[0]
+        model = ifcopenshell.file()
+        for name, total in (("Type A", 20), ("Type B", 10)):
+            element_type = model.createIfcWallType(Name=name)
+            walls = [model.createIfcWall(Name="Wally") for i in range(total)]
+            model.createIfcRelDefinesByType(RelatedObjects=walls, RelatingType=element_type)
+        specs.validate(model)
+        engine = reporter.Html(specs, sample_size=20)
+        engine.entity_limit = 10
+        engine.report()
+        requirement = engine.results["specifications"][0]["requirements"][0]
+        failures = requirement["failed_entities"]
+        assert len(failures) == 10
+        assert [e["element_type"].Name for e in failures] == ["Type A"] * 7 + ["Type B"] * 3
+        # The number of extra entities of each type is counted from all failures, not from the sample
+        assert failures[6]["extra_of_type"] == 13
+        assert failures[9]["extra_of_type"] == 7
+        assert requirement["total_failed_entities"] == 30
+        assert requirement["total_omitted_failures"] == 0
+        assert requirement["has_omitted_failures"] is False
+
+
+class TestJsonLines:
+    def test_streaming_results_while_validating(self):
+        specs, model = create_specs()
+        output = io.StringIO()
+        engine = reporter.JsonLines(specs, output, sample_size=2)
+        line_counts = []
+
+        def on_specification(specification):
+            engine.add_specification(specification)
+            line_counts.append(len(output.getvalue().splitlines()))
+
+        specs.validate(model, on_specification=on_specification)
+        engine.report()
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert line_counts == [5, 9]
+        assert [line["type"] for line in lines] == [
+            "ids",
+            "specification",
+            "requirement",
+            "failure",
+            "failure",
+            "specification",
+            "requirement",
+            "failure",
+            "failure",
+            "summary",
+        ]
+        assert lines[2]["total_fail"] == 7
+        assert lines[2]["total_omitted_failures"] == 5
+        assert lines[3]["specification"] == 0 and lines[3]["requirement"] == 0
+        assert lines[-1]["total_checks"] == 20
+        assert lines[-1]["status"] is False
+
+    def test_reporting_without_streaming(self):
+        specs, model = create_specs()
+        specs.validate(model)
+        engine = reporter.JsonLines(specs)
+        engine.report()
+        lines = [json.loads(line) for line in engine.to_string().splitlines()]
+        assert len([line for line in lines if line["type"] == "failure"]) == 17
+        assert lines[-1]["total_specifications_fail"] == 2